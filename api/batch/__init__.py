@@ -0,0 +1,60 @@
+"""
+Azure Function running several API reads in one request.
+Used by the frontend to load a client page (dashboard, contract, payments
+and periods) in one round trip.
+"""
+import azure.functions as func
+import json
+import sys
+import os
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.dispatch import BatchError, Dispatcher, parse_batch, run_batch
+from utils.middleware import http_function, json_response
+
+_dispatcher: Optional[Dispatcher] = None
+
+
+def get_dispatcher() -> Dispatcher:
+    """Route table for the other functions, built on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = Dispatcher(exclude=(os.path.basename(os.path.dirname(__file__)),))
+    return _dispatcher
+
+
+# Sub-requests are admitted one by one; holding a slot here as well could
+# leave them waiting on their own batch.
+@http_function("$batch", admit=False)
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Run several GET requests concurrently.
+    Route: POST /api/$batch
+    
+    Body:
+        {"requests": [{"id": "dashboard", "method": "GET", "url": "/api/dashboard/7"},
+                      {"id": "payments", "url": "payments?client_id=7&limit=20"}]}
+    
+    Returns:
+    - responses: One entry per request, in request order, with id, status,
+      duration_ms, headers (including Server-Timing) and the decoded body
+    """
+    try:
+        requests = parse_batch(req.get_json())
+    except ValueError as e:
+        # Covers invalid JSON as well as BatchError
+        message = str(e) if isinstance(e, BatchError) else "Invalid request body: expected JSON"
+        return func.HttpResponse(
+            json.dumps({"error": message}),
+            status_code=400,
+            mimetype="application/json"
+        )
+    
+    # Sub-requests join the caller's distributed trace
+    headers = {}
+    if req.headers.get('traceparent'):
+        headers['traceparent'] = req.headers['traceparent']
+    
+    responses = await run_batch(get_dispatcher(), requests, headers)
+    return json_response({"responses": responses})
@@ -4,7 +4,14 @@ Compares actual vs expected fees.
 """
 import azure.functions as func
 import json
+import sys
+import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.fees import variance
+from utils.middleware import http_function, json_response
+
+@http_function("calculations/variance", admit=False)
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Calculate variance between actual and expected fees.
@@ -20,40 +27,4 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="application/json"
         )
     
-    if expected == 0:
-        return func.HttpResponse(
-            json.dumps({
-                "status": "unknown",
-                "message": "N/A",
-                "difference": None,
-                "percent_difference": None
-            }),
-            mimetype="application/json"
-        )
-    
-    difference = actual - expected
-    percent_diff = (difference / expected) * 100
-    
-    # Determine status based on percentage difference
-    if abs(difference) < 0.01:
-        status = "exact"
-        message = "Exact Match"
-    elif abs(percent_diff) <= 5:
-        status = "acceptable"
-        message = f"${difference:,.2f} ({percent_diff:.1f}%)"
-    elif abs(percent_diff) <= 15:
-        status = "warning"
-        message = f"${difference:,.2f} ({percent_diff:.1f}%)"
-    else:
-        status = "alert"
-        message = f"${difference:,.2f} ({percent_diff:.1f}%)"
-    
-    return func.HttpResponse(
-        json.dumps({
-            "status": status,
-            "message": message,
-            "difference": difference,
-            "percent_difference": percent_diff
-        }),
-        mimetype="application/json"
-    )
\ No newline at end of file
+    return json_response(variance(actual, expected))
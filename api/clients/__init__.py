@@ -13,16 +13,41 @@ from typing import Dict, Any
 # Add backend to path to use existing database code
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from database.batch import batch_result, fetch_by_ids, parse_ids
 from database.database import get_db
 from database.models import Client, ClientCreate, ClientUpdate
+from database.projection import Entity, Field
+from services.dashboard_read_model import mark_clients_stale
+from utils.middleware import http_function, json_response
 
+# Fields for GET /api/clients?fields=...
+CLIENT_LIST = Entity("client", {
+    'client_id': Field('c.client_id'),
+    'display_name': Field('c.display_name'),
+    'full_name': Field('c.full_name'),
+    'ima_signed_date': Field('c.ima_signed_date'),
+    'onedrive_folder_path': Field('c.onedrive_folder_path'),
+    'valid_from': Field('c.valid_from'),
+    'valid_to': Field('c.valid_to'),
+    'provider_name': Field('co.provider_name', 'co'),
+    'last_payment_date': Field('m.last_payment_date', 'm'),
+    'last_payment_amount': Field('m.last_payment_amount', 'm'),
+    'last_recorded_assets': Field('m.last_recorded_assets', 'm'),
+    'total_ytd_payments': Field('m.total_ytd_payments', 'm'),
+}, joins={
+    'co': "LEFT JOIN contracts co ON c.client_id = co.client_id AND co.valid_to IS NULL",
+    'm': "LEFT JOIN client_metrics m ON c.client_id = m.client_id",
+})
 
+
+@http_function("clients/{id?}")
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Handle client-related HTTP requests.
     
     Routes:
-    - GET /api/clients - List all clients
+    - GET /api/clients - List all clients (?fields=client_id,display_name to trim columns)
+    - GET /api/clients?ids=1,2,3 - Get several clients, keyed by id
     - GET /api/clients/{id} - Get specific client
     - POST /api/clients - Create new client
     - PUT /api/clients/{id} - Update client
@@ -35,23 +60,54 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         db = get_db()
         
-        # GET all clients
-        if req.method == "GET" and not client_id:
-            # Get query parameters
-            provider = req.params.get('provider')
+        # GET several clients by id
+        if req.method == "GET" and not client_id and req.params.get('ids'):
+            try:
+                ids = parse_ids(req.params.get('ids'))
+            except ValueError as e:
+                return func.HttpResponse(
+                    json.dumps({"error": str(e)}),
+                    status_code=400,
+                    mimetype="application/json"
+                )
             
             with db.cursor(commit=False) as cursor:
-                query = """
-                    SELECT c.client_id, c.display_name, c.full_name, 
+                found = fetch_by_ids(cursor, """
+                    -- name: clients.by_ids
+                    SELECT c.client_id, c.display_name, c.full_name,
                            c.ima_signed_date, c.onedrive_folder_path,
                            c.valid_from, c.valid_to,
-                           co.provider_name,
+                           co.provider_name, co.fee_type, co.payment_schedule,
                            m.last_payment_date, m.last_payment_amount,
-                           m.last_recorded_assets, m.total_ytd_payments
+                           m.total_ytd_payments, m.avg_quarterly_payment,
+                           m.last_recorded_assets, m.next_payment_due
                     FROM clients c
                     LEFT JOIN contracts co ON c.client_id = co.client_id 
                         AND co.valid_to IS NULL
                     LEFT JOIN client_metrics m ON c.client_id = m.client_id
+                    WHERE c.client_id IN ({ids}) AND c.valid_to IS NULL
+                """, ids, key='client_id')
+            
+            return json_response(batch_result(ids, found))
+        
+        # GET all clients
+        elif req.method == "GET" and not client_id:
+            # Get query parameters
+            provider = req.params.get('provider')
+            try:
+                fields = CLIENT_LIST.parse(req.params.get('fields'))
+            except ValueError as e:
+                return func.HttpResponse(
+                    json.dumps({"error": str(e)}),
+                    status_code=400,
+                    mimetype="application/json"
+                )
+            
+            with db.cursor(commit=False) as cursor:
+                query = f"""
+                    SELECT {CLIENT_LIST.select_list(fields)}
+                    FROM clients c
+                    {CLIENT_LIST.join_clauses(fields, also=['co'] if provider else [])}
                     WHERE c.valid_to IS NULL
                 """
                 
@@ -76,10 +132,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 client_dict = dict(zip(columns, row))
                 clients.append(client_dict)
             
-            return func.HttpResponse(
-                json.dumps(clients, default=str),
-                mimetype="application/json"
-            )
+            return json_response(clients)
         
         # GET single client
         elif req.method == "GET" and client_id:
@@ -111,10 +164,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             
             client_dict = dict(zip(columns, row))
             
-            return func.HttpResponse(
-                json.dumps(client_dict, default=str),
-                mimetype="application/json"
-            )
+            return json_response(client_dict)
         
         # POST - Create new client
         elif req.method == "POST":
@@ -142,11 +192,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 ))
                 new_id = cursor.fetchone()[0]
             
-            return func.HttpResponse(
-                json.dumps({"client_id": new_id, **client_create.model_dump()}, default=str),
-                mimetype="application/json",
-                status_code=201
-            )
+            return json_response({"client_id": new_id, **client_create.model_dump()}, status_code=201)
         
         # PUT - Update client
         elif req.method == "PUT" and client_id:
@@ -192,11 +238,10 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                         status_code=404,
                         mimetype="application/json"
                     )
+                
+                mark_clients_stale(cursor, int(client_id))
             
-            return func.HttpResponse(
-                json.dumps({"message": "Client updated successfully"}),
-                mimetype="application/json"
-            )
+            return json_response({"message": "Client updated successfully"})
         
         # DELETE - Soft delete client
         elif req.method == "DELETE" and client_id:
@@ -213,6 +258,8 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                         status_code=404,
                         mimetype="application/json"
                     )
+                
+                mark_clients_stale(cursor, int(client_id))
             
             return func.HttpResponse(status_code=204)
         
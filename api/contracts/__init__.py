@@ -13,16 +13,40 @@ import os
 # Add backend to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from database.batch import batch_result, fetch_by_ids, parse_ids
 from database.database import get_db
 from database.models import Contract, ContractCreate, ContractUpdate
+from database.projection import Entity, Field
+from services.dashboard_read_model import mark_contract_stale
+from utils.middleware import http_function, json_response
 
+# Fields for GET /api/contracts?fields=...
+CONTRACT_LIST = Entity("contract", {
+    'contract_id': Field('co.contract_id'),
+    'client_id': Field('co.client_id'),
+    'contract_number': Field('co.contract_number'),
+    'provider_name': Field('co.provider_name'),
+    'contract_start_date': Field('co.contract_start_date'),
+    'fee_type': Field('co.fee_type'),
+    'percent_rate': Field('co.percent_rate'),
+    'flat_rate': Field('co.flat_rate'),
+    'payment_schedule': Field('co.payment_schedule'),
+    'num_people': Field('co.num_people'),
+    'notes': Field('co.notes'),
+    'valid_from': Field('co.valid_from'),
+    'valid_to': Field('co.valid_to'),
+    'client_name': Field('c.display_name'),
+})
 
+
+@http_function("contracts/{id?}")
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Handle contract-related HTTP requests.
     
     Routes:
-    - GET /api/contracts - List all contracts
+    - GET /api/contracts - List all contracts (?fields=contract_id,provider_name to trim columns)
+    - GET /api/contracts?ids=1,2,3 - Get several contracts, keyed by id
     - GET /api/contracts/{id} - Get specific contract
     - GET /api/contracts/client/{client_id} - Get contract for a client
     - POST /api/contracts - Create new contract
@@ -36,13 +60,43 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         db = get_db()
         
+        # GET several contracts by id
+        if req.method == "GET" and not contract_id and not client_id and req.params.get('ids'):
+            try:
+                ids = parse_ids(req.params.get('ids'))
+            except ValueError as e:
+                return func.HttpResponse(
+                    json.dumps({"error": str(e)}),
+                    status_code=400,
+                    mimetype="application/json"
+                )
+            
+            with db.cursor(commit=False) as cursor:
+                found = fetch_by_ids(cursor, """
+                    -- name: contracts.by_ids
+                    SELECT co.*, c.display_name as client_name
+                    FROM contracts co
+                    JOIN clients c ON co.client_id = c.client_id
+                    WHERE co.contract_id IN ({ids}) AND co.valid_to IS NULL
+                """, ids, key='contract_id')
+            
+            return json_response(batch_result(ids, found))
+        
         # GET all contracts
-        if req.method == "GET" and not contract_id and not client_id:
+        elif req.method == "GET" and not contract_id and not client_id:
             provider = req.params.get('provider')
+            try:
+                fields = CONTRACT_LIST.parse(req.params.get('fields'))
+            except ValueError as e:
+                return func.HttpResponse(
+                    json.dumps({"error": str(e)}),
+                    status_code=400,
+                    mimetype="application/json"
+                )
             
             with db.cursor(commit=False) as cursor:
-                query = """
-                    SELECT co.*, c.display_name as client_name
+                query = f"""
+                    SELECT {CONTRACT_LIST.select_list(fields)}
                     FROM contracts co
                     JOIN clients c ON co.client_id = c.client_id
                     WHERE co.valid_to IS NULL
@@ -65,10 +119,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             
             contracts = [dict(zip(columns, row)) for row in rows]
             
-            return func.HttpResponse(
-                json.dumps(contracts, default=str),
-                mimetype="application/json"
-            )
+            return json_response(contracts)
         
         # GET contract by client_id
         elif req.method == "GET" and client_id:
@@ -92,10 +143,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             
             contract = dict(zip(columns, row))
             
-            return func.HttpResponse(
-                json.dumps(contract, default=str),
-                mimetype="application/json"
-            )
+            return json_response(contract)
         
         # GET single contract by id
         elif req.method == "GET" and contract_id:
@@ -119,10 +167,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             
             contract = dict(zip(columns, row))
             
-            return func.HttpResponse(
-                json.dumps(contract, default=str),
-                mimetype="application/json"
-            )
+            return json_response(contract)
         
         # POST - Create new contract
         elif req.method == "POST":
@@ -158,12 +203,9 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                     contract_create.notes
                 ))
                 new_id = cursor.fetchone()[0]
+                mark_contract_stale(cursor, new_id)
             
-            return func.HttpResponse(
-                json.dumps({"contract_id": new_id, **contract_create.model_dump()}, default=str),
-                mimetype="application/json",
-                status_code=201
-            )
+            return json_response({"contract_id": new_id, **contract_create.model_dump()}, status_code=201)
         
         # PUT - Update contract
         elif req.method == "PUT" and contract_id:
@@ -209,11 +251,10 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                         status_code=404,
                         mimetype="application/json"
                     )
+                
+                mark_contract_stale(cursor, int(contract_id))
             
-            return func.HttpResponse(
-                json.dumps({"message": "Contract updated successfully"}),
-                mimetype="application/json"
-            )
+            return json_response({"message": "Contract updated successfully"})
         
         # DELETE - Soft delete contract
         elif req.method == "DELETE" and contract_id:
@@ -230,6 +271,8 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                         status_code=404,
                         mimetype="application/json"
                     )
+                
+                mark_contract_stale(cursor, int(contract_id))
             
             return func.HttpResponse(status_code=204)
         
@@ -0,0 +1,64 @@
+"""
+Azure Function for the portfolio-wide dashboard.
+Returns payment status and fee totals for every active client in one query.
+"""
+import azure.functions as func
+import json
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from database.database import get_db
+from database.instrumentation import current_trace
+from services.portfolio import PAYMENT_STATUSES, iter_portfolio_json
+from utils.middleware import http_function, record_serialize
+
+@http_function("dashboard/portfolio")
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Get payment status for all active clients.
+    Route: GET /api/dashboard/portfolio
+    
+    Query params:
+    - status: Optional 'Paid' or 'Due' filter
+    
+    Returns:
+    - as_of: Date the current collection period was evaluated for
+    - clients: Status, expected fee, last payment, YTD and collection-quarter totals per client
+    - totals: Portfolio totals, overall and by provider
+    """
+    status = req.params.get('status')
+    if status:
+        status = status.capitalize()
+        if status not in PAYMENT_STATUSES:
+            return func.HttpResponse(
+                json.dumps({"error": f"status must be one of {', '.join(PAYMENT_STATUSES)}"}),
+                status_code=400,
+                mimetype="application/json"
+            )
+    
+    try:
+        db = get_db()
+        
+        with db.cursor(commit=False) as cursor:
+            # Rows are serialized chunk by chunk as they are fetched;
+            # everything but the database time counts as serialization
+            trace = current_trace()
+            db_before = trace.db_ms if trace else 0.0
+            start = time.perf_counter()
+            body = "".join(iter_portfolio_json(cursor, status=status))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            record_serialize(elapsed_ms - ((trace.db_ms if trace else 0.0) - db_before))
+        
+        return func.HttpResponse(
+            body,
+            mimetype="application/json"
+        )
+        
+    except Exception as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            status_code=500,
+            mimetype="application/json"
+        )
@@ -6,5 +6,6 @@ for safe connection and cursor management.
 """
 
 from .database import db, Database, get_db, DatabaseNotInitializedError
+from .instrumentation import current_trace, trace_request
 
-__all__ = ['db', 'Database', 'get_db', 'DatabaseNotInitializedError']
\ No newline at end of file
+__all__ = ['db', 'Database', 'get_db', 'DatabaseNotInitializedError', 'current_trace', 'trace_request']
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Multi-ID lookups.
+
+Resolves a list of ids with set-based ``IN (...)`` queries instead of one
+query per id. Large lists are split into chunks well under SQL Server's
+2100-parameter limit, and each chunk is padded to one of a few fixed sizes
+(repeating its last id) so the plan cache holds a handful of plans rather
+than one per list length.
+
+Example:
+    ids = parse_ids(req.params.get('ids'))
+    with db.cursor(commit=False) as cursor:
+        found = fetch_by_ids(cursor, "SELECT ... WHERE c.client_id IN ({ids})", ids, 'client_id')
+    return json_response(batch_result(ids, found))
+"""
+from typing import Any, Dict, Iterator, List, Sequence
+
+# Most ids accepted in one request
+MAX_BATCH_IDS = 1000
+
+CHUNK_SIZE = 500
+_PAD_SIZES = (1, 8, 32, 128, CHUNK_SIZE)
+
+
+def parse_ids(value: str, limit: int = MAX_BATCH_IDS) -> List[int]:
+    """
+    Parse a comma-separated ``ids`` parameter, keeping first-seen order.
+
+    Raises:
+        ValueError: If the list is empty, too long or has a non-integer id
+    """
+    ids = []
+    seen = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            item = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid id: {part}")
+        if item not in seen:
+            seen.add(item)
+            ids.append(item)
+    if not ids:
+        raise ValueError("ids must list at least one id")
+    if len(ids) > limit:
+        raise ValueError(f"At most {limit} ids per request; got {len(ids)}")
+    return ids
+
+
+def _chunks(ids: Sequence[int], size: int) -> Iterator[List[int]]:
+    for start in range(0, len(ids), size):
+        yield list(ids[start:start + size])
+
+
+def _padded(chunk: List[int]) -> List[int]:
+    size = next(s for s in _PAD_SIZES if s >= len(chunk))
+    return chunk + [chunk[-1]] * (size - len(chunk))
+
+
+def fetch_by_ids(cursor, query: str, ids: Sequence[int], key: str,
+                 chunk_size: int = CHUNK_SIZE) -> Dict[int, Dict[str, Any]]:
+    """
+    Rows for ``ids`` keyed by the ``key`` column.
+
+    Args:
+        cursor: Open cursor
+        query: SELECT with an ``{ids}`` placeholder inside ``IN (...)``
+        ids: Ids to look up
+        key: Column holding the id in the result
+        chunk_size: Most ids per statement (at most 500)
+    """
+    found: Dict[int, Dict[str, Any]] = {}
+    for chunk in _chunks(ids, min(chunk_size, CHUNK_SIZE)):
+        params = _padded(chunk)
+        cursor.execute(query.replace('{ids}', ', '.join('?' * len(params))), params)
+        columns = [column[0] for column in cursor.description]
+        for row in cursor.fetchall():
+            record = dict(zip(columns, row))
+            found[record[key]] = record
+    return found
+
+
+def batch_result(ids: Sequence[int], found: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """Response body: rows keyed by id, plus the ids that were not found."""
+    return {
+        "results": {str(i): found[i] for i in ids if i in found},
+        "missing": [i for i in ids if i not in found],
+    }
@@ -1,6 +1,7 @@
 import os
 import pyodbc
 import struct
+import time
 import logging
 from pathlib import Path
 from contextlib import contextmanager
@@ -8,6 +9,14 @@ from typing import Optional, Generator, List, Any, Tuple
 from azure.identity import DefaultAzureCredential
 from dotenv import load_dotenv
 
+from .instrumentation import (
+    connection_closed, connection_opened, current_trace, instrument_cursor,
+    record_connect, record_error, record_replica, record_token
+)
+from .isolation import SNAPSHOT, SNAPSHOT_SQL, checked_read_isolation
+from .routing import read_router, replica_enabled
+from .timeouts import default_timeout
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -37,12 +46,12 @@ def find_project_root() -> Path:
     for parent in current_path.parents:
         for marker in markers:
             if (parent / marker).exists():
-                logger.debug(f"Found project root at {parent} (marker: {marker})")
+                logger.debug("Found project root at %s (marker: %s)", parent, marker)
                 return parent
     
     # If no markers found, fall back to 3 levels up (original behavior)
     fallback = current_path.parent.parent.parent
-    logger.warning(f"No project root markers found, using fallback: {fallback}")
+    logger.warning("No project root markers found, using fallback: %s", fallback)
     return fallback
 
 
@@ -55,11 +64,11 @@ try:
     
     if env_path.exists():
         load_dotenv(env_path)
-        logger.info(f"Loaded environment from {env_path}")
+        logger.info("Loaded environment from %s", env_path)
     else:
-        logger.warning(f"Environment file not found: {env_path}")
+        logger.warning("Environment file not found: %s", env_path)
 except Exception as e:
-    logger.error(f"Error loading environment variables: {str(e)}")
+    logger.error("Error loading environment variables: %s", e)
 
 class Database:
     """
@@ -67,6 +76,14 @@ class Database:
     
     This class handles connection management, authentication, and provides context
     managers for safe database operations with automatic cleanup.
+    
+    Set SQL_AUTH=sql (with SQL_USER and SQL_PASSWORD) to use SQL Server
+    authentication instead, e.g. against the local SQL Server container
+    used for offline development and benchmarking.
+    
+    Set SQL_READ_REPLICA=on to send read-only cursors to a read replica
+    (see database.routing), and SQL_READ_ISOLATION=snapshot to run them
+    under snapshot isolation (see database.isolation).
     """
     
     # SQL Server specific constant for access token
@@ -79,38 +96,70 @@ class Database:
         Loads connection parameters from environment variables and prepares
         the connection string for Azure SQL Database.
         """
+        self.auth_mode = os.getenv("SQL_AUTH", "aad").lower()
         self.connection_string = self._get_connection_string()
+        self.read_connection_string = (
+            self._get_connection_string(os.getenv("SQL_READ_SERVER"), read_only=True)
+            if replica_enabled() else None
+        )
         self._credential = None
+        self.read_isolation = checked_read_isolation(self.get_connection)
         logger.info("Database instance initialized")
         
-    def _get_connection_string(self) -> str:
+    def _get_connection_string(self, server: Optional[str] = None, read_only: bool = False) -> str:
         """
         Build the connection string from environment variables.
         
+        Args:
+            server: Server to connect to instead of SQL_SERVER
+            read_only: Add ApplicationIntent=ReadOnly for read replicas
+        
         Returns:
             str: Formatted connection string for Azure SQL Database
         
         Raises:
             ValueError: If required environment variables are missing
         """
-        server = os.getenv("SQL_SERVER")
+        server = server or os.getenv("SQL_SERVER")
         database = os.getenv("SQL_DATABASE")
+        intent = ";ApplicationIntent=ReadOnly" if read_only else ""
         
         if not server or not database:
             raise ValueError(
                 "Missing required environment variables: SQL_SERVER and/or SQL_DATABASE"
             )
         
+        if self.auth_mode == "sql":
+            user = os.getenv("SQL_USER")
+            password = os.getenv("SQL_PASSWORD")
+            if not user or not password:
+                raise ValueError(
+                    "SQL_AUTH=sql requires SQL_USER and SQL_PASSWORD environment variables"
+                )
+            port = os.getenv("SQL_PORT", "1433")
+            trust = os.getenv("SQL_TRUST_SERVER_CERTIFICATE", "yes")
+            logger.debug("Connection string prepared for server: %s (SQL authentication)", server)
+            return (
+                f"Driver={{ODBC Driver 18 for SQL Server}};"
+                f"Server=tcp:{server},{port};"
+                f"Database={database};"
+                f"UID={user};"
+                f"PWD={password};"
+                f"Encrypt=yes;"
+                f"TrustServerCertificate={trust};"
+                f"Connection Timeout=30{intent}"
+            )
+        
         connection_string = (
             f"Driver={{ODBC Driver 18 for SQL Server}};"
             f"Server=tcp:{server},1433;"
             f"Database={database};"
             f"Encrypt=yes;"
             f"TrustServerCertificate=no;"
-            f"Connection Timeout=30"
+            f"Connection Timeout=30{intent}"
         )
         
-        logger.debug(f"Connection string prepared for server: {server}")
+        logger.debug("Connection string prepared for server: %s", server)
         return connection_string
     
     @property
@@ -145,13 +194,20 @@ class Database:
             token_struct = struct.pack(f'<I{len(token_bytes)}s', len(token_bytes), token_bytes)
             return token_struct
         except Exception as e:
-            logger.error(f"Failed to acquire access token: {str(e)}")
+            logger.error("Failed to acquire access token: %s", e)
             raise
     
-    def get_connection(self) -> pyodbc.Connection:
+    def get_connection(self, read_only: bool = False) -> pyodbc.Connection:
         """
         Create a new database connection using Azure AD authentication.
         
+        With SQL_AUTH=sql the credentials are in the connection string and
+        no token is requested.
+        
+        Args:
+            read_only: Connect to the read replica when one is configured,
+                falling back to the primary if it is unreachable
+        
         Returns:
             pyodbc.Connection: Active database connection
         
@@ -159,31 +215,56 @@ class Database:
             pyodbc.Error: If connection fails
             Exception: If authentication fails
         """
+        if read_only and self.read_connection_string:
+            try:
+                conn = self._connect(self.read_connection_string)
+                record_replica()
+                return conn
+            except pyodbc.Error as e:
+                logger.warning("Read replica unavailable, using primary: %s", e)
+        return self._connect(self.connection_string)
+    
+    def _connect(self, connection_string: str) -> pyodbc.Connection:
         try:
+            if self.auth_mode == "sql":
+                start = time.perf_counter()
+                conn = pyodbc.connect(connection_string)
+                record_connect((time.perf_counter() - start) * 1000)
+                logger.debug("Database connection established successfully")
+                return conn
+            
+            start = time.perf_counter()
             token_struct = self._get_access_token()
+            connect_start = time.perf_counter()
+            record_token((connect_start - start) * 1000)
             
             conn = pyodbc.connect(
-                self.connection_string,
+                connection_string,
                 attrs_before={self.SQL_COPT_SS_ACCESS_TOKEN: token_struct}
             )
+            record_connect((time.perf_counter() - connect_start) * 1000)
             
             logger.debug("Database connection established successfully")
             return conn
             
         except pyodbc.Error as e:
-            logger.error(f"Database connection failed: {str(e)}")
+            record_error()
+            logger.error("Database connection failed: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error during connection: {str(e)}")
+            logger.error("Unexpected error during connection: %s", e)
             raise
     
     @contextmanager
-    def connection(self) -> Generator[pyodbc.Connection, None, None]:
+    def connection(self, read_only: bool = False) -> Generator[pyodbc.Connection, None, None]:
         """
         Context manager for database connections with automatic cleanup.
         
         Ensures connections are properly closed even if exceptions occur.
         
+        Args:
+            read_only: Use the read replica if configured (see get_connection)
+        
         Yields:
             pyodbc.Connection: Active database connection
         
@@ -194,26 +275,38 @@ class Database:
         """
         conn = None
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(read_only=read_only)
+            connection_opened()
             yield conn
         except Exception as e:
-            logger.error(f"Error during database operation: {str(e)}")
+            logger.error("Error during database operation: %s", e)
             raise
         finally:
             if conn:
+                connection_closed()
                 try:
                     conn.close()
                     logger.debug("Database connection closed")
                 except Exception as e:
-                    logger.warning(f"Error closing connection: {str(e)}")
+                    logger.warning("Error closing connection: %s", e)
     
     @contextmanager
-    def cursor(self, commit: bool = True) -> Generator[pyodbc.Cursor, None, None]:
+    def cursor(self, commit: bool = True, read_only: Optional[bool] = None) -> Generator[pyodbc.Cursor, None, None]:
         """
         Context manager for database cursors with automatic transaction handling.
         
+        Inside a request trace or with DB_SLOW_QUERY_MS set, the cursor is
+        wrapped to record statement timings (see database.instrumentation).
+        
+        Read-only cursors go to the read replica when one is configured,
+        unless the request is pinned to the primary or this worker wrote
+        within the staleness bound (see database.routing). With
+        read_isolation set to snapshot they read row versions rather than
+        waiting on writers' locks (see database.isolation).
+        
         Args:
             commit: Whether to commit the transaction on success (default: True)
+            read_only: Whether the cursor only reads (default: not commit)
         
         Yields:
             pyodbc.Cursor: Active database cursor
@@ -222,24 +315,34 @@ class Database:
             with db.cursor() as cursor:
                 cursor.execute("INSERT INTO users (name) VALUES (?)", ["John"])
         """
-        with self.connection() as conn:
+        if read_only is None:
+            read_only = not commit
+        use_replica = read_only and self.read_connection_string is not None and read_router.use_replica()
+        with self.connection(read_only=use_replica) as conn:
             cursor = None
             try:
-                cursor = conn.cursor()
+                if current_trace() is not None:
+                    # Cursors take the timeout in force when they are created
+                    conn.timeout = default_timeout()
+                raw_cursor = conn.cursor()
+                if read_only and not commit and self.read_isolation == SNAPSHOT:
+                    raw_cursor.execute(SNAPSHOT_SQL)
+                cursor = instrument_cursor(raw_cursor)
                 yield cursor
                 if commit:
                     conn.commit()
+                    read_router.note_write()
                     logger.debug("Transaction committed")
             except Exception as e:
                 conn.rollback()
-                logger.error(f"Transaction rolled back due to error: {str(e)}")
+                logger.error("Transaction rolled back due to error: %s", e)
                 raise
             finally:
                 if cursor:
                     try:
                         cursor.close()
                     except Exception as e:
-                        logger.warning(f"Error closing cursor: {str(e)}")
+                        logger.warning("Error closing cursor: %s", e)
     
     def execute_query(self, query: str, params: Optional[Tuple[Any, ...]] = None, 
                      commit: bool = False) -> List[Any]:
@@ -265,10 +368,10 @@ class Database:
             
             if cursor.description:  # SELECT query
                 results = cursor.fetchall()
-                logger.debug(f"Query returned {len(results)} rows")
+                logger.debug("Query returned %s rows", len(results))
                 return results
             else:  # INSERT/UPDATE/DELETE
-                logger.debug(f"Query affected {cursor.rowcount} rows")
+                logger.debug("Query affected %s rows", cursor.rowcount)
                 return []
 
 # Global database instance
@@ -278,7 +381,7 @@ try:
     _db = Database()
     logger.info("Global database instance created successfully")
 except Exception as e:
-    logger.error(f"Failed to initialize database: {str(e)}")
+    logger.error("Failed to initialize database: %s", e)
     _db = None
 
 
@@ -0,0 +1,354 @@
+"""
+Per-request query instrumentation for the Database class.
+
+When a request trace is active (``trace_request``) or the slow-query log is
+enabled (``DB_SLOW_QUERY_MS``), Database records how long token acquisition,
+connecting, each statement's execute and its fetches took, with row counts
+and a statement name. Otherwise cursors are handed out unwrapped and the
+only cost is a context-variable lookup per connection and cursor.
+
+Statements are named by a leading ``-- name: <name>`` comment, falling back
+to their first words. Traced statements also get a per-name query timeout
+(see database.timeouts), and ``RequestTrace.cancel_statements`` cancels
+whatever the request still has running when it is abandoned.
+
+Example:
+    with trace_request("dashboard") as trace:
+        ...
+    logger.info(trace.to_dict())
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from database.timeouts import (QueryCancelledError, QueryTimeoutError, is_cancelled, is_timeout,
+                               statement_timeout)
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("database.slow_query")
+
+_NAME_RE = re.compile(r'^\s*--\s*name:\s*([\w.\-]+)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_current_trace: ContextVar[Optional['RequestTrace']] = ContextVar('db_request_trace', default=None)
+
+# Process-wide connection counters, read by the metrics endpoint
+_connections_lock = threading.Lock()
+_connections = {"in_use": 0, "opened_total": 0}
+
+
+def slow_query_threshold_ms() -> Optional[float]:
+    """Slow-query log threshold from DB_SLOW_QUERY_MS, or None when disabled."""
+    value = os.getenv("DB_SLOW_QUERY_MS")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid DB_SLOW_QUERY_MS: %s", value)
+        return None
+
+
+def statement_name(sql: str) -> str:
+    """Name from a leading '-- name:' comment, else the statement's first words."""
+    match = _NAME_RE.match(sql)
+    if match:
+        return match.group(1)
+    return _WHITESPACE_RE.sub(' ', sql).strip()[:60]
+
+
+class StatementTiming:
+    """Timings for one executed statement."""
+
+    __slots__ = ('name', 'execute_ms', 'fetch_ms', 'rows', 'batch_size')
+
+    def __init__(self, name: str, execute_ms: float, batch_size: int = 1):
+        self.name = name
+        self.execute_ms = execute_ms
+        self.fetch_ms = 0.0
+        self.rows = 0
+        self.batch_size = batch_size
+
+    @property
+    def total_ms(self) -> float:
+        return self.execute_ms + self.fetch_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "name": self.name,
+            "execute_ms": round(self.execute_ms, 3),
+            "fetch_ms": round(self.fetch_ms, 3),
+            "rows": self.rows,
+        }
+        if self.batch_size != 1:
+            result["batch_size"] = self.batch_size
+        return result
+
+
+class RequestTrace:
+    """Database work done while handling one request."""
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        self.started = time.perf_counter()
+        self.token_ms = 0.0
+        self.connect_ms = 0.0
+        self.connections = 0
+        self.replica_connections = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = False
+        self.statements: List[StatementTiming] = []
+        self._open_cursors: Set['InstrumentedCursor'] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def db_ms(self) -> float:
+        """Total time spent in the database layer."""
+        return self.token_ms + self.connect_ms + sum(s.total_ms for s in self.statements)
+
+    @property
+    def query_count(self) -> int:
+        return len(self.statements)
+
+    def cursor_opened(self, cursor: 'InstrumentedCursor') -> None:
+        with self._lock:
+            self._open_cursors.add(cursor)
+
+    def cursor_closed(self, cursor: 'InstrumentedCursor') -> None:
+        with self._lock:
+            self._open_cursors.discard(cursor)
+
+    def cancel_statements(self) -> int:
+        """
+        Cancel statements still running for this request.
+
+        Safe to call from another thread than the one executing them.
+        Returns the number of cursors cancelled.
+        """
+        with self._lock:
+            self.cancelled = True
+            cursors = list(self._open_cursors)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception as e:
+                logger.warning("Could not cancel statement: %s", e)
+        return len(cursors)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request": self.name,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "db_ms": round(self.db_ms, 3),
+            "token_ms": round(self.token_ms, 3),
+            "connect_ms": round(self.connect_ms, 3),
+            "connections": self.connections,
+            "replica_connections": self.replica_connections,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "queries": self.query_count,
+            "statements": [s.to_dict() for s in self.statements],
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The active request trace, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_request(name: Optional[str] = None) -> Iterator[RequestTrace]:
+    """Record database timings for the enclosed block."""
+    trace = RequestTrace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def instrumentation_active() -> bool:
+    """Whether cursors need wrapping for the current context."""
+    return _current_trace.get() is not None or slow_query_threshold_ms() is not None
+
+
+def record_token(elapsed_ms: float) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.token_ms += elapsed_ms
+
+
+def record_connect(elapsed_ms: float) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.connect_ms += elapsed_ms
+        trace.connections += 1
+
+
+def record_replica() -> None:
+    """Count a connection made to the read replica."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.replica_connections += 1
+
+
+def record_error() -> None:
+    """Count a failed connect or statement against the active trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.errors += 1
+
+
+def connection_opened() -> None:
+    with _connections_lock:
+        _connections["in_use"] += 1
+        _connections["opened_total"] += 1
+
+
+def connection_closed() -> None:
+    with _connections_lock:
+        _connections["in_use"] -= 1
+
+
+def connection_stats() -> Dict[str, int]:
+    """Connections currently open and opened since process start."""
+    with _connections_lock:
+        return dict(_connections)
+
+
+class InstrumentedCursor:
+    """
+    pyodbc cursor wrapper that times statements and fetches.
+
+    Attributes it does not override (description, rowcount, nextset,
+    fast_executemany, ...) pass through to the wrapped cursor.
+    """
+
+    def __init__(self, cursor, trace: Optional[RequestTrace], slow_ms: Optional[float]):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_trace', trace)
+        object.__setattr__(self, '_slow_ms', slow_ms)
+        object.__setattr__(self, '_last', None)
+        # pyodbc gives a cursor its connection's timeout when it is created
+        object.__setattr__(self, '_timeout', getattr(cursor.connection, 'timeout', None))
+        if trace is not None:
+            trace.cursor_opened(self)
+
+    def _apply_timeout(self, name: str) -> int:
+        """
+        Run the next statement with the query timeout for ``name``.
+
+        A cursor keeps the timeout it was created with, so a different
+        timeout swaps in a new cursor on the same connection (and
+        transaction).
+        """
+        seconds = statement_timeout(name)
+        if seconds != self._timeout:
+            connection = self._cursor.connection
+            connection.timeout = seconds
+            cursor = connection.cursor()
+            cursor.fast_executemany = self._cursor.fast_executemany
+            self._cursor.close()
+            object.__setattr__(self, '_cursor', cursor)
+            object.__setattr__(self, '_timeout', seconds)
+        return seconds
+
+    def _finish_last(self) -> None:
+        last = self._last
+        if last is not None and self._slow_ms is not None and last.total_ms >= self._slow_ms:
+            telemetry.emit(
+                "db.slow_query", level=logging.WARNING, log=slow_query_logger,
+                query=last.name, ms=round(last.total_ms, 3), execute_ms=round(last.execute_ms, 3),
+                fetch_ms=round(last.fetch_ms, 3), rows=last.rows, batch_size=last.batch_size,
+            )
+
+    def _run(self, method_name, sql, args, batch_size=1):
+        self._finish_last()
+        name = statement_name(sql)
+        timeout = self._apply_timeout(name) if self._trace is not None else 0
+        # Looked up after _apply_timeout, which may have replaced the cursor
+        method = getattr(self._cursor, method_name)
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        except Exception as e:
+            if self._trace is None:
+                raise
+            self._trace.errors += 1
+            if is_timeout(e):
+                self._trace.timeouts += 1
+                telemetry.emit("db.timeout", level=logging.WARNING, query=name, timeout_s=timeout)
+                raise QueryTimeoutError(name, timeout) from e
+            if is_cancelled(e) and self._trace.cancelled:
+                raise QueryCancelledError(name) from e
+            raise
+        finally:
+            timing = StatementTiming(name, (time.perf_counter() - start) * 1000, batch_size)
+            object.__setattr__(self, '_last', timing)
+            if self._trace is not None:
+                self._trace.statements.append(timing)
+
+    def execute(self, sql, *params):
+        self._run('execute', sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        rows = seq_of_params if isinstance(seq_of_params, list) else list(seq_of_params)
+        return self._run('executemany', sql, (rows,), batch_size=len(rows))
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if self._last is not None:
+            self._last.fetch_ms += (time.perf_counter() - start) * 1000
+            if isinstance(result, list):
+                self._last.rows += len(result)
+            elif result is not None:
+                self._last.rows += 1
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._fetch(self._cursor.fetchmany)
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+    def close(self):
+        self._finish_last()
+        object.__setattr__(self, '_last', None)
+        if self._trace is not None:
+            self._trace.cursor_closed(self)
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+
+def instrument_cursor(cursor):
+    """Wrap a cursor if tracing or the slow-query log is on, else return it as is."""
+    trace = _current_trace.get()
+    slow_ms = slow_query_threshold_ms()
+    if trace is None and slow_ms is None:
+        return cursor
+    return InstrumentedCursor(cursor, trace, slow_ms)
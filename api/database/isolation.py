@@ -0,0 +1,130 @@
+"""
+Read isolation.
+
+Payment writes fire triggers that update ``client_metrics`` and merge
+``quarterly_summaries``/``yearly_summaries`` inside the writing
+transaction. Under the default locking READ COMMITTED, a dashboard read
+of those rows waits until the writer commits.
+
+With ``SQL_READ_ISOLATION=snapshot``, read-only cursors
+(``db.cursor(commit=False)``) run ``SET TRANSACTION ISOLATION LEVEL
+SNAPSHOT`` before the caller's first statement. They read row versions
+instead of taking shared locks, so they never wait for a writer, and
+every statement on the cursor sees the database as of its first read.
+The database must allow snapshot isolation (``enable-snapshot`` below;
+Azure SQL Database allows it by default, a new SQL Server database does
+not), or every snapshot read fails with error 3952, so ``Database`` checks
+once when it is created and otherwise reads under READ COMMITTED with a
+warning. Writing cursors keep locking READ COMMITTED.
+
+The mode is experimental: it has not been measured under production load.
+
+READ_COMMITTED_SNAPSHOT (RCSI) is deliberately not used: it would also
+change the triggers, which recompute quarter totals from ``payments``.
+Two concurrent inserts for the same quarter would each read the last
+committed rows and miss the other's payment. ``status`` reports whether
+it is on.
+
+Usage (from the api directory):
+    python -m database.isolation status
+    python -m database.isolation enable-snapshot
+"""
+import argparse
+import logging
+import os
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+READ_COMMITTED = 'read_committed'
+SNAPSHOT = 'snapshot'
+READ_ISOLATION_LEVELS = (READ_COMMITTED, SNAPSHOT)
+
+SNAPSHOT_SQL = "SET TRANSACTION ISOLATION LEVEL SNAPSHOT"
+
+_SETTINGS_SQL = """
+    SELECT snapshot_isolation_state_desc, is_read_committed_snapshot_on
+    FROM sys.databases
+    WHERE database_id = DB_ID()
+"""
+
+_ENABLE_SNAPSHOT_SQL = "ALTER DATABASE CURRENT SET ALLOW_SNAPSHOT_ISOLATION ON"
+
+
+def read_isolation() -> str:
+    """Isolation level for read-only cursors, from SQL_READ_ISOLATION."""
+    value = os.getenv("SQL_READ_ISOLATION", READ_COMMITTED).lower()
+    if value not in READ_ISOLATION_LEVELS:
+        logger.warning("Ignoring invalid SQL_READ_ISOLATION: %s", value)
+        return READ_COMMITTED
+    return value
+
+
+def database_settings(cursor) -> Dict[str, Any]:
+    """Row-versioning settings of the current database."""
+    cursor.execute(_SETTINGS_SQL)
+    state, rcsi = cursor.fetchone()
+    return {"snapshot_isolation": state, "read_committed_snapshot": bool(rcsi)}
+
+
+def checked_read_isolation(connect: Callable[[], Any]) -> str:
+    """
+    ``read_isolation()``, falling back to READ_COMMITTED with a warning if
+    snapshot is configured but the database does not allow it or its
+    settings cannot be read.
+
+    Args:
+        connect: Opens a connection to the database (closed afterwards)
+    """
+    isolation = read_isolation()
+    if isolation != SNAPSHOT:
+        return isolation
+    try:
+        conn = connect()
+        try:
+            state = database_settings(conn.cursor())["snapshot_isolation"]
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning("Could not check snapshot isolation, reading under READ COMMITTED: %s", e)
+        return READ_COMMITTED
+    if state != 'ON':
+        logger.warning("Snapshot isolation is %s on this database, reading under READ COMMITTED; "
+                       "run `python -m database.isolation enable-snapshot`", state)
+        return READ_COMMITTED
+    return SNAPSHOT
+
+
+def enable_snapshot(db) -> None:
+    """
+    Allow snapshot isolation on the current database.
+
+    Runs outside a transaction, as ALTER DATABASE requires. Takes effect
+    once transactions already running when it starts have finished.
+    """
+    with db.connection() as conn:
+        conn.autocommit = True
+        conn.cursor().execute(_ENABLE_SNAPSHOT_SQL)
+    logger.info("Snapshot isolation allowed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read isolation settings")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='Show the database row-versioning settings')
+    sub.add_parser('enable-snapshot', help='Allow snapshot isolation on the database')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+    db = get_db()
+
+    if args.command == 'enable-snapshot':
+        enable_snapshot(db)
+    with db.cursor(commit=False, read_only=False) as cursor:
+        print({"read_isolation": db.read_isolation, **database_settings(cursor)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Local SQL Server database for offline development and benchmarking.
+
+Runs the production schema (tables, triggers, views and migrations) on a
+SQL Server container and fills it with generated clients, contracts and
+payments at a chosen scale, so handlers and benchmarks can run without
+Azure SQL or AAD credentials.
+
+Start the container and point the API at it:
+    docker compose --profile local-db up -d sqlserver
+    export SQL_AUTH=sql SQL_SERVER=localhost SQL_DATABASE=hohimer_local \\
+           SQL_USER=sa SQL_PASSWORD='LocalDev!Passw0rd'
+
+Then, from the api directory:
+    python -m database.local_db setup
+    python -m database.local_db seed --scale 1k
+    python -m database.local_db reset
+"""
+import argparse
+import logging
+import os
+import random
+import re
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pyodbc
+
+from services.fees import expected_fee
+from services.payment_status import collection_period
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = Path(__file__).resolve().parent
+SCHEMA_PATH = DATABASE_DIR / 'schema.sql'
+MIGRATIONS_DIR = DATABASE_DIR / 'migrations'
+
+SCALES = {'10': 10, '1k': 1000, '100k': 100000}
+
+INSERT_CHUNK_SIZE = 10000
+
+PROVIDERS = ['John Hancock', 'Voya', 'Empower', 'Principal', 'Ascensus',
+             'Transamerica', 'Fidelity', 'Nationwide']
+PAYMENT_METHODS = ['Auto - Check', 'Auto - ACH', 'Check', 'Wire', 'ACH']
+NAME_PARTS = ['Acme', 'Summit', 'Harbor', 'Pioneer', 'Cedar', 'Atlas', 'Liberty',
+              'Keystone', 'Bluewater', 'Ironwood', 'Northgate', 'Riverside']
+NAME_SUFFIXES = ['Manufacturing', 'Dental', 'Engineering', 'Logistics', 'Foods',
+                 'Medical Group', 'Construction', 'Partners', 'Holdings', 'Labs']
+
+CLIENT_COLUMNS = ('client_id', 'display_name', 'full_name', 'ima_signed_date', 'onedrive_folder_path')
+CONTRACT_COLUMNS = ('contract_id', 'client_id', 'contract_number', 'provider_name',
+                    'contract_start_date', 'fee_type', 'percent_rate', 'flat_rate',
+                    'payment_schedule', 'num_people', 'valid_to')
+PAYMENT_COLUMNS = ('contract_id', 'client_id', 'received_date', 'total_assets',
+                   'expected_fee', 'actual_fee', 'method', 'notes',
+                   'applied_period_type', 'applied_period', 'applied_year')
+
+# Child tables first
+DATA_TABLES = ('payment_files', 'client_files', 'contacts', 'summary_dirty_keys',
+               'client_dashboard', 'yearly_summaries', 'quarterly_summaries', 'client_metrics',
+               'payments', 'contracts', 'clients')
+
+
+class ClientData(NamedTuple):
+    """Generated rows for one client, in the *_COLUMNS orders."""
+    client: tuple
+    contracts: List[tuple]
+    payments: List[tuple]
+
+
+def split_batches(script: str) -> List[str]:
+    """Split a T-SQL script on GO separator lines."""
+    batches = re.split(r'^\s*GO\s*$', script, flags=re.MULTILINE | re.IGNORECASE)
+    return [b.strip() for b in batches if b.strip()]
+
+
+def _period_ordinal(period: int, year: int, schedule: str) -> int:
+    per_year = 12 if schedule == 'monthly' else 4
+    return year * per_year + period - 1
+
+
+def _period_from_ordinal(ordinal: int, schedule: str) -> Tuple[int, int]:
+    per_year = 12 if schedule == 'monthly' else 4
+    return ordinal % per_year + 1, ordinal // per_year
+
+
+def _period_start(period: int, year: int, schedule: str) -> date:
+    return date(year, period if schedule == 'monthly' else period * 3 - 2, 1)
+
+
+def _period_end(period: int, year: int, schedule: str) -> date:
+    month = period if schedule == 'monthly' else period * 3
+    if month == 12:
+        return date(year, 12, 31)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+
+def generate_client(rng: random.Random, client_id: int, first_contract_id: int,
+                    today: date) -> ClientData:
+    """
+    One client with its contract history and payments in arrears.
+
+    About 70% of clients pay quarterly. Assets follow a random walk, fees
+    vary a little around the expected amount, roughly one client in ten
+    changed contracts partway through, and recent periods are sometimes
+    still unpaid so both Paid and Due statuses occur.
+    """
+    name = f"{rng.choice(NAME_PARTS)} {rng.choice(NAME_SUFFIXES)} {client_id}"
+    start = date(rng.randint(2017, today.year - 1), rng.randint(1, 12), 1)
+    client = (client_id, name, f"{name} 401(k) Plan", start.isoformat(),
+              f"/Clients/{name}")
+
+    schedule = 'quarterly' if rng.random() < 0.7 else 'monthly'
+    per_year = 12 if schedule == 'monthly' else 4
+    first = _period_ordinal(start.month if schedule == 'monthly' else (start.month - 1) // 3 + 1,
+                            start.year, schedule)
+    last = _period_ordinal(*collection_period(today, schedule), schedule)
+    # Most clients are current; some are a period or two behind
+    last -= rng.choices((0, 1, 2), weights=(80, 15, 5))[0]
+
+    switch_at = first + rng.randint(1, max(1, last - first)) if rng.random() < 0.1 else None
+    contracts, terms = [], []
+    for index, begins in enumerate([first] + ([switch_at] if switch_at else [])):
+        fee_type = 'percentage' if rng.random() < 0.6 else 'flat'
+        percent_rate = round(rng.uniform(0.0005, 0.0025) * 4 / per_year, 6) if fee_type == 'percentage' else None
+        flat_rate = round(rng.uniform(500, 6000) * 4 / per_year, -1) if fee_type == 'flat' else None
+        contract_id = first_contract_id + index
+        period, year = _period_from_ordinal(begins, schedule)
+        contracts.append([contract_id, client_id, f"{rng.choice('ABCDEFGH')}{rng.randint(10000, 99999)}",
+                          rng.choice(PROVIDERS), _period_start(period, year, schedule).isoformat(), fee_type,
+                          percent_rate, flat_rate, schedule, rng.randint(3, 400), None])
+        terms.append((begins, contract_id, fee_type, percent_rate, flat_rate))
+    if switch_at:
+        contracts[0][-1] = _period_end(*_period_from_ordinal(switch_at - 1, schedule), schedule).isoformat()
+
+    payments = []
+    assets = rng.uniform(2e5, 2e7)
+    for ordinal in range(first, last + 1):
+        assets *= 1 + rng.gauss(0.015, 0.04) / per_year * 4
+        if rng.random() < 0.02:
+            continue  # missed period
+        term = [t for t in terms if t[0] <= ordinal][-1]
+        _, contract_id, fee_type, percent_rate, flat_rate = term
+        expected = expected_fee(fee_type, flat_rate, percent_rate, assets)
+        period, year = _period_from_ordinal(ordinal, schedule)
+        received = min(today, _period_end(period, year, schedule) + timedelta(days=rng.randint(5, 40)))
+        payments.append((
+            contract_id, client_id, received.isoformat(),
+            round(assets, 2) if fee_type == 'percentage' or rng.random() < 0.5 else None,
+            expected, round(expected * rng.uniform(0.97, 1.03), 2),
+            rng.choice(PAYMENT_METHODS), None, schedule, period, year,
+        ))
+    return ClientData(client, [tuple(c) for c in contracts], payments)
+
+
+def iter_dataset(clients: int, seed: int = 0, today: Optional[date] = None) -> Iterator[ClientData]:
+    """Deterministic stream of generated clients for a seed."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    contract_id = 1
+    for client_id in range(1, clients + 1):
+        data = generate_client(rng, client_id, contract_id, today)
+        contract_id += len(data.contracts)
+        yield data
+
+
+class LocalDatabase:
+    """Schema setup and seeding for a local SQL Server database."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _master_connection(self) -> pyodbc.Connection:
+        database = os.getenv("SQL_DATABASE")
+        conn_str = self.db.connection_string.replace(f"Database={database};", "Database=master;")
+        return pyodbc.connect(conn_str, autocommit=True)
+
+    def create_database(self) -> None:
+        """
+        Create SQL_DATABASE on the server if it does not exist, allowing
+        snapshot isolation as Azure SQL Database does.
+        """
+        database = os.getenv("SQL_DATABASE")
+        conn = self._master_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"IF DB_ID(N'{database}') IS NULL CREATE DATABASE [{database}]")
+            cursor.execute(f"ALTER DATABASE [{database}] SET ALLOW_SNAPSHOT_ISOLATION ON")
+        finally:
+            conn.close()
+
+    def apply_script(self, path: Path) -> None:
+        with self.db.cursor() as cursor:
+            for batch in split_batches(path.read_text(encoding='utf-8')):
+                cursor.execute(batch)
+        logger.info("Applied %s", path.name)
+
+    def setup(self) -> None:
+        """Create the database, the base schema if missing, then every migration."""
+        self.create_database()
+        with self.db.cursor(commit=False) as cursor:
+            cursor.execute("SELECT OBJECT_ID('dbo.clients', 'U')")
+            has_schema = cursor.fetchone()[0] is not None
+        if not has_schema:
+            self.apply_script(SCHEMA_PATH)
+        for migration in sorted(MIGRATIONS_DIR.glob('*.sql')):
+            self.apply_script(migration)
+
+    def reset(self) -> None:
+        """Delete all data and restart identity values."""
+        with self.db.cursor() as cursor:
+            for table in DATA_TABLES:
+                cursor.execute(f"IF OBJECT_ID('dbo.{table}', 'U') IS NOT NULL DELETE FROM {table}")
+            for table in ('clients', 'contracts', 'payments', 'client_metrics',
+                          'quarterly_summaries', 'yearly_summaries'):
+                cursor.execute(f"DBCC CHECKIDENT ('{table}', RESEED, 0)")
+        logger.info("Local database emptied")
+
+    def _insert(self, cursor, table: str, columns: Tuple[str, ...], rows: List[tuple],
+                identity: bool) -> None:
+        if not rows:
+            return
+        placeholders = ', '.join('?' for _ in columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        if identity:
+            cursor.execute(f"SET IDENTITY_INSERT {table} ON")
+        cursor.executemany(sql, rows)
+        if identity:
+            cursor.execute(f"SET IDENTITY_INSERT {table} OFF")
+
+    def seed(self, clients: int, seed: int = 0, today: Optional[date] = None) -> Dict[str, float]:
+        """
+        Load a generated dataset into an empty database.
+
+        Summary triggers are disabled during the load and the summaries are
+        rebuilt once at the end, which is far faster than firing them per
+        chunk. Deferred-mode databases are left with triggers disabled.
+        """
+        from services.summary_maintenance import DEFERRED_MODE, maintenance_mode, rebuild_all, set_trigger_state
+
+        with self.db.cursor(commit=False) as cursor:
+            cursor.execute("SELECT COUNT(*) FROM clients")
+            if cursor.fetchone()[0]:
+                raise ValueError("Database already has clients; run reset first")
+            deferred = maintenance_mode(cursor) == DEFERRED_MODE
+
+        start = time.perf_counter()
+        set_trigger_state(self.db, False)
+        counts = {"clients": 0, "contracts": 0, "payments": 0}
+        buffers = {"clients": [], "contracts": [], "payments": []}
+
+        def flush():
+            with self.db.cursor() as cursor:
+                cursor.fast_executemany = True
+                self._insert(cursor, 'clients', CLIENT_COLUMNS, buffers["clients"], identity=True)
+                self._insert(cursor, 'client_metrics', ('client_id',),
+                             [(row[0],) for row in buffers["clients"]], identity=False)
+                self._insert(cursor, 'contracts', CONTRACT_COLUMNS, buffers["contracts"], identity=True)
+                self._insert(cursor, 'payments', PAYMENT_COLUMNS, buffers["payments"], identity=False)
+            for key, rows in buffers.items():
+                counts[key] += len(rows)
+                rows.clear()
+
+        for data in iter_dataset(clients, seed, today):
+            buffers["clients"].append(data.client)
+            buffers["contracts"].extend(data.contracts)
+            buffers["payments"].extend(data.payments)
+            if len(buffers["payments"]) >= INSERT_CHUNK_SIZE:
+                flush()
+        flush()
+        load_s = time.perf_counter() - start
+
+        rebuild_all(self.db)
+        if not deferred:
+            set_trigger_state(self.db, True)
+
+        counts["load_seconds"] = round(load_s, 1)
+        counts["total_seconds"] = round(time.perf_counter() - start, 1)
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SQL Server database for offline work")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('setup', help='Create the database, schema and migrations')
+    seed_parser = sub.add_parser('seed', help='Load generated clients, contracts and payments')
+    seed_parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    seed_parser.add_argument('--clients', type=int, help='Exact client count (overrides --scale)')
+    seed_parser.add_argument('--seed', type=int, default=0)
+    sub.add_parser('reset', help='Delete all data')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+    db = get_db()
+    if db.auth_mode != 'sql':
+        parser.error("Set SQL_AUTH=sql to point at a local SQL Server, not Azure SQL")
+
+    local = LocalDatabase(db)
+    if args.command == 'setup':
+        local.setup()
+    elif args.command == 'reset':
+        local.reset()
+    else:
+        print(local.seed(args.clients or SCALES[args.scale], args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+-- Queue of (client, year, quarter) keys whose summaries need recomputing.
+-- Filled by payment writes when SUMMARY_MAINTENANCE_MODE=deferred and drained
+-- by the summary-maintenance function. year/quarter are NULL for payments
+-- without an applied period; those keys only refresh client_metrics.
+
+IF OBJECT_ID('dbo.summary_dirty_keys', 'U') IS NULL
+BEGIN
+    CREATE TABLE summary_dirty_keys (
+        id BIGINT IDENTITY(1,1) PRIMARY KEY,
+        client_id INT NOT NULL,
+        year INT NULL,
+        quarter INT NULL,
+        enqueued_at DATETIME NOT NULL DEFAULT (GETDATE())
+    );
+END;
@@ -0,0 +1,16 @@
+-- Dashboard read model: the finished GET /api/dashboard/{client_id} body per
+-- client, served when DASHBOARD_READ_MODEL=on. Writes bump version; the
+-- refresher rebuilds rows whose built_version is behind it or whose
+-- built_on is not today. body is NULL until a row is first built.
+
+IF OBJECT_ID('dbo.client_dashboard', 'U') IS NULL
+BEGIN
+    CREATE TABLE client_dashboard (
+        client_id INT NOT NULL PRIMARY KEY,
+        body NVARCHAR(MAX) NULL,
+        version INT NOT NULL DEFAULT (0),
+        built_version INT NOT NULL DEFAULT (0),
+        built_on DATE NULL,
+        refreshed_at DATETIME2 NULL
+    );
+END;
@@ -0,0 +1,144 @@
+-- Integer period ordinal on payments, so period logic can use range
+-- predicates instead of comparing (applied_period_type, applied_period,
+-- applied_year) triples.
+--
+-- period_ordinal is the month index (year * 12 + month - 1) of the last
+-- month the applied period covers: March for Q1, the month itself for a
+-- monthly payment. Monthly and quarterly ordinals therefore compare
+-- directly, a quarter's months are the range [ordinal - 2, ordinal], and
+-- the quarter of any ordinal is (ordinal % 12) / 3 + 1. As elsewhere, any
+-- type other than 'monthly' is read as quarterly. NULL when the payment
+-- has no applied period.
+--
+-- Mirrored in Python by services.payment_status.period_ordinal.
+
+IF COL_LENGTH('dbo.payments', 'period_ordinal') IS NULL
+BEGIN
+    ALTER TABLE payments ADD period_ordinal AS (
+        applied_year * 12
+        + CASE WHEN applied_period_type = 'monthly' THEN applied_period ELSE applied_period * 3 END
+        - 1
+    ) PERSISTED;
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_payments_period_ordinal'
+               AND object_id = OBJECT_ID('dbo.payments'))
+BEGIN
+    CREATE NONCLUSTERED INDEX idx_payments_period_ordinal
+    ON payments (client_id, applied_period_type, period_ordinal)
+    INCLUDE (actual_fee, total_assets, expected_fee)
+    WHERE valid_to IS NULL;
+END;
+GO
+
+-- Payment status compares the latest payment's ordinal with the ordinal
+-- of the period being collected: one range test instead of nested CASEs
+-- on year and period. A payment applied to an unknown period type or a
+-- contract with an unknown schedule falls back to comparing years.
+CREATE OR ALTER VIEW client_payment_status AS
+SELECT
+    c.client_id,
+    c.display_name,
+    ct.payment_schedule,
+    ct.fee_type,
+    ct.flat_rate,
+    ct.percent_rate,
+    cm.last_payment_date,
+    cm.last_payment_amount,
+    latest.applied_period,
+    latest.applied_year,
+    latest.applied_period_type,
+    -- Current period calculation (one period back from today)
+    CASE
+        WHEN ct.payment_schedule = 'monthly' THEN
+            CASE WHEN MONTH(GETDATE()) = 1 THEN 12 ELSE MONTH(GETDATE()) - 1 END
+        WHEN ct.payment_schedule = 'quarterly' THEN
+            CASE WHEN DATEPART(QUARTER, GETDATE()) = 1 THEN 4 ELSE DATEPART(QUARTER, GETDATE()) - 1 END
+    END AS current_period,
+    cur.year AS current_year,
+    cm.last_recorded_assets,
+    CASE
+        WHEN ct.fee_type = 'flat' THEN ct.flat_rate
+        WHEN ct.fee_type = 'percentage' AND cm.last_recorded_assets IS NOT NULL THEN
+            ROUND(cm.last_recorded_assets * (ct.percent_rate / 100.0), 2)
+        ELSE NULL
+    END AS expected_fee,
+    CASE
+        WHEN latest.applied_year IS NULL THEN 'Due'
+        WHEN latest.period_ordinal IS NULL OR cur.ordinal IS NULL THEN
+            CASE WHEN latest.applied_year < cur.year THEN 'Due' ELSE 'Paid' END
+        WHEN latest.period_ordinal < cur.ordinal THEN 'Due'
+        ELSE 'Paid'
+    END AS payment_status
+FROM clients c
+JOIN contracts ct ON c.client_id = ct.client_id AND ct.valid_to IS NULL
+LEFT JOIN client_metrics cm ON c.client_id = cm.client_id
+LEFT JOIN (
+    SELECT * FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY received_date DESC) as rn
+        FROM payments WHERE valid_to IS NULL
+    ) AS numbered WHERE rn = 1
+) latest ON c.client_id = latest.client_id
+-- Year and ordinal of the period being collected (the one before today's)
+CROSS APPLY (
+    SELECT
+        CASE
+            WHEN MONTH(GETDATE()) = 1 AND ct.payment_schedule = 'monthly' THEN YEAR(GETDATE()) - 1
+            WHEN DATEPART(QUARTER, GETDATE()) = 1 AND ct.payment_schedule = 'quarterly' THEN YEAR(GETDATE()) - 1
+            ELSE YEAR(GETDATE())
+        END AS year,
+        CASE ct.payment_schedule
+            WHEN 'monthly' THEN YEAR(GETDATE()) * 12 + MONTH(GETDATE()) - 2
+            WHEN 'quarterly' THEN YEAR(GETDATE()) * 12 + (DATEPART(QUARTER, GETDATE()) - 1) * 3 - 1
+        END AS ordinal
+) cur
+WHERE c.valid_to IS NULL;
+GO
+
+-- Quarter summaries join a quarter's payments on one ordinal, and only
+-- count active payments.
+CREATE OR ALTER TRIGGER [dbo].[update_quarterly_after_payment]
+ON [dbo].[payments]
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    MERGE quarterly_summaries AS target
+    USING (
+        SELECT
+            i.client_id,
+            i.applied_year as year,
+            i.applied_period as quarter,
+            SUM(p.actual_fee) as total_payments,
+            AVG(p.total_assets) as total_assets,
+            COUNT(*) as payment_count,
+            AVG(p.actual_fee) as avg_payment,
+            MAX(p.expected_fee) as expected_total
+        FROM inserted i
+        JOIN payments p ON p.client_id = i.client_id
+            AND p.applied_period_type = 'quarterly'
+            AND p.period_ordinal = i.period_ordinal
+            AND p.valid_to IS NULL
+        WHERE i.applied_period_type = 'quarterly'
+        GROUP BY i.client_id, i.applied_year, i.applied_period
+    ) AS source
+    ON target.client_id = source.client_id
+        AND target.year = source.year
+        AND target.quarter = source.quarter
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            expected_total = source.expected_total,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED THEN
+        INSERT (client_id, year, quarter, total_payments, total_assets,
+                payment_count, avg_payment, expected_total, last_updated)
+        VALUES (source.client_id, source.year, source.quarter, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                source.expected_total, CONVERT(NVARCHAR(50), GETDATE(), 120));
+END;
+GO
@@ -0,0 +1,66 @@
+-- client_payment_status.expected_fee divided percent_rate by 100, but
+-- contracts store it as a fraction (0.0025 is 0.25%, see models.Contract),
+-- so percentage clients were shown a hundredth of their fee. The view now
+-- computes expected fees as services.fees does: flat_rate for flat
+-- contracts, assets * percent_rate rounded to cents for percentage ones.
+-- Otherwise unchanged from 003_payment_period_ordinal.sql.
+
+CREATE OR ALTER VIEW client_payment_status AS
+SELECT
+    c.client_id,
+    c.display_name,
+    ct.payment_schedule,
+    ct.fee_type,
+    ct.flat_rate,
+    ct.percent_rate,
+    cm.last_payment_date,
+    cm.last_payment_amount,
+    latest.applied_period,
+    latest.applied_year,
+    latest.applied_period_type,
+    -- Current period calculation (one period back from today)
+    CASE
+        WHEN ct.payment_schedule = 'monthly' THEN
+            CASE WHEN MONTH(GETDATE()) = 1 THEN 12 ELSE MONTH(GETDATE()) - 1 END
+        WHEN ct.payment_schedule = 'quarterly' THEN
+            CASE WHEN DATEPART(QUARTER, GETDATE()) = 1 THEN 4 ELSE DATEPART(QUARTER, GETDATE()) - 1 END
+    END AS current_period,
+    cur.year AS current_year,
+    cm.last_recorded_assets,
+    CASE
+        WHEN ct.fee_type = 'flat' THEN ct.flat_rate
+        WHEN ct.fee_type = 'percentage' AND cm.last_recorded_assets IS NOT NULL THEN
+            ROUND(cm.last_recorded_assets * ct.percent_rate, 2)
+        ELSE NULL
+    END AS expected_fee,
+    CASE
+        WHEN latest.applied_year IS NULL THEN 'Due'
+        WHEN latest.period_ordinal IS NULL OR cur.ordinal IS NULL THEN
+            CASE WHEN latest.applied_year < cur.year THEN 'Due' ELSE 'Paid' END
+        WHEN latest.period_ordinal < cur.ordinal THEN 'Due'
+        ELSE 'Paid'
+    END AS payment_status
+FROM clients c
+JOIN contracts ct ON c.client_id = ct.client_id AND ct.valid_to IS NULL
+LEFT JOIN client_metrics cm ON c.client_id = cm.client_id
+LEFT JOIN (
+    SELECT * FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY received_date DESC) as rn
+        FROM payments WHERE valid_to IS NULL
+    ) AS numbered WHERE rn = 1
+) latest ON c.client_id = latest.client_id
+-- Year and ordinal of the period being collected (the one before today's)
+CROSS APPLY (
+    SELECT
+        CASE
+            WHEN MONTH(GETDATE()) = 1 AND ct.payment_schedule = 'monthly' THEN YEAR(GETDATE()) - 1
+            WHEN DATEPART(QUARTER, GETDATE()) = 1 AND ct.payment_schedule = 'quarterly' THEN YEAR(GETDATE()) - 1
+            ELSE YEAR(GETDATE())
+        END AS year,
+        CASE ct.payment_schedule
+            WHEN 'monthly' THEN YEAR(GETDATE()) * 12 + MONTH(GETDATE()) - 2
+            WHEN 'quarterly' THEN YEAR(GETDATE()) * 12 + (DATEPART(QUARTER, GETDATE()) - 1) * 3 - 1
+        END AS ordinal
+) cur
+WHERE c.valid_to IS NULL;
+GO
@@ -0,0 +1,90 @@
+-- The summary triggers joined every inserted row to its quarter's (or
+-- year's) rows and grouped the result, so a statement inserting k rows for
+-- the same quarter counted each payment k times. Single-row inserts never
+-- showed it; the bulk payment MERGE does. Both triggers now join each
+-- distinct quarter (year) once. Otherwise unchanged from
+-- 003_payment_period_ordinal.sql and schema.sql.
+
+CREATE OR ALTER TRIGGER [dbo].[update_quarterly_after_payment]
+ON [dbo].[payments]
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    MERGE quarterly_summaries AS target
+    USING (
+        SELECT
+            k.client_id,
+            k.applied_year as year,
+            k.applied_period as quarter,
+            SUM(p.actual_fee) as total_payments,
+            AVG(p.total_assets) as total_assets,
+            COUNT(*) as payment_count,
+            AVG(p.actual_fee) as avg_payment,
+            MAX(p.expected_fee) as expected_total
+        FROM (
+            SELECT DISTINCT client_id, applied_year, applied_period, period_ordinal
+            FROM inserted
+            WHERE applied_period_type = 'quarterly'
+        ) k
+        JOIN payments p ON p.client_id = k.client_id
+            AND p.applied_period_type = 'quarterly'
+            AND p.period_ordinal = k.period_ordinal
+            AND p.valid_to IS NULL
+        GROUP BY k.client_id, k.applied_year, k.applied_period
+    ) AS source
+    ON target.client_id = source.client_id
+        AND target.year = source.year
+        AND target.quarter = source.quarter
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            expected_total = source.expected_total,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED THEN
+        INSERT (client_id, year, quarter, total_payments, total_assets,
+                payment_count, avg_payment, expected_total, last_updated)
+        VALUES (source.client_id, source.year, source.quarter, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                source.expected_total, CONVERT(NVARCHAR(50), GETDATE(), 120));
+END;
+GO
+
+CREATE OR ALTER TRIGGER update_yearly_after_quarterly
+ON quarterly_summaries
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    MERGE yearly_summaries AS target
+    USING (
+        SELECT
+            k.client_id,
+            k.year,
+            SUM(q.total_payments) as total_payments,
+            AVG(q.total_assets) as total_assets,
+            SUM(q.payment_count) as payment_count,
+            AVG(q.avg_payment) as avg_payment
+        FROM (SELECT DISTINCT client_id, year FROM inserted) k
+        JOIN quarterly_summaries q ON q.client_id = k.client_id AND q.year = k.year
+        GROUP BY k.client_id, k.year
+    ) AS source
+    ON target.client_id = source.client_id AND target.year = source.year
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED THEN
+        INSERT (client_id, year, total_payments, total_assets,
+                payment_count, avg_payment, yoy_growth, last_updated)
+        VALUES (source.client_id, source.year, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                NULL, CONVERT(NVARCHAR(50), GETDATE(), 120));
+END;
+GO
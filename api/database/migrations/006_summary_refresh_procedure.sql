@@ -0,0 +1,145 @@
+-- One definition of the quarterly and yearly summaries for both
+-- maintenance modes. The payment trigger (trigger mode) and
+-- services.summary_maintenance (deferred mode) used to compute them
+-- differently: the trigger skipped monthly payments and always took
+-- MAX(expected_fee). Both now call refresh_summaries for the quarters
+-- they touched:
+--
+-- - a quarter's row covers its active payments, monthly ones rolled into
+--   their quarter; total_payments = SUM(actual_fee), total_assets =
+--   AVG(total_assets), payment_count = COUNT(*), avg_payment =
+--   AVG(actual_fee), expected_total = MAX(expected_fee), or
+--   SUM(expected_fee) if the quarter has monthly payments;
+-- - a year's row aggregates its quarters' rows;
+-- - a quarter or year left without payments loses its row.
+--
+-- services.summary_engine computes the same figures in Python.
+-- update_yearly_after_quarterly is dropped: years are refreshed here.
+
+IF TYPE_ID('dbo.summary_quarter_keys') IS NULL
+    CREATE TYPE summary_quarter_keys AS TABLE (
+        client_id INT NOT NULL,
+        year INT NOT NULL,
+        quarter INT NOT NULL,
+        PRIMARY KEY (client_id, year, quarter)
+    );
+GO
+
+CREATE OR ALTER PROCEDURE refresh_summaries
+    @quarters summary_quarter_keys READONLY
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    WITH target AS (
+        SELECT * FROM quarterly_summaries qs
+        WHERE EXISTS (
+            SELECT 1 FROM @quarters d
+            WHERE d.client_id = qs.client_id AND d.year = qs.year AND d.quarter = qs.quarter
+        )
+    ),
+    source AS (
+        SELECT d.client_id,
+               d.year,
+               d.quarter,
+               SUM(p.actual_fee) AS total_payments,
+               AVG(p.total_assets) AS total_assets,
+               COUNT(*) AS payment_count,
+               AVG(p.actual_fee) AS avg_payment,
+               CASE WHEN COUNT(CASE WHEN p.applied_period_type = 'monthly' THEN 1 END) > 0
+                    THEN SUM(p.expected_fee)
+                    ELSE MAX(p.expected_fee) END AS expected_total
+        FROM payments p
+        JOIN @quarters d ON d.client_id = p.client_id
+            AND p.applied_period_type IN ('monthly', 'quarterly')
+            AND p.period_ordinal BETWEEN d.year * 12 + d.quarter * 3 - 3 AND d.year * 12 + d.quarter * 3 - 1
+        WHERE p.valid_to IS NULL
+        GROUP BY d.client_id, d.year, d.quarter
+    )
+    MERGE target
+    USING source
+    ON target.client_id = source.client_id
+        AND target.year = source.year
+        AND target.quarter = source.quarter
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            expected_total = source.expected_total,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (client_id, year, quarter, total_payments, total_assets,
+                payment_count, avg_payment, expected_total, last_updated)
+        VALUES (source.client_id, source.year, source.quarter, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                source.expected_total, CONVERT(NVARCHAR(50), GETDATE(), 120))
+    WHEN NOT MATCHED BY SOURCE THEN
+        DELETE;
+
+    WITH years AS (
+        SELECT DISTINCT client_id, year FROM @quarters
+    ),
+    target AS (
+        SELECT * FROM yearly_summaries ys
+        WHERE EXISTS (SELECT 1 FROM years d WHERE d.client_id = ys.client_id AND d.year = ys.year)
+    ),
+    source AS (
+        SELECT q.client_id, q.year,
+               SUM(q.total_payments) AS total_payments,
+               AVG(q.total_assets) AS total_assets,
+               SUM(q.payment_count) AS payment_count,
+               AVG(q.avg_payment) AS avg_payment
+        FROM quarterly_summaries q
+        JOIN years d ON d.client_id = q.client_id AND d.year = q.year
+        GROUP BY q.client_id, q.year
+    )
+    MERGE target
+    USING source
+    ON target.client_id = source.client_id AND target.year = source.year
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (client_id, year, total_payments, total_assets,
+                payment_count, avg_payment, yoy_growth, last_updated)
+        VALUES (source.client_id, source.year, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                NULL, CONVERT(NVARCHAR(50), GETDATE(), 120))
+    WHEN NOT MATCHED BY SOURCE THEN
+        DELETE;
+END;
+GO
+
+CREATE OR ALTER TRIGGER [dbo].[update_quarterly_after_payment]
+ON [dbo].[payments]
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    DECLARE @quarters summary_quarter_keys;
+    INSERT INTO @quarters (client_id, year, quarter)
+    SELECT DISTINCT client_id, applied_year,
+           CASE WHEN applied_period_type = 'monthly'
+                THEN (applied_period - 1) / 3 + 1
+                ELSE applied_period END
+    FROM inserted
+    WHERE applied_year IS NOT NULL AND applied_period IS NOT NULL;
+
+    IF @@ROWCOUNT > 0
+        EXEC refresh_summaries @quarters;
+END;
+GO
+
+-- client_metrics.avg_quarterly_payment reads the refreshed quarters
+EXEC sp_settriggerorder @triggername = 'dbo.update_quarterly_after_payment',
+    @order = 'First', @stmttype = 'INSERT';
+GO
+
+DROP TRIGGER IF EXISTS dbo.update_yearly_after_quarterly;
+GO
@@ -0,0 +1,172 @@
+"""
+Execution plan checks.
+
+``estimated_plan`` asks SQL Server for a statement's estimated plan
+(``SET SHOWPLAN_XML ON``) without running it, and ``index_accesses``
+lists the index seeks and scans in it. ``check_seeks`` compiles the
+queries that rely on ``idx_payments_period_ordinal`` and reports any
+that would not seek it:
+
+    python -m database.plans
+    python -m database.plans --client 42
+
+The optimizer picks scans for tables small enough that a scan is
+cheaper, so run the check against a realistically sized database
+(e.g. ``python -m database.local_db seed --scale 100k``).
+"""
+import argparse
+import logging
+import xml.etree.ElementTree as ET
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+SHOWPLAN_NS = '{http://schemas.microsoft.com/sqlserver/2004/07/showplan}'
+
+PERIOD_ORDINAL_INDEX = 'idx_payments_period_ordinal'
+
+
+class IndexAccess(NamedTuple):
+    """One index operator in a plan."""
+    op: str
+    table: str
+    index: Optional[str]
+
+    @property
+    def is_seek(self) -> bool:
+        return self.op.endswith('Seek')
+
+
+def inline_params(sql: str, params: Sequence[Any]) -> str:
+    """
+    ``sql`` with each ``?`` replaced by a literal.
+
+    Plans are requested for ad hoc text, so the values the check uses are
+    written into it. Only ints and strings are supported.
+    """
+    parts = sql.split('?')
+    if len(parts) != len(params) + 1:
+        raise ValueError(f"Expected {len(parts) - 1} parameters, got {len(params)}")
+    text = parts[0]
+    for value, part in zip(params, parts[1:]):
+        if isinstance(value, int):
+            literal = str(value)
+        elif isinstance(value, str):
+            literal = "N'" + value.replace("'", "''") + "'"
+        else:
+            raise ValueError(f"Unsupported parameter type: {type(value).__name__}")
+        text += literal + part
+    return text
+
+
+def estimated_plan(cursor, sql: str, params: Sequence[Any] = ()) -> str:
+    """Showplan XML for ``sql``; the statement is compiled, not executed."""
+    cursor.execute("SET SHOWPLAN_XML ON")
+    try:
+        cursor.execute(inline_params(sql, params))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.execute("SET SHOWPLAN_XML OFF")
+
+
+def _name(value: Optional[str]) -> Optional[str]:
+    return value.strip('[]') if value else value
+
+
+def index_accesses(plan_xml: str) -> List[IndexAccess]:
+    """Index seeks and scans in a showplan, in plan order."""
+    accesses = []
+    for relop in ET.fromstring(plan_xml).iter(f'{SHOWPLAN_NS}RelOp'):
+        op = relop.get('PhysicalOp', '')
+        if 'Seek' not in op and 'Scan' not in op:
+            continue
+        obj = relop.find(f'./*/{SHOWPLAN_NS}Object')
+        if obj is None:
+            continue
+        accesses.append(IndexAccess(op, _name(obj.get('Table')), _name(obj.get('Index'))))
+    return accesses
+
+
+def seek_checks(client_id: int, year: int) -> Dict[str, tuple]:
+    """name -> (sql, params) for the queries that should seek idx_payments_period_ordinal."""
+    from periods import FIRST_MONTH_SQL, PAID_SQL
+    from services.summary_maintenance import QUARTER_ORDINALS_SQL
+
+    # refresh_summaries joins its @quarters keys, which do not exist while only
+    # compiling; the same join over one literal key has the same shape.
+    quarter_refresh = f"""
+        SELECT d.client_id, d.year, d.quarter, SUM(p.actual_fee), COUNT(*)
+        FROM (VALUES (?, ?, ?)) AS d (client_id, year, quarter)
+        JOIN payments p ON d.client_id = p.client_id
+            AND p.applied_period_type IN ('monthly', 'quarterly')
+            AND p.period_ordinal BETWEEN {QUARTER_ORDINALS_SQL.format(d='d.')}
+        WHERE p.valid_to IS NULL
+        GROUP BY d.client_id, d.year, d.quarter
+    """
+    return {
+        'periods.first_month': (FIRST_MONTH_SQL, [client_id, client_id]),
+        'periods.paid': (PAID_SQL, [client_id, 'quarterly', year * 12, year * 12 + 11]),
+        'summary_maintenance.refresh_quarterly': (quarter_refresh, [client_id, year, 1]),
+    }
+
+
+def check_seeks(cursor, client_id: int, year: int,
+                index: str = PERIOD_ORDINAL_INDEX) -> Dict[str, Dict[str, Any]]:
+    """
+    Compile each period-ordinal query and report how it reads ``payments``.
+
+    Returns:
+        dict: name -> {"ok": seeks ``index`` and never scans payments,
+              "accesses": ["<op> <table>.<index>", ...]}
+    """
+    results = {}
+    for name, (sql, params) in seek_checks(client_id, year).items():
+        accesses = [a for a in index_accesses(estimated_plan(cursor, sql, params))
+                    if a.table == 'payments']
+        ok = (any(a.is_seek and a.index == index for a in accesses)
+              and not any(not a.is_seek for a in accesses))
+        results[name] = {
+            "ok": ok,
+            "accesses": [f"{a.op} {a.table}.{a.index}" for a in accesses],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that period queries seek their index")
+    parser.add_argument('--client', type=int, help='Client id to compile with (default: one with payments)')
+    parser.add_argument('--year', type=int, help='Year to compile with (default: its latest)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+    db = get_db()
+    with db.cursor(commit=False) as cursor:
+        client_id, year = args.client, args.year
+        if client_id is None:
+            # The client with the most payments
+            cursor.execute("""
+                SELECT TOP 1 client_id FROM payments
+                WHERE valid_to IS NULL
+                GROUP BY client_id ORDER BY COUNT(*) DESC
+            """)
+            row = cursor.fetchone()
+            if row is None:
+                raise SystemExit("No payments to compile against")
+            client_id = row[0]
+        if year is None:
+            cursor.execute("SELECT MAX(applied_year) FROM payments WHERE client_id = ? AND valid_to IS NULL",
+                           [client_id])
+            year = cursor.fetchone()[0] or date.today().year
+        results = check_seeks(cursor, client_id, year)
+
+    for name, result in results.items():
+        print(f"{'OK  ' if result['ok'] else 'FAIL'} {name}: {', '.join(result['accesses']) or 'no payments access'}")
+    if not all(r["ok"] for r in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
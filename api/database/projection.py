@@ -0,0 +1,71 @@
+"""
+Sparse field projection for list endpoints.
+
+Each entity declares the fields callers may ask for with ``?fields=`` and
+the SQL that produces each one. Only the requested columns are selected,
+and optional joins are only added when a selected field (or a filter)
+needs them, so a request for ``fields=client_id,display_name`` reads just
+the clients table.
+
+Example:
+    names = CLIENT_LIST.parse(req.params.get('fields'))
+    cursor.execute(f"SELECT {CLIENT_LIST.select_list(names)} FROM clients c "
+                   f"{CLIENT_LIST.join_clauses(names)} WHERE ...")
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+
+class Field(NamedTuple):
+    """One selectable field."""
+    sql: str
+    join: Optional[str] = None
+
+
+class Entity:
+    """
+    Whitelisted fields of a list endpoint.
+
+    Args:
+        name: Entity name used in error messages
+        fields: Field name -> Field, in default output order
+        joins: Join alias -> JOIN clause, in the order they must appear
+    """
+
+    def __init__(self, name: str, fields: Dict[str, Field], joins: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.fields = fields
+        self.joins = joins or {}
+
+    def parse(self, value: Optional[str]) -> List[str]:
+        """
+        Requested field names, or every field when ``value`` is empty.
+
+        Raises:
+            ValueError: If a field is not in the whitelist
+        """
+        if not value:
+            return list(self.fields)
+        names = []
+        for part in value.split(','):
+            part = part.strip()
+            if part and part not in names:
+                names.append(part)
+        unknown = [n for n in names if n not in self.fields]
+        if unknown:
+            raise ValueError(
+                f"Unknown {self.name} field(s): {', '.join(unknown)}. "
+                f"Allowed: {', '.join(self.fields)}"
+            )
+        if not names:
+            return list(self.fields)
+        return names
+
+    def select_list(self, names: Sequence[str]) -> str:
+        """SELECT list for the requested fields."""
+        return ', '.join(f"{self.fields[n].sql} AS {n}" for n in names)
+
+    def join_clauses(self, names: Sequence[str], also: Iterable[str] = ()) -> str:
+        """JOIN clauses needed by the selected fields plus the aliases in ``also``."""
+        needed = {self.fields[n].join for n in names} | set(also)
+        return '\n'.join(clause for alias, clause in self.joins.items() if alias in needed)
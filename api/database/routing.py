@@ -0,0 +1,85 @@
+"""
+Read-intent routing.
+
+With ``SQL_READ_REPLICA=on``, read-only cursors (``db.cursor(commit=False)``)
+connect with ``ApplicationIntent=ReadOnly``, to ``SQL_READ_SERVER`` if set
+(a geo-replica) or to the primary's read scale-out replica otherwise. The
+read connection string differs from the primary's, so the ODBC driver keeps
+separate connection pools for the two.
+
+Replicas lag the primary, so reads stay on the primary when they might
+need to see a recent write:
+
+- every cursor in a request that is not a GET (``pin_primary``), so a
+  handler reading back what it just wrote sees it;
+- every read for ``SQL_READ_STALENESS_S`` seconds (default 30) after this
+  worker committed a write, which bounds how stale a read served after a
+  write can be.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STALENESS_SECONDS = 30.0
+
+_pinned: ContextVar[bool] = ContextVar('db_pinned_to_primary', default=False)
+
+
+def replica_enabled() -> bool:
+    return os.getenv("SQL_READ_REPLICA", "off").lower() in ("on", "true", "1", "yes")
+
+
+def staleness_bound() -> float:
+    value = os.getenv("SQL_READ_STALENESS_S")
+    if not value:
+        return DEFAULT_STALENESS_SECONDS
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        logger.warning("Ignoring invalid SQL_READ_STALENESS_S: %s", value)
+        return DEFAULT_STALENESS_SECONDS
+
+
+@contextmanager
+def pin_primary(pinned: bool = True) -> Iterator[None]:
+    """Send every cursor opened in the enclosed block to the primary."""
+    token = _pinned.set(pinned or _pinned.get())
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReadRouter:
+    """Decides whether a read-only cursor may use the replica."""
+
+    def __init__(self, staleness: Optional[float] = None, clock=time.monotonic):
+        self._staleness = staleness
+        self._clock = clock
+        self._last_write: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def staleness(self) -> float:
+        return staleness_bound() if self._staleness is None else self._staleness
+
+    def note_write(self) -> None:
+        """Record a committed write; reads go to the primary for the staleness bound."""
+        with self._lock:
+            self._last_write = self._clock()
+
+    def use_replica(self) -> bool:
+        if _pinned.get():
+            return False
+        with self._lock:
+            last_write = self._last_write
+        return last_write is None or self._clock() - last_write > self.staleness
+
+
+read_router = ReadRouter()
@@ -0,0 +1,345 @@
+-- Hohimer Pro schema for a local SQL Server instance.
+--
+-- Rebuilt from database_schema_dump.txt: same tables, indexes, triggers and
+-- views as the Azure SQL database, so handlers run their T-SQL unchanged.
+-- Applied by `python -m database.local_db setup`; batches are separated by GO.
+
+CREATE TABLE clients (
+    client_id INT IDENTITY(1,1) PRIMARY KEY,
+    display_name NVARCHAR(255) NOT NULL,
+    full_name NVARCHAR(255) NULL,
+    ima_signed_date NVARCHAR(50) NULL,
+    onedrive_folder_path NVARCHAR(500) NULL,
+    valid_from DATETIME DEFAULT (GETDATE()),
+    valid_to DATETIME NULL
+);
+GO
+
+CREATE TABLE contracts (
+    contract_id INT IDENTITY(1,1) PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    contract_number NVARCHAR(100) NULL,
+    provider_name NVARCHAR(255) NULL,
+    contract_start_date NVARCHAR(50) NULL,
+    fee_type NVARCHAR(50) NULL,
+    percent_rate FLOAT NULL,
+    flat_rate FLOAT NULL,
+    payment_schedule NVARCHAR(50) NULL,
+    num_people INT NULL,
+    notes NVARCHAR(MAX) NULL,
+    valid_from DATETIME DEFAULT (GETDATE()),
+    valid_to DATETIME NULL
+);
+GO
+
+CREATE TABLE payments (
+    payment_id INT IDENTITY(1,1) PRIMARY KEY,
+    contract_id INT NOT NULL REFERENCES contracts (contract_id),
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    received_date NVARCHAR(50) NULL,
+    total_assets FLOAT NULL,
+    expected_fee FLOAT NULL,
+    actual_fee FLOAT NULL,
+    method NVARCHAR(50) NULL,
+    notes NVARCHAR(MAX) NULL,
+    valid_from DATETIME DEFAULT (GETDATE()),
+    valid_to DATETIME NULL,
+    applied_period_type NVARCHAR(10) NULL,
+    applied_period INT NULL,
+    applied_year INT NULL
+);
+GO
+
+CREATE TABLE client_metrics (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    last_payment_date NVARCHAR(50) NULL,
+    last_payment_amount FLOAT NULL,
+    last_payment_quarter INT NULL,
+    last_payment_year INT NULL,
+    total_ytd_payments FLOAT NULL,
+    avg_quarterly_payment FLOAT NULL,
+    last_recorded_assets FLOAT NULL,
+    last_updated NVARCHAR(50) NULL,
+    next_payment_due NVARCHAR(50) NULL
+);
+GO
+
+CREATE TABLE quarterly_summaries (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    year INT NOT NULL,
+    quarter INT NOT NULL,
+    total_payments FLOAT NULL,
+    total_assets FLOAT NULL,
+    payment_count INT NULL,
+    avg_payment FLOAT NULL,
+    expected_total FLOAT NULL,
+    last_updated NVARCHAR(50) NULL
+);
+GO
+
+CREATE TABLE yearly_summaries (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    year INT NOT NULL,
+    total_payments FLOAT NULL,
+    total_assets FLOAT NULL,
+    payment_count INT NULL,
+    avg_payment FLOAT NULL,
+    yoy_growth FLOAT NULL,
+    last_updated NVARCHAR(50) NULL
+);
+GO
+
+CREATE TABLE contacts (
+    contact_id INT IDENTITY(1,1) PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    contact_type NVARCHAR(50) NOT NULL,
+    contact_name NVARCHAR(255) NULL,
+    phone NVARCHAR(50) NULL,
+    email NVARCHAR(255) NULL,
+    fax NVARCHAR(50) NULL,
+    physical_address NVARCHAR(500) NULL,
+    mailing_address NVARCHAR(500) NULL,
+    valid_from DATETIME DEFAULT (GETDATE()),
+    valid_to DATETIME NULL
+);
+GO
+
+CREATE TABLE client_files (
+    file_id INT IDENTITY(1,1) PRIMARY KEY,
+    client_id INT NOT NULL REFERENCES clients (client_id),
+    file_name NVARCHAR(255) NOT NULL,
+    onedrive_path NVARCHAR(500) NOT NULL,
+    uploaded_at DATETIME DEFAULT (GETDATE())
+);
+GO
+
+CREATE TABLE payment_files (
+    payment_id INT NOT NULL REFERENCES payments (payment_id),
+    file_id INT NOT NULL REFERENCES client_files (file_id),
+    linked_at DATETIME DEFAULT (GETDATE()),
+    PRIMARY KEY (payment_id, file_id)
+);
+GO
+
+CREATE NONCLUSTERED INDEX idx_client_metrics_lookup ON client_metrics (client_id);
+CREATE NONCLUSTERED INDEX idx_contacts_client_id ON contacts (client_id);
+CREATE NONCLUSTERED INDEX idx_contacts_type ON contacts (contact_type);
+CREATE NONCLUSTERED INDEX idx_contracts_client_id ON contracts (client_id);
+CREATE NONCLUSTERED INDEX idx_contracts_provider ON contracts (provider_name);
+CREATE NONCLUSTERED INDEX idx_payments_client_id ON payments (client_id);
+CREATE NONCLUSTERED INDEX idx_payments_contract_id ON payments (contract_id);
+CREATE NONCLUSTERED INDEX idx_payments_date ON payments (received_date);
+CREATE NONCLUSTERED INDEX idx_quarterly_lookup ON quarterly_summaries (client_id, year, quarter);
+CREATE NONCLUSTERED INDEX idx_yearly_lookup ON yearly_summaries (client_id, year);
+GO
+
+CREATE TRIGGER update_client_metrics_after_payment
+ON payments
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    -- Update metrics for affected clients
+    WITH affected_clients AS (
+        SELECT client_id FROM inserted
+        UNION
+        SELECT client_id FROM deleted
+    )
+    UPDATE cm
+    SET
+        last_payment_date = lp.received_date,
+        last_payment_amount = lp.actual_fee,
+        last_recorded_assets = lp.total_assets,
+        total_ytd_payments = ytd.total,
+        avg_quarterly_payment = qavg.avg_payment,
+        last_updated = CONVERT(nvarchar(50), GETDATE(), 120)
+    FROM client_metrics cm
+    INNER JOIN affected_clients ac ON cm.client_id = ac.client_id
+    OUTER APPLY (
+        SELECT TOP 1 received_date, actual_fee, total_assets
+        FROM payments
+        WHERE client_id = cm.client_id AND valid_to IS NULL
+        ORDER BY received_date DESC
+    ) lp
+    OUTER APPLY (
+        SELECT SUM(actual_fee) as total
+        FROM payments
+        WHERE client_id = cm.client_id
+        AND applied_year = YEAR(GETDATE())
+        AND valid_to IS NULL
+    ) ytd
+    OUTER APPLY (
+        SELECT AVG(total_payments) as avg_payment
+        FROM quarterly_summaries
+        WHERE client_id = cm.client_id
+    ) qavg;
+END;
+GO
+
+CREATE TRIGGER [dbo].[update_quarterly_after_payment]
+ON [dbo].[payments]
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    MERGE quarterly_summaries AS target
+    USING (
+        SELECT
+            i.client_id,
+            i.applied_year as year,
+            i.applied_period as quarter,
+            SUM(p.actual_fee) as total_payments,
+            AVG(p.total_assets) as total_assets,
+            COUNT(*) as payment_count,
+            AVG(p.actual_fee) as avg_payment,
+            MAX(p.expected_fee) as expected_total
+        FROM inserted i
+        JOIN payments p ON p.client_id = i.client_id
+            AND p.applied_year = i.applied_year
+            AND p.applied_period = i.applied_period
+            AND p.applied_period_type = 'quarterly'
+        WHERE i.applied_period_type = 'quarterly'
+        GROUP BY i.client_id, i.applied_year, i.applied_period
+    ) AS source
+    ON target.client_id = source.client_id
+        AND target.year = source.year
+        AND target.quarter = source.quarter
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            expected_total = source.expected_total,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED THEN
+        INSERT (client_id, year, quarter, total_payments, total_assets,
+                payment_count, avg_payment, expected_total, last_updated)
+        VALUES (source.client_id, source.year, source.quarter, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                source.expected_total, CONVERT(NVARCHAR(50), GETDATE(), 120));
+END;
+GO
+
+CREATE TRIGGER update_yearly_after_quarterly
+ON quarterly_summaries
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    MERGE yearly_summaries AS target
+    USING (
+        SELECT
+            i.client_id,
+            i.year,
+            SUM(q.total_payments) as total_payments,
+            AVG(q.total_assets) as total_assets,
+            SUM(q.payment_count) as payment_count,
+            AVG(q.avg_payment) as avg_payment
+        FROM inserted i
+        JOIN quarterly_summaries q ON q.client_id = i.client_id AND q.year = i.year
+        GROUP BY i.client_id, i.year
+    ) AS source
+    ON target.client_id = source.client_id AND target.year = source.year
+    WHEN MATCHED THEN
+        UPDATE SET
+            total_payments = source.total_payments,
+            total_assets = source.total_assets,
+            payment_count = source.payment_count,
+            avg_payment = source.avg_payment,
+            last_updated = CONVERT(NVARCHAR(50), GETDATE(), 120)
+    WHEN NOT MATCHED THEN
+        INSERT (client_id, year, total_payments, total_assets,
+                payment_count, avg_payment, yoy_growth, last_updated)
+        VALUES (source.client_id, source.year, source.total_payments,
+                source.total_assets, source.payment_count, source.avg_payment,
+                NULL, CONVERT(NVARCHAR(50), GETDATE(), 120));
+END;
+GO
+
+CREATE VIEW client_payment_status AS
+SELECT
+    c.client_id,
+    c.display_name,
+    ct.payment_schedule,
+    ct.fee_type,
+    ct.flat_rate,
+    ct.percent_rate,
+    cm.last_payment_date,
+    cm.last_payment_amount,
+    latest.applied_period,
+    latest.applied_year,
+    latest.applied_period_type,
+    -- Current period calculation (one period back from today)
+    CASE
+        WHEN ct.payment_schedule = 'monthly' THEN
+            CASE WHEN MONTH(GETDATE()) = 1 THEN 12 ELSE MONTH(GETDATE()) - 1 END
+        WHEN ct.payment_schedule = 'quarterly' THEN
+            CASE WHEN DATEPART(QUARTER, GETDATE()) = 1 THEN 4 ELSE DATEPART(QUARTER, GETDATE()) - 1 END
+    END AS current_period,
+    CASE
+        WHEN MONTH(GETDATE()) = 1 AND ct.payment_schedule = 'monthly' THEN YEAR(GETDATE()) - 1
+        WHEN DATEPART(QUARTER, GETDATE()) = 1 AND ct.payment_schedule = 'quarterly' THEN YEAR(GETDATE()) - 1
+        ELSE YEAR(GETDATE())
+    END AS current_year,
+    cm.last_recorded_assets,
+    CASE
+        WHEN ct.fee_type = 'flat' THEN ct.flat_rate
+        WHEN ct.fee_type = 'percentage' AND cm.last_recorded_assets IS NOT NULL THEN
+            ROUND(cm.last_recorded_assets * (ct.percent_rate / 100.0), 2)
+        ELSE NULL
+    END AS expected_fee,
+    -- Simplified payment status
+    CASE
+        WHEN latest.applied_year IS NULL THEN 'Due'
+        WHEN latest.applied_year < CASE
+            WHEN (MONTH(GETDATE()) = 1 AND ct.payment_schedule = 'monthly') OR
+                 (DATEPART(QUARTER, GETDATE()) = 1 AND ct.payment_schedule = 'quarterly')
+            THEN YEAR(GETDATE()) - 1
+            ELSE YEAR(GETDATE())
+        END THEN 'Due'
+        WHEN latest.applied_year = CASE
+            WHEN (MONTH(GETDATE()) = 1 AND ct.payment_schedule = 'monthly') OR
+                 (DATEPART(QUARTER, GETDATE()) = 1 AND ct.payment_schedule = 'quarterly')
+            THEN YEAR(GETDATE()) - 1
+            ELSE YEAR(GETDATE())
+        END AND latest.applied_period < CASE
+            WHEN ct.payment_schedule = 'monthly' THEN
+                CASE WHEN MONTH(GETDATE()) = 1 THEN 12 ELSE MONTH(GETDATE()) - 1 END
+            WHEN ct.payment_schedule = 'quarterly' THEN
+                CASE WHEN DATEPART(QUARTER, GETDATE()) = 1 THEN 4 ELSE DATEPART(QUARTER, GETDATE()) - 1 END
+        END THEN 'Due'
+        ELSE 'Paid'
+    END AS payment_status
+FROM clients c
+JOIN contracts ct ON c.client_id = ct.client_id AND ct.valid_to IS NULL
+LEFT JOIN client_metrics cm ON c.client_id = cm.client_id
+LEFT JOIN (
+    SELECT * FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY received_date DESC) as rn
+        FROM payments WHERE valid_to IS NULL
+    ) AS numbered WHERE rn = 1
+) latest ON c.client_id = latest.client_id
+WHERE c.valid_to IS NULL;
+GO
+
+CREATE VIEW payment_file_view AS
+SELECT
+    p.payment_id,
+    p.client_id,
+    p.contract_id,
+    p.received_date,
+    p.actual_fee,
+    CASE WHEN cf.file_id IS NOT NULL THEN 1 ELSE 0 END AS has_file,
+    cf.file_id,
+    cf.file_name,
+    cf.onedrive_path
+FROM
+    payments p
+LEFT JOIN
+    payment_files pf ON p.payment_id = pf.payment_id
+LEFT JOIN
+    client_files cf ON pf.file_id = cf.file_id;
+GO
@@ -0,0 +1,107 @@
+"""
+Statement timeouts for queries run while handling a request.
+
+Traced statements (see database.instrumentation) get a pyodbc query
+timeout before they execute: ``DB_STATEMENT_TIMEOUT_S`` by default
+(30 seconds, 0 disables it), overridden per named query by
+``QUERY_TIMEOUTS`` below and ``DB_QUERY_TIMEOUTS``, e.g.
+
+    DB_QUERY_TIMEOUTS=portfolio.status=90;dashboard.client=5
+
+Maintenance scripts run untraced and keep the driver's unlimited default.
+
+A statement that hits its timeout raises ``QueryTimeoutError``; one
+cancelled because its request was abandoned raises
+``QueryCancelledError``.
+"""
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATEMENT_TIMEOUT = 30
+
+# Named queries that legitimately take longer than the default
+QUERY_TIMEOUTS: Dict[str, int] = {
+    "portfolio.status": 60,
+    "payment_status.latest_all": 60,
+    "bulk_payments.stage_rows": 120,
+    "bulk_payments.merge": 120,
+}
+
+# ODBC SQLSTATEs for "timeout expired" and "operation canceled"
+_TIMEOUT_STATES = ('HYT00', 'HYT01')
+_CANCELLED_STATES = ('HY008',)
+
+
+class QueryTimeoutError(Exception):
+    """A statement ran longer than its timeout and was stopped by the driver."""
+
+    def __init__(self, name: str, timeout: int):
+        super().__init__(f"Query {name} timed out after {timeout} s")
+        self.name = name
+        self.timeout = timeout
+
+
+class QueryCancelledError(Exception):
+    """A statement was cancelled because its request was abandoned."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Query {name} was cancelled")
+        self.name = name
+
+
+def _sqlstate(error: BaseException) -> Optional[str]:
+    args = getattr(error, 'args', ())
+    return args[0] if args and isinstance(args[0], str) else None
+
+
+def is_timeout(error: BaseException) -> bool:
+    return _sqlstate(error) in _TIMEOUT_STATES
+
+
+def is_cancelled(error: BaseException) -> bool:
+    return _sqlstate(error) in _CANCELLED_STATES
+
+
+_overrides_cache: Tuple[str, Dict[str, int]] = ("", {})
+
+
+def _env_overrides() -> Dict[str, int]:
+    global _overrides_cache
+    raw = os.getenv("DB_QUERY_TIMEOUTS", "")
+    if raw == _overrides_cache[0]:
+        return _overrides_cache[1]
+    overrides = {}
+    for item in raw.split(';'):
+        if not item.strip():
+            continue
+        name, _, value = item.rpartition('=')
+        try:
+            overrides[name.strip()] = int(value)
+        except ValueError:
+            logger.warning("Ignoring invalid DB_QUERY_TIMEOUTS entry: %s", item)
+    _overrides_cache = (raw, overrides)
+    return overrides
+
+
+def default_timeout() -> int:
+    value = os.getenv("DB_STATEMENT_TIMEOUT_S")
+    if not value:
+        return DEFAULT_STATEMENT_TIMEOUT
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Ignoring invalid DB_STATEMENT_TIMEOUT_S: %s", value)
+        return DEFAULT_STATEMENT_TIMEOUT
+
+
+def statement_timeout(name: str) -> int:
+    """Timeout in seconds for a named statement, 0 for none."""
+    overrides = _env_overrides()
+    if name in overrides:
+        return overrides[name]
+    if name in QUERY_TIMEOUTS:
+        return QUERY_TIMEOUTS[name]
+    return default_timeout()
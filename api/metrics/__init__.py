@@ -0,0 +1,22 @@
+"""
+Azure Function exposing Prometheus metrics.
+Request latency, database time and errors, connections and cache hit rates
+for this worker process.
+"""
+import azure.functions as func
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.metrics import REGISTRY
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Get metrics in Prometheus text format.
+    Route: GET /api/_metrics
+    """
+    return func.HttpResponse(
+        REGISTRY.render(),
+        mimetype="text/plain",
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
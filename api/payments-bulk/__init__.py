@@ -0,0 +1,67 @@
+# api/payments-bulk/__init__.py
+
+"""
+Azure Function for bulk payment import.
+Validates and inserts a batch of payments in a single transaction.
+"""
+import azure.functions as func
+import json
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from database.database import get_db
+from services.bulk_payments import (
+    PaymentBatchError, validate_payment_batch, insert_payment_batch
+)
+from services.payment_status import note_payment_write
+from utils.middleware import http_function, json_response
+
+
+@http_function("payments/bulk")
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Create many payments in one request.
+    Route: POST /api/payments/bulk
+    
+    Body is either a JSON list of payment objects or {"payments": [...]}.
+    The batch is all-or-nothing: any invalid row rejects the whole batch
+    with per-row errors keyed by the row's index in the request.
+    
+    Returns:
+    - payment_ids: New IDs in request order
+    - count: Number of payments created
+    """
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse(
+            json.dumps({"error": "Invalid request body: expected JSON"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+    
+    items = req_body.get('payments') if isinstance(req_body, dict) else req_body
+    
+    try:
+        payments = validate_payment_batch(items)
+        
+        db = get_db()
+        with db.cursor() as cursor:
+            payment_ids = insert_payment_batch(cursor, payments)
+            
+            # Note: Triggers fire once for the whole batch
+        
+        note_payment_write(*{p.client_id for p in payments})
+        return json_response({"payment_ids": payment_ids, "count": len(payment_ids)}, status_code=201)
+    
+    except PaymentBatchError as e:
+        return json_response(e.to_dict(), status_code=400)
+    except Exception as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            status_code=500,
+            mimetype="application/json"
+        )
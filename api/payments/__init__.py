@@ -14,16 +14,54 @@ from typing import Dict, Any, Optional
 # Add backend to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from database.batch import batch_result, fetch_by_ids, parse_ids
 from database.database import get_db
 from database.models import Payment, PaymentCreate, PaymentUpdate
+from database.projection import Entity, Field
+from services.contract_terms import fill_expected_fees
+from services.dashboard_read_model import mark_payment_stale
+from services.expected_fee_backfill import FEE_INPUTS, recompute_expected_fees
+from services.summary_maintenance import enqueue_payment
+from services.payment_status import note_payment_write, payment_client_id
+from utils.middleware import http_function, json_response
 
+# Fields for GET /api/payments?client_id=...&fields=...
+PAYMENT_LIST = Entity("payment", {
+    'payment_id': Field('p.payment_id'),
+    'contract_id': Field('p.contract_id'),
+    'client_id': Field('p.client_id'),
+    'received_date': Field('p.received_date'),
+    'total_assets': Field('p.total_assets'),
+    'expected_fee': Field('p.expected_fee'),
+    'actual_fee': Field('p.actual_fee'),
+    'method': Field('p.method'),
+    'notes': Field('p.notes'),
+    'applied_period_type': Field('p.applied_period_type'),
+    'applied_period': Field('p.applied_period'),
+    'applied_year': Field('p.applied_year'),
+    'valid_from': Field('p.valid_from'),
+    'valid_to': Field('p.valid_to'),
+    'client_name': Field('c.display_name'),
+    'provider_name': Field('co.provider_name', 'co'),
+    'fee_type': Field('co.fee_type', 'co'),
+    'percent_rate': Field('co.percent_rate', 'co'),
+    'flat_rate': Field('co.flat_rate', 'co'),
+    'payment_schedule': Field('co.payment_schedule', 'co'),
+    'has_files': Field('CASE WHEN EXISTS (SELECT 1 FROM payment_files pf '
+                       'WHERE pf.payment_id = p.payment_id) THEN 1 ELSE 0 END'),
+}, joins={
+    'co': "LEFT JOIN contracts co ON p.contract_id = co.contract_id",
+})
 
+
+@http_function("payments/{id?}")
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Handle payment-related HTTP requests.
     
     Routes:
-    - GET /api/payments?client_id={id} - List payments for a client
+    - GET /api/payments?client_id={id} - List payments for a client (?fields= to trim columns)
+    - GET /api/payments?ids=1,2,3 - Get several payments, keyed by id
     - GET /api/payments/{id} - Get specific payment
     - POST /api/payments - Create new payment
     - PUT /api/payments/{id} - Update payment
@@ -35,23 +73,20 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         db = get_db()
         
-        # GET payments with filters
-        if req.method == "GET" and not payment_id:
-            client_id = req.params.get('client_id')
-            year = req.params.get('year')
-            page = int(req.params.get('page', 1))
-            limit = int(req.params.get('limit', 50))
-            offset = (page - 1) * limit
-            
-            if not client_id:
+        # GET several payments by id
+        if req.method == "GET" and not payment_id and req.params.get('ids'):
+            try:
+                ids = parse_ids(req.params.get('ids'))
+            except ValueError as e:
                 return func.HttpResponse(
-                    json.dumps({"error": "client_id parameter required"}),
+                    json.dumps({"error": str(e)}),
                     status_code=400,
                     mimetype="application/json"
                 )
             
             with db.cursor(commit=False) as cursor:
-                query = """
+                found = fetch_by_ids(cursor, """
+                    -- name: payments.by_ids
                     SELECT p.payment_id, p.contract_id, p.client_id, p.received_date,
                            p.total_assets, p.expected_fee, p.actual_fee, p.method, p.notes,
                            p.applied_period_type, p.applied_period, p.applied_year,
@@ -59,11 +94,52 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                            c.display_name as client_name, 
                            co.provider_name, co.fee_type, co.percent_rate, 
                            co.flat_rate, co.payment_schedule,
-                           CASE WHEN pf.payment_id IS NOT NULL THEN 1 ELSE 0 END as has_files
+                           CASE WHEN COUNT(pf.file_id) > 0 THEN 1 ELSE 0 END as has_files
                     FROM payments p
                     JOIN clients c ON p.client_id = c.client_id
                     LEFT JOIN contracts co ON p.contract_id = co.contract_id
                     LEFT JOIN payment_files pf ON p.payment_id = pf.payment_id
+                    WHERE p.payment_id IN ({ids}) AND p.valid_to IS NULL
+                    GROUP BY p.payment_id, p.contract_id, p.client_id, p.received_date,
+                             p.total_assets, p.expected_fee, p.actual_fee, p.method, p.notes,
+                             p.applied_period_type, p.applied_period, p.applied_year,
+                             p.valid_from, p.valid_to, c.display_name, 
+                             co.provider_name, co.fee_type, co.percent_rate, 
+                             co.flat_rate, co.payment_schedule
+                """, ids, key='payment_id')
+            
+            return json_response(batch_result(ids, found))
+        
+        # GET payments with filters
+        elif req.method == "GET" and not payment_id:
+            client_id = req.params.get('client_id')
+            year = req.params.get('year')
+            page = int(req.params.get('page', 1))
+            limit = int(req.params.get('limit', 50))
+            offset = (page - 1) * limit
+            
+            if not client_id:
+                return func.HttpResponse(
+                    json.dumps({"error": "client_id parameter required"}),
+                    status_code=400,
+                    mimetype="application/json"
+                )
+            
+            try:
+                fields = PAYMENT_LIST.parse(req.params.get('fields'))
+            except ValueError as e:
+                return func.HttpResponse(
+                    json.dumps({"error": str(e)}),
+                    status_code=400,
+                    mimetype="application/json"
+                )
+            
+            with db.cursor(commit=False) as cursor:
+                query = f"""
+                    SELECT {PAYMENT_LIST.select_list(fields)}
+                    FROM payments p
+                    JOIN clients c ON p.client_id = c.client_id
+                    {PAYMENT_LIST.join_clauses(fields)}
                     WHERE p.client_id = ? AND p.valid_to IS NULL
                 """
                 
@@ -73,14 +149,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                     query += " AND p.applied_year = ?"
                     params.append(int(year))
                 
-                # Group by all non-aggregate columns to handle multiple files
                 query += """
-                    GROUP BY p.payment_id, p.contract_id, p.client_id, p.received_date,
-                             p.total_assets, p.expected_fee, p.actual_fee, p.method, p.notes,
-                             p.applied_period_type, p.applied_period, p.applied_year,
-                             p.valid_from, p.valid_to, c.display_name, 
-                             co.provider_name, co.fee_type, co.percent_rate, 
-                             co.flat_rate, co.payment_schedule
                     ORDER BY p.received_date DESC
                     OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
                 """
@@ -90,24 +159,9 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 columns = [column[0] for column in cursor.description]
                 rows = cursor.fetchall()
             
-            # Convert to list of dictionaries
-            payments = []
-            for row in rows:
-                payment_dict = dict(zip(columns, row))
-                
-                # Calculate expected fee if not stored
-                if payment_dict['expected_fee'] is None:
-                    if payment_dict['fee_type'] == 'percentage' and payment_dict['percent_rate'] and payment_dict['total_assets']:
-                        payment_dict['expected_fee'] = payment_dict['total_assets'] * payment_dict['percent_rate']
-                    elif payment_dict['fee_type'] == 'flat' and payment_dict['flat_rate']:
-                        payment_dict['expected_fee'] = payment_dict['flat_rate']
-                
-                payments.append(payment_dict)
+            payments = [dict(zip(columns, row)) for row in rows]
             
-            return func.HttpResponse(
-                json.dumps(payments, default=str),
-                mimetype="application/json"
-            )
+            return json_response(payments)
         
         # GET single payment
         elif req.method == "GET" and payment_id:
@@ -146,17 +200,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             
             payment_dict = dict(zip(columns, row))
             
-            # Calculate expected fee if not stored
-            if payment_dict['expected_fee'] is None:
-                if payment_dict['fee_type'] == 'percentage' and payment_dict['percent_rate'] and payment_dict['total_assets']:
-                    payment_dict['expected_fee'] = payment_dict['total_assets'] * payment_dict['percent_rate']
-                elif payment_dict['fee_type'] == 'flat' and payment_dict['flat_rate']:
-                    payment_dict['expected_fee'] = payment_dict['flat_rate']
-            
-            return func.HttpResponse(
-                json.dumps(payment_dict, default=str),
-                mimetype="application/json"
-            )
+            return json_response(payment_dict)
         
         # POST - Create new payment
         elif req.method == "POST":
@@ -170,7 +214,12 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                     mimetype="application/json"
                 )
             
+            payment_data = payment_create.model_dump()
+            
             with db.cursor() as cursor:
+                # Store the expected fee under the contract in force for the period
+                fill_expected_fees(cursor, [payment_data])
+                
                 # Insert payment using new schema
                 cursor.execute("""
                     INSERT INTO payments (
@@ -185,7 +234,7 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                     payment_create.client_id,
                     payment_create.received_date,
                     payment_create.total_assets,
-                    payment_create.expected_fee,
+                    payment_data['expected_fee'],
                     payment_create.actual_fee,
                     payment_create.method,
                     payment_create.notes,
@@ -196,12 +245,12 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 new_id = cursor.fetchone()[0]
                 
                 # Note: Triggers will handle updating client_metrics and summaries automatically
+                # unless deferred summary maintenance is enabled
+                enqueue_payment(cursor, new_id)
+                mark_payment_stale(cursor, new_id)
             
-            return func.HttpResponse(
-                json.dumps({"payment_id": new_id, **payment_create.model_dump()}, default=str),
-                mimetype="application/json",
-                status_code=201
-            )
+            note_payment_write(payment_create.client_id)
+            return json_response({"payment_id": new_id, **payment_data}, status_code=201)
         
         # PUT - Update payment
         elif req.method == "PUT" and payment_id:
@@ -234,6 +283,26 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             params.append(int(payment_id))
             
             with db.cursor() as cursor:
+                # Lock the live row before queueing any side effects, so a
+                # missing payment returns 404 with nothing written
+                cursor.execute(
+                    "SELECT client_id FROM payments WITH (UPDLOCK, ROWLOCK) "
+                    "WHERE payment_id = ? AND valid_to IS NULL",
+                    [int(payment_id)]
+                )
+                row = cursor.fetchone()
+                if not row:
+                    return func.HttpResponse(
+                        json.dumps({"error": "Payment not found"}),
+                        status_code=404,
+                        mimetype="application/json"
+                    )
+                old_client_id = row[0]
+                
+                # Old period must be refreshed too if the update moves the payment
+                enqueue_payment(cursor, int(payment_id))
+                mark_payment_stale(cursor, int(payment_id))
+                
                 query = f"""
                     UPDATE payments 
                     SET {', '.join(update_fields)}
@@ -241,19 +310,17 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                 """
                 cursor.execute(query, params)
                 
-                if cursor.rowcount == 0:
-                    return func.HttpResponse(
-                        json.dumps({"error": "Payment not found"}),
-                        status_code=404,
-                        mimetype="application/json"
-                    )
+                if FEE_INPUTS & update_data.keys() and 'expected_fee' not in update_data:
+                    recompute_expected_fees(cursor, [int(payment_id)])
                 
                 # Note: Triggers will handle updating summaries automatically
+                # unless deferred summary maintenance is enabled
+                enqueue_payment(cursor, int(payment_id))
+                mark_payment_stale(cursor, int(payment_id))
+                new_client_id = payment_client_id(cursor, int(payment_id))
             
-            return func.HttpResponse(
-                json.dumps({"message": "Payment updated successfully"}),
-                mimetype="application/json"
-            )
+            note_payment_write(old_client_id, new_client_id)
+            return json_response({"message": "Payment updated successfully"})
         
         # DELETE - Soft delete payment
         elif req.method == "DELETE" and payment_id:
@@ -272,7 +339,12 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
                     )
                 
                 # Note: Triggers will handle updating summaries automatically
+                # unless deferred summary maintenance is enabled
+                enqueue_payment(cursor, int(payment_id))
+                mark_payment_stale(cursor, int(payment_id))
+                client_id = payment_client_id(cursor, int(payment_id))
             
+            note_payment_write(client_id)
             return func.HttpResponse(status_code=204)
         
         else:
@@ -2,15 +2,117 @@
 Azure Function for getting available payment periods.
 Used by payment forms to show which periods can be selected.
 """
+import asyncio
 import azure.functions as func
 import json
 import sys
 import os
-from datetime import datetime
+from datetime import date
+from typing import Any, Dict, Tuple
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from database.database import get_db
+from services.payment_status import collection_period, ordinal_period, period_ordinal
+from utils.middleware import http_function, json_response
+from utils.single_flight import SingleFlight
 
+period_lists = SingleFlight("periods")
+
+
+PERIOD_NAMES = {
+    'monthly': ['January', 'February', 'March', 'April', 'May', 'June',
+                'July', 'August', 'September', 'October', 'November', 'December'],
+    'quarterly': ['Q1', 'Q2', 'Q3', 'Q4'],
+}
+
+# First month covered by any active payment, whatever its period type
+FIRST_MONTH_SQL = """
+    -- name: periods.first_month
+    SELECT MIN(first_month) FROM (
+        SELECT MIN(period_ordinal) AS first_month
+        FROM payments
+        WHERE client_id = ? AND applied_period_type = 'monthly' AND valid_to IS NULL
+        UNION ALL
+        SELECT MIN(period_ordinal) - 2
+        FROM payments
+        WHERE client_id = ? AND applied_period_type = 'quarterly' AND valid_to IS NULL
+    ) AS firsts
+"""
+
+PAID_SQL = """
+    -- name: periods.paid
+    SELECT DISTINCT period_ordinal
+    FROM payments
+    WHERE client_id = ?
+      AND applied_period_type = ?
+      AND period_ordinal BETWEEN ? AND ?
+      AND valid_to IS NULL
+"""
+
+
+def load_periods(client_id: int, contract_id: int) -> Tuple[int, Dict[str, Any]]:
+    """
+    Status code and body listing a contract's unpaid periods.
+
+    Periods run from the one holding the client's earliest payment (or
+    the start of this year) to the period being collected. Both queries
+    are seeks on idx_payments_period_ordinal.
+    """
+    db = get_db()
+    
+    with db.cursor(commit=False) as cursor:
+        # Get payment schedule from contract
+        cursor.execute("""
+            SELECT payment_schedule
+            FROM contracts
+            WHERE contract_id = ? AND client_id = ? AND valid_to IS NULL
+        """, [contract_id, client_id])
+        
+        row = cursor.fetchone()
+        if not row:
+            return 404, {"error": "Contract not found"}
+        
+        payment_schedule = row[0]
+        period_type = 'monthly' if payment_schedule.lower() == 'monthly' else 'quarterly'
+        months = 1 if period_type == 'monthly' else 3
+        
+        # Current collection period (one back for arrears)
+        today = date.today()
+        last = period_ordinal(*collection_period(today, period_type), period_type)
+        
+        # Start at the period holding the earliest payment
+        cursor.execute(FIRST_MONTH_SQL, [client_id, client_id])
+        row = cursor.fetchone()
+        if row and row[0] is not None:
+            first = period_ordinal(*ordinal_period(row[0], period_type), period_type)
+        else:
+            # No payments yet, start from beginning of current year
+            first = period_ordinal(1, today.year, period_type)
+        
+        cursor.execute(PAID_SQL, [client_id, period_type, first, last])
+        paid = {row[0] for row in cursor.fetchall()}
+        
+        # Most recent first
+        available_periods = []
+        for ordinal in range(last, first - 1, -months):
+            if ordinal in paid:
+                continue
+            period, year = ordinal_period(ordinal, period_type)
+            available_periods.append({
+                'value': f"{period}-{year}",
+                'label': f"{PERIOD_NAMES[period_type][period - 1]} {year}",
+                'period': period,
+                'year': year,
+                'period_type': payment_schedule.lower()
+            })
+
+    return 200, {
+        'periods': available_periods,
+        'payment_schedule': payment_schedule
+    }
+
+
+@http_function("periods")
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Get available periods for payment entry.
@@ -29,122 +131,12 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
         )
     
     try:
-        db = get_db()
-        
-        with db.cursor(commit=False) as cursor:
-            # Get payment schedule from contract
-            cursor.execute("""
-                SELECT payment_schedule
-                FROM contracts
-                WHERE contract_id = ? AND client_id = ? AND valid_to IS NULL
-            """, [int(contract_id), int(client_id)])
-            
-            row = cursor.fetchone()
-            if not row:
-                return func.HttpResponse(
-                    json.dumps({"error": "Contract not found"}),
-                    status_code=404,
-                    mimetype="application/json"
-                )
-            
-            payment_schedule = row[0]
-            is_monthly = payment_schedule.lower() == 'monthly'
-            
-            # Get all paid periods
-            cursor.execute("""
-                SELECT DISTINCT applied_period, applied_year
-                FROM payments
-                WHERE client_id = ? 
-                  AND valid_to IS NULL
-                  AND applied_period_type = ?
-                ORDER BY applied_year DESC, applied_period DESC
-            """, [int(client_id), payment_schedule.lower()])
-            
-            paid_periods = set()
-            for row in cursor.fetchall():
-                paid_periods.add((row[0], row[1]))
-            
-            # Get the earliest payment to determine starting point
-            cursor.execute("""
-                SELECT MIN(applied_year) as first_year,
-                       MIN(CASE WHEN applied_year = (SELECT MIN(applied_year) FROM payments WHERE client_id = ?)
-                                THEN applied_period END) as first_period
-                FROM payments
-                WHERE client_id = ? AND valid_to IS NULL
-            """, [int(client_id), int(client_id)])
-            
-            row = cursor.fetchone()
-            if row and row[0]:
-                start_year = row[0]
-                start_period = row[1] if row[1] else 1
-            else:
-                # No payments yet, start from beginning of current year
-                start_year = datetime.now().year
-                start_period = 1
-            
-            # Calculate current collection period (one back for arrears)
-            current_date = datetime.now()
-            
-            if is_monthly:
-                if current_date.month == 1:
-                    current_period = 12
-                    current_year = current_date.year - 1
-                else:
-                    current_period = current_date.month - 1
-                    current_year = current_date.year
-                max_period = 12
-                period_names = [
-                    'January', 'February', 'March', 'April', 'May', 'June',
-                    'July', 'August', 'September', 'October', 'November', 'December'
-                ]
-            else:  # Quarterly
-                current_quarter = (current_date.month - 1) // 3 + 1
-                if current_quarter == 1:
-                    current_period = 4
-                    current_year = current_date.year - 1
-                else:
-                    current_period = current_quarter - 1
-                    current_year = current_date.year
-                max_period = 4
-                period_names = ['Q1', 'Q2', 'Q3', 'Q4']
-            
-            # Generate available periods
-            available_periods = []
-            year = start_year
-            period = start_period
-            
-            # Generate periods up to current collection period
-            while year < current_year or (year == current_year and period <= current_period):
-                if (period, year) not in paid_periods:
-                    period_label = f"{period_names[period-1]} {year}"
-                    available_periods.append({
-                        'value': f"{period}-{year}",
-                        'label': period_label,
-                        'period': period,
-                        'year': year,
-                        'period_type': payment_schedule.lower()
-                    })
-                
-                # Move to next period
-                period += 1
-                if period > max_period:
-                    period = 1
-                    year += 1
-                
-                # Safety check to prevent infinite loop
-                if year > current_year + 1:
-                    break
-            
-            # Reverse to show most recent first
-            available_periods.reverse()
-        
-        return func.HttpResponse(
-            json.dumps({
-                'periods': available_periods,
-                'payment_schedule': payment_schedule
-            }, default=str),
-            mimetype="application/json"
-        )
+        client_id, contract_id = int(client_id), int(contract_id)
+        # Identical concurrent requests share one load
+        status_code, periods = await period_lists.do(
+            ("periods", client_id, contract_id),
+            lambda: asyncio.to_thread(load_periods, client_id, contract_id))
+        return json_response(periods, status_code=status_code)
         
     except Exception as e:
         return func.HttpResponse(
@@ -0,0 +1,6 @@
+"""
+Shared business services used by the Azure Function endpoints.
+
+Endpoints stay thin HTTP wrappers; multi-step operations that more than one
+function (or a maintenance script) needs live here.
+"""
@@ -0,0 +1,232 @@
+"""
+Bulk payment import.
+
+Validates a batch of payment payloads with ``PaymentCreate`` and inserts the
+whole batch in a single transaction. Rows are loaded into a session temp
+table with pyodbc ``fast_executemany`` and moved into ``payments`` with one
+set-based MERGE, so the payment triggers fire once per batch instead of once
+per row.
+"""
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from database.models import PaymentCreate
+from services.contract_terms import fill_expected_fees
+from services.dashboard_read_model import MARK_PAYMENT_BATCH_STALE_SQL, read_model_enabled
+from services.summary_maintenance import ENQUEUE_PAYMENT_BATCH_SQL
+
+logger = logging.getLogger(__name__)
+
+# Largest batch accepted in one request/transaction
+MAX_BATCH_SIZE = 10000
+
+# Column order shared by the staging table and the final insert
+PAYMENT_COLUMNS = (
+    'contract_id', 'client_id', 'received_date', 'total_assets',
+    'expected_fee', 'actual_fee', 'method', 'notes',
+    'applied_period_type', 'applied_period', 'applied_year'
+)
+
+_CREATE_STAGING_SQL = """
+    CREATE TABLE #payment_batch (
+        row_num INT NOT NULL PRIMARY KEY,
+        contract_id INT NOT NULL,
+        client_id INT NOT NULL,
+        received_date NVARCHAR(50),
+        total_assets FLOAT,
+        expected_fee FLOAT,
+        actual_fee FLOAT,
+        method NVARCHAR(50),
+        notes NVARCHAR(MAX),
+        applied_period_type NVARCHAR(10),
+        applied_period INT,
+        applied_year INT
+    )
+"""
+
+_STAGE_ROWS_SQL = f"""
+    -- name: bulk_payments.stage_rows
+    INSERT INTO #payment_batch (row_num, {', '.join(PAYMENT_COLUMNS)})
+    VALUES ({', '.join('?' * (len(PAYMENT_COLUMNS) + 1))})
+"""
+
+# Rows whose contract is missing, inactive or belongs to another client
+_ORPHAN_ROWS_SQL = """
+    SELECT s.row_num, s.contract_id, s.client_id
+    FROM #payment_batch s
+    LEFT JOIN contracts co ON co.contract_id = s.contract_id
+        AND co.client_id = s.client_id
+        AND co.valid_to IS NULL
+    WHERE co.contract_id IS NULL
+    ORDER BY s.row_num
+"""
+
+# MERGE (rather than INSERT ... SELECT) lets OUTPUT reference the source
+# row number, which maps every new identity back to its request position.
+# OUTPUT must go INTO a table because payments has enabled triggers.
+_MERGE_SQL = f"""
+    -- name: bulk_payments.merge
+    SET NOCOUNT ON;
+    DECLARE @inserted TABLE (row_num INT NOT NULL, payment_id INT NOT NULL);
+
+    MERGE INTO payments AS target
+    USING #payment_batch AS source
+    ON 1 = 0
+    WHEN NOT MATCHED THEN
+        INSERT ({', '.join(PAYMENT_COLUMNS)})
+        VALUES ({', '.join('source.' + c for c in PAYMENT_COLUMNS)})
+    OUTPUT source.row_num, INSERTED.payment_id INTO @inserted;
+
+    SELECT payment_id FROM @inserted ORDER BY row_num;
+"""
+
+
+class PaymentBatchError(Exception):
+    """Raised when a batch fails validation; carries per-row and per-batch errors."""
+
+    def __init__(self, message: str, row_errors: List[Dict[str, Any]] = None,
+                 batch_errors: List[str] = None):
+        super().__init__(message)
+        self.row_errors = row_errors or []
+        self.batch_errors = batch_errors or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable error body for API responses."""
+        return {
+            "error": str(self),
+            "batch_errors": self.batch_errors,
+            "row_errors": self.row_errors
+        }
+
+
+def format_validation_error(error: ValidationError) -> List[Dict[str, str]]:
+    """Flatten a pydantic ValidationError into field/message pairs."""
+    return [
+        {
+            "field": ".".join(str(part) for part in detail.get('loc', ())) or None,
+            "message": detail.get('msg', '')
+        }
+        for detail in error.errors()
+    ]
+
+
+def validate_payment_batch(items: Any) -> List[PaymentCreate]:
+    """
+    Validate a batch of raw payment payloads.
+
+    Every row is validated so the caller gets all problems in one response
+    rather than the first failure only.
+
+    Args:
+        items: Decoded JSON list of payment objects
+
+    Returns:
+        list: PaymentCreate models in request order
+
+    Raises:
+        PaymentBatchError: If the batch shape or any row is invalid
+    """
+    if not isinstance(items, list):
+        raise PaymentBatchError(
+            "Invalid batch", batch_errors=["Request body must be a list of payments"]
+        )
+    if not items:
+        raise PaymentBatchError("Invalid batch", batch_errors=["Batch is empty"])
+    if len(items) > MAX_BATCH_SIZE:
+        raise PaymentBatchError(
+            "Invalid batch",
+            batch_errors=[f"Batch has {len(items)} rows; maximum is {MAX_BATCH_SIZE}"]
+        )
+
+    payments = []
+    row_errors = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            row_errors.append({
+                "index": index,
+                "errors": [{"field": None, "message": "Row must be an object"}]
+            })
+            continue
+        try:
+            payments.append(PaymentCreate(**item))
+        except ValidationError as e:
+            row_errors.append({"index": index, "errors": format_validation_error(e)})
+
+    if row_errors:
+        raise PaymentBatchError(
+            f"{len(row_errors)} of {len(items)} rows failed validation",
+            row_errors=row_errors
+        )
+
+    return payments
+
+
+def payment_row(payment: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Parameter tuple for one payment in PAYMENT_COLUMNS order."""
+    return tuple(payment[column] for column in PAYMENT_COLUMNS)
+
+
+def insert_payment_batch(cursor, payments: Sequence[PaymentCreate]) -> List[int]:
+    """
+    Insert validated payments in one set-based statement.
+
+    Must run inside a transactional cursor (``db.cursor()``) so a failure
+    rolls back the whole batch. Call ``note_payment_write`` for the
+    batch's clients once it commits.
+
+    Args:
+        cursor: Open pyodbc cursor
+        payments: Validated payments
+
+    Returns:
+        list: New payment IDs in the same order as ``payments``
+
+    Raises:
+        PaymentBatchError: If any row references an inactive or mismatched contract
+    """
+    if not payments:
+        return []
+
+    # Expected fees not sent are stored under the contract in force for
+    # each period, computed for the whole batch at once
+    rows = [payment.model_dump() for payment in payments]
+    fill_expected_fees(cursor, rows)
+
+    # The staging table is created inside the transaction, so a rollback
+    # on any error below discards it along with the batch.
+    cursor.execute(_CREATE_STAGING_SQL)
+    cursor.fast_executemany = True
+    cursor.executemany(
+        _STAGE_ROWS_SQL,
+        [(index, *payment_row(row)) for index, row in enumerate(rows)]
+    )
+
+    cursor.execute(_ORPHAN_ROWS_SQL)
+    orphans = cursor.fetchall()
+    if orphans:
+        raise PaymentBatchError(
+            f"{len(orphans)} of {len(payments)} rows reference an unknown contract",
+            row_errors=[
+                {
+                    "index": row[0],
+                    "errors": [{
+                        "field": "contract_id",
+                        "message": f"No active contract {row[1]} for client {row[2]}"
+                    }]
+                }
+                for row in orphans
+            ]
+        )
+
+    cursor.execute(_MERGE_SQL)
+    payment_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute(ENQUEUE_PAYMENT_BATCH_SQL)
+    if read_model_enabled():
+        cursor.execute(MARK_PAYMENT_BATCH_STALE_SQL)
+    cursor.execute("DROP TABLE #payment_batch")
+
+    logger.debug("Inserted %d payments in one batch", len(payment_ids))
+    return payment_ids
@@ -0,0 +1,170 @@
+"""
+Effective-dated contract terms.
+
+A client's contracts, ended ones included, form a timeline: each applies
+from the month it starts (``contract_start_date``, else ``valid_from``)
+until the next one starts or, if it was ended (``valid_to``), through the
+month it ended. A contract ended with none starting after it was deleted
+rather than replaced, and never applies while the client has an active
+contract. ``ContractTimeline`` keeps a client's contracts sorted by start
+month, so the contract in force for a payment's period is a bisect away.
+
+Payment writes and the expected-fee backfill use it to compute the
+``expected_fee`` they store, at the rates in force for each payment's
+period, with ``services.fees``.
+"""
+import bisect
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from services import fees
+from services.payment_status import period_ordinal
+
+logger = logging.getLogger(__name__)
+
+
+def month_ordinal(value: Any) -> Optional[int]:
+    """
+    Month index (year * 12 + month - 1) of a date, datetime or ISO date
+    string, on the same scale as ``payments.period_ordinal``. None if it
+    cannot be read.
+    """
+    if isinstance(value, (date, datetime)):
+        return value.year * 12 + value.month - 1
+    if isinstance(value, str):
+        try:
+            year, month = int(value[:4]), int(value[5:7])
+        except ValueError:
+            return None
+        if 1 <= month <= 12:
+            return year * 12 + month - 1
+    return None
+
+
+class ContractTerm(NamedTuple):
+    """A contract's fee terms, the month they take effect and the month the contract ended."""
+    starts: Optional[int]
+    contract_id: int
+    fee_type: Optional[str]
+    percent_rate: Optional[float]
+    flat_rate: Optional[float]
+    ends: Optional[int] = None
+
+    def in_force(self, ordinal: int) -> bool:
+        return self.ends is None or ordinal <= self.ends
+
+
+class ContractTimeline:
+    """One client's contracts ordered by start month."""
+
+    def __init__(self, terms: Iterable[ContractTerm]):
+        # Contracts without a readable start sort first; on equal starts
+        # the later contract wins
+        self.terms: List[ContractTerm] = sorted(
+            terms, key=lambda t: (t.starts if t.starts is not None else -1, t.contract_id))
+        # Drop deleted contracts: ended ones nothing started after, as long
+        # as the client has an active contract
+        if any(t.ends is None for t in self.terms):
+            while self.terms[-1].ends is not None:
+                self.terms.pop()
+        starts = [t.starts if t.starts is not None else -1 for t in self.terms]
+
+        # The term in force only changes where a contract starts or ends, so
+        # it is resolved once per such month and looked up with one bisect
+        self._changes = sorted(set(starts) | {t.ends + 1 for t in self.terms if t.ends is not None})
+        self._in_force = []
+        for ordinal in self._changes:
+            position = bisect.bisect_right(starts, ordinal) - 1
+            if position < 0:
+                self._in_force.append(self.terms[0])
+                continue
+            self._in_force.append(next(
+                (t for t in reversed(self.terms[:position + 1]) if t.in_force(ordinal)),
+                self.terms[position]))
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def term_at(self, ordinal: Optional[int]) -> Optional[ContractTerm]:
+        """
+        Contract in force in month ``ordinal``.
+
+        That is the latest contract started by then and not yet ended,
+        else the latest started (no contract was in force). Months before
+        the first contract get the first contract, and an unknown month
+        gets the latest one. None if there are no contracts.
+        """
+        if not self.terms:
+            return None
+        if ordinal is None:
+            return self.terms[-1]
+        position = bisect.bisect_right(self._changes, ordinal) - 1
+        if position < 0:
+            return self.terms[0]
+        return self._in_force[position]
+
+
+def payment_ordinal(payment: Dict[str, Any]) -> Optional[int]:
+    """Month a payment's fee is governed by: its applied period's, else the month received."""
+    ordinal = period_ordinal(payment.get('applied_period'), payment.get('applied_year'),
+                             payment.get('applied_period_type'))
+    return ordinal if ordinal is not None else month_ordinal(payment.get('received_date'))
+
+
+# Ids per contracts query, well under SQL Server's 2100 parameter limit
+MAX_CLIENTS_PER_QUERY = 1000
+
+_CONTRACTS_SQL = """
+    -- name: contract_terms.contracts
+    SELECT client_id, contract_id, contract_start_date, valid_from, valid_to,
+           fee_type, percent_rate, flat_rate
+    FROM contracts
+    WHERE client_id IN ({ids})
+"""
+
+
+def _term(contract_id, contract_start_date, valid_from, valid_to, fee_type, percent_rate,
+          flat_rate) -> ContractTerm:
+    starts = month_ordinal(contract_start_date)
+    if starts is None:
+        starts = month_ordinal(valid_from)
+    return ContractTerm(starts, contract_id, fee_type, percent_rate, flat_rate, month_ordinal(valid_to))
+
+
+def load_timelines(cursor, client_ids: Iterable[int]) -> Dict[int, ContractTimeline]:
+    """Contract timelines for these clients, with one query per thousand clients."""
+    wanted = sorted(set(int(c) for c in client_ids))
+    terms: Dict[int, List[ContractTerm]] = {client_id: [] for client_id in wanted}
+    for start in range(0, len(wanted), MAX_CLIENTS_PER_QUERY):
+        chunk = wanted[start:start + MAX_CLIENTS_PER_QUERY]
+        cursor.execute(_CONTRACTS_SQL.format(ids=', '.join('?' * len(chunk))), chunk)
+        for row in cursor.fetchall():
+            terms[row[0]].append(_term(*row[1:]))
+    return {client_id: ContractTimeline(client_terms) for client_id, client_terms in terms.items()}
+
+
+def fill_expected_fees(cursor, payments: Iterable[Dict[str, Any]]) -> None:
+    """
+    Fill in ``expected_fee`` where it is missing, from the contract in
+    force for each payment's period.
+
+    Payments need client_id, total_assets and the applied period columns
+    (received_date is used when the period is missing). Contracts are read
+    fresh for the payments' clients in one query, each payment costs one
+    bisect, and the fees are computed in one pass of the fee engine.
+    """
+    missing = [p for p in payments if p.get('expected_fee') is None]
+    if not missing:
+        return
+    timelines = load_timelines(cursor, (p['client_id'] for p in missing))
+    terms = [timelines[int(p['client_id'])].term_at(payment_ordinal(p)) for p in missing]
+
+    computed = fees.expected_fees(
+        [t.fee_type if t else None for t in terms],
+        [t.flat_rate if t else None for t in terms],
+        [t.percent_rate if t else None for t in terms],
+        [p.get('total_assets') for p in missing],
+    )
+    for payment, fee in zip(missing, fees.to_optional(computed)):
+        payment['expected_fee'] = fee
@@ -0,0 +1,321 @@
+"""
+Dashboard read model.
+
+With ``DASHBOARD_READ_MODEL=on``, GET /api/dashboard/{client_id} is served
+from ``client_dashboard``: one row per client holding the finished JSON
+body, read with a single primary-key lookup and returned without
+re-serialization. Apply ``database/migrations/002_client_dashboard.sql``
+before turning it on.
+
+Rows are kept current incrementally:
+
+- every client, contract and payment write bumps the client's ``version``
+  in the write's transaction (``mark_*_stale``), as does deferred summary
+  maintenance for the clients it recomputes;
+- ``refresh`` (run by the summary-maintenance timer) rebuilds rows whose
+  ``built_version`` is behind ``version``, rows built before today (the
+  body depends on the current period and year) and clients with no row
+  yet, and deletes rows of removed clients. A rebuild is only saved if
+  no write bumped the version while it was being built.
+
+A row that is stale or missing is never served; the endpoint assembles
+the dashboard live instead. ``verify`` compares fresh rows with a live
+build.
+
+Usage (from the api directory):
+    python -m services.dashboard_read_model refresh
+    python -m services.dashboard_read_model rebuild
+    python -m services.dashboard_read_model verify
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from database.routing import pin_primary
+from services.dashboard import build_dashboard
+from services.payment_status import StatusIndex
+
+logger = logging.getLogger(__name__)
+
+# Most rows rebuilt per refresh run
+DEFAULT_REFRESH_BATCH = 200
+
+# Bumps the version of the clients selected by {source}, creating
+# placeholder rows so a refresh racing a client's first write cannot
+# store a body built before it.
+MARK_STALE_SQL = """
+    -- name: dashboard_read_model.mark_stale
+    MERGE client_dashboard WITH (HOLDLOCK) AS target
+    USING ({source}) AS source (client_id)
+    ON target.client_id = source.client_id
+    WHEN MATCHED THEN
+        UPDATE SET version = target.version + 1
+    WHEN NOT MATCHED THEN
+        INSERT (client_id, version, built_version) VALUES (source.client_id, 1, 0);
+"""
+
+_CLIENT_SOURCE = "SELECT DISTINCT client_id FROM clients WHERE client_id IN ({ids})"
+_CONTRACT_SOURCE = "SELECT DISTINCT client_id FROM contracts WHERE contract_id = ?"
+_PAYMENT_SOURCE = "SELECT DISTINCT client_id FROM payments WHERE payment_id = ?"
+
+# Used by the bulk insert while its staging table still exists
+MARK_PAYMENT_BATCH_STALE_SQL = MARK_STALE_SQL.format(
+    source="SELECT DISTINCT client_id FROM #payment_batch")
+
+# Used by deferred summary maintenance while #dirty_clients exists
+MARK_DIRTY_CLIENTS_STALE_SQL = MARK_STALE_SQL.format(
+    source="SELECT client_id FROM #dirty_clients")
+
+_READ_SQL = """
+    -- name: dashboard_read_model.read
+    SELECT body
+    FROM client_dashboard
+    WHERE client_id = ? AND built_version = version AND built_on = ?
+"""
+
+_PENDING_SQL = """
+    -- name: dashboard_read_model.pending
+    SELECT TOP (?) c.client_id, ISNULL(cd.version, 0)
+    FROM clients c
+    LEFT JOIN client_dashboard cd ON cd.client_id = c.client_id
+    WHERE c.valid_to IS NULL
+      AND (cd.client_id IS NULL OR cd.built_version <> cd.version
+           OR cd.built_on IS NULL OR cd.built_on <> ?)
+    ORDER BY CASE WHEN cd.built_version <> cd.version THEN 0 ELSE 1 END, c.client_id
+"""
+
+_DELETE_REMOVED_SQL = """
+    DELETE cd
+    FROM client_dashboard cd
+    WHERE NOT EXISTS (
+        SELECT 1 FROM clients c WHERE c.client_id = cd.client_id AND c.valid_to IS NULL
+    )
+"""
+
+# Saves a rebuilt body unless the version moved on while it was built
+_SAVE_SQL = """
+    -- name: dashboard_read_model.save
+    MERGE client_dashboard WITH (HOLDLOCK) AS target
+    USING (SELECT ? AS client_id, ? AS version) AS source
+    ON target.client_id = source.client_id
+    WHEN MATCHED AND target.version = source.version THEN
+        UPDATE SET body = ?, built_version = source.version, built_on = ?,
+                   refreshed_at = SYSUTCDATETIME()
+    WHEN NOT MATCHED AND source.version = 0 THEN
+        INSERT (client_id, body, version, built_version, built_on, refreshed_at)
+        VALUES (source.client_id, ?, 0, 0, ?, SYSUTCDATETIME());
+"""
+
+_FRESH_SQL = """
+    SELECT client_id, body
+    FROM client_dashboard
+    WHERE built_version = version AND built_on = ?
+"""
+
+_COUNTS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM clients WHERE valid_to IS NULL),
+        (SELECT COUNT(*) FROM client_dashboard WHERE built_version = version AND built_on = ?)
+"""
+
+
+def read_model_enabled() -> bool:
+    """True when the dashboard is served from, and writes maintain, client_dashboard."""
+    return os.getenv("DASHBOARD_READ_MODEL", "off").lower() in ("on", "true", "1", "yes")
+
+
+def refresh_batch_size() -> int:
+    value = os.getenv("DASHBOARD_REFRESH_BATCH")
+    if not value:
+        return DEFAULT_REFRESH_BATCH
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        logger.warning("Ignoring invalid DASHBOARD_REFRESH_BATCH: %s", value)
+        return DEFAULT_REFRESH_BATCH
+
+
+def serialize(body: Dict[str, Any]) -> str:
+    """JSON stored for a dashboard body, as json_response would send it."""
+    return json.dumps(body, default=str)
+
+
+def mark_clients_stale(cursor, *client_ids: int) -> None:
+    """Call inside a client write's transaction. No-op unless the read model is enabled."""
+    if read_model_enabled() and client_ids:
+        source = _CLIENT_SOURCE.format(ids=', '.join('?' * len(client_ids)))
+        cursor.execute(MARK_STALE_SQL.format(source=source), [int(c) for c in client_ids])
+
+
+def mark_contract_stale(cursor, contract_id: int) -> None:
+    """Call inside a contract write's transaction. No-op unless the read model is enabled."""
+    if read_model_enabled():
+        cursor.execute(MARK_STALE_SQL.format(source=_CONTRACT_SOURCE), [contract_id])
+
+
+def mark_payment_stale(cursor, payment_id: int) -> None:
+    """
+    Call inside a payment write's transaction. No-op unless the read model is enabled.
+
+    Edits call this before and after the UPDATE so a payment moved to
+    another client marks both.
+    """
+    if read_model_enabled():
+        cursor.execute(MARK_STALE_SQL.format(source=_PAYMENT_SOURCE), [payment_id])
+
+
+def read_dashboard(cursor, client_id: int, today: date = None) -> Optional[str]:
+    """Stored dashboard JSON for a client, or None if missing or stale."""
+    cursor.execute(_READ_SQL, [client_id, today or date.today()])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def refresh(db, limit: int = None, today: date = None) -> Dict[str, Any]:
+    """
+    Rebuild one batch of stale and missing rows, those behind a write first.
+
+    Reads go to the primary so a rebuild never sees data older than the
+    version it records. Each row is saved in its own short transaction.
+
+    Returns:
+        dict: Rows rebuilt, skipped (written to meanwhile), deleted, and seconds
+    """
+    start = time.perf_counter()
+    today = today or date.today()
+    limit = limit or refresh_batch_size()
+    rebuilt = skipped = 0
+
+    with pin_primary():
+        with db.cursor() as cursor:
+            cursor.execute(_DELETE_REMOVED_SQL)
+            deleted = max(cursor.rowcount, 0)
+            cursor.execute(_PENDING_SQL, [limit, today])
+            pending = [(row[0], row[1]) for row in cursor.fetchall()]
+
+        # A fresh index sees payments written by other workers
+        index = StatusIndex()
+        for client_id, version in pending:
+            with db.cursor() as cursor:
+                body = build_dashboard(cursor, client_id, index)
+                if body is None:
+                    continue
+                text = serialize(body)
+                cursor.execute(_SAVE_SQL, [client_id, version, text, today, text, today])
+                if cursor.rowcount:
+                    rebuilt += 1
+                else:
+                    skipped += 1
+
+    stats = {
+        "rebuilt": rebuilt,
+        "skipped": skipped,
+        "deleted": deleted,
+        "pending": len(pending),
+        "elapsed_seconds": round(time.perf_counter() - start, 4),
+    }
+    if pending or deleted:
+        logger.info("Dashboard read model: rebuilt %d, skipped %d, deleted %d in %.3fs",
+                    rebuilt, skipped, deleted, stats["elapsed_seconds"])
+    return stats
+
+
+def rebuild_all(db, today: date = None) -> Dict[str, Any]:
+    """Refresh until no row is stale or missing."""
+    totals = {"rebuilt": 0, "skipped": 0, "deleted": 0, "runs": 0}
+    while True:
+        stats = refresh(db, today=today)
+        totals["runs"] += 1
+        for key in ("rebuilt", "skipped", "deleted"):
+            totals[key] += stats[key]
+        if stats["pending"] < refresh_batch_size() or not stats["rebuilt"]:
+            return totals
+
+
+def _diff(stored: Any, live: Any, path: str = '') -> List[str]:
+    """Paths at which two decoded bodies differ."""
+    if isinstance(stored, dict) and isinstance(live, dict):
+        paths = []
+        for key in sorted(set(stored) | set(live)):
+            paths += _diff(stored.get(key), live.get(key), f"{path}.{key}" if path else key)
+        return paths
+    if isinstance(stored, list) and isinstance(live, list) and len(stored) == len(live):
+        paths = []
+        for i, (a, b) in enumerate(zip(stored, live)):
+            paths += _diff(a, b, f"{path}[{i}]")
+        return paths
+    return [] if stored == live else [path or '.']
+
+
+def verify(db, client_ids: Iterable[int] = None, today: date = None) -> Dict[str, Any]:
+    """
+    Compare fresh rows with a live build of the same dashboards.
+
+    Rows refreshed after a write the checker has not seen yet can show up
+    as mismatches if writes are running; rerun to confirm.
+
+    Returns:
+        dict: Active clients, fresh rows, rows checked and mismatching paths
+    """
+    today = today or date.today()
+    wanted = set(int(c) for c in client_ids) if client_ids is not None else None
+    mismatches = []
+    with pin_primary(), db.cursor(commit=False) as cursor:
+        cursor.execute(_COUNTS_SQL, [today])
+        clients, fresh = cursor.fetchone()
+        cursor.execute(_FRESH_SQL, [today])
+        rows = [(row[0], row[1]) for row in cursor.fetchall()
+                if wanted is None or row[0] in wanted]
+
+        index = StatusIndex()
+        index.load(cursor)
+        for client_id, text in rows:
+            body = build_dashboard(cursor, client_id, index)
+            live = json.loads(serialize(body)) if body is not None else None
+            paths = _diff(json.loads(text), live)
+            if paths:
+                mismatches.append({"client_id": client_id, "fields": paths[:10]})
+
+    return {
+        "clients": clients,
+        "fresh_rows": fresh,
+        "checked": len(rows),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard read model maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('refresh', help='Rebuild one batch of stale or missing rows')
+    sub.add_parser('rebuild', help='Rebuild every stale or missing row')
+    verify_parser = sub.add_parser('verify', help='Compare fresh rows with a live build')
+    verify_parser.add_argument('--clients', type=int, nargs='*', help='Only these client ids')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+    db = get_db()
+
+    if args.command == 'refresh':
+        print(refresh(db))
+    elif args.command == 'rebuild':
+        print(rebuild_all(db))
+    else:
+        result = verify(db, args.clients)
+        mismatches = result.pop("mismatches")
+        print(result)
+        for mismatch in mismatches[:20]:
+            print("  MISMATCH", mismatch)
+        print("OK" if not mismatches else f"{len(mismatches)} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Stored expected fees.
+
+Payment writes store ``expected_fee`` when the client does not send one,
+computed from the contract in force for the payment's period
+(``services.contract_terms``) by the fee engine (``services.fees``), so
+reads and the summary triggers see the same value. Editing a payment's
+assets, period or client recomputes it unless the edit sets it, and
+stores NULL if the edited inputs no longer give a fee.
+
+``backfill`` fills in rows stored before that, in chunks of
+``--chunk`` active payments (default 1000) taken in payment_id order.
+Each chunk is one short transaction that reads its payments and their
+clients' contracts and updates the chunk with one statement, so locks
+are held briefly and an interrupted run loses at most one chunk; rerun
+it to continue. Rows that still have no fee (no assets for a percentage
+contract, no contract) are skipped, not retried.
+
+The summaries' ``expected_total`` picks the new fees up in either summary
+mode: the payment trigger refreshes each chunk's quarters as the chunk is
+updated (migrations/007_summary_updates_and_yoy_growth.sql), and in deferred
+mode the chunk queues them for the next maintenance run.
+
+Usage (from the api directory):
+    python -m services.expected_fee_backfill status
+    python -m services.expected_fee_backfill run [--chunk 1000] [--pause-ms 50]
+"""
+import argparse
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.contract_terms import fill_expected_fees
+from services.summary_maintenance import DEFERRED_SQL, QUARTER_SQL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# One VALUES row per payment with two parameters each
+MAX_CHUNK_SIZE = 1000
+
+# Writes to these columns change a payment's expected fee
+FEE_INPUTS = frozenset((
+    'client_id', 'total_assets', 'received_date',
+    'applied_period_type', 'applied_period', 'applied_year',
+))
+
+_INPUTS_SQL = """
+    -- name: expected_fee_backfill.inputs
+    SELECT payment_id, client_id, total_assets, received_date,
+           applied_period_type, applied_period, applied_year
+    FROM payments
+    WHERE payment_id IN ({ids})
+"""
+
+_UPDATE_SQL = """
+    -- name: expected_fee_backfill.update
+    UPDATE p
+    SET expected_fee = v.expected_fee
+    FROM payments p
+    JOIN (VALUES {rows}) AS v (payment_id, expected_fee) ON p.payment_id = v.payment_id
+    {where}
+"""
+
+_NEXT_CHUNK_SQL = """
+    -- name: expected_fee_backfill.next_chunk
+    SELECT TOP (?) payment_id
+    FROM payments
+    WHERE expected_fee IS NULL AND valid_to IS NULL AND payment_id > ?
+    ORDER BY payment_id
+"""
+
+_MISSING_SQL = """
+    SELECT COUNT(*) FROM payments WHERE expected_fee IS NULL AND valid_to IS NULL
+"""
+
+_ENQUEUE_SQL = f"""
+    INSERT INTO summary_dirty_keys (client_id, year, quarter)
+    SELECT DISTINCT client_id, applied_year, {QUARTER_SQL.format(p='')}
+    FROM payments
+    WHERE payment_id IN ({{ids}}) AND {DEFERRED_SQL}
+"""
+
+
+def _placeholders(count: int) -> str:
+    return ', '.join('?' * count)
+
+
+def recompute_expected_fees(cursor, payment_ids: Iterable[int], only_missing: bool = False) -> List[int]:
+    """
+    Compute and store expected fees for up to ``MAX_CHUNK_SIZE`` payments.
+
+    Payments whose inputs no longer give a fee are set to NULL. With
+    ``only_missing`` only rows without a fee are written, leaving any
+    stored by a write since they were selected alone.
+
+    Returns:
+        list: IDs of the payments given a fee
+    """
+    ids = [int(i) for i in payment_ids]
+    if not ids:
+        return []
+    if len(ids) > MAX_CHUNK_SIZE:
+        raise ValueError(f"At most {MAX_CHUNK_SIZE} payments per call; got {len(ids)}")
+
+    cursor.execute(_INPUTS_SQL.format(ids=_placeholders(len(ids))), ids)
+    columns = [column[0] for column in cursor.description]
+    payments = [dict(zip(columns, row), expected_fee=None) for row in cursor.fetchall()]
+    fill_expected_fees(cursor, payments)
+
+    updates = [(p['payment_id'], p['expected_fee']) for p in payments
+               if p['expected_fee'] is not None or not only_missing]
+    if updates:
+        cursor.execute(
+            _UPDATE_SQL.format(rows=', '.join(['(?, ?)'] * len(updates)),
+                               where='WHERE p.expected_fee IS NULL' if only_missing else ''),
+            [value for pair in updates for value in pair],
+        )
+    return [payment_id for payment_id, fee in updates if fee is not None]
+
+
+def missing_count(cursor) -> int:
+    """Active payments without a stored expected fee."""
+    cursor.execute(_MISSING_SQL)
+    return cursor.fetchone()[0]
+
+
+def _log_progress(stats: Dict[str, Any]) -> None:
+    logger.info("Expected fee backfill: chunk %d, %d scanned, %d filled, %d skipped, "
+                "%.0f rows/s, about %d left",
+                stats["chunks"], stats["scanned"], stats["filled"], stats["skipped"],
+                stats["rows_per_second"], stats["remaining"])
+
+
+def backfill(db, chunk_size: int = DEFAULT_CHUNK_SIZE, max_chunks: int = None, pause: float = 0.0,
+             progress: Optional[Callable[[Dict[str, Any]], None]] = _log_progress) -> Dict[str, Any]:
+    """
+    Fill in missing expected fees chunk by chunk, one transaction each.
+
+    Args:
+        db: Database from ``get_db()``
+        chunk_size: Payments per chunk (at most ``MAX_CHUNK_SIZE``)
+        max_chunks: Stop after this many chunks (default: until done)
+        pause: Seconds to sleep between chunks to leave room for other work
+        progress: Called with the running stats after each chunk
+
+    Returns:
+        dict: chunks, scanned, filled, skipped, remaining and elapsed_seconds
+    """
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+    start = time.perf_counter()
+    with db.cursor(commit=False) as cursor:
+        total = missing_count(cursor)
+    stats = {"chunks": 0, "scanned": 0, "filled": 0, "skipped": 0,
+             "total": total, "remaining": total, "rows_per_second": 0.0}
+    last_id = 0
+
+    while max_chunks is None or stats["chunks"] < max_chunks:
+        with db.cursor() as cursor:
+            cursor.execute(_NEXT_CHUNK_SQL, [chunk_size, last_id])
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            filled = recompute_expected_fees(cursor, ids, only_missing=True)
+            if filled:
+                cursor.execute(_ENQUEUE_SQL.format(ids=_placeholders(len(filled))), filled)
+
+        last_id = ids[-1]
+        elapsed = time.perf_counter() - start
+        stats["chunks"] += 1
+        stats["scanned"] += len(ids)
+        stats["filled"] += len(filled)
+        stats["skipped"] += len(ids) - len(filled)
+        stats["remaining"] = max(total - stats["scanned"], 0)
+        stats["rows_per_second"] = stats["scanned"] / elapsed if elapsed else 0.0
+        if progress:
+            progress(dict(stats))
+        if len(ids) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stored expected fee maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='Count active payments without an expected fee')
+    run = sub.add_parser('run', help='Fill in missing expected fees')
+    run.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE,
+                     help=f'Payments per transaction (max {MAX_CHUNK_SIZE})')
+    run.add_argument('--max-chunks', type=int, help='Stop after this many chunks')
+    run.add_argument('--pause-ms', type=int, default=0, help='Sleep between chunks')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+    db = get_db()
+
+    if args.command == 'status':
+        with db.cursor(commit=False) as cursor:
+            print({"missing": missing_count(cursor)})
+        return
+
+    print(backfill(db, args.chunk, args.max_chunks, args.pause_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Fee engine.
+
+The one definition of expected fees and fee variance. The payment
+endpoints, the dashboard's payment status and the variance endpoint use
+it, and the client_payment_status view computes the same expected fee
+(tests/backend_tests/test_fees.py pins the two together, against SQL
+Server when one is available).
+
+Expected fee:
+    - 'flat' contracts: flat_rate
+    - 'percentage' contracts: assets * percent_rate rounded to cents, half
+      away from zero as T-SQL ROUND does. percent_rate is a fraction, so
+      0.0025 is 0.25%.
+    - None for any other fee type or when an input is missing.
+
+Variance of an actual fee against the expected one: the difference, the
+difference as a percent of expected, and a status: 'exact' within a
+cent, 'acceptable' within 5%, 'warning' within 15%, 'alert' beyond, and
+'unknown' without a non-zero expected fee or an actual fee.
+
+``expected_fee`` and ``variance`` handle one row. ``expected_fees`` and
+``variances`` take columns for whole histories as NumPy arrays, with NaN
+for missing values, and give identical results element for element.
+tests/benchmarks/bench_fees.py measures both paths.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FLAT = 'flat'
+PERCENTAGE = 'percentage'
+
+# Fee type codes used by the array path
+UNKNOWN_CODE, FLAT_CODE, PERCENTAGE_CODE = 0, 1, 2
+
+EXACT_TOLERANCE = 0.01
+ACCEPTABLE_PERCENT = 5.0
+WARNING_PERCENT = 15.0
+
+# Variance status per code returned by variances()
+VARIANCE_STATUSES = ('unknown', 'exact', 'acceptable', 'warning', 'alert')
+_STATUS_LABELS = np.array(VARIANCE_STATUSES, dtype=object)
+
+
+def round_cents(value: float) -> float:
+    """Round to cents, half away from zero like T-SQL ROUND(value, 2)."""
+    sign = -1.0 if value < 0 else 1.0
+    return sign * math.floor(abs(value) * 100 + 0.5) / 100
+
+
+def round_cents_array(values: np.ndarray) -> np.ndarray:
+    """``round_cents`` over an array."""
+    return np.sign(values) * np.floor(np.abs(values) * 100 + 0.5) / 100
+
+
+def expected_fee(fee_type: Optional[str], flat_rate: Optional[float], percent_rate: Optional[float],
+                 assets: Optional[float]) -> Optional[float]:
+    """Expected fee for one payment or contract."""
+    if fee_type == FLAT:
+        return flat_rate
+    if fee_type == PERCENTAGE and assets is not None and percent_rate is not None:
+        return round_cents(assets * percent_rate)
+    return None
+
+
+def variance(actual: Optional[float], expected: Optional[float]) -> Dict[str, Any]:
+    """Difference, percent difference, status and a display message for one fee."""
+    if actual is None or not expected:
+        return {"status": "unknown", "message": "N/A", "difference": None, "percent_difference": None}
+
+    difference = actual - expected
+    percent_diff = difference / expected * 100
+    if abs(difference) < EXACT_TOLERANCE:
+        return {"status": "exact", "message": "Exact Match",
+                "difference": difference, "percent_difference": percent_diff}
+    if abs(percent_diff) <= ACCEPTABLE_PERCENT:
+        status = "acceptable"
+    elif abs(percent_diff) <= WARNING_PERCENT:
+        status = "warning"
+    else:
+        status = "alert"
+    return {"status": status, "message": f"${difference:,.2f} ({percent_diff:.1f}%)",
+            "difference": difference, "percent_difference": percent_diff}
+
+
+def fee_type_codes(fee_types: Sequence[Optional[str]]) -> np.ndarray:
+    """Fee type names as codes (``FLAT_CODE``, ``PERCENTAGE_CODE``, else ``UNKNOWN_CODE``)."""
+    names = np.asarray(fee_types, dtype=object)
+    codes = np.full(names.shape, UNKNOWN_CODE, dtype=np.int8)
+    codes[names == FLAT] = FLAT_CODE
+    codes[names == PERCENTAGE] = PERCENTAGE_CODE
+    return codes
+
+
+def as_floats(values: Sequence[Optional[float]]) -> np.ndarray:
+    """A column as float64, with None as NaN."""
+    return np.asarray(values, dtype=np.float64)
+
+
+def to_optional(values: np.ndarray) -> List[Optional[float]]:
+    """Array values as floats, with NaN as None (for JSON and DB parameters)."""
+    return [None if v != v else v for v in values.tolist()]
+
+
+def expected_fees(fee_types: Sequence[Any], flat_rates: Sequence[Optional[float]],
+                  percent_rates: Sequence[Optional[float]], assets: Sequence[Optional[float]]) -> np.ndarray:
+    """
+    ``expected_fee`` over columns; NaN where it would be None.
+
+    ``fee_types`` may be names or codes from ``fee_type_codes``.
+    """
+    codes = np.asarray(fee_types)
+    if codes.dtype.kind not in 'iu':
+        codes = fee_type_codes(fee_types)
+    flat = as_floats(flat_rates)
+    percent = round_cents_array(as_floats(assets) * as_floats(percent_rates))
+    return np.where(codes == FLAT_CODE, flat, np.where(codes == PERCENTAGE_CODE, percent, np.nan))
+
+
+def variances(actual: Sequence[Optional[float]],
+              expected: Sequence[Optional[float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ``variance`` over columns.
+
+    Returns:
+        tuple: (difference, percent_difference, status code) arrays; NaN
+               differences where the status is unknown. Index
+               ``VARIANCE_STATUSES`` (or use ``variance_labels``) for names.
+    """
+    actual = as_floats(actual)
+    expected = as_floats(expected)
+    unknown = np.isnan(actual) | np.isnan(expected) | (expected == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difference = np.where(unknown, np.nan, actual - expected)
+        percent = np.where(unknown, np.nan, difference / expected * 100)
+    magnitude = np.abs(percent)
+    codes = np.select(
+        [unknown, np.abs(difference) < EXACT_TOLERANCE,
+         magnitude <= ACCEPTABLE_PERCENT, magnitude <= WARNING_PERCENT],
+        [0, 1, 2, 3], default=4,
+    ).astype(np.int8)
+    return difference, percent, codes
+
+
+def variance_labels(codes: np.ndarray) -> np.ndarray:
+    """Status names for codes from ``variances``."""
+    return _STATUS_LABELS[codes]
@@ -0,0 +1,422 @@
+"""
+Provider statement ingestion.
+
+Streams a provider remittance export (CSV or XLSX) row by row, maps each row
+to ``PaymentCreate`` using a per-provider column mapping, resolves the
+contract/client through an in-memory index built once per run, and writes
+valid rows in batches through the bulk payment insert.
+
+Usage (from the api directory):
+    python -m services.ingestion statement.csv --provider "John Hancock" --dry-run
+    python -m services.ingestion statement.xlsx --provider Voya --mapping voya.json
+"""
+import argparse
+import csv
+import json
+import logging
+import re
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+
+from database.models import PaymentCreate
+from services.bulk_payments import (
+    PaymentBatchError, format_validation_error, insert_payment_batch
+)
+from services.payment_status import collection_period
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ProviderMapping(BaseModel):
+    """Maps a provider's export columns onto payment fields."""
+    provider_name: str = Field(..., description="Matches contracts.provider_name")
+    contract_number_column: Optional[str] = Field(None, description="Column holding the contract/plan number")
+    plan_name_column: Optional[str] = Field(None, description="Column holding the plan name (matched to client names)")
+    received_date_column: str = Field(..., description="Column holding the deposit/received date")
+    actual_fee_column: str = Field(..., description="Column holding the fee amount received")
+    total_assets_column: Optional[str] = Field(None, description="Column holding plan assets")
+    method_column: Optional[str] = Field(None, description="Column holding the payment method")
+    default_method: Optional[str] = Field(None, max_length=50, description="Method used when the row has none")
+    period_column: Optional[str] = Field(None, description="Column naming the period paid (e.g. 'Q1 2024', '2024-03')")
+    date_formats: List[str] = Field(default_factory=lambda: ['%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y'])
+
+
+# Built-in mappings for the providers we receive statements from.
+# Override with --mapping when a provider changes its export layout.
+PROVIDER_MAPPINGS: Dict[str, ProviderMapping] = {
+    mapping.provider_name.lower(): mapping
+    for mapping in (
+        ProviderMapping(
+            provider_name='John Hancock',
+            contract_number_column='Contract Number',
+            plan_name_column='Plan Name',
+            received_date_column='Deposit Date',
+            actual_fee_column='Advisor Fee',
+            total_assets_column='Plan Assets',
+            default_method='Auto - ACH'
+        ),
+        ProviderMapping(
+            provider_name='Voya',
+            contract_number_column='Plan Number',
+            plan_name_column='Plan Name',
+            received_date_column='Payment Date',
+            actual_fee_column='Fee Amount',
+            total_assets_column='Market Value',
+            period_column='Period',
+            default_method='Auto - ACH'
+        ),
+        ProviderMapping(
+            provider_name='Empower',
+            contract_number_column='Plan ID',
+            plan_name_column='Plan Name',
+            received_date_column='Check Date',
+            actual_fee_column='Amount',
+            total_assets_column='Plan Balance',
+            default_method='Auto - Check'
+        ),
+        ProviderMapping(
+            provider_name='Principal',
+            contract_number_column='Contract No',
+            plan_name_column='Plan Name',
+            received_date_column='Paid Date',
+            actual_fee_column='Compensation',
+            total_assets_column='Assets',
+            default_method='Auto - ACH'
+        ),
+        ProviderMapping(
+            provider_name='Ascensus',
+            contract_number_column='Plan Number',
+            plan_name_column='Plan Name',
+            received_date_column='Date',
+            actual_fee_column='Fee',
+            total_assets_column='Plan Assets',
+            default_method='Auto - ACH'
+        ),
+    )
+}
+
+
+class IngestionReport(BaseModel):
+    """Outcome and throughput of one ingestion run."""
+    source: str
+    provider_name: str
+    dry_run: bool
+    rows_read: int = 0
+    rows_valid: int = 0
+    rows_written: int = 0
+    batches_written: int = 0
+    errors: List[Dict[str, Any]] = Field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        mode = "dry run" if self.dry_run else "written"
+        return (
+            f"{self.source} ({self.provider_name}, {mode}): "
+            f"{self.rows_read} read, {self.rows_valid} valid, {self.rows_written} written "
+            f"in {self.batches_written} batches, {len(self.errors)} errors, "
+            f"{self.elapsed_seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+class RowError(Exception):
+    """Raised when a source row cannot be mapped to a payment."""
+    pass
+
+
+def _normalize(value: Optional[str]) -> str:
+    """Case/whitespace-insensitive key for names and contract numbers."""
+    return re.sub(r'\s+', ' ', str(value or '')).strip().lower()
+
+
+class ContractIndex:
+    """
+    In-memory lookup of active contracts for one provider.
+
+    Built with a single query per run so resolving each row is a dict lookup
+    rather than a database round trip.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.contract_count = len(rows)
+        self.by_number: Dict[str, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            if row.get('contract_number'):
+                self.by_number[_normalize(row['contract_number'])] = row
+            for name in (row.get('display_name'), row.get('full_name')):
+                if name:
+                    self.by_name.setdefault(_normalize(name), row)
+
+    @classmethod
+    def load(cls, cursor, provider_name: str) -> 'ContractIndex':
+        """Load every active contract for ``provider_name``."""
+        cursor.execute("""
+            SELECT co.contract_id, co.client_id, co.contract_number,
+                   co.payment_schedule, c.display_name, c.full_name
+            FROM contracts co
+            JOIN clients c ON co.client_id = c.client_id AND c.valid_to IS NULL
+            WHERE co.valid_to IS NULL AND co.provider_name = ?
+        """, [provider_name])
+        columns = [column[0] for column in cursor.description]
+        return cls([dict(zip(columns, row)) for row in cursor.fetchall()])
+
+    def resolve(self, contract_number: Optional[str], plan_name: Optional[str]) -> Dict[str, Any]:
+        """Find the contract by number first, then by plan/client name."""
+        if contract_number and _normalize(contract_number) in self.by_number:
+            return self.by_number[_normalize(contract_number)]
+        if plan_name and _normalize(plan_name) in self.by_name:
+            return self.by_name[_normalize(plan_name)]
+        raise RowError(
+            f"No active contract matches number '{contract_number or ''}' "
+            f"or plan '{plan_name or ''}'"
+        )
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """Parse '$1,234.50' / '(12.00)' / 1234.5 into a float."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    negative = text.startswith('(') and text.endswith(')')
+    text = re.sub(r'[$,()\s]', '', text)
+    try:
+        amount = float(text)
+    except ValueError:
+        raise RowError(f"Invalid amount '{value}'")
+    return -amount if negative else amount
+
+
+def parse_date(value: Any, formats: List[str]) -> date:
+    """Parse a spreadsheet cell or string into a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or '').strip()
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"Invalid date '{value}'")
+
+
+def parse_period(value: Any, schedule: str) -> Tuple[int, int]:
+    """
+    Parse a period label into (period, year).
+
+    Accepts 'Q1 2024', '2024 Q1', '2024-Q1' for quarterly and '2024-03',
+    '03/2024', 'March 2024' for monthly schedules.
+    """
+    text = str(value or '').strip()
+    if schedule == 'quarterly':
+        match = (re.match(r'^Q([1-4])\D*(\d{4})$', text, re.I)
+                 or re.match(r'^(\d{4})\D*Q([1-4])$', text, re.I))
+        if match:
+            a, b = match.groups()
+            return (int(a), int(b)) if len(a) == 1 else (int(b), int(a))
+    else:
+        match = re.match(r'^(\d{4})-(\d{1,2})$', text) or re.match(r'^(\d{1,2})/(\d{4})$', text)
+        if match:
+            a, b = match.groups()
+            period, year = (int(b), int(a)) if len(a) == 4 else (int(a), int(b))
+            if 1 <= period <= 12:
+                return period, year
+        try:
+            parsed = datetime.strptime(text, '%B %Y')
+            return parsed.month, parsed.year
+        except ValueError:
+            pass
+    raise RowError(f"Invalid {schedule} period '{value}'")
+
+
+def iter_rows(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Stream (line_number, row) pairs from a CSV or XLSX file.
+
+    Rows are read lazily so large exports never sit in memory at once.
+    """
+    suffix = path.suffix.lower()
+    if suffix in ('.xlsx', '.xlsm'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("openpyxl is required to ingest Excel files: pip install openpyxl")
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+            for line_number, values in enumerate(rows, start=2):
+                if any(value not in (None, '') for value in values):
+                    yield line_number, dict(zip(header, values))
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+            for line_number, row in enumerate(reader, start=2):
+                if any((value or '').strip() for value in row.values() if isinstance(value, str)):
+                    yield line_number, row
+
+
+def map_row(row: Dict[str, Any], mapping: ProviderMapping, index: ContractIndex) -> PaymentCreate:
+    """
+    Convert one source row into a validated PaymentCreate.
+
+    Raises:
+        RowError: If the row cannot be mapped or resolved
+        ValidationError: If the mapped payment fails model validation
+    """
+    def column(name: Optional[str]) -> Any:
+        return row.get(name) if name else None
+
+    contract = index.resolve(
+        column(mapping.contract_number_column), column(mapping.plan_name_column)
+    )
+    schedule = (contract.get('payment_schedule') or 'quarterly').lower()
+
+    received = parse_date(column(mapping.received_date_column), mapping.date_formats)
+    if mapping.period_column and column(mapping.period_column):
+        period, year = parse_period(column(mapping.period_column), schedule)
+    else:
+        period, year = collection_period(received, schedule)
+
+    return PaymentCreate(
+        contract_id=contract['contract_id'],
+        client_id=contract['client_id'],
+        received_date=received.isoformat(),
+        total_assets=parse_amount(column(mapping.total_assets_column)),
+        actual_fee=parse_amount(column(mapping.actual_fee_column)),
+        method=column(mapping.method_column) or mapping.default_method,
+        applied_period_type=schedule,
+        applied_period=period,
+        applied_year=year
+    )
+
+
+def ingest_file(db, path: Path, mapping: ProviderMapping, dry_run: bool = False,
+                batch_size: int = DEFAULT_BATCH_SIZE) -> IngestionReport:
+    """
+    Ingest one provider statement.
+
+    Invalid rows are reported and skipped; valid rows are written in
+    batches of ``batch_size``, each in its own transaction. In dry-run mode
+    rows are mapped, resolved and validated but nothing is written.
+
+    Args:
+        db: Database instance
+        path: CSV or XLSX file
+        mapping: Column mapping for the provider
+        dry_run: Validate only
+        batch_size: Rows per write transaction
+
+    Returns:
+        IngestionReport: Counts, per-row errors and throughput
+    """
+    report = IngestionReport(source=path.name, provider_name=mapping.provider_name, dry_run=dry_run)
+    start = time.perf_counter()
+
+    with db.cursor(commit=False) as cursor:
+        index = ContractIndex.load(cursor, mapping.provider_name)
+    logger.info("Loaded %d contracts for %s", index.contract_count, mapping.provider_name)
+
+    batch: List[PaymentCreate] = []
+    batch_lines: List[int] = []
+
+    def flush():
+        if batch and not dry_run:
+            try:
+                with db.cursor() as write_cursor:
+                    report.rows_written += len(insert_payment_batch(write_cursor, batch))
+                report.batches_written += 1
+            except PaymentBatchError as e:
+                # The batch was rolled back; report its failing rows by source line
+                for row_error in e.row_errors:
+                    report.errors.append({
+                        "line": batch_lines[row_error["index"]],
+                        "errors": row_error["errors"]
+                    })
+        batch.clear()
+        batch_lines.clear()
+
+    for line_number, row in iter_rows(path):
+        report.rows_read += 1
+        try:
+            batch.append(map_row(row, mapping, index))
+            batch_lines.append(line_number)
+            report.rows_valid += 1
+        except RowError as e:
+            report.errors.append({"line": line_number, "errors": [{"field": None, "message": str(e)}]})
+            continue
+        except ValidationError as e:
+            report.errors.append({"line": line_number, "errors": format_validation_error(e)})
+            continue
+
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+
+    report.elapsed_seconds = time.perf_counter() - start
+    logger.info(report.summary())
+    return report
+
+
+def load_mapping(provider: str, mapping_path: Optional[str] = None) -> ProviderMapping:
+    """Return the mapping from a JSON file, or the built-in one for ``provider``."""
+    if mapping_path:
+        with open(mapping_path, encoding='utf-8') as f:
+            data = json.load(f)
+        data.setdefault('provider_name', provider)
+        return ProviderMapping(**data)
+
+    mapping = PROVIDER_MAPPINGS.get(provider.lower())
+    if mapping is None:
+        raise ValueError(
+            f"No built-in mapping for provider '{provider}'. "
+            f"Known: {', '.join(m.provider_name for m in PROVIDER_MAPPINGS.values())}"
+        )
+    return mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a provider remittance statement")
+    parser.add_argument('path', type=Path, help='CSV or XLSX export')
+    parser.add_argument('--provider', required=True, help='Provider name as in contracts.provider_name')
+    parser.add_argument('--mapping', help='JSON file overriding the built-in column mapping')
+    parser.add_argument('--dry-run', action='store_true', help='Validate without writing')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--errors', type=int, default=20, help='Max row errors to print')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+
+    report = ingest_file(
+        get_db(), args.path, load_mapping(args.provider, args.mapping),
+        dry_run=args.dry_run, batch_size=args.batch_size
+    )
+
+    print(report.summary())
+    for error in report.errors[:args.errors]:
+        messages = '; '.join(e['message'] for e in error['errors'])
+        print(f"  line {error['line']}: {messages}")
+
+
+if __name__ == "__main__":
+    main()
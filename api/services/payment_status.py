@@ -0,0 +1,344 @@
+"""
+Client payment status computed in Python.
+
+Mirrors the client_payment_status view without re-running it per request:
+the current collection period is worked out once per process per day, and
+each client's latest payment (by received_date, as the view's ROW_NUMBER
+picks it) is kept in a compact in-memory index. Lookups never scan
+payments: a client's entry is read with one index seek when it is first
+looked up, and again once it is older than INDEX_TTL_SECONDS or a committed
+payment write marks it stale. The index is per process, so other workers
+only see a write when their entry expires: the TTL bounds how stale a
+status can be across workers.
+
+Usage (from the api directory):
+    python -m services.payment_status verify
+"""
+import logging
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from services.fees import expected_fee
+from utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on cross-worker staleness; a reload is one client's index seek
+INDEX_TTL_SECONDS = 30
+
+
+def collection_period(day: date, schedule: Optional[str]) -> Tuple[int, int]:
+    """
+    (period, year) being collected on ``day``.
+
+    Payments are collected in arrears, so this is the period before the one
+    ``day`` falls in. Anything other than 'monthly' is treated as quarterly.
+    """
+    if schedule == 'monthly':
+        if day.month == 1:
+            return 12, day.year - 1
+        return day.month - 1, day.year
+    quarter = (day.month - 1) // 3 + 1
+    if quarter == 1:
+        return 4, day.year - 1
+    return quarter - 1, day.year
+
+
+def period_ordinal(period: Optional[int], year: Optional[int], period_type: Optional[str]) -> Optional[int]:
+    """
+    ``payments.period_ordinal`` for an applied period: the month index
+    (year * 12 + month - 1) of the last month the period covers.
+
+    Anything other than 'monthly' is treated as quarterly, so Q1 2024 and
+    March 2024 share an ordinal. None when the period or year is missing.
+    """
+    if period is None or year is None:
+        return None
+    return year * 12 + (period if period_type == 'monthly' else period * 3) - 1
+
+
+def ordinal_period(ordinal: int, period_type: Optional[str]) -> Tuple[int, int]:
+    """(period, year) of the given type containing the month ``ordinal`` ends in."""
+    year, month_index = divmod(ordinal, 12)
+    if period_type == 'monthly':
+        return month_index + 1, year
+    return month_index // 3 + 1, year
+
+
+class PeriodClock:
+    """Current collection periods, recomputed only when the date changes."""
+
+    def __init__(self, today=date.today):
+        self._today = today
+        self._day: Optional[date] = None
+        self._periods: Dict[str, Tuple[int, int]] = {}
+
+    def current_period(self, schedule: Optional[str]) -> Tuple[Optional[int], int]:
+        """
+        (period, year) being collected today for a payment schedule.
+
+        Unknown schedules get (None, this year), as the view's CASE has no
+        branch for them.
+        """
+        day = self._today()
+        if day != self._day:
+            self._periods = {s: collection_period(day, s) for s in ('monthly', 'quarterly')}
+            self._day = day
+        return self._periods.get(schedule, (None, day.year))
+
+
+class LatestPayment(NamedTuple):
+    """A client's most recently received active payment."""
+    received_date: Optional[str]
+    payment_id: int
+    applied_period: Optional[int]
+    applied_year: Optional[int]
+    applied_period_type: Optional[str]
+
+
+def payment_status(latest: Optional[LatestPayment], current: Tuple[Optional[int], Optional[int]],
+                   schedule: Optional[str] = None) -> str:
+    """
+    'Paid' or 'Due', with the view's semantics.
+
+    The latest payment is Due when its period ordinal is before that of
+    the period being collected on the contract's ``schedule``. Without
+    both ordinals (no applied period, or an unknown schedule) only the
+    years are compared, as the view does.
+    """
+    current_period, current_year = current
+    if latest is None or latest.applied_year is None:
+        return 'Due'
+    latest_ordinal = period_ordinal(latest.applied_period, latest.applied_year, latest.applied_period_type)
+    current_ordinal = period_ordinal(current_period, current_year, schedule)
+    if latest_ordinal is None or current_ordinal is None:
+        return 'Due' if latest.applied_year < current_year else 'Paid'
+    return 'Due' if latest_ordinal < current_ordinal else 'Paid'
+
+
+_LATEST_ALL_SQL = """
+    -- name: payment_status.latest_all
+    SELECT client_id, received_date, payment_id, applied_period, applied_year, applied_period_type
+    FROM (
+        SELECT client_id, received_date, payment_id, applied_period, applied_year, applied_period_type,
+               ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY received_date DESC, payment_id DESC) AS rn
+        FROM payments WHERE valid_to IS NULL
+    ) AS numbered
+    WHERE rn = 1
+"""
+
+_LATEST_CLIENT_SQL = """
+    -- name: payment_status.latest_client
+    SELECT TOP 1 received_date, payment_id, applied_period, applied_year, applied_period_type
+    FROM payments
+    WHERE client_id = ? AND valid_to IS NULL
+    ORDER BY received_date DESC, payment_id DESC
+"""
+
+
+class StatusIndex:
+    """
+    Latest active payment per client.
+
+    Entries are read per client on demand (``latest``) or for every client
+    at once (``load``, for callers about to look up most of them). Ties on
+    received_date break on the highest payment_id; the view leaves them to
+    ROW_NUMBER's arbitrary order.
+    """
+
+    def __init__(self, ttl: float = INDEX_TTL_SECONDS, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._latest: Dict[int, Optional[LatestPayment]] = {}
+        self._read_at: Dict[int, float] = {}
+        self._stale: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def load(self, cursor) -> None:
+        """Read every client's latest payment in one query."""
+        with self._lock:
+            # Clients marked stale while the query runs stay stale
+            pending = set(self._stale)
+        started = self._clock()
+        cursor.execute(_LATEST_ALL_SQL)
+        latest = {row[0]: LatestPayment(*row[1:]) for row in cursor.fetchall()}
+        with self._lock:
+            self._latest = latest
+            self._read_at = dict.fromkeys(latest, started)
+            self._stale -= pending
+        logger.info("Loaded payment status index for %d clients", len(latest))
+
+    def mark_stale(self, client_ids: Iterable[int]) -> None:
+        """Note that these clients' payments changed; they reload on next lookup."""
+        with self._lock:
+            self._stale.update(int(c) for c in client_ids)
+
+    def _fresh(self, client_id: int) -> bool:
+        read_at = self._read_at.get(client_id)
+        return (read_at is not None and client_id not in self._stale
+                and self._clock() - read_at <= self.ttl)
+
+    def latest(self, cursor, client_id: int) -> Optional[LatestPayment]:
+        """Latest active payment for a client, re-reading it if missing, expired or stale."""
+        with self._lock:
+            fresh = self._fresh(client_id)
+            if fresh:
+                latest = self._latest.get(client_id)
+            else:
+                # A write marking it stale during the read below keeps it stale
+                self._stale.discard(client_id)
+        record_cache_lookup('payment_status_index', fresh)
+        if fresh:
+            return latest
+
+        started = self._clock()
+        cursor.execute(_LATEST_CLIENT_SQL, [client_id])
+        row = cursor.fetchone()
+        latest = LatestPayment(*row) if row else None
+        with self._lock:
+            self._latest[client_id] = latest
+            self._read_at[client_id] = started
+        return latest
+
+
+period_clock = PeriodClock()
+status_index = StatusIndex()
+
+
+def note_payment_write(*client_ids: Optional[int]) -> None:
+    """
+    Call once payment inserts, edits or deletes for these clients have committed.
+
+    Marking them stale earlier lets a concurrent lookup reload the
+    pre-commit row and keep it until the index expires. None IDs are ignored.
+    """
+    status_index.mark_stale(c for c in client_ids if c is not None)
+
+
+def payment_client_id(cursor, payment_id: int) -> Optional[int]:
+    """
+    Client owning a payment, to pass to note_payment_write after commit.
+
+    Edits look it up before and after the UPDATE so a payment moved to
+    another client refreshes both.
+    """
+    cursor.execute("SELECT client_id FROM payments WHERE payment_id = ?", [payment_id])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def client_status(cursor, client: Dict[str, Any], index: StatusIndex = None,
+                  clock: PeriodClock = None) -> Dict[str, Any]:
+    """
+    A client_payment_status row for one client.
+
+    ``client`` needs client_id, display_name and the contract/metrics
+    columns the view selects (payment_schedule, fee_type, flat_rate,
+    percent_rate, last_payment_date, last_payment_amount, last_recorded_assets).
+    """
+    index = index or status_index
+    clock = clock or period_clock
+    latest = index.latest(cursor, client['client_id'])
+    current_period, current_year = clock.current_period(client['payment_schedule'])
+    return {
+        'client_id': client['client_id'],
+        'display_name': client['display_name'],
+        'payment_schedule': client['payment_schedule'],
+        'fee_type': client['fee_type'],
+        'flat_rate': client['flat_rate'],
+        'percent_rate': client['percent_rate'],
+        'last_payment_date': client['last_payment_date'],
+        'last_payment_amount': client['last_payment_amount'],
+        'applied_period': latest.applied_period if latest else None,
+        'applied_year': latest.applied_year if latest else None,
+        'applied_period_type': latest.applied_period_type if latest else None,
+        'current_period': current_period,
+        'current_year': current_year,
+        'last_recorded_assets': client['last_recorded_assets'],
+        'expected_fee': expected_fee(client['fee_type'], client['flat_rate'],
+                                     client['percent_rate'], client['last_recorded_assets']),
+        'payment_status': payment_status(latest, (current_period, current_year),
+                                         client['payment_schedule']),
+    }
+
+
+_VIEW_SQL = """
+    SELECT client_id, display_name, payment_schedule, fee_type, flat_rate, percent_rate,
+           last_payment_date, last_payment_amount, applied_period, applied_year,
+           applied_period_type, current_period, current_year, last_recorded_assets,
+           expected_fee, payment_status
+    FROM client_payment_status
+"""
+
+_CLIENTS_SQL = """
+    SELECT c.client_id, c.display_name, ct.payment_schedule, ct.fee_type, ct.flat_rate,
+           ct.percent_rate, cm.last_payment_date, cm.last_payment_amount, cm.last_recorded_assets
+    FROM clients c
+    JOIN contracts ct ON c.client_id = ct.client_id AND ct.valid_to IS NULL
+    LEFT JOIN client_metrics cm ON c.client_id = cm.client_id
+    WHERE c.valid_to IS NULL
+"""
+
+
+def verify(db) -> Dict[str, Any]:
+    """
+    Compare client_status against the view for every client, with timings.
+
+    Clients whose latest payments tie on received_date may differ, since
+    the view's choice between them is arbitrary.
+    """
+    with db.cursor(commit=False) as cursor:
+        start = time.perf_counter()
+        cursor.execute(_VIEW_SQL)
+        columns = [c[0] for c in cursor.description]
+        view_rows = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+        view_ms = (time.perf_counter() - start) * 1000
+
+        cursor.execute(_CLIENTS_SQL)
+        columns = [c[0] for c in cursor.description]
+        clients = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        index = StatusIndex()
+        start = time.perf_counter()
+        index.load(cursor)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        computed = {c['client_id']: client_status(cursor, c, index) for c in clients}
+        compute_ms = (time.perf_counter() - start) * 1000
+
+    fields = ('current_period', 'current_year', 'applied_period', 'applied_year', 'payment_status')
+    mismatches = []
+    for client_id, expected in view_rows.items():
+        actual = computed.get(client_id)
+        diff = [f for f in fields if actual is None or actual[f] != expected[f]]
+        if actual is not None and expected['expected_fee'] is not None and actual['expected_fee'] is not None:
+            if abs(actual['expected_fee'] - expected['expected_fee']) > 0.005:
+                diff.append('expected_fee')
+        if diff:
+            mismatches.append({"client_id": client_id, "fields": diff})
+
+    return {
+        "clients": len(view_rows),
+        "view_ms": round(view_ms, 2),
+        "index_load_ms": round(load_ms, 2),
+        "compute_ms": round(compute_ms, 2),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    from database.database import get_db
+    result = verify(get_db())
+    mismatches = result.pop("mismatches")
+    print(result)
+    for mismatch in mismatches[:20]:
+        print("  MISMATCH", mismatch)
+    print("OK" if not mismatches else f"{len(mismatches)} mismatches (received_date ties are expected)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Portfolio-wide payment status.
+
+One set-based query over client_payment_status and the summary tables
+returns every active client's status, expected fee, last payment, YTD and
+collection-quarter totals. Rows are fetched and serialized in chunks so
+thousands of clients never sit in memory as dicts at once; provider totals
+are accumulated on the same pass.
+"""
+import json
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+FETCH_CHUNK_SIZE = 500
+
+PAYMENT_STATUSES = ('Paid', 'Due')
+
+PORTFOLIO_SQL = """
+    -- name: portfolio.status
+    SELECT s.client_id, s.display_name, co.provider_name, s.payment_schedule, s.fee_type,
+           s.current_period, s.current_year, s.payment_status, s.expected_fee,
+           s.last_payment_date, s.last_payment_amount, s.last_recorded_assets,
+           y.total_payments AS ytd_payments,
+           q.total_payments AS quarter_payments
+    FROM client_payment_status s
+    JOIN contracts co ON co.client_id = s.client_id AND co.valid_to IS NULL
+    LEFT JOIN yearly_summaries y ON y.client_id = s.client_id AND y.year = ?
+    LEFT JOIN quarterly_summaries q ON q.client_id = s.client_id
+        AND q.year = CASE WHEN s.payment_schedule = 'monthly' THEN ? ELSE ? END
+        AND q.quarter = CASE WHEN s.payment_schedule = 'monthly' THEN ? ELSE ? END
+    {where}
+    ORDER BY s.display_name
+"""
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+def collection_quarters(today: date):
+    """
+    (year, quarter) being collected for monthly and quarterly clients.
+
+    Payments are in arrears: monthly clients are collecting last month,
+    quarterly clients last quarter.
+    """
+    if today.month == 1:
+        monthly = (today.year - 1, 4)
+    else:
+        monthly = (today.year, (today.month - 2) // 3 + 1)
+    quarter = (today.month - 1) // 3 + 1
+    quarterly = (today.year - 1, 4) if quarter == 1 else (today.year, quarter - 1)
+    return monthly, quarterly
+
+
+def portfolio_query(today: date, status: Optional[str] = None):
+    """SQL and parameters for the portfolio query."""
+    monthly, quarterly = collection_quarters(today)
+    params: List[Any] = [today.year, monthly[0], quarterly[0], monthly[1], quarterly[1]]
+    where = ""
+    if status:
+        where = "WHERE s.payment_status = ?"
+        params.append(status)
+    return PORTFOLIO_SQL.format(where=where), params
+
+
+def period_name(period_type: Optional[str], period: Optional[int], year: Optional[int]) -> Optional[str]:
+    if period is None or year is None:
+        return None
+    if period_type == 'monthly':
+        return f"{MONTH_NAMES[period - 1]} {year}"
+    return f"Q{period} {year}"
+
+
+class PortfolioTotals:
+    """Running totals, overall and by provider."""
+
+    def __init__(self):
+        self.overall = self._empty()
+        self.by_provider: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"clients": 0, "due": 0, "paid": 0, "expected_fees": 0.0,
+                "ytd_payments": 0.0, "quarter_payments": 0.0}
+
+    def add(self, row: Dict[str, Any]) -> None:
+        provider = row["provider_name"] or "Unknown"
+        for totals in (self.overall, self.by_provider.setdefault(provider, self._empty())):
+            totals["clients"] += 1
+            totals["due" if row["payment_status"] == 'Due' else "paid"] += 1
+            totals["expected_fees"] += float(row["expected_fee"] or 0)
+            totals["ytd_payments"] += float(row["ytd_payments"] or 0)
+            totals["quarter_payments"] += float(row["quarter_payments"] or 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.overall.items()},
+            "by_provider": {
+                name: {k: round(v, 2) if isinstance(v, float) else v for k, v in totals.items()}
+                for name, totals in sorted(self.by_provider.items())
+            },
+        }
+
+
+def iter_portfolio_json(cursor, today: Optional[date] = None, status: Optional[str] = None,
+                        chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Run the portfolio query and yield the JSON response body in pieces.
+
+    Shape: {"as_of": ..., "clients": [...], "totals": {..., "by_provider": {...}}}
+    """
+    today = today or date.today()
+    sql, params = portfolio_query(today, status)
+    cursor.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    totals = PortfolioTotals()
+
+    yield f'{{"as_of": "{today.isoformat()}", "clients": ['
+    first = True
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        pieces = []
+        for values in rows:
+            row = dict(zip(columns, values))
+            row["current_period_name"] = period_name(
+                row["payment_schedule"], row["current_period"], row["current_year"])
+            totals.add(row)
+            pieces.append(json.dumps(row, default=str))
+        yield ("" if first else ", ") + ", ".join(pieces)
+        first = False
+    yield f'], "totals": {json.dumps(totals.to_dict())}}}'
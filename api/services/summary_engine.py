@@ -0,0 +1,476 @@
+"""
+Incremental quarterly/yearly summary engine.
+
+Keeps per-(client, year, quarter) accumulators that payment deltas add to
+or subtract from, so an insert, update or soft-delete costs O(1) instead of
+rescanning the client's history. Monthly payments roll up into their
+quarter, and yearly rows (including ``yoy_growth``) are derived from the
+quarters. ``SummaryEngine.rebuild`` computes the same figures from scratch;
+``verify`` diffs the two.
+
+Figures follow the ``refresh_summaries`` procedure both maintenance modes
+use (see services.summary_maintenance): SUM/AVG ignore NULL amounts,
+``payment_count`` counts rows, ``expected_total`` is the MAX expected fee
+for quarterly payments or the SUM for monthly ones, and ``yoy_growth`` is
+the change from the previous year's total in percent. ``verify-db`` checks
+the stored rows against a rebuild.
+
+Usage (from the api directory):
+    python -m services.summary_engine verify --clients 1000 --events 200000
+    python -m services.summary_engine verify-db
+    python -m services.summary_engine rebuild-db
+"""
+import argparse
+import logging
+import math
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+QuarterKey = Tuple[int, int, int]
+YearKey = Tuple[int, int]
+
+
+class PaymentFact(NamedTuple):
+    """The fields of an active payment that summaries depend on."""
+    client_id: int
+    applied_period_type: Optional[str]
+    applied_period: Optional[int]
+    applied_year: Optional[int]
+    actual_fee: Optional[float]
+    total_assets: Optional[float]
+    expected_fee: Optional[float]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'PaymentFact':
+        return cls(*(row.get(field) for field in cls._fields))
+
+    @property
+    def quarter_key(self) -> Optional[QuarterKey]:
+        """(client_id, year, quarter) this payment rolls up into, if it has a period."""
+        if self.applied_year is None or self.applied_period is None:
+            return None
+        if self.applied_period_type == 'monthly':
+            quarter = (self.applied_period - 1) // 3 + 1
+        else:
+            quarter = self.applied_period
+        return self.client_id, self.applied_year, quarter
+
+
+def _close(a: Optional[float], b: Optional[float]) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+class QuarterAccumulator:
+    """Invertible aggregates for one quarter."""
+
+    __slots__ = ('payment_count', 'fee_sum', 'fee_count', 'assets_sum', 'assets_count',
+                 'monthly_count', 'expected_sum', 'expected_count', 'expected_values')
+
+    def __init__(self):
+        self.payment_count = 0
+        self.fee_sum = 0.0
+        self.fee_count = 0
+        self.assets_sum = 0.0
+        self.assets_count = 0
+        self.monthly_count = 0
+        self.expected_sum = 0.0
+        self.expected_count = 0
+        # MAX is not invertible, so keep the multiset of expected fees
+        self.expected_values: Counter = Counter()
+
+    def apply(self, fact: PaymentFact, sign: int) -> None:
+        self.payment_count += sign
+        if fact.applied_period_type == 'monthly':
+            self.monthly_count += sign
+        if fact.actual_fee is not None:
+            self.fee_sum += sign * fact.actual_fee
+            self.fee_count += sign
+        if fact.total_assets is not None:
+            self.assets_sum += sign * fact.total_assets
+            self.assets_count += sign
+        if fact.expected_fee is not None:
+            self.expected_sum += sign * fact.expected_fee
+            self.expected_count += sign
+            self.expected_values[fact.expected_fee] += sign
+            if self.expected_values[fact.expected_fee] <= 0:
+                del self.expected_values[fact.expected_fee]
+
+    @property
+    def empty(self) -> bool:
+        return self.payment_count <= 0
+
+    def row(self) -> Dict[str, Any]:
+        """Summary figures in quarterly_summaries column names."""
+        if self.monthly_count > 0:
+            expected_total = self.expected_sum if self.expected_count else None
+        else:
+            expected_total = max(self.expected_values) if self.expected_values else None
+        return {
+            "total_payments": self.fee_sum if self.fee_count else None,
+            "total_assets": self.assets_sum / self.assets_count if self.assets_count else None,
+            "payment_count": self.payment_count,
+            "avg_payment": self.fee_sum / self.fee_count if self.fee_count else None,
+            "expected_total": expected_total,
+        }
+
+
+def _average(values: List[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return sum(present) / len(present) if present else None
+
+
+class SummaryEngine:
+    """
+    Quarterly and yearly summaries maintained from payment deltas.
+
+    Call ``add``/``remove``/``update`` as payments change, then ``flush`` to
+    get the quarter and year rows that changed since the last flush.
+    """
+
+    def __init__(self):
+        self.quarters: Dict[QuarterKey, QuarterAccumulator] = {}
+        self._years: Dict[YearKey, Set[int]] = {}
+        self._dirty_quarters: Set[QuarterKey] = set()
+        self._dirty_years: Set[YearKey] = set()
+
+    @classmethod
+    def rebuild(cls, facts: Iterable[PaymentFact]) -> 'SummaryEngine':
+        """Full rebuild from the current set of active payments."""
+        engine = cls()
+        for fact in facts:
+            engine.add(fact)
+        engine._dirty_quarters.clear()
+        engine._dirty_years.clear()
+        return engine
+
+    def _apply(self, fact: PaymentFact, sign: int) -> None:
+        key = fact.quarter_key
+        if key is None:
+            return
+        client_id, year, quarter = key
+
+        accumulator = self.quarters.get(key)
+        if accumulator is None:
+            accumulator = self.quarters[key] = QuarterAccumulator()
+            self._years.setdefault((client_id, year), set()).add(quarter)
+        accumulator.apply(fact, sign)
+
+        if accumulator.empty:
+            del self.quarters[key]
+            quarters = self._years[(client_id, year)]
+            quarters.discard(quarter)
+            if not quarters:
+                del self._years[(client_id, year)]
+
+        self._dirty_quarters.add(key)
+        # Next year's yoy_growth depends on this year's total
+        self._dirty_years.add((client_id, year))
+        self._dirty_years.add((client_id, year + 1))
+
+    def add(self, fact: PaymentFact) -> None:
+        """Account for a new active payment."""
+        self._apply(fact, +1)
+
+    def remove(self, fact: PaymentFact) -> None:
+        """Account for a payment that was soft-deleted (or replaced)."""
+        self._apply(fact, -1)
+
+    def update(self, old: PaymentFact, new: PaymentFact) -> None:
+        """Account for an edited payment, including a move to another period."""
+        self._apply(old, -1)
+        self._apply(new, +1)
+
+    def quarterly_row(self, key: QuarterKey) -> Optional[Dict[str, Any]]:
+        accumulator = self.quarters.get(key)
+        return accumulator.row() if accumulator else None
+
+    def yearly_row(self, key: YearKey) -> Optional[Dict[str, Any]]:
+        """Year figures from its quarters plus YoY growth, matching refresh_summaries."""
+        client_id, year = key
+        quarters = self._years.get(key)
+        if not quarters:
+            return None
+        rows = [self.quarters[(client_id, year, q)].row() for q in sorted(quarters)]
+        totals = [r["total_payments"] for r in rows if r["total_payments"] is not None]
+        total_payments = sum(totals) if totals else None
+
+        yoy_growth = None
+        previous = self._years.get((client_id, year - 1))
+        if previous and total_payments is not None:
+            prev_totals = [self.quarters[(client_id, year - 1, q)].row()["total_payments"]
+                           for q in previous]
+            prev_total = sum(t for t in prev_totals if t is not None)
+            if prev_total:
+                yoy_growth = (total_payments - prev_total) / prev_total * 100
+
+        return {
+            "total_payments": total_payments,
+            "total_assets": _average([r["total_assets"] for r in rows]),
+            "payment_count": sum(r["payment_count"] for r in rows),
+            "avg_payment": _average([r["avg_payment"] for r in rows]),
+            "yoy_growth": yoy_growth,
+        }
+
+    def quarterly_rows(self) -> Dict[QuarterKey, Dict[str, Any]]:
+        return {key: acc.row() for key, acc in self.quarters.items()}
+
+    def yearly_rows(self) -> Dict[YearKey, Dict[str, Any]]:
+        return {key: self.yearly_row(key) for key in self._years}
+
+    def flush(self) -> Tuple[Dict[QuarterKey, Optional[Dict[str, Any]]],
+                             Dict[YearKey, Optional[Dict[str, Any]]]]:
+        """
+        Rows changed since the last flush.
+
+        A ``None`` value means the key no longer has payments and its
+        summary row should be deleted.
+        """
+        quarters = {key: self.quarterly_row(key) for key in self._dirty_quarters}
+        years = {key: self.yearly_row(key) for key in self._dirty_years}
+        self._dirty_quarters.clear()
+        self._dirty_years.clear()
+        return quarters, years
+
+
+def diff_engines(incremental: SummaryEngine, rebuilt: SummaryEngine) -> List[Dict[str, Any]]:
+    """Every quarter/year whose figures differ between two engines."""
+    return diff_rows(incremental.quarterly_rows(), rebuilt.quarterly_rows(), 'quarter') + \
+        diff_rows(incremental.yearly_rows(), rebuilt.yearly_rows(), 'year')
+
+
+def diff_rows(actual: Dict[tuple, Dict[str, Any]], expected: Dict[tuple, Dict[str, Any]],
+              level: str) -> List[Dict[str, Any]]:
+    """Compare summary rows by key, tolerating float rounding."""
+    mismatches = []
+    for key in sorted(set(actual) | set(expected)):
+        a, e = actual.get(key), expected.get(key)
+        if a is None or e is None:
+            mismatches.append({"level": level, "key": key, "actual": a, "expected": e})
+            continue
+        fields = [f for f in e if not _close(a.get(f), e.get(f))]
+        if fields:
+            mismatches.append({"level": level, "key": key, "fields": fields,
+                               "actual": a, "expected": e})
+    return mismatches
+
+
+# ----------------------------------------------------------------------------
+# Database integration
+# ----------------------------------------------------------------------------
+
+_ACTIVE_PAYMENTS_SQL = """
+    SELECT client_id, applied_period_type, applied_period, applied_year,
+           actual_fee, total_assets, expected_fee
+    FROM payments
+    WHERE valid_to IS NULL AND applied_year IS NOT NULL AND applied_period IS NOT NULL
+"""
+
+
+def load_facts(cursor) -> List[PaymentFact]:
+    """All active payments with an applied period."""
+    cursor.execute(_ACTIVE_PAYMENTS_SQL)
+    return [PaymentFact(*row) for row in cursor.fetchall()]
+
+
+def load_stored_rows(cursor) -> Tuple[Dict[QuarterKey, Dict[str, Any]], Dict[YearKey, Dict[str, Any]]]:
+    """Current contents of quarterly_summaries and yearly_summaries."""
+    cursor.execute("""
+        SELECT client_id, year, quarter, total_payments, total_assets,
+               payment_count, avg_payment, expected_total
+        FROM quarterly_summaries
+    """)
+    quarters = {
+        (r[0], r[1], r[2]): dict(zip(
+            ("total_payments", "total_assets", "payment_count", "avg_payment", "expected_total"), r[3:]))
+        for r in cursor.fetchall()
+    }
+    cursor.execute("""
+        SELECT client_id, year, total_payments, total_assets,
+               payment_count, avg_payment, yoy_growth
+        FROM yearly_summaries
+    """)
+    years = {
+        (r[0], r[1]): dict(zip(
+            ("total_payments", "total_assets", "payment_count", "avg_payment", "yoy_growth"), r[2:]))
+        for r in cursor.fetchall()
+    }
+    return quarters, years
+
+
+def persist(cursor, quarters: Dict[QuarterKey, Optional[Dict[str, Any]]],
+            years: Dict[YearKey, Optional[Dict[str, Any]]]) -> None:
+    """
+    Write summary rows (as returned by ``flush`` or ``*_rows``).
+
+    Affected keys are deleted and re-inserted in bulk; ``None`` rows are
+    only deleted. Run inside a transactional cursor.
+    """
+    cursor.fast_executemany = True
+    if quarters:
+        cursor.executemany(
+            "DELETE FROM quarterly_summaries WHERE client_id = ? AND year = ? AND quarter = ?",
+            list(quarters)
+        )
+        inserts = [(*key, r["total_payments"], r["total_assets"], r["payment_count"],
+                    r["avg_payment"], r["expected_total"])
+                   for key, r in quarters.items() if r is not None]
+        if inserts:
+            cursor.executemany("""
+                INSERT INTO quarterly_summaries (client_id, year, quarter, total_payments,
+                    total_assets, payment_count, avg_payment, expected_total, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CONVERT(NVARCHAR(50), GETDATE(), 120))
+            """, inserts)
+    if years:
+        cursor.executemany(
+            "DELETE FROM yearly_summaries WHERE client_id = ? AND year = ?", list(years)
+        )
+        inserts = [(*key, r["total_payments"], r["total_assets"], r["payment_count"],
+                    r["avg_payment"], r["yoy_growth"])
+                   for key, r in years.items() if r is not None]
+        if inserts:
+            cursor.executemany("""
+                INSERT INTO yearly_summaries (client_id, year, total_payments, total_assets,
+                    payment_count, avg_payment, yoy_growth, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CONVERT(NVARCHAR(50), GETDATE(), 120))
+            """, inserts)
+
+
+# ----------------------------------------------------------------------------
+# Verification
+# ----------------------------------------------------------------------------
+
+def synthetic_events(clients: int, events: int, seed: int = 0):
+    """
+    Yield ('add'|'remove'|'update', old, new) events over a random payment history.
+
+    Mixes quarterly and monthly clients, NULL amounts, period moves and
+    soft-deletes so every accumulator path is exercised.
+    """
+    rng = random.Random(seed)
+    schedules = {c: rng.choice(('quarterly', 'monthly')) for c in range(1, clients + 1)}
+    live: List[PaymentFact] = []
+
+    def random_fact(client_id):
+        monthly = schedules[client_id] == 'monthly'
+        return PaymentFact(
+            client_id=client_id,
+            applied_period_type=schedules[client_id],
+            applied_period=rng.randint(1, 12 if monthly else 4),
+            applied_year=rng.randint(2019, 2025),
+            actual_fee=None if rng.random() < 0.02 else round(rng.uniform(100, 5000), 2),
+            total_assets=None if rng.random() < 0.1 else round(rng.uniform(1e5, 5e6), 2),
+            expected_fee=None if rng.random() < 0.3 else round(rng.uniform(100, 5000), 2),
+        )
+
+    for _ in range(events):
+        roll = rng.random()
+        if roll < 0.6 or not live:
+            fact = random_fact(rng.randint(1, clients))
+            live.append(fact)
+            yield 'add', None, fact
+        elif roll < 0.85:
+            index = rng.randrange(len(live))
+            old = live[index]
+            new = random_fact(old.client_id)
+            live[index] = new
+            yield 'update', old, new
+        else:
+            index = rng.randrange(len(live))
+            live[index], live[-1] = live[-1], live[index]
+            yield 'remove', live.pop(), None
+
+
+def verify(clients: int, events: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Replay a synthetic event stream incrementally and diff against a full rebuild.
+
+    Returns:
+        dict: Event/key counts, timings and any mismatches
+    """
+    engine = SummaryEngine()
+    live: Counter = Counter()
+
+    start = time.perf_counter()
+    for kind, old, new in synthetic_events(clients, events, seed):
+        if kind == 'add':
+            engine.add(new)
+            live[new] += 1
+        elif kind == 'update':
+            engine.update(old, new)
+            live[old] -= 1
+            live[new] += 1
+        else:
+            engine.remove(old)
+            live[old] -= 1
+    incremental_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rebuilt = SummaryEngine.rebuild(live.elements())
+    rebuild_s = time.perf_counter() - start
+
+    mismatches = diff_engines(engine, rebuilt)
+    return {
+        "events": events,
+        "live_payments": sum(live.values()),
+        "quarters": len(rebuilt.quarters),
+        "incremental_seconds": round(incremental_s, 3),
+        "incremental_events_per_second": round(events / incremental_s) if incremental_s else None,
+        "rebuild_seconds": round(rebuild_s, 3),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary engine verification and rebuild")
+    sub = parser.add_subparsers(dest='command', required=True)
+    verify_parser = sub.add_parser('verify', help='Diff incremental vs full rebuild on synthetic data')
+    verify_parser.add_argument('--clients', type=int, default=1000)
+    verify_parser.add_argument('--events', type=int, default=200000)
+    verify_parser.add_argument('--seed', type=int, default=0)
+    sub.add_parser('verify-db', help='Diff stored summary tables against a rebuild from payments')
+    sub.add_parser('rebuild-db', help='Rewrite stored summaries from a full rebuild')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'verify':
+        result = verify(args.clients, args.events, args.seed)
+        mismatches = result.pop("mismatches")
+        print(result)
+        for mismatch in mismatches[:20]:
+            print("  MISMATCH", mismatch)
+        print("OK" if not mismatches else f"{len(mismatches)} mismatches")
+        raise SystemExit(1 if mismatches else 0)
+
+    from database.database import get_db
+    db = get_db()
+
+    if args.command == 'verify-db':
+        with db.cursor(commit=False) as cursor:
+            rebuilt = SummaryEngine.rebuild(load_facts(cursor))
+            stored_quarters, stored_years = load_stored_rows(cursor)
+        mismatches = diff_rows(stored_quarters, rebuilt.quarterly_rows(), 'quarter') + \
+            diff_rows(stored_years, rebuilt.yearly_rows(), 'year')
+        for mismatch in mismatches[:20]:
+            print("  STALE", mismatch)
+        print(f"{len(mismatches)} stored summary rows differ from a rebuild")
+    else:
+        with db.cursor() as cursor:
+            rebuilt = SummaryEngine.rebuild(load_facts(cursor))
+            stored_quarters, stored_years = load_stored_rows(cursor)
+            quarters = {k: None for k in stored_quarters}
+            quarters.update(rebuilt.quarterly_rows())
+            years = {k: None for k in stored_years}
+            years.update(rebuilt.yearly_rows())
+            persist(cursor, quarters, years)
+        print(f"Rewrote {len(rebuilt.quarters)} quarters and {len(rebuilt.yearly_rows())} years")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Deferred summary maintenance.
+
+By default the payment triggers keep ``client_metrics``, ``quarterly_summaries``
+and ``yearly_summaries`` current on every write. In deferred mode the
+triggers are disabled and payment writes only enqueue the dirty (client,
+year, quarter) keys in ``summary_dirty_keys``. ``run_summary_maintenance``
+then drains the queue and recomputes just those keys set-based, so a burst
+of writes to one client is coalesced into a single recomputation.
+
+The mode is the state of the payment trigger in the database, not an app
+setting: every write's enqueue statement runs only while the trigger is
+disabled, checked in the write's own transaction. DISABLE/ENABLE TRIGGER
+waits for running writes, so each write is either maintained by the
+trigger or queued, whichever mode it commits under.
+
+Both modes compute the summaries with the ``refresh_summaries`` procedure
+(migrations/006_summary_refresh_procedure.sql and
+007_summary_updates_and_yoy_growth.sql), so switching modes does not change
+any figure. The trigger refreshes on inserts, edits and deletes alike.
+
+- a quarter covers its active payments, monthly ones rolled into their
+  quarter: total_payments SUM(actual_fee), total_assets AVG(total_assets),
+  payment_count COUNT(*), avg_payment AVG(actual_fee), and expected_total
+  MAX(expected_fee), or SUM(expected_fee) if the quarter has monthly
+  payments;
+- a year aggregates its quarters, and yoy_growth is its change from the
+  previous year's total in percent (NULL without a non-zero previous total);
+- a quarter or year left without payments loses its row.
+
+``services.summary_engine`` models the same figures in Python and checks
+the stored rows against a rebuild.
+
+Switch modes with the CLI (from the api directory). Switching rebuilds
+every summary:
+    python -m services.summary_maintenance mode
+    python -m services.summary_maintenance set-mode deferred
+    python -m services.summary_maintenance run
+    python -m services.summary_maintenance rebuild
+    python -m services.summary_maintenance set-mode trigger
+"""
+import argparse
+import logging
+import time
+from typing import Dict, Iterable
+
+from services.dashboard_read_model import MARK_DIRTY_CLIENTS_STALE_SQL, read_model_enabled
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_MODE = 'trigger'
+DEFERRED_MODE = 'deferred'
+
+# Trigger name -> table it is defined on
+SUMMARY_TRIGGERS = {
+    'update_client_metrics_after_payment': 'payments',
+    'update_quarterly_after_payment': 'payments',
+}
+
+# Quarter a payment rolls up into (monthly periods 1-12 map to quarters 1-4)
+QUARTER_SQL = """
+    CASE WHEN {p}applied_period_type = 'monthly'
+         THEN ({p}applied_period - 1) / 3 + 1
+         ELSE {p}applied_period END
+"""
+
+# payments.period_ordinal range of a quarter's months (see
+# migrations/003_payment_period_ordinal.sql): the quarter's own ordinal is
+# its last month, so monthly and quarterly payments fall in one range.
+# refresh_summaries joins a quarter's payments on it.
+QUARTER_ORDINALS_SQL = "{d}year * 12 + {d}quarter * 3 - 3 AND {d}year * 12 + {d}quarter * 3 - 1"
+
+# True while the database is in deferred mode (see the module docstring)
+DEFERRED_SQL = """EXISTS (
+        SELECT 1 FROM sys.triggers
+        WHERE name = 'update_quarterly_after_payment' AND is_disabled = 1
+    )"""
+
+ENQUEUE_PAYMENT_SQL = f"""
+    INSERT INTO summary_dirty_keys (client_id, year, quarter)
+    SELECT client_id, applied_year, {QUARTER_SQL.format(p='')}
+    FROM payments
+    WHERE payment_id = ? AND {DEFERRED_SQL}
+"""
+
+# Used by the bulk insert while its staging table still exists
+ENQUEUE_PAYMENT_BATCH_SQL = f"""
+    INSERT INTO summary_dirty_keys (client_id, year, quarter)
+    SELECT DISTINCT client_id, applied_year, {QUARTER_SQL.format(p='')}
+    FROM #payment_batch
+    WHERE {DEFERRED_SQL}
+"""
+
+_MODE_SQL = f"SELECT CASE WHEN {DEFERRED_SQL} THEN 1 ELSE 0 END"
+
+_CLAIM_KEYS_SQL = """
+    SET NOCOUNT ON;
+    CREATE TABLE #claimed (client_id INT NOT NULL, year INT NULL, quarter INT NULL);
+
+    DELETE FROM summary_dirty_keys
+    OUTPUT DELETED.client_id, DELETED.year, DELETED.quarter INTO #claimed;
+
+    SELECT DISTINCT client_id, year, quarter
+    INTO #dirty_quarters
+    FROM #claimed
+    WHERE year IS NOT NULL AND quarter IS NOT NULL;
+
+    SELECT DISTINCT client_id, year INTO #dirty_years FROM #dirty_quarters;
+    SELECT DISTINCT client_id INTO #dirty_clients FROM #claimed;
+
+    SELECT
+        (SELECT COUNT(*) FROM #claimed),
+        (SELECT COUNT(*) FROM #dirty_quarters),
+        (SELECT COUNT(*) FROM #dirty_years),
+        (SELECT COUNT(*) FROM #dirty_clients);
+"""
+
+# Recompute the dirty quarters and their years with the procedure the
+# payment trigger uses (see the module docstring)
+_REFRESH_SUMMARIES_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @quarters summary_quarter_keys;
+    INSERT INTO @quarters (client_id, year, quarter)
+    SELECT client_id, year, quarter FROM #dirty_quarters;
+    EXEC refresh_summaries @quarters;
+"""
+
+# Same figures as update_client_metrics_after_payment, for dirty clients only
+_REFRESH_METRICS_SQL = """
+    SET NOCOUNT ON;
+    INSERT INTO client_metrics (client_id)
+    SELECT d.client_id
+    FROM #dirty_clients d
+    WHERE NOT EXISTS (SELECT 1 FROM client_metrics cm WHERE cm.client_id = d.client_id);
+
+    UPDATE cm
+    SET
+        last_payment_date = lp.received_date,
+        last_payment_amount = lp.actual_fee,
+        last_recorded_assets = lp.total_assets,
+        total_ytd_payments = ytd.total,
+        avg_quarterly_payment = qavg.avg_payment,
+        last_updated = CONVERT(nvarchar(50), GETDATE(), 120)
+    FROM client_metrics cm
+    INNER JOIN #dirty_clients d ON cm.client_id = d.client_id
+    OUTER APPLY (
+        SELECT TOP 1 received_date, actual_fee, total_assets
+        FROM payments
+        WHERE client_id = cm.client_id AND valid_to IS NULL
+        ORDER BY received_date DESC
+    ) lp
+    OUTER APPLY (
+        SELECT SUM(actual_fee) as total
+        FROM payments
+        WHERE client_id = cm.client_id
+        AND applied_year = YEAR(GETDATE())
+        AND valid_to IS NULL
+    ) ytd
+    OUTER APPLY (
+        SELECT AVG(total_payments) as avg_payment
+        FROM quarterly_summaries
+        WHERE client_id = cm.client_id
+    ) qavg;
+"""
+
+_DROP_WORK_TABLES_SQL = """
+    DROP TABLE #claimed;
+    DROP TABLE #dirty_quarters;
+    DROP TABLE #dirty_years;
+    DROP TABLE #dirty_clients;
+"""
+
+_ENQUEUE_ALL_SQL = f"""
+    INSERT INTO summary_dirty_keys (client_id, year, quarter)
+    SELECT DISTINCT client_id, applied_year, {QUARTER_SQL.format(p='')}
+    FROM payments
+    UNION
+    SELECT client_id, year, quarter FROM quarterly_summaries
+"""
+
+
+def maintenance_mode(cursor) -> str:
+    """The database's current summary maintenance mode."""
+    cursor.execute(_MODE_SQL)
+    return DEFERRED_MODE if cursor.fetchone()[0] else TRIGGER_MODE
+
+
+def enqueue_payment(cursor, payment_id: int) -> None:
+    """
+    Mark the summaries touched by one payment as dirty.
+
+    Enqueues nothing unless the database is in deferred mode. Call inside
+    the write's transaction; for updates call it before and after so both
+    the old and new period are refreshed.
+    """
+    cursor.execute(ENQUEUE_PAYMENT_SQL, [payment_id])
+
+
+def run_summary_maintenance(db) -> Dict[str, float]:
+    """
+    Drain the dirty-key queue and recompute the affected summaries.
+
+    Runs in one transaction: claimed keys are deleted from the queue only
+    if every refresh succeeds. Duplicate keys from bursts of writes are
+    coalesced before recomputation. The recomputed clients' dashboard
+    read-model rows are marked stale in the same transaction.
+
+    Returns:
+        dict: Claimed/distinct key counts and elapsed seconds
+    """
+    start = time.perf_counter()
+
+    with db.cursor() as cursor:
+        cursor.execute(_CLAIM_KEYS_SQL)
+        claimed, quarters, years, clients = cursor.fetchone()
+
+        if claimed:
+            cursor.execute(_REFRESH_SUMMARIES_SQL)
+            cursor.execute(_REFRESH_METRICS_SQL)
+            if read_model_enabled():
+                cursor.execute(MARK_DIRTY_CLIENTS_STALE_SQL)
+        cursor.execute(_DROP_WORK_TABLES_SQL)
+
+    stats = {
+        "claimed_keys": claimed,
+        "quarters": quarters,
+        "years": years,
+        "clients": clients,
+        "elapsed_seconds": round(time.perf_counter() - start, 4),
+    }
+    if claimed:
+        logger.info(
+            "Summary maintenance: %d queued keys -> %d quarters, %d years, %d clients in %.3fs",
+            claimed, quarters, years, clients, stats["elapsed_seconds"]
+        )
+    return stats
+
+
+def rebuild_all(db) -> Dict[str, float]:
+    """Enqueue every key that has payments or a summary row, then recompute."""
+    with db.cursor() as cursor:
+        cursor.execute(_ENQUEUE_ALL_SQL)
+    return run_summary_maintenance(db)
+
+
+def set_trigger_state(db, enabled: bool, triggers: Iterable[str] = SUMMARY_TRIGGERS) -> None:
+    """Enable or disable the summary triggers."""
+    action = 'ENABLE' if enabled else 'DISABLE'
+    with db.cursor() as cursor:
+        for trigger in triggers:
+            cursor.execute(f"{action} TRIGGER {trigger} ON {SUMMARY_TRIGGERS[trigger]}")
+    logger.info("%sd summary triggers", action.capitalize())
+
+
+def set_mode(db, mode: str) -> Dict[str, float]:
+    """
+    Switch the database between trigger and deferred maintenance.
+
+    Writes follow the trigger state from the moment it changes (see the
+    module docstring), so nothing else needs to change on the function
+    app. Every summary is then rebuilt, which also drains the queue, so
+    the figures carried over from the old mode are recomputed too.
+
+    Returns:
+        dict: Stats from the rebuild
+    """
+    set_trigger_state(db, enabled=mode != DEFERRED_MODE)
+    return rebuild_all(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary maintenance for deferred mode")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('run', help='Drain the dirty-key queue once')
+    sub.add_parser('rebuild', help='Recompute every summary')
+    sub.add_parser('mode', help='Show the current mode')
+    mode_parser = sub.add_parser('set-mode', help='Enable/disable the summary triggers')
+    mode_parser.add_argument('mode', choices=[TRIGGER_MODE, DEFERRED_MODE])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.database import get_db
+    db = get_db()
+
+    if args.command == 'run':
+        print(run_summary_maintenance(db))
+    elif args.command == 'rebuild':
+        print(rebuild_all(db))
+    elif args.command == 'mode':
+        with db.cursor(commit=False, read_only=False) as cursor:
+            print(maintenance_mode(cursor))
+    else:
+        print(set_mode(db, args.mode))
+        print(f"Summary maintenance mode set to {args.mode}")
+
+
+if __name__ == "__main__":
+    main()
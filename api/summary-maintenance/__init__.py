@@ -0,0 +1,36 @@
+"""
+Azure Function that drains the summary dirty-key queue.
+Recomputes client_metrics and quarterly/yearly summaries for keys enqueued
+by payment writes in deferred mode (summary triggers disabled), then rebuilds
+stale dashboard read-model rows when DASHBOARD_READ_MODEL=on.
+"""
+import azure.functions as func
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from database.database import get_db
+from services.dashboard_read_model import read_model_enabled, refresh
+from services.summary_maintenance import run_summary_maintenance
+
+
+def main(timer: func.TimerRequest) -> None:
+    """
+    Timer trigger, schedule from the SUMMARY_MAINTENANCE_SCHEDULE setting
+    (e.g. "0 */1 * * * *" for every minute).
+    
+    Runs even in trigger mode so keys queued before a mode switch are not
+    left behind; an empty queue costs one DELETE.
+    """
+    if timer.past_due:
+        logging.info("Summary maintenance timer is past due")
+    
+    db = get_db()
+    stats = run_summary_maintenance(db)
+    if stats["claimed_keys"]:
+        logging.info("Summary maintenance refreshed %s", stats)
+    
+    # After the summaries, so rebuilt dashboards include them
+    if read_model_enabled():
+        refresh(db)
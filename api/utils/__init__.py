@@ -0,0 +1,6 @@
+"""
+Cross-cutting HTTP helpers shared by the Azure Function endpoints.
+
+Request middleware, response helpers and process metrics live here so each
+endpoint's ``main`` stays focused on its own route.
+"""
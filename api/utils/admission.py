@@ -0,0 +1,218 @@
+"""
+Admission control in front of the database.
+
+Every request that touches the database takes one of a fixed number of
+slots per worker (``DB_MAX_CONCURRENCY``) before its handler runs, so a
+burst of requests queues in the worker instead of opening a connection
+each and exhausting the database's session and worker limits.
+
+Waiting requests are admitted writes first, then in arrival order. A
+request that waits longer than ``ADMISSION_QUEUE_TIMEOUT_MS``, or arrives
+when ``ADMISSION_MAX_QUEUE`` requests are already waiting, is shed and the
+client gets 503 with ``Retry-After``. A write arriving at a full queue
+takes the place of the most recently queued read instead.
+
+Slots are handed between event loops and threads safely, so handlers that
+run their queries with ``asyncio.to_thread`` and in-process benchmarks
+with one loop per thread are limited together.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_QUEUE_TIMEOUT_MS = 2000
+
+
+class Priority(IntEnum):
+    """Admission order; lower values are admitted first."""
+    WRITE = 0
+    READ = 1
+
+
+def request_priority(method: str) -> Priority:
+    return Priority.READ if method.upper() in ('GET', 'HEAD') else Priority.WRITE
+
+
+class Rejected(Exception):
+    """A request was shed instead of admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request shed ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'loop', 'future', 'state')
+
+    def __init__(self, priority: Priority, seq: int, loop: asyncio.AbstractEventLoop):
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.future = loop.create_future()
+        self.state = 'waiting'
+
+    @property
+    def order(self):
+        return self.priority, self.seq
+
+
+def _resolve(future: asyncio.Future, error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid %s: %s", name, value)
+        return default
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a prioritized, deadline-limited queue.
+
+    Args:
+        limit: Requests allowed to run at once
+        max_queue: Requests allowed to wait; later arrivals are shed
+        timeout: Seconds a request may wait before it is shed
+    """
+
+    def __init__(self, limit: int = DEFAULT_MAX_CONCURRENCY, max_queue: int = DEFAULT_MAX_QUEUE,
+                 timeout: float = DEFAULT_QUEUE_TIMEOUT_MS / 1000):
+        self.limit = max(int(limit), 1)
+        self.max_queue = max(int(max_queue), 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        self._shed = 0
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        return cls(
+            limit=_env_number("DB_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+            max_queue=_env_number("ADMISSION_MAX_QUEUE", DEFAULT_MAX_QUEUE),
+            timeout=_env_number("ADMISSION_QUEUE_TIMEOUT_MS", DEFAULT_QUEUE_TIMEOUT_MS) / 1000,
+        )
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds clients are told to wait before retrying."""
+        return max(1, math.ceil(self.timeout))
+
+    def _reject(self, priority: Priority, reason: str) -> Rejected:
+        self._shed += 1
+        metrics.ADMISSION_SHED.inc(priority=priority.name.lower(), reason=reason)
+        return Rejected(reason, self.retry_after)
+
+    async def acquire(self, priority: Priority = Priority.READ) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            Rejected: The queue was full or the wait exceeded the timeout
+        """
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                metrics.ADMISSION_WAIT.observe(0.0, priority=priority.name.lower())
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                evictable = [w for w in self._waiters if w.priority > priority]
+                if not evictable:
+                    raise self._reject(priority, 'queue_full')
+                victim = max(evictable, key=lambda w: w.order)
+                self._waiters.remove(victim)
+                victim.state = 'shed'
+                victim.loop.call_soon_threadsafe(
+                    _resolve, victim.future, self._reject(victim.priority, 'evicted'))
+            self._seq += 1
+            waiter = _Waiter(priority, self._seq, asyncio.get_running_loop())
+            self._waiters.append(waiter)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.state != 'granted':
+                    if waiter.state == 'waiting':
+                        self._waiters.remove(waiter)
+                        waiter.state = 'shed'
+                    raise self._reject(priority, 'timeout')
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.state == 'granted'
+                if waiter.state == 'waiting':
+                    self._waiters.remove(waiter)
+                    waiter.state = 'cancelled'
+            if granted:
+                self.release()
+            raise
+        # Rejected (evicted) propagates from the future as is
+        waited = time.perf_counter() - start
+        metrics.ADMISSION_WAIT.observe(waited, priority=priority.name.lower())
+        return waited
+
+    def release(self) -> None:
+        """Free a slot, handing it to the next waiter if there is one."""
+        with self._lock:
+            if self._waiters:
+                waiter = min(self._waiters, key=lambda w: w.order)
+                self._waiters.remove(waiter)
+                waiter.state = 'granted'
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future, None)
+                return
+            self._active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Requests running, waiting (by priority) and shed since start."""
+        with self._lock:
+            return {
+                "in_flight": self._active,
+                "queued": len(self._waiters),
+                "queued_writes": sum(1 for w in self._waiters if w.priority == Priority.WRITE),
+                "shed_total": self._shed,
+            }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_controller() -> AdmissionController:
+    """Process-wide controller, configured from the environment on first use."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController.from_env()
+    return _controller
+
+
+def set_controller(controller: Optional[AdmissionController]) -> None:
+    """Replace the process-wide controller (None re-reads the environment)."""
+    global _controller
+    _controller = controller
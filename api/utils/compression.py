@@ -0,0 +1,134 @@
+"""
+Response compression.
+
+JSON and text responses larger than ``COMPRESSION_MIN_BYTES`` (default
+1024) are compressed with the best encoding the client accepts: brotli
+when the ``brotli`` package is installed and the client sends ``br``, gzip
+otherwise. Smaller bodies are sent as is; below about a kilobyte the
+headers and CPU cost more than the bytes saved.
+
+Levels favour speed over ratio because compression runs on the request
+path: gzip 6 (``COMPRESSION_GZIP_LEVEL``) and brotli quality 4
+(``COMPRESSION_BROTLI_QUALITY``) get most of the savings on our JSON at a
+fraction of the CPU of their maximum levels. See
+tests/benchmarks/bench_compression.py for the trade-off on realistic
+payloads.
+"""
+import gzip
+import logging
+import os
+from typing import Dict, Optional
+
+import azure.functions as func
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_BYTES = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+_COMPRESSIBLE = ('application/json', 'text/')
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Ignoring invalid %s: %s", name, value)
+        return default
+
+
+def available_encodings() -> tuple:
+    """Encodings this worker can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    """Accept-Encoding as coding -> q value."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(accept_encoding: Optional[str], encodings: tuple = None) -> Optional[str]:
+    """
+    Pick a content coding for an ``Accept-Encoding`` header.
+
+    Returns the acceptable coding with the highest q value (ties go to the
+    server's preference order), or None to send the body uncompressed.
+    """
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in encodings or available_encodings():
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=_env_int("COMPRESSION_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY))
+    return gzip.compress(body, compresslevel=_env_int("COMPRESSION_GZIP_LEVEL", DEFAULT_GZIP_LEVEL))
+
+
+def _compressible(response: func.HttpResponse) -> bool:
+    mimetype = (response.mimetype or '').lower()
+    return mimetype.startswith(_COMPRESSIBLE)
+
+
+def compress_response(req: func.HttpRequest, response: func.HttpResponse) -> func.HttpResponse:
+    """
+    Compress ``response`` for ``req`` if it is worth it.
+
+    Returns the response unchanged when the client does not accept a
+    supported coding, the body is below the size threshold, or the response
+    is not JSON/text or is already encoded.
+    """
+    if not _compressible(response) or 'Content-Encoding' in response.headers:
+        return response
+    response.headers['Vary'] = 'Accept-Encoding'
+
+    body = response.get_body()
+    if len(body) < _env_int("COMPRESSION_MIN_BYTES", DEFAULT_MIN_BYTES):
+        return response
+    encoding = negotiate(req.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    compressed = compress(body, encoding)
+    if len(compressed) >= len(body):
+        return response
+    headers = dict(response.headers)
+    headers['Content-Encoding'] = encoding
+    return func.HttpResponse(
+        compressed,
+        status_code=response.status_code,
+        headers=headers,
+        mimetype=response.mimetype,
+        charset=response.charset
+    )
@@ -0,0 +1,259 @@
+"""
+In-process routing to the HTTP functions.
+
+Builds a route table from each function folder's ``function.json`` and
+resolves a method and path (e.g. ``GET dashboard/7``) to the folder's
+``main`` and its route parameters, the way the Functions host does:
+literal segments win over parameters, so ``dashboard/portfolio`` is not
+read as a client id.
+
+Handler modules are imported on first use and kept for the life of the
+process. ``run_batch`` executes a list of sub-requests through the same
+handlers for POST /api/$batch.
+"""
+import asyncio
+import contextvars
+import importlib.util
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import azure.functions as func
+
+logger = logging.getLogger(__name__)
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PARAM = re.compile(r'^\{(\w+)(?::[^}?]*)?(\?)?\}$')
+
+
+class Route(NamedTuple):
+    """One HTTP-triggered function."""
+    folder: str
+    template: str
+    methods: Tuple[str, ...]
+    pattern: 're.Pattern'
+    literals: int
+
+
+class RouteNotFound(LookupError):
+    """No function serves the path."""
+
+
+class MethodNotAllowed(LookupError):
+    """A function serves the path but not the method."""
+
+
+def compile_template(template: str) -> Tuple['re.Pattern', int]:
+    """Regex for a route template and its number of literal segments."""
+    parts = []
+    literals = 0
+    for segment in template.strip('/').split('/'):
+        param = _PARAM.match(segment)
+        if param is None:
+            literals += 1
+            parts.append('/' + re.escape(segment))
+        elif param.group(2):
+            parts.append(f'(?:/(?P<{param.group(1)}>[^/]+))?')
+        else:
+            parts.append(f'/(?P<{param.group(1)}>[^/]+)')
+    return re.compile('^' + ''.join(parts) + '/?$', re.IGNORECASE), literals
+
+
+def load_routes(api_dir: str = API_DIR) -> List[Route]:
+    """HTTP-triggered functions under ``api_dir``, most specific route first."""
+    routes = []
+    for folder in sorted(os.listdir(api_dir)):
+        path = os.path.join(api_dir, folder, 'function.json')
+        if not os.path.isfile(path):
+            continue
+        with open(path) as f:
+            config = json.load(f)
+        for binding in config.get('bindings', []):
+            if binding.get('type') != 'httpTrigger':
+                continue
+            template = binding.get('route') or folder
+            pattern, literals = compile_template(template)
+            methods = tuple(m.upper() for m in binding.get('methods') or ('GET', 'POST', 'PUT', 'DELETE'))
+            routes.append(Route(folder, template, methods, pattern, literals))
+    routes.sort(key=lambda r: (-r.literals, r.template))
+    return routes
+
+
+class Dispatcher:
+    """Resolves requests to function handlers."""
+
+    def __init__(self, api_dir: str = API_DIR, exclude: Tuple[str, ...] = ()):
+        self.api_dir = api_dir
+        self.routes = [r for r in load_routes(api_dir) if r.folder not in exclude]
+        self._handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._lock = threading.Lock()
+
+    def handler(self, folder: str) -> Callable[..., Awaitable[Any]]:
+        """The folder's ``main``, importing the module on first use."""
+        with self._lock:
+            main = self._handlers.get(folder)
+            if main is None:
+                path = os.path.join(self.api_dir, folder, '__init__.py')
+                spec = importlib.util.spec_from_file_location(
+                    f"dispatch_{folder.replace('-', '_')}", path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                main = self._handlers[folder] = module.main
+            return main
+
+    def resolve(self, method: str, path: str) -> Tuple[Route, Dict[str, str]]:
+        """
+        Route and route parameters for ``method`` and ``path`` (without ``/api``).
+
+        Raises:
+            RouteNotFound: No route matches the path
+            MethodNotAllowed: Matching routes do not accept the method
+        """
+        path = '/' + path.strip('/')
+        method = method.upper()
+        matched = False
+        for route in self.routes:
+            match = route.pattern.match(path)
+            if match is None:
+                continue
+            matched = True
+            if method in route.methods:
+                params = {k: v for k, v in match.groupdict().items() if v is not None}
+                return route, params
+        if matched:
+            raise MethodNotAllowed(f"{method} is not allowed on {path}")
+        raise RouteNotFound(f"No route for {path}")
+
+
+# Most sub-requests accepted in one batch
+MAX_BATCH_REQUESTS = 20
+
+# Sub-requests are reads; writes keep their own requests and transactions
+BATCH_METHODS = ('GET',)
+
+
+class BatchError(ValueError):
+    """The batch body is malformed."""
+
+
+class SubRequest(NamedTuple):
+    id: str
+    method: str
+    path: str
+    params: Dict[str, str]
+    headers: Dict[str, str]
+
+
+def parse_batch(body: Any, limit: int = MAX_BATCH_REQUESTS) -> List[SubRequest]:
+    """
+    Sub-requests from a ``{"requests": [{"id", "method", "url"}, ...]}`` body.
+
+    ``url`` is relative to the API, with or without ``/api``, and may carry
+    a query string. ``method`` defaults to GET and ``id`` to the position.
+
+    Raises:
+        BatchError: If the body or a sub-request is malformed
+    """
+    items = body.get('requests') if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BatchError('Body must be {"requests": [...]} with at least one request')
+    if len(items) > limit:
+        raise BatchError(f"At most {limit} requests per batch; got {len(items)}")
+
+    requests = []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('url'), str):
+            raise BatchError(f"Request {index} must be an object with a url")
+        request_id = str(item.get('id', index))
+        if request_id in seen:
+            raise BatchError(f"Duplicate request id: {request_id}")
+        seen.add(request_id)
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise BatchError(f"Request {request_id} headers must be an object")
+
+        url = urlsplit(item['url'])
+        path = url.path.strip('/')
+        if path.lower() == 'api' or path.lower().startswith('api/'):
+            path = path[4:]
+        requests.append(SubRequest(
+            id=request_id,
+            method=str(item.get('method', 'GET')).upper(),
+            path=path,
+            params=dict(parse_qsl(url.query)),
+            headers={str(k): str(v) for k, v in headers.items()},
+        ))
+    return requests
+
+
+def _error(request_id: str, status: int, message: str) -> Dict[str, Any]:
+    return {"id": request_id, "status": status, "duration_ms": 0.0, "headers": {},
+            "body": {"error": message}}
+
+
+def _decode(response: func.HttpResponse) -> Any:
+    body = response.get_body() or b''
+    if (response.mimetype or '').startswith('application/json') and body:
+        return json.loads(body)
+    return body.decode(response.charset or 'utf-8', errors='replace')
+
+
+async def run_sub_request(dispatcher: Dispatcher, sub: SubRequest,
+                          headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Run one sub-request through its function and describe the response.
+
+    The handler runs on a worker thread with its own event loop: most
+    handlers query the database without awaiting, and would otherwise run
+    one at a time on the caller's loop. It also runs in a fresh context, so
+    it sets up its own request scope like a top-level request: a batched
+    GET may read from the replica even though the $batch POST is pinned to
+    the primary.
+    """
+    if sub.method not in BATCH_METHODS:
+        return _error(sub.id, 405, f"Only {', '.join(BATCH_METHODS)} requests can be batched")
+    try:
+        route, route_params = dispatcher.resolve(sub.method, sub.path)
+    except RouteNotFound as e:
+        return _error(sub.id, 404, str(e))
+    except MethodNotAllowed as e:
+        return _error(sub.id, 405, str(e))
+
+    request = func.HttpRequest(
+        method=sub.method,
+        url=f"http://localhost/api/{sub.path}",
+        # Bodies are returned decoded, so sub-responses are never compressed
+        headers={k: v for k, v in {**(headers or {}), **sub.headers}.items()
+                 if k.lower() != 'accept-encoding'},
+        params=sub.params,
+        route_params=route_params,
+        body=b'',
+    )
+    handler = dispatcher.handler(route.folder)
+    start = time.perf_counter()
+    try:
+        response = await asyncio.to_thread(contextvars.Context().run, asyncio.run, handler(request))
+    except Exception as e:
+        logger.exception("Batched request %s failed", sub.id)
+        return _error(sub.id, 500, str(e))
+    return {
+        "id": sub.id,
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+        "headers": dict(response.headers),
+        "body": _decode(response),
+    }
+
+
+async def run_batch(dispatcher: Dispatcher, requests: List[SubRequest],
+                    headers: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Run sub-requests concurrently; responses come back in request order."""
+    return list(await asyncio.gather(
+        *(run_sub_request(dispatcher, sub, headers) for sub in requests)))
@@ -0,0 +1,219 @@
+"""
+In-process Prometheus metrics.
+
+A small dependency-free registry of counters, gauges and histograms
+rendered in the Prometheus text exposition format by GET /api/_metrics.
+Values are per worker process; Prometheus sums them across instances.
+"""
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, incremented here or read from a callback at render time."""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self._callback is not None:
+            return [f"{self.name} {_format_value(self._callback())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set directly or read from a callback at render time."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self._callback is not None:
+            return [f"{self.name} {_format_value(self._callback())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    'hohimer_http_requests_total', 'HTTP requests handled.', ('route', 'method', 'status')))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'hohimer_http_request_duration_seconds', 'HTTP request latency.', ('route',)))
+DB_TIME = REGISTRY.register(Histogram(
+    'hohimer_db_time_seconds', 'Database time per HTTP request.', ('route',)))
+DB_QUERIES = REGISTRY.register(Counter(
+    'hohimer_db_queries_total', 'Statements executed while handling requests.', ('route',)))
+DB_ERRORS = REGISTRY.register(Counter(
+    'hohimer_db_errors_total', 'Failed database connects and statements.', ('route',)))
+DB_TIMEOUTS = REGISTRY.register(Counter(
+    'hohimer_db_timeouts_total', 'Statements stopped by their query timeout.', ('route',)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'hohimer_cache_requests_total', 'In-process cache lookups.', ('cache', 'result')))
+SINGLE_FLIGHT = REGISTRY.register(Counter(
+    'hohimer_single_flight_requests_total',
+    'Coalesced reads by outcome: executed, shared an in-flight call, or reused a recent result.',
+    ('flight', 'result')))
+RESPONSE_BYTES = REGISTRY.register(Counter(
+    'hohimer_http_response_bytes_total', 'Response body bytes sent, by content coding.',
+    ('route', 'encoding')))
+COMPRESSION_SAVED = REGISTRY.register(Counter(
+    'hohimer_http_compression_saved_bytes_total', 'Response bytes saved by compression.',
+    ('route', 'encoding')))
+
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    'hohimer_admission_wait_seconds', 'Time requests queued for a database slot.', ('priority',)))
+ADMISSION_SHED = REGISTRY.register(Counter(
+    'hohimer_admission_shed_total', 'Requests rejected with 503 by admission control.',
+    ('priority', 'reason')))
+
+
+def _connection_stat(key: str) -> Callable[[], float]:
+    def read() -> float:
+        from database.instrumentation import connection_stats
+        return connection_stats()[key]
+    return read
+
+
+REGISTRY.register(Gauge(
+    'hohimer_db_connections_in_use', 'Database connections currently open.',
+    callback=_connection_stat('in_use')))
+REGISTRY.register(Counter(
+    'hohimer_db_connections_opened_total', 'Database connections opened since process start.',
+    callback=_connection_stat('opened_total')))
+
+
+def _admission_stat(key: str) -> Callable[[], float]:
+    def read() -> float:
+        from utils.admission import get_controller
+        return get_controller().stats()[key]
+    return read
+
+
+REGISTRY.register(Gauge(
+    'hohimer_admission_in_flight', 'Requests holding a database slot.',
+    callback=_admission_stat('in_flight')))
+REGISTRY.register(Gauge(
+    'hohimer_admission_queue_depth', 'Requests waiting for a database slot.',
+    callback=_admission_stat('queued')))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss for the cache hit-rate metrics."""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
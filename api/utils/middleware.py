@@ -0,0 +1,218 @@
+"""
+Shared middleware for HTTP-triggered functions.
+
+Decorate each endpoint's ``main`` with ``http_function(route)`` to get
+admission control (see utils.admission), a database request trace,
+negotiated gzip/brotli compression of larger JSON bodies (see
+utils.compression), a ``Server-Timing`` header (queue, db, serialize,
+compress, total) on every response, request metrics for GET /api/_metrics and a sampled
+``request.completed`` telemetry event tagged with the invocation id. Build
+JSON bodies with ``json_response`` so serialization time is attributed.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+import azure.functions as func
+
+from database.instrumentation import trace_request
+from database.routing import pin_primary
+from utils import admission, compression, metrics, telemetry
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[func.HttpRequest], Awaitable[func.HttpResponse]]
+
+
+class RequestTiming:
+    """Non-database timings collected while handling a request."""
+
+    __slots__ = ('serialize_ms', 'queue_ms', 'compress_ms')
+
+    def __init__(self):
+        self.serialize_ms = 0.0
+        self.queue_ms = 0.0
+        self.compress_ms = 0.0
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('request_timing', default=None)
+
+
+def record_serialize(elapsed_ms: float) -> None:
+    """Attribute serialization time to the current request."""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.serialize_ms += elapsed_ms
+
+
+def json_response(data: Any, status_code: int = 200) -> func.HttpResponse:
+    """JSON HttpResponse, timing the serialization for Server-Timing."""
+    start = time.perf_counter()
+    body = json.dumps(data, default=str)
+    record_serialize((time.perf_counter() - start) * 1000)
+    return func.HttpResponse(body, mimetype="application/json", status_code=status_code)
+
+
+def server_timing(db_ms: float, serialize_ms: float, total_ms: float, queue_ms: float = 0.0,
+                  compress_ms: float = 0.0) -> str:
+    return (f"db;dur={db_ms:.1f}, serialize;dur={serialize_ms:.1f}, "
+            f"queue;dur={queue_ms:.1f}, compress;dur={compress_ms:.1f}, total;dur={total_ms:.1f}")
+
+
+def timeout_response() -> func.HttpResponse:
+    """504 for a request whose query hit its statement timeout."""
+    return func.HttpResponse(
+        json.dumps({"error": "Database query timed out"}),
+        status_code=504,
+        mimetype="application/json"
+    )
+
+
+def shed_response(rejected: admission.Rejected) -> func.HttpResponse:
+    """503 telling the client when to retry."""
+    return func.HttpResponse(
+        json.dumps({"error": "Server busy, please retry"}),
+        status_code=503,
+        mimetype="application/json",
+        headers={"Retry-After": str(rejected.retry_after)}
+    )
+
+
+async def _run_admitted(handler: Handler, req: func.HttpRequest, timing: RequestTiming) -> func.HttpResponse:
+    controller = admission.get_controller()
+    try:
+        waited = await controller.acquire(admission.request_priority(req.method))
+    except admission.Rejected as rejected:
+        return shed_response(rejected)
+    timing.queue_ms = waited * 1000
+    try:
+        return await handler(req)
+    finally:
+        controller.release()
+
+
+def operation_id(req: func.HttpRequest, context: Optional[func.Context]) -> Optional[str]:
+    """W3C trace id of the invocation, from the Functions context or the traceparent header."""
+    trace_context = getattr(context, 'trace_context', None)
+    traceparent = getattr(trace_context, 'trace_parent', None) or req.headers.get('traceparent')
+    if not traceparent:
+        return None
+    parts = traceparent.split('-')
+    return parts[1] if len(parts) == 4 else None
+
+
+def request_client_id(req: func.HttpRequest) -> Optional[str]:
+    return req.route_params.get('client_id') or req.params.get('client_id')
+
+
+def _with_context(signature: inspect.Signature) -> inspect.Signature:
+    """Add the Functions ``context`` parameter so the worker passes the invocation context."""
+    if 'context' in signature.parameters:
+        return signature
+    context = inspect.Parameter('context', inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                                default=None, annotation=func.Context)
+    return signature.replace(parameters=[*signature.parameters.values(), context])
+
+
+def http_function(route: str, admit: bool = True) -> Callable[[Handler], Handler]:
+    """
+    Wrap an HTTP function's ``main``.
+
+    Args:
+        route: Route template used as the metrics label, e.g. "clients/{id?}"
+        admit: Queue for a database slot first; False for endpoints that never query
+    """
+    def decorate(handler: Handler) -> Handler:
+        @functools.wraps(handler)
+        async def main(req: func.HttpRequest, context: Optional[func.Context] = None) -> func.HttpResponse:
+            start = time.perf_counter()
+            timing = RequestTiming()
+            token = _current_timing.set(timing)
+            invocation_id = getattr(context, 'invocation_id', None)
+            try:
+                # Requests that write read their own writes from the primary
+                with telemetry.request_scope(route, invocation_id, operation_id(req, context)), \
+                        pin_primary(req.method.upper() not in ('GET', 'HEAD')), \
+                        trace_request(route) as trace:
+                    try:
+                        if admit:
+                            response = await _run_admitted(handler, req, timing)
+                        else:
+                            response = await handler(req)
+                    except asyncio.CancelledError:
+                        # The invocation was abandoned; stop its queries too
+                        trace.cancel_statements()
+                        raise
+                    except Exception as e:
+                        logger.exception("Unhandled error in %s", route)
+                        response = func.HttpResponse(
+                            json.dumps({"error": str(e)}),
+                            status_code=500,
+                            mimetype="application/json"
+                        )
+                    if trace.timeouts and response.status_code == 500:
+                        response = timeout_response()
+
+                    body_bytes = len(response.get_body() or b'')
+                    compress_start = time.perf_counter()
+                    response = compression.compress_response(req, response)
+                    timing.compress_ms = (time.perf_counter() - compress_start) * 1000
+                    encoding = response.headers.get('Content-Encoding', 'identity')
+                    sent_bytes = len(response.get_body() or b'')
+
+                    total_ms = (time.perf_counter() - start) * 1000
+                    if response.status_code == 503:
+                        level = logging.WARNING
+                    else:
+                        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+                    if telemetry.enabled(level):
+                        telemetry.emit(
+                            "request.completed",
+                            level=level,
+                            method=req.method,
+                            status=response.status_code,
+                            client_id=request_client_id(req),
+                            duration_ms=round(total_ms, 3),
+                            db_ms=round(trace.db_ms, 3),
+                            serialize_ms=round(timing.serialize_ms, 3),
+                            queue_ms=round(timing.queue_ms, 3),
+                            compress_ms=round(timing.compress_ms, 3),
+                            response_bytes=sent_bytes,
+                            encoding=encoding,
+                            connections=trace.connections,
+                            replica_connections=trace.replica_connections,
+                            db_errors=trace.errors,
+                            db_timeouts=trace.timeouts,
+                            query_count=trace.query_count,
+                            queries=[{"name": s.name, "ms": round(s.total_ms, 3), "rows": s.rows}
+                                     for s in trace.statements],
+                        )
+            finally:
+                _current_timing.reset(token)
+
+            response.headers['Server-Timing'] = server_timing(
+                trace.db_ms, timing.serialize_ms, total_ms, timing.queue_ms, timing.compress_ms)
+
+            metrics.REQUESTS.inc(route=route, method=req.method, status=str(response.status_code))
+            metrics.REQUEST_LATENCY.observe(total_ms / 1000, route=route)
+            metrics.DB_TIME.observe(trace.db_ms / 1000, route=route)
+            metrics.RESPONSE_BYTES.inc(sent_bytes, route=route, encoding=encoding)
+            if sent_bytes < body_bytes:
+                metrics.COMPRESSION_SAVED.inc(body_bytes - sent_bytes, route=route, encoding=encoding)
+            if trace.query_count:
+                metrics.DB_QUERIES.inc(trace.query_count, route=route)
+            if trace.errors:
+                metrics.DB_ERRORS.inc(trace.errors, route=route)
+            if trace.timeouts:
+                metrics.DB_TIMEOUTS.inc(trace.timeouts, route=route)
+            return response
+
+        main.__signature__ = _with_context(inspect.signature(handler))
+        return main
+
+    return decorate
@@ -0,0 +1,156 @@
+"""
+Request coalescing for identical concurrent reads.
+
+When several requests ask for the same thing at once (a team opening one
+client's dashboard together), the first caller for a key runs the load and
+the others await its result instead of repeating the queries. Calls are
+shared through a ``concurrent.futures.Future``, so callers on different
+event loops or threads of the same worker coalesce too.
+
+A result can also be reused for a short window after the call finishes
+(``SINGLE_FLIGHT_WINDOW_MS``, default 0: only in-flight calls are shared),
+which bounds how stale a coalesced read can be.
+
+Example:
+    dashboards = SingleFlight("dashboard")
+    payload = await dashboards.do(("dashboard", client_id),
+                                  lambda: asyncio.to_thread(load_dashboard, client_id))
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Abandoned(Exception):
+    """Set on a shared call whose leader was cancelled; followers retry."""
+
+
+def default_window() -> float:
+    """Reuse window in seconds from SINGLE_FLIGHT_WINDOW_MS."""
+    value = os.getenv("SINGLE_FLIGHT_WINDOW_MS")
+    if not value:
+        return 0.0
+    try:
+        return max(float(value), 0.0) / 1000
+    except ValueError:
+        logger.warning("Ignoring invalid SINGLE_FLIGHT_WINDOW_MS: %s", value)
+        return 0.0
+
+
+class SingleFlight:
+    """
+    Share one execution per key among concurrent callers.
+
+    Args:
+        name: Label for stats and metrics
+        window: Seconds a finished result stays shareable; None reads the environment
+    """
+
+    def __init__(self, name: str, window: Optional[float] = None, clock=time.monotonic):
+        self.name = name
+        self.window = default_window() if window is None else window
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (future, finished_at or None while in flight)
+        self._calls: Dict[Hashable, Tuple[Future, Optional[float]]] = {}
+        self._stats = {"executed": 0, "shared": 0, "reused": 0, "errors": 0}
+
+    def _count(self, result: str) -> None:
+        self._stats[result] += 1
+        metrics.SINGLE_FLIGHT.inc(flight=self.name, result=result)
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """The call to await for ``key`` and whether this caller must run it."""
+        with self._lock:
+            entry = self._calls.get(key)
+            if entry is not None:
+                future, finished_at = entry
+                if finished_at is None:
+                    self._count("shared")
+                    return future, False
+                if self._clock() - finished_at <= self.window and future.exception() is None:
+                    self._count("reused")
+                    return future, False
+            future = Future()
+            self._calls[key] = (future, None)
+            self._count("executed")
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key, (None,))[0] is not future:
+                return
+            if self.window > 0 and future.exception() is None:
+                self._calls[key] = (future, self._clock())
+            else:
+                del self._calls[key]
+            # Drop other expired results so the map does not grow with every key seen
+            if self.window > 0:
+                now = self._clock()
+                expired = [k for k, (_, done) in self._calls.items()
+                           if done is not None and now - done > self.window]
+                for k in expired:
+                    del self._calls[k]
+
+    def _abandon(self, key: Hashable, future: Future) -> None:
+        """Drop a call whose leader was cancelled and wake its followers to retry."""
+        with self._lock:
+            if self._calls.get(key, (None,))[0] is future:
+                del self._calls[key]
+        future.set_exception(_Abandoned())
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Result of ``load()`` for ``key``, shared with concurrent callers.
+
+        ``load`` only runs when no call for the key is in flight (or reusable).
+        Its exception is raised to every caller that shared the call. If the
+        caller running it is cancelled, one of the callers that shared it runs
+        ``load`` again for the rest. Results are shared by reference, so
+        callers must not mutate them.
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # Shielded so a cancelled follower does not cancel the shared call
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _Abandoned:
+                continue
+
+        try:
+            result = await load()
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            future.set_exception(e)
+            self._finish(key, future)
+            raise
+        except BaseException:
+            # Cancellation is this caller's, not the followers'
+            self._abandon(key, future)
+            raise
+        future.set_result(result)
+        self._finish(key, future)
+        return result
+
+    def forget(self, key: Hashable) -> None:
+        """Stop sharing a finished result for ``key`` (in-flight calls are unaffected)."""
+        with self._lock:
+            entry = self._calls.get(key)
+            if entry is not None and entry[1] is not None:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of executed, shared and reused calls, and failed executions."""
+        with self._lock:
+            return dict(self._stats)
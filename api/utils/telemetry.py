@@ -0,0 +1,176 @@
+"""
+Structured telemetry events.
+
+Every event is one log record on the ``hohimer.telemetry`` logger (or a
+logger passed in) whose message is ``<event> {json fields}`` and whose
+``custom_dimensions`` extra carries the same fields, so Application
+Insights can query them either with ``parse_json`` on the trace message or
+as custom dimensions when an exporter is configured.
+
+Events are cheap when nobody will see them: nothing is formatted unless
+the logger is enabled for the level and the request was sampled in, and
+the JSON message is only built if a handler actually formats the record.
+
+Sampling is decided once per request in ``request_scope`` so a request's
+events are kept or dropped together. Warnings and errors are never
+sampled out. Rates come from the environment:
+
+    TELEMETRY_SAMPLE_RATE=0.25                       # default for every route
+    TELEMETRY_ROUTE_SAMPLING=dashboard/portfolio=1;_metrics=0
+"""
+import json
+import logging
+import os
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger("hohimer.telemetry")
+
+
+def _parse_rate(value: str, setting: str) -> Optional[float]:
+    try:
+        rate = float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid %s rate: %r", setting, value)
+        return None
+    return min(max(rate, 0.0), 1.0)
+
+
+class Sampler:
+    """Per-route sampling rates with a default."""
+
+    def __init__(self, default_rate: float = 1.0, routes: Optional[Dict[str, float]] = None,
+                 rng: Callable[[], float] = random.random):
+        self.default_rate = default_rate
+        self.routes = routes or {}
+        self._rng = rng
+
+    @classmethod
+    def from_env(cls) -> 'Sampler':
+        default_rate = 1.0
+        value = os.getenv("TELEMETRY_SAMPLE_RATE")
+        if value:
+            default_rate = _parse_rate(value, "TELEMETRY_SAMPLE_RATE")
+            if default_rate is None:
+                default_rate = 1.0
+
+        routes = {}
+        for item in os.getenv("TELEMETRY_ROUTE_SAMPLING", "").split(';'):
+            if not item.strip():
+                continue
+            route, _, value = item.rpartition('=')
+            rate = _parse_rate(value.strip(), "TELEMETRY_ROUTE_SAMPLING") if route else None
+            if rate is not None:
+                routes[route.strip()] = rate
+        return cls(default_rate, routes)
+
+    def rate(self, route: Optional[str]) -> float:
+        return self.routes.get(route, self.default_rate)
+
+    def sample(self, route: Optional[str]) -> bool:
+        rate = self.rate(route)
+        return rate >= 1.0 or (rate > 0.0 and self._rng() < rate)
+
+
+class TelemetryScope:
+    """Correlation fields and the sampling decision for one request."""
+
+    __slots__ = ('route', 'invocation_id', 'operation_id', 'sampled')
+
+    def __init__(self, route: Optional[str], invocation_id: Optional[str] = None,
+                 operation_id: Optional[str] = None, sampled: bool = True):
+        self.route = route
+        self.invocation_id = invocation_id
+        self.operation_id = operation_id
+        self.sampled = sampled
+
+    def dimensions(self) -> Dict[str, Any]:
+        result = {"route": self.route}
+        if self.invocation_id:
+            result["invocation_id"] = self.invocation_id
+        if self.operation_id:
+            result["operation_id"] = self.operation_id
+        return result
+
+
+class Event:
+    """Log message that renders its fields as JSON only when formatted."""
+
+    __slots__ = ('name', 'fields')
+
+    def __init__(self, name: str, fields: Dict[str, Any]):
+        self.name = name
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return f"{self.name} {json.dumps(self.fields, default=str, separators=(',', ':'))}"
+
+
+_current_scope: ContextVar[Optional[TelemetryScope]] = ContextVar('telemetry_scope', default=None)
+_sampler: Optional[Sampler] = None
+
+
+def get_sampler() -> Sampler:
+    """Process-wide sampler, read from the environment on first use."""
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler.from_env()
+    return _sampler
+
+
+def set_sampler(sampler: Optional[Sampler]) -> None:
+    """Replace the process-wide sampler (None re-reads the environment)."""
+    global _sampler
+    _sampler = sampler
+
+
+def current_scope() -> Optional[TelemetryScope]:
+    return _current_scope.get()
+
+
+@contextmanager
+def request_scope(route: Optional[str], invocation_id: Optional[str] = None,
+                  operation_id: Optional[str] = None) -> Iterator[TelemetryScope]:
+    """Tag events in the enclosed block with the request and sample them together."""
+    scope = TelemetryScope(route, invocation_id, operation_id, get_sampler().sample(route))
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def enabled(level: int = logging.INFO, log: Optional[logging.Logger] = None) -> bool:
+    """
+    Whether an event at ``level`` would be emitted.
+
+    Check this before building fields that are expensive to compute.
+    """
+    if not (log or logger).isEnabledFor(level):
+        return False
+    scope = _current_scope.get()
+    return scope is None or scope.sampled or level >= logging.WARNING
+
+
+def emit(event: str, level: int = logging.INFO, log: Optional[logging.Logger] = None,
+         **fields: Any) -> None:
+    """
+    Emit a structured event.
+
+    Args:
+        event: Event name, e.g. "request.completed"
+        level: Logging level; WARNING and above bypass sampling
+        log: Logger to emit on, defaults to ``hohimer.telemetry``
+        **fields: Event fields (route and invocation_id are added from the scope)
+    """
+    log = log or logger
+    if not log.isEnabledFor(level):
+        return
+    scope = _current_scope.get()
+    if scope is not None:
+        if level < logging.WARNING and not scope.sampled:
+            return
+        fields = {**scope.dimensions(), **fields}
+    log.log(level, "%s", Event(event, fields), extra={"custom_dimensions": {"event": event, **fields}})
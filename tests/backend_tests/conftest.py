@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the backend tests.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database whose cursors all share one mock cursor; returns (db, cursor)."""
+    db = MagicMock()
+    cursor = MagicMock()
+    db.cursor.return_value.__enter__.return_value = cursor
+    return db, cursor
+
+
+@pytest.fixture
+def live_connection():
+    """
+    Connection to the local SQL Server (database/local_db.py), in a
+    transaction rolled back after the test. Skipped unless SQL_AUTH=sql
+    and the server answers.
+    """
+    if os.getenv("SQL_AUTH", "").lower() != "sql":
+        pytest.skip("Set SQL_AUTH=sql and point SQL_SERVER at the local SQL Server")
+    try:
+        from database.database import get_db
+        db = get_db()
+        conn = db.get_connection()
+    except Exception as e:
+        pytest.skip(f"Local SQL Server unavailable: {e}")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,163 @@
+"""
+Tests for admission control.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+
+import azure.functions as func
+
+from utils import admission
+from utils.admission import AdmissionController, Priority, Rejected, request_priority
+from utils.middleware import http_function, json_response
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestAdmissionController:
+    """Test slot limits, ordering and shedding."""
+
+    def test_limits_concurrency(self):
+        controller = AdmissionController(limit=2, max_queue=10, timeout=1)
+        running = []
+        peak = []
+
+        async def work():
+            await controller.acquire()
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            controller.release()
+
+        async def run():
+            await asyncio.gather(*(work() for _ in range(6)))
+
+        asyncio.run(run())
+        assert max(peak) == 2
+        assert controller.stats() == {"in_flight": 0, "queued": 0, "queued_writes": 0, "shed_total": 0}
+
+    def test_writes_are_admitted_before_reads(self):
+        controller = AdmissionController(limit=1, max_queue=10, timeout=1)
+        order = []
+
+        async def request(name, priority):
+            await controller.acquire(priority)
+            order.append(name)
+            controller.release()
+
+        async def run():
+            await controller.acquire()
+            tasks = [asyncio.ensure_future(request("read-1", Priority.READ)),
+                     asyncio.ensure_future(request("read-2", Priority.READ)),
+                     asyncio.ensure_future(request("write", Priority.WRITE))]
+            await settle()
+            assert controller.stats()["queued"] == 3
+            controller.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["write", "read-1", "read-2"]
+
+    def test_full_queue_sheds_reads(self):
+        controller = AdmissionController(limit=1, max_queue=1, timeout=1)
+
+        async def run():
+            await controller.acquire()
+            queued = asyncio.ensure_future(controller.acquire(Priority.READ))
+            await settle()
+            with pytest.raises(Rejected) as excinfo:
+                await controller.acquire(Priority.READ)
+            assert excinfo.value.reason == 'queue_full'
+            controller.release()
+            await queued
+            controller.release()
+
+        asyncio.run(run())
+        assert controller.stats()["shed_total"] == 1
+
+    def test_write_evicts_newest_queued_read(self):
+        controller = AdmissionController(limit=1, max_queue=1, timeout=1)
+
+        async def run():
+            await controller.acquire()
+            read = asyncio.ensure_future(controller.acquire(Priority.READ))
+            await settle()
+            write = asyncio.ensure_future(controller.acquire(Priority.WRITE))
+            await settle()
+            with pytest.raises(Rejected) as excinfo:
+                await read
+            assert excinfo.value.reason == 'evicted'
+            controller.release()
+            await write
+            controller.release()
+
+        asyncio.run(run())
+        assert controller.stats()["in_flight"] == 0
+
+    def test_queue_deadline(self):
+        controller = AdmissionController(limit=1, max_queue=5, timeout=0.01)
+
+        async def run():
+            await controller.acquire()
+            with pytest.raises(Rejected) as excinfo:
+                await controller.acquire()
+            controller.release()
+            return excinfo.value
+
+        rejected = asyncio.run(run())
+        assert rejected.reason == 'timeout'
+        assert rejected.retry_after == 1
+        assert controller.stats() == {"in_flight": 0, "queued": 0, "queued_writes": 0, "shed_total": 1}
+
+    def test_request_priority(self):
+        assert request_priority('GET') is Priority.READ
+        assert request_priority('post') is Priority.WRITE
+        assert request_priority('DELETE') is Priority.WRITE
+
+
+class TestMiddlewareAdmission:
+    """Test 503 responses from the middleware."""
+
+    @pytest.fixture(autouse=True)
+    def controller(self):
+        controller = AdmissionController(limit=1, max_queue=0, timeout=0.01)
+        admission.set_controller(controller)
+        yield controller
+        admission.set_controller(None)
+
+    def test_shed_request_gets_503_with_retry_after(self, controller):
+        @http_function("test/busy")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            return json_response({})
+
+        async def run():
+            await controller.acquire()
+            try:
+                return await main(func.HttpRequest(method='GET', url='http://localhost/api/test', body=b''))
+            finally:
+                controller.release()
+
+        response = asyncio.run(run())
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+    def test_admitted_request_releases_slot(self, controller):
+        @http_function("test/ok")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            assert controller.stats()["in_flight"] == 1
+            return json_response({})
+
+        response = asyncio.run(main(func.HttpRequest(method='GET', url='http://localhost/api/test', body=b'')))
+        assert response.status_code == 200
+        assert "queue;dur=" in response.headers['Server-Timing']
+        assert controller.stats()["in_flight"] == 0
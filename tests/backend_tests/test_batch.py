@@ -0,0 +1,76 @@
+"""
+Tests for multi-ID lookups.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+from database.batch import batch_result, fetch_by_ids, parse_ids
+
+QUERY = "SELECT client_id, display_name FROM clients WHERE client_id IN ({ids})"
+
+
+@pytest.fixture
+def cursor():
+    """Cursor that returns the rows whose ids were bound, skipping id 404."""
+    cursor = MagicMock()
+    cursor.description = [('client_id',), ('display_name',)]
+    bound = []
+
+    def execute(sql, params):
+        bound.append((sql, list(params)))
+        cursor.fetchall.return_value = [(i, f"Client {i}") for i in dict.fromkeys(params) if i != 404]
+
+    cursor.execute.side_effect = execute
+    cursor.bound = bound
+    return cursor
+
+
+class TestParseIds:
+    """Test the ids parameter."""
+
+    def test_parses_and_dedupes_in_order(self):
+        assert parse_ids("3, 1,3,,2") == [3, 1, 2]
+
+    @pytest.mark.parametrize("value", ["", " , ", "1,x", "1.5"])
+    def test_rejects_invalid(self, value):
+        with pytest.raises(ValueError):
+            parse_ids(value)
+
+    def test_rejects_too_many(self):
+        with pytest.raises(ValueError):
+            parse_ids(",".join(str(i) for i in range(11)), limit=10)
+
+
+class TestFetchByIds:
+    """Test set-based lookups."""
+
+    def test_one_statement_padded_to_fixed_size(self, cursor):
+        found = fetch_by_ids(cursor, QUERY, [5, 6, 7], key='client_id')
+
+        assert list(found) == [5, 6, 7]
+        assert found[6] == {'client_id': 6, 'display_name': 'Client 6'}
+        sql, params = cursor.bound[0]
+        assert len(cursor.bound) == 1
+        assert params == [5, 6, 7, 7, 7, 7, 7, 7]
+        assert sql.count('?') == 8
+
+    def test_large_lists_are_chunked(self, cursor):
+        ids = list(range(1, 1001))
+        found = fetch_by_ids(cursor, QUERY, ids, key='client_id')
+
+        assert len(found) == 999  # 404 is never found
+        assert [len(params) for _, params in cursor.bound] == [500, 500]
+
+    def test_missing_ids_are_reported(self, cursor):
+        ids = [1, 404, 2]
+        body = batch_result(ids, fetch_by_ids(cursor, QUERY, ids, key='client_id'))
+
+        assert list(body["results"]) == ["1", "2"]
+        assert body["missing"] == [404]
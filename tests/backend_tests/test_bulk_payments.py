@@ -0,0 +1,144 @@
+"""
+Tests for bulk payment validation and set-based insertion.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+from database.models import PaymentCreate
+from services.bulk_payments import (
+    MAX_BATCH_SIZE,
+    PAYMENT_COLUMNS,
+    PaymentBatchError,
+    validate_payment_batch,
+    insert_payment_batch,
+    payment_row
+)
+
+
+def make_payment(**overrides):
+    """Build a valid raw payment payload."""
+    payment = {
+        "contract_id": 1,
+        "client_id": 1,
+        "received_date": "2024-04-15",
+        "total_assets": 500000.00,
+        "actual_fee": 1250.00,
+        "applied_period_type": "quarterly",
+        "applied_period": 1,
+        "applied_year": 2024
+    }
+    payment.update(overrides)
+    return payment
+
+
+class TestValidatePaymentBatch:
+    """Test per-row and per-batch validation."""
+
+    def test_valid_batch(self):
+        """Test that a valid batch returns models in request order."""
+        payments = validate_payment_batch([
+            make_payment(applied_period=1),
+            make_payment(applied_period=2)
+        ])
+        assert [p.applied_period for p in payments] == [1, 2]
+        assert all(isinstance(p, PaymentCreate) for p in payments)
+
+    def test_batch_must_be_list(self):
+        """Test that a non-list body is a batch error."""
+        with pytest.raises(PaymentBatchError) as exc_info:
+            validate_payment_batch({"contract_id": 1})
+        assert exc_info.value.batch_errors
+        assert not exc_info.value.row_errors
+
+    def test_empty_batch(self):
+        """Test that an empty batch is rejected."""
+        with pytest.raises(PaymentBatchError) as exc_info:
+            validate_payment_batch([])
+        assert "Batch is empty" in exc_info.value.batch_errors
+
+    def test_oversized_batch(self):
+        """Test that batches above the limit are rejected before row validation."""
+        with pytest.raises(PaymentBatchError) as exc_info:
+            validate_payment_batch([make_payment()] * (MAX_BATCH_SIZE + 1))
+        assert str(MAX_BATCH_SIZE) in exc_info.value.batch_errors[0]
+
+    def test_all_row_errors_reported(self):
+        """Test that every invalid row is reported with its index."""
+        with pytest.raises(PaymentBatchError) as exc_info:
+            validate_payment_batch([
+                make_payment(),
+                make_payment(actual_fee=-1),
+                "not an object",
+                make_payment(applied_period=5)
+            ])
+        errors = exc_info.value.row_errors
+        assert [e["index"] for e in errors] == [1, 2, 3]
+        assert errors[0]["errors"][0]["field"] == "actual_fee"
+        assert "between 1 and 4" in errors[2]["errors"][0]["message"]
+
+    def test_error_body_is_serializable(self):
+        """Test the API error body shape."""
+        error = PaymentBatchError("bad", row_errors=[{"index": 0, "errors": []}])
+        body = error.to_dict()
+        assert body == {"error": "bad", "batch_errors": [], "row_errors": [{"index": 0, "errors": []}]}
+
+
+class TestInsertPaymentBatch:
+    """Test the staged insert against a mock cursor."""
+
+    @pytest.fixture
+    def cursor(self):
+        """Mock cursor with one flat contract, no orphan rows and sequential new IDs."""
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [[(1, 1, '2024-01-01', None, None, 'flat', None, 1250.00)], [],
+                                       [(101,), (102,)]]
+        return cursor
+
+    def test_payment_row_column_order(self):
+        """Test that parameter tuples follow PAYMENT_COLUMNS."""
+        row = payment_row(PaymentCreate(**make_payment()).model_dump())
+        assert len(row) == len(PAYMENT_COLUMNS)
+        assert row[PAYMENT_COLUMNS.index('actual_fee')] == 1250.00
+
+    def test_insert_returns_ids_in_order(self, cursor):
+        """Test that staged rows are inserted with fast_executemany and IDs returned."""
+        payments = validate_payment_batch([make_payment(), make_payment(applied_period=2)])
+
+        ids = insert_payment_batch(cursor, payments)
+
+        assert ids == [101, 102]
+        assert cursor.fast_executemany is True
+        staged = cursor.executemany.call_args[0][1]
+        assert [row[0] for row in staged] == [0, 1]
+        # Expected fees not sent are staged from the contract
+        fee = 1 + PAYMENT_COLUMNS.index('expected_fee')
+        assert [row[fee] for row in staged] == [1250.00, 1250.00]
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert "MERGE INTO payments" in statements[-3]
+        # Queued only while the database is in deferred mode
+        assert "summary_dirty_keys" in statements[-2] and "is_disabled = 1" in statements[-2]
+
+    def test_orphan_rows_rejected(self):
+        """Test that rows with a mismatched contract fail the batch before insert."""
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [[], [(1, 9, 1)]]
+        payments = validate_payment_batch([make_payment(), make_payment(contract_id=9)])
+
+        with pytest.raises(PaymentBatchError) as exc_info:
+            insert_payment_batch(cursor, payments)
+
+        assert exc_info.value.row_errors[0]["index"] == 1
+        assert not any("MERGE" in c[0][0] for c in cursor.execute.call_args_list)
+
+    def test_empty_insert_is_noop(self):
+        """Test that an empty list does not touch the database."""
+        cursor = MagicMock()
+        assert insert_payment_batch(cursor, []) == []
+        cursor.execute.assert_not_called()
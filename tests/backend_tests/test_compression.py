@@ -0,0 +1,123 @@
+"""
+Tests for response compression.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+import gzip
+import json
+
+import azure.functions as func
+
+from utils import compression, metrics
+from utils.compression import compress_response, negotiate
+from utils.middleware import http_function, json_response
+
+LARGE = [{"contract_id": i, "notes": "Quarterly in arrears, billed on AUM"} for i in range(200)]
+
+
+def make_request(accept_encoding=None):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    return func.HttpRequest(method='GET', url='http://localhost/api/test', headers=headers, body=b'')
+
+
+def json_body(data):
+    return func.HttpResponse(json.dumps(data), mimetype="application/json")
+
+
+class TestNegotiate:
+    """Test Accept-Encoding negotiation."""
+
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0.1, br;q=0", "gzip"),
+        ("gzip, br", "br"),
+        ("gzip;q=1.0, br;q=0.8", "gzip"),
+        ("GZIP;Q=0.9", "gzip"),
+    ])
+    def test_picks_best_coding(self, header, expected):
+        assert negotiate(header, encodings=('br', 'gzip')) == expected
+
+    def test_without_brotli_falls_back_to_gzip(self, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', None)
+        assert negotiate("br, gzip") == "gzip"
+        assert negotiate("br") is None
+
+
+class TestCompressResponse:
+    """Test which responses are compressed."""
+
+    def test_gzips_large_json(self, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', None)
+        response = compress_response(make_request("gzip, deflate"), json_body(LARGE))
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.mimetype == 'application/json'
+        assert json.loads(gzip.decompress(response.get_body())) == LARGE
+
+    def test_small_bodies_are_not_compressed(self):
+        response = compress_response(make_request("gzip"), json_body({"ok": True}))
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.headers['Vary'] == 'Accept-Encoding'
+
+    def test_threshold_is_configurable(self, monkeypatch):
+        monkeypatch.setenv("COMPRESSION_MIN_BYTES", "1")
+        response = compress_response(make_request("gzip"), json_body({"ok": True}))
+
+        # Too small to shrink, so it is still sent as is
+        assert 'Content-Encoding' not in response.headers
+        monkeypatch.setenv("COMPRESSION_MIN_BYTES", "64")
+        response = compress_response(make_request("gzip"), json_body(LARGE[:5]))
+        assert response.headers['Content-Encoding'] == 'gzip'
+
+    def test_client_without_accept_encoding(self):
+        response = compress_response(make_request(), json_body(LARGE))
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_non_json_is_not_compressed(self):
+        response = func.HttpResponse(b"\x00" * 4096, mimetype="application/octet-stream")
+
+        assert compress_response(make_request("gzip"), response) is response
+        assert 'Vary' not in response.headers
+
+    def test_keeps_status_and_headers(self):
+        original = func.HttpResponse(json.dumps(LARGE), status_code=201, mimetype="application/json",
+                                     headers={"Retry-After": "1"})
+        response = compress_response(make_request("gzip"), original)
+
+        assert response.status_code == 201
+        assert response.headers['Retry-After'] == "1"
+
+
+class TestMiddleware:
+    """Test compression through http_function."""
+
+    def test_compresses_and_counts_saved_bytes(self, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', None)
+
+        @http_function("test/compressed", admit=False)
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            return json_response(LARGE)
+
+        before = metrics.COMPRESSION_SAVED.value(route="test/compressed", encoding="gzip")
+        response = asyncio.run(main(make_request("gzip")))
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert "compress;dur=" in response.headers['Server-Timing']
+        assert metrics.COMPRESSION_SAVED.value(route="test/compressed", encoding="gzip") > before
+        assert metrics.RESPONSE_BYTES.value(route="test/compressed", encoding="gzip") == len(response.get_body())
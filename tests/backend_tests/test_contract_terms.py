@@ -0,0 +1,186 @@
+"""
+Tests for effective-dated contract terms.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import bisect
+import random
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+from services.contract_terms import (
+    ContractTerm,
+    ContractTimeline,
+    fill_expected_fees,
+    load_timelines,
+    month_ordinal,
+    payment_ordinal
+)
+
+
+def month(year, m):
+    return year * 12 + m - 1
+
+
+# Client 1 went from 0.1% to 0.2% in April 2024, and to a flat fee in 2025
+CONTRACT_ROWS = [
+    (1, 12, '2024-04-01', datetime(2024, 3, 20), datetime(2025, 1, 2), 'percentage', 0.002, None),
+    (1, 11, '2023-01-01', datetime(2023, 1, 5), datetime(2024, 3, 20), 'percentage', 0.001, None),
+    (1, 13, None, datetime(2025, 1, 2), None, 'flat', None, 500.0),
+]
+
+
+@pytest.fixture
+def cursor():
+    cursor = MagicMock()
+    cursor.fetchall.return_value = CONTRACT_ROWS
+    return cursor
+
+
+def payment(year, period, period_type='quarterly', assets=1000000.0, expected=None, received=None):
+    return {'payment_id': 1, 'client_id': 1, 'total_assets': assets, 'expected_fee': expected,
+            'applied_period': period, 'applied_year': year, 'applied_period_type': period_type,
+            'received_date': received}
+
+
+class TestMonthOrdinal:
+    """Test date parsing onto the period_ordinal scale."""
+
+    @pytest.mark.parametrize("value,expected", [
+        ('2024-04-01', month(2024, 4)),
+        ('2024-12', month(2024, 12)),
+        (date(2024, 1, 31), month(2024, 1)),
+        (datetime(2023, 6, 1, 12, 0), month(2023, 6)),
+        ('', None), ('04/01/2024', None), ('2024-13-01', None), (None, None),
+    ])
+    def test_parses(self, value, expected):
+        assert month_ordinal(value) == expected
+
+    def test_payment_falls_back_to_received_month(self):
+        assert payment_ordinal(payment(2024, 2)) == month(2024, 6)
+        assert payment_ordinal(payment(None, None, received='2024-07-15')) == month(2024, 7)
+
+
+class TestContractTimeline:
+    """Test bisect lookups."""
+
+    def test_term_in_force_by_month(self):
+        timeline = ContractTimeline([
+            ContractTerm(month(2024, 4), 12, 'percentage', 0.002, None),
+            ContractTerm(month(2023, 1), 11, 'percentage', 0.001, None),
+        ])
+        assert timeline.term_at(month(2024, 3)).contract_id == 11
+        assert timeline.term_at(month(2024, 4)).contract_id == 12
+        assert timeline.term_at(month(2030, 1)).contract_id == 12
+        # Before the first contract, and an unknown month
+        assert timeline.term_at(month(2020, 1)).contract_id == 11
+        assert timeline.term_at(None).contract_id == 12
+
+    def test_later_contract_wins_same_start(self):
+        timeline = ContractTimeline([
+            ContractTerm(month(2024, 1), 21, 'flat', None, 100.0),
+            ContractTerm(month(2024, 1), 20, 'flat', None, 90.0),
+        ])
+        assert timeline.term_at(month(2024, 6)).contract_id == 21
+
+    def test_empty(self):
+        assert ContractTimeline([]).term_at(month(2024, 1)) is None
+
+    def test_deleted_contract_never_applies(self):
+        # 31 was deleted with nothing after it; the active 30 applies throughout
+        timeline = ContractTimeline([
+            ContractTerm(month(2023, 1), 30, 'percentage', 0.001, None),
+            ContractTerm(month(2024, 4), 31, 'percentage', 0.005, None, ends=month(2024, 6)),
+        ])
+        assert [t.contract_id for t in timeline.terms] == [30]
+        assert timeline.term_at(month(2024, 5)).contract_id == 30
+        assert timeline.term_at(None).contract_id == 30
+
+    def test_ended_contract_stops_at_valid_to(self):
+        timeline = ContractTimeline([
+            ContractTerm(month(2022, 1), 40, 'flat', None, 100.0),
+            ContractTerm(month(2023, 1), 41, 'flat', None, 200.0, ends=month(2023, 6)),
+            ContractTerm(month(2024, 1), 42, 'flat', None, 300.0),
+        ])
+        assert timeline.term_at(month(2023, 6)).contract_id == 41
+        # After 41 ended and before 42 started, the still-active 40 applies
+        assert timeline.term_at(month(2023, 9)).contract_id == 40
+        assert timeline.term_at(month(2024, 2)).contract_id == 42
+
+    def test_client_without_active_contract_keeps_history(self):
+        timeline = ContractTimeline([
+            ContractTerm(month(2022, 1), 50, 'flat', None, 100.0, ends=month(2022, 12)),
+            ContractTerm(month(2023, 1), 51, 'flat', None, 200.0, ends=month(2023, 12)),
+        ])
+        assert timeline.term_at(month(2022, 3)).contract_id == 50
+        assert timeline.term_at(month(2024, 3)).contract_id == 51
+
+
+    def test_matches_scanning_every_started_term(self):
+        def scan(timeline, ordinal):
+            starts = [t.starts if t.starts is not None else -1 for t in timeline.terms]
+            position = bisect.bisect_right(starts, ordinal) - 1
+            if position < 0:
+                return timeline.terms[0]
+            started = timeline.terms[:position + 1]
+            return next((t for t in reversed(started) if t.in_force(ordinal)), started[-1])
+
+        rng = random.Random(5)
+        for _ in range(200):
+            terms = []
+            for contract_id in range(rng.randint(1, 8)):
+                starts = rng.choice([None, rng.randint(0, 60)])
+                ends = rng.choice([None, rng.randint(0, 70)])
+                terms.append(ContractTerm(starts, contract_id, 'flat', None, 100.0, ends))
+            timeline = ContractTimeline(terms)
+            for ordinal in range(-2, 75):
+                assert timeline.term_at(ordinal) == scan(timeline, ordinal), (terms, ordinal)
+
+
+class TestFillExpectedFees:
+    """Test per-period expected fees."""
+
+    def test_uses_rate_in_force_for_each_period(self, cursor):
+        payments = [payment(2024, 1), payment(2024, 2), payment(2025, 1),
+                    payment(2024, 3, period_type='monthly'), payment(2024, 1, expected=42.0)]
+
+        fill_expected_fees(cursor, payments)
+
+        assert [p['expected_fee'] for p in payments] == [1000.0, 2000.0, 500.0, 1000.0, 42.0]
+        # One contracts query for the client however many payments
+        assert cursor.execute.call_count == 1
+
+    def test_missing_assets_leave_fee_empty(self, cursor):
+        payments = [payment(2024, 2, assets=None)]
+        fill_expected_fees(cursor, payments)
+        assert payments[0]['expected_fee'] is None
+
+
+    def test_nothing_missing_skips_query(self, cursor):
+        fill_expected_fees(cursor, [payment(2024, 1, expected=42.0)])
+        cursor.execute.assert_not_called()
+
+
+class TestLoadTimelines:
+    """Test loading timelines for several clients."""
+
+    def test_groups_by_client(self, cursor):
+        timelines = load_timelines(cursor, [1, 2, 1])
+
+        assert len(timelines[1]) == 3
+        assert timelines[1].term_at(month(2025, 3)).contract_id == 13
+        # A client without contracts gets an empty timeline
+        assert timelines[2].term_at(month(2024, 1)) is None
+        assert cursor.execute.call_args[0][1] == [1, 2]
+
+    def test_chunks_client_ids(self, cursor, monkeypatch):
+        monkeypatch.setattr('services.contract_terms.MAX_CLIENTS_PER_QUERY', 2)
+        cursor.fetchall.return_value = []
+        load_timelines(cursor, [5, 4, 3])
+        assert [c[0][1] for c in cursor.execute.call_args_list] == [[3, 4], [5]]
@@ -0,0 +1,197 @@
+"""
+Tests for the dashboard read model.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+import importlib.util
+import json
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import azure.functions as func
+
+from services import dashboard_read_model
+from services.dashboard_read_model import (
+    _diff,
+    mark_clients_stale,
+    mark_contract_stale,
+    mark_payment_stale,
+    read_dashboard,
+    read_model_enabled,
+    refresh,
+    verify
+)
+from services.summary_maintenance import run_summary_maintenance
+
+TODAY = date(2025, 3, 14)
+ENABLED = {'DASHBOARD_READ_MODEL': 'on'}
+
+
+def statements(cursor):
+    return [c[0][0] for c in cursor.execute.call_args_list]
+
+
+class TestMarkStale:
+    """Test the write-path version bumps."""
+
+    def test_disabled_by_default(self):
+        cursor = MagicMock()
+        with patch.dict('os.environ', {}, clear=True):
+            assert not read_model_enabled()
+            mark_clients_stale(cursor, 1)
+            mark_contract_stale(cursor, 2)
+            mark_payment_stale(cursor, 3)
+        cursor.execute.assert_not_called()
+
+    def test_bumps_owning_client(self):
+        cursor = MagicMock()
+        with patch.dict('os.environ', ENABLED):
+            mark_payment_stale(cursor, 3)
+            mark_contract_stale(cursor, 2)
+            mark_clients_stale(cursor, 1, 4)
+
+        (payment_sql, payment_params), (contract_sql, contract_params), (client_sql, client_params) = \
+            [c[0] for c in cursor.execute.call_args_list]
+        assert "FROM payments WHERE payment_id = ?" in payment_sql
+        assert "version = target.version + 1" in payment_sql
+        assert payment_params == [3]
+        assert "FROM contracts WHERE contract_id = ?" in contract_sql
+        assert contract_params == [2]
+        assert "client_id IN (?, ?)" in client_sql
+        assert client_params == [1, 4]
+
+    def test_deferred_maintenance_marks_recomputed_clients(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (3, 2, 1, 1)
+        with patch.dict('os.environ', ENABLED):
+            run_summary_maintenance(db)
+
+        assert any("#dirty_clients" in sql and "client_dashboard" in sql
+                   for sql in statements(cursor))
+
+
+class TestRead:
+    """Test the endpoint's lookup."""
+
+    def test_only_current_rows_are_served(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ('{"client": {}}',)
+
+        assert read_dashboard(cursor, 7, today=TODAY) == '{"client": {}}'
+        sql, params = cursor.execute.call_args[0]
+        assert "built_version = version" in sql
+        assert params == [7, TODAY]
+
+    def test_missing_or_stale(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = None
+
+        assert read_dashboard(cursor, 7, today=TODAY) is None
+
+
+class TestRefresh:
+    """Test the incremental refresher."""
+
+    def test_rebuilds_pending_rows(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchall.return_value = [(1, 4), (2, 0), (3, 1)]
+        # Client 3 was written to while it was built
+        cursor.rowcount = 1
+        saves = iter([1, 1, 0])
+
+        def execute(sql, params=None):
+            if "dashboard_read_model.save" in sql:
+                cursor.rowcount = next(saves)
+
+        cursor.execute.side_effect = execute
+        bodies = {1: {"client": {"client_id": 1}}, 2: {"client": {"client_id": 2}}, 3: {"client": {}}}
+        with patch.object(dashboard_read_model, 'build_dashboard',
+                          side_effect=lambda cur, client_id, index: bodies[client_id]):
+            stats = refresh(db, limit=10, today=TODAY)
+
+        assert stats["rebuilt"] == 2
+        assert stats["skipped"] == 1
+        assert stats["pending"] == 3
+        save_params = [c[0][1] for c in cursor.execute.call_args_list
+                       if "dashboard_read_model.save" in c[0][0]]
+        client_id, version, body, built_on = save_params[0][:4]
+        assert (client_id, version, built_on) == (1, 4, TODAY)
+        assert json.loads(body) == bodies[1]
+
+    def test_removed_clients_are_skipped(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchall.return_value = [(9, 2)]
+        cursor.rowcount = 0
+        with patch.object(dashboard_read_model, 'build_dashboard', return_value=None):
+            stats = refresh(db, limit=10, today=TODAY)
+
+        assert stats["rebuilt"] == 0
+        assert not any("dashboard_read_model.save" in sql for sql in statements(cursor))
+
+
+class TestVerify:
+    """Test the consistency checker."""
+
+    def test_diff_paths(self):
+        stored = {"client": {"name": "A"}, "recent_payments": [{"id": 1}, {"id": 2}], "metrics": {}}
+        live = {"client": {"name": "B"}, "recent_payments": [{"id": 1}, {"id": 3}], "metrics": {}}
+
+        assert _diff(stored, live) == ["client.name", "recent_payments[1].id"]
+        assert _diff(stored, stored) == []
+
+    def test_reports_mismatches(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (2, 2)
+        cursor.fetchall.side_effect = [
+            [(1, '{"client": {"client_id": 1}}'), (2, '{"client": {"client_id": 2}}')],
+            [],
+        ]
+        live = {1: {"client": {"client_id": 1}}, 2: {"client": {"client_id": 20}}}
+        with patch.object(dashboard_read_model, 'build_dashboard',
+                          side_effect=lambda cur, client_id, index: live[client_id]):
+            result = verify(db, today=TODAY)
+
+        assert result["checked"] == 2
+        assert result["mismatches"] == [{"client_id": 2, "fields": ["client.client_id"]}]
+
+
+class TestDashboardEndpoint:
+    """Test serving from the read model."""
+
+    @pytest.fixture
+    def dashboard(self):
+        spec = importlib.util.spec_from_file_location(
+            "dashboard_function", os.path.join(api_dir, "dashboard", "__init__.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def get(self, dashboard):
+        req = func.HttpRequest(method='GET', url='http://localhost/api/dashboard/7',
+                               route_params={'client_id': '7'}, body=b'')
+        return asyncio.run(dashboard.main(req))
+
+    def test_serves_stored_body(self, dashboard):
+        with patch.dict('os.environ', ENABLED), \
+                patch.object(dashboard, 'stored_dashboard', return_value='{"stored": true}'), \
+                patch.object(dashboard, 'load_dashboard') as load:
+            response = self.get(dashboard)
+
+        assert response.status_code == 200
+        assert response.get_body() == b'{"stored": true}'
+        load.assert_not_called()
+
+    def test_falls_back_to_live_assembly(self, dashboard):
+        with patch.dict('os.environ', ENABLED), \
+                patch.object(dashboard, 'stored_dashboard', return_value=None), \
+                patch.object(dashboard, 'load_dashboard', return_value=(200, {"live": True})):
+            response = self.get(dashboard)
+
+        assert json.loads(response.get_body()) == {"live": True}
@@ -57,6 +57,34 @@ class TestDatabase(unittest.TestCase):
                 Database()
             self.assertIn("Missing required environment variables", str(context.exception))
     
+    def test_sql_auth_connection_string(self):
+        """Test SQL Server authentication for local databases."""
+        with patch.dict('os.environ', {
+            'SQL_AUTH': 'sql', 'SQL_SERVER': 'localhost', 'SQL_USER': 'sa',
+            'SQL_PASSWORD': 'secret', 'SQL_PORT': '14333'
+        }):
+            db = Database()
+        self.assertIn("Server=tcp:localhost,14333;", db.connection_string)
+        self.assertIn("UID=sa;PWD=secret;", db.connection_string)
+        self.assertIn("TrustServerCertificate=yes;", db.connection_string)
+    
+    def test_sql_auth_requires_credentials(self):
+        """Test that SQL authentication without a login raises ValueError."""
+        with patch.dict('os.environ', {'SQL_AUTH': 'sql'}):
+            with self.assertRaises(ValueError):
+                Database()
+    
+    @patch('database.database.pyodbc.connect')
+    @patch('database.database.DefaultAzureCredential')
+    def test_sql_auth_skips_token(self, mock_credential_class, mock_connect):
+        """Test that SQL authentication connects without an access token."""
+        with patch.dict('os.environ', {'SQL_AUTH': 'sql', 'SQL_USER': 'sa', 'SQL_PASSWORD': 'secret'}):
+            db = Database()
+        db.get_connection()
+        
+        mock_credential_class.assert_not_called()
+        mock_connect.assert_called_once_with(db.connection_string)
+    
     @patch('database.database.DefaultAzureCredential')
     def test_credential_lazy_initialization(self, mock_credential_class):
         """Test that credential is created only when accessed."""
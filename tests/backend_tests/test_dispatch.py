@@ -0,0 +1,239 @@
+"""
+Tests for in-process routing and the $batch endpoint helpers.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+import importlib.util
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import azure.functions as func
+
+from database import database as database_module
+from database.routing import ReadRouter
+
+from utils.dispatch import (
+    BatchError, Dispatcher, MethodNotAllowed, RouteNotFound, compile_template,
+    parse_batch, run_batch
+)
+
+HANDLER = '''
+import json
+import time
+import azure.functions as func
+
+async def main(req, context=None):
+    time.sleep(float(req.params.get('sleep', 0)))
+    if req.params.get('fail'):
+        raise RuntimeError("boom")
+    return func.HttpResponse(json.dumps({
+        "folder": %r,
+        "route_params": dict(req.route_params),
+        "params": dict(req.params),
+        "accept_encoding": req.headers.get('Accept-Encoding'),
+        "traceparent": req.headers.get('traceparent'),
+    }), mimetype="application/json")
+'''
+
+
+# A real function: wrapped in http_function and opening a read-only cursor
+READ_HANDLER = '''
+import azure.functions as func
+from database.database import Database
+from utils.middleware import http_function
+
+@http_function("clients", admit=False)
+async def main(req):
+    with Database().cursor(commit=False):
+        pass
+    return func.HttpResponse("{}", mimetype="application/json")
+'''
+
+
+def add_function(root, folder, route=None, methods=("get",), handler=HANDLER):
+    os.makedirs(root / folder)
+    binding = {"type": "httpTrigger", "direction": "in", "name": "req", "methods": list(methods)}
+    if route:
+        binding["route"] = route
+    (root / folder / "function.json").write_text(json.dumps({"bindings": [binding]}))
+    (root / folder / "__init__.py").write_text(handler % folder if handler is HANDLER else handler)
+
+
+@pytest.fixture
+def dispatcher(tmp_path):
+    add_function(tmp_path, "dashboard", "dashboard/{client_id}")
+    add_function(tmp_path, "dashboard-portfolio", "dashboard/portfolio")
+    add_function(tmp_path, "payments", "payments/{id?}", methods=("get", "post"))
+    add_function(tmp_path, "periods")
+    (tmp_path / "summary-maintenance").mkdir()
+    (tmp_path / "summary-maintenance" / "function.json").write_text(
+        json.dumps({"bindings": [{"type": "timerTrigger", "name": "timer"}]}))
+    return Dispatcher(api_dir=str(tmp_path))
+
+
+class TestResolve:
+    """Test route matching."""
+
+    def test_compile_template(self):
+        pattern, literals = compile_template("payments/{id?}")
+
+        assert literals == 1
+        assert pattern.match("/payments").groupdict() == {"id": None}
+        assert pattern.match("/payments/5").groupdict() == {"id": "5"}
+        assert pattern.match("/payments/5/files") is None
+
+    def test_literal_segments_win(self, dispatcher):
+        route, params = dispatcher.resolve("GET", "dashboard/portfolio")
+        assert route.folder == "dashboard-portfolio"
+        assert params == {}
+
+        route, params = dispatcher.resolve("GET", "/dashboard/7/")
+        assert route.folder == "dashboard"
+        assert params == {"client_id": "7"}
+
+    def test_route_defaults_to_folder(self, dispatcher):
+        assert dispatcher.resolve("get", "periods")[0].folder == "periods"
+
+    def test_not_found_and_method_not_allowed(self, dispatcher):
+        with pytest.raises(RouteNotFound):
+            dispatcher.resolve("GET", "summary-maintenance")
+        with pytest.raises(MethodNotAllowed):
+            dispatcher.resolve("DELETE", "payments/5")
+
+
+class TestParseBatch:
+    """Test the batch body."""
+
+    def test_parses_urls(self):
+        requests = parse_batch({"requests": [
+            {"id": "d", "url": "/api/dashboard/7"},
+            {"url": "payments?client_id=7&limit=20", "method": "get"},
+        ]})
+
+        assert [r.id for r in requests] == ["d", "1"]
+        assert requests[0].path == "dashboard/7"
+        assert requests[1].method == "GET"
+        assert requests[1].params == {"client_id": "7", "limit": "20"}
+
+    @pytest.mark.parametrize("body", [
+        None,
+        [],
+        {"requests": []},
+        {"requests": [{"id": "a"}]},
+        {"requests": [{"id": "a", "url": "periods"}, {"id": "a", "url": "periods"}]},
+        {"requests": [{"url": "periods", "headers": ["x"]}]},
+    ])
+    def test_rejects_malformed(self, body):
+        with pytest.raises(BatchError):
+            parse_batch(body)
+
+    def test_rejects_too_many(self):
+        with pytest.raises(BatchError):
+            parse_batch({"requests": [{"url": "periods"}] * 3}, limit=2)
+
+
+class TestRunBatch:
+    """Test executing sub-requests."""
+
+    def test_responses_in_request_order(self, dispatcher):
+        requests = parse_batch({"requests": [
+            {"id": "dashboard", "url": "dashboard/7"},
+            {"id": "payments", "url": "payments?client_id=7"},
+        ]})
+        responses = asyncio.run(run_batch(dispatcher, requests, {"traceparent": "00-abc-def-01"}))
+
+        assert [r["id"] for r in responses] == ["dashboard", "payments"]
+        assert all(r["status"] == 200 for r in responses)
+        assert responses[0]["body"]["route_params"] == {"client_id": "7"}
+        assert responses[1]["body"]["params"] == {"client_id": "7"}
+        assert responses[1]["body"]["traceparent"] == "00-abc-def-01"
+        assert responses[0]["duration_ms"] >= 0
+
+    def test_runs_concurrently(self, dispatcher):
+        requests = parse_batch({"requests": [
+            {"url": f"dashboard/{i}?sleep=0.2"} for i in range(4)
+        ]})
+        start = time.perf_counter()
+        asyncio.run(run_batch(dispatcher, requests))
+
+        assert time.perf_counter() - start < 0.6
+
+    def test_errors_are_per_request(self, dispatcher):
+        requests = parse_batch({"requests": [
+            {"id": "ok", "url": "periods"},
+            {"id": "missing", "url": "nope"},
+            {"id": "write", "method": "POST", "url": "payments"},
+            {"id": "fails", "url": "periods?fail=1"},
+        ]})
+        responses = {r["id"]: r for r in asyncio.run(run_batch(dispatcher, requests))}
+
+        assert responses["ok"]["status"] == 200
+        assert responses["missing"]["status"] == 404
+        assert responses["write"]["status"] == 405
+        assert responses["fails"]["status"] == 500
+        assert responses["fails"]["body"] == {"error": "boom"}
+
+    def test_sub_requests_are_not_compressed(self, dispatcher):
+        requests = parse_batch({"requests": [
+            {"url": "periods", "headers": {"Accept-Encoding": "gzip"}},
+        ]})
+        response, = asyncio.run(run_batch(dispatcher, requests, {"Accept-Encoding": "gzip"}))
+
+        assert response["body"]["accept_encoding"] is None
+
+
+class TestBatchFunction:
+    """Test POST /api/$batch."""
+
+    @pytest.fixture
+    def batch(self, dispatcher):
+        spec = importlib.util.spec_from_file_location(
+            "batch_function", os.path.join(api_dir, "batch", "__init__.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module._dispatcher = dispatcher
+        return module
+
+    def post(self, batch, body):
+        req = func.HttpRequest(method='POST', url='http://localhost/api/$batch', body=body)
+        return asyncio.run(batch.main(req))
+
+    def test_returns_all_responses(self, batch):
+        response = self.post(batch, json.dumps({"requests": [
+            {"id": "a", "url": "dashboard/1"}, {"id": "b", "url": "periods"}
+        ]}).encode())
+
+        assert response.status_code == 200
+        body = json.loads(response.get_body())
+        assert [r["id"] for r in body["responses"]] == ["a", "b"]
+
+    @pytest.mark.parametrize("body", [b"not json", b'{"requests": []}'])
+    def test_bad_body(self, batch, body):
+        response = self.post(batch, body)
+
+        assert response.status_code == 400
+        assert "error" in json.loads(response.get_body())
+
+    def test_batched_get_reads_from_replica(self, batch, tmp_path):
+        add_function(tmp_path, "clients", handler=READ_HANDLER)
+        batch._dispatcher = Dispatcher(api_dir=str(tmp_path))
+        env = {'SQL_AUTH': 'sql', 'SQL_SERVER': 'primary', 'SQL_DATABASE': 'test',
+               'SQL_USER': 'sa', 'SQL_PASSWORD': 'secret',
+               'SQL_READ_REPLICA': 'on', 'SQL_READ_SERVER': 'replica'}
+        with patch.dict('os.environ', env), \
+                patch('database.database.pyodbc.connect') as connect, \
+                patch.object(database_module, 'read_router', ReadRouter(staleness=30)):
+            connect.return_value.cursor.return_value = MagicMock()
+            response = self.post(batch, json.dumps({"requests": [{"url": "clients"}]}).encode())
+
+        assert json.loads(response.get_body())["responses"][0]["status"] == 200
+        servers = [c[0][0].split('Server=tcp:')[1].split(',')[0] for c in connect.call_args_list]
+        assert servers == ['replica']
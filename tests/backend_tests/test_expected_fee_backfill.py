@@ -0,0 +1,109 @@
+"""
+Tests for stored expected fees and the chunked backfill.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock, patch
+
+from services.expected_fee_backfill import (
+    MAX_CHUNK_SIZE,
+    backfill,
+    recompute_expected_fees
+)
+
+PAYMENT_COLUMNS = ('payment_id', 'client_id', 'total_assets', 'received_date',
+                   'applied_period_type', 'applied_period', 'applied_year')
+
+# Client 1 pays 0.1%; client 2 has no contract
+CONTRACT_ROWS = [(1, 11, '2023-01-01', None, None, 'percentage', 0.001, None)]
+
+
+@pytest.fixture
+def cursor():
+    cursor = MagicMock()
+    cursor.description = [(name,) for name in PAYMENT_COLUMNS]
+    cursor.fetchall.side_effect = [
+        [(7, 1, 1000000.0, None, 'quarterly', 1, 2024),
+         (8, 1, 250000.0, None, 'quarterly', 2, 2024),
+         (9, 2, 1000000.0, None, 'quarterly', 2, 2024)],
+        CONTRACT_ROWS,
+    ]
+    return cursor
+
+
+class TestRecomputeExpectedFees:
+    """Test computing and storing fees for a set of payments."""
+
+    def test_updates_fees_in_one_statement(self, cursor):
+        assert recompute_expected_fees(cursor, [7, 8, 9]) == [7, 8]
+
+        query, params = cursor.execute.call_args[0]
+        assert "UPDATE p" in query and "(?, ?), (?, ?), (?, ?)" in query
+        assert "IS NULL" not in query
+        # Payment 9 no longer has a fee, so its stored one is cleared
+        assert params == [7, 1000.0, 8, 250.0, 9, None]
+
+    def test_only_missing_guards_the_update(self, cursor):
+        assert recompute_expected_fees(cursor, [7, 8, 9], only_missing=True) == [7, 8]
+        query, params = cursor.execute.call_args[0]
+        assert "WHERE p.expected_fee IS NULL" in query
+        assert params == [7, 1000.0, 8, 250.0]
+
+    def test_no_ids_is_noop(self):
+        cursor = MagicMock()
+        assert recompute_expected_fees(cursor, []) == []
+        cursor.execute.assert_not_called()
+
+    def test_rejects_oversized_chunk(self):
+        with pytest.raises(ValueError):
+            recompute_expected_fees(MagicMock(), range(MAX_CHUNK_SIZE + 1))
+
+
+class TestBackfill:
+    """Test chunking, keyset progress and stats."""
+
+    def test_walks_chunks_by_payment_id(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (5,)
+        cursor.fetchall.side_effect = [[(1,), (2,)], [(3,), (4,)], [(5,)]]
+        progress = []
+
+        with patch('services.expected_fee_backfill.recompute_expected_fees',
+                   side_effect=lambda c, ids, only_missing: [i for i in ids if i != 4]) as recompute:
+            stats = backfill(db, chunk_size=2, progress=progress.append)
+
+        keyset = [c[0][1] for c in cursor.execute.call_args_list if 'next_chunk' in c[0][0]]
+        assert keyset == [[2, 0], [2, 2], [2, 4]]
+        assert all(c.kwargs['only_missing'] for c in recompute.call_args_list)
+        assert [s['chunks'] for s in progress] == [1, 2, 3]
+        assert {k: stats[k] for k in ('chunks', 'scanned', 'filled', 'skipped', 'remaining')} == \
+            {'chunks': 3, 'scanned': 5, 'filled': 4, 'skipped': 1, 'remaining': 0}
+
+    def test_max_chunks(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (10,)
+        cursor.fetchall.return_value = [(1,), (2,)]
+
+        with patch('services.expected_fee_backfill.recompute_expected_fees', return_value=[1, 2]):
+            stats = backfill(db, chunk_size=2, max_chunks=1, progress=None)
+
+        assert stats['chunks'] == 1
+        assert stats['remaining'] == 8
+
+    def test_enqueues_filled_quarters_if_deferred(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (2,)
+        cursor.fetchall.return_value = [(1,), (2,)]
+
+        with patch('services.expected_fee_backfill.recompute_expected_fees', return_value=[2]):
+            backfill(db, chunk_size=5, progress=None)
+
+        query, params = cursor.execute.call_args[0]
+        assert "summary_dirty_keys" in query and "is_disabled = 1" in query
+        assert params == [2]
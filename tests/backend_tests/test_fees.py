@@ -0,0 +1,183 @@
+"""
+Tests for the fee engine: pinned results, scalar/array parity and parity
+with the client_payment_status view.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import random
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+from services.fees import (
+    VARIANCE_STATUSES,
+    expected_fee,
+    expected_fees,
+    fee_type_codes,
+    round_cents,
+    round_cents_array,
+    to_optional,
+    variance,
+    variance_labels,
+    variances
+)
+
+# (fee_type, flat_rate, percent_rate, assets) -> expected fee
+PINNED_FEES = [
+    (('flat', 250.0, None, 1e6), 250.0),
+    (('flat', 250.0, 0.001, None), 250.0),
+    (('flat', None, None, 1e6), None),
+    (('percentage', None, 0.0025, 1000000.0), 2500.0),
+    (('percentage', None, 0.00125, 733412.37), 916.77),
+    (('percentage', None, 0.0007, 1234567.89), 864.2),
+    (('percentage', 100.0, 0.0, 5e5), 0.0),
+    (('percentage', None, None, 1e6), None),
+    (('percentage', None, 0.0025, None), None),
+    ((None, 250.0, 0.0025, 1e6), None),
+    (('annual', 250.0, 0.0025, 1e6), None),
+]
+
+# (actual, expected) -> status
+PINNED_VARIANCES = [
+    ((1000.0, 1000.0), 'exact'),
+    ((1000.004, 1000.0), 'exact'),
+    ((1049.0, 1000.0), 'acceptable'),
+    ((950.0, 1000.0), 'acceptable'),
+    ((1120.0, 1000.0), 'warning'),
+    ((1151.0, 1000.0), 'alert'),
+    ((0.0, 1000.0), 'alert'),
+    ((1000.0, 0.0), 'unknown'),
+    ((1000.0, None), 'unknown'),
+    ((None, 1000.0), 'unknown'),
+]
+
+
+def sql_round(value):
+    """T-SQL ROUND(value, 2): half away from zero."""
+    return float(Decimal(repr(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def view_expected_fee(fee_type, flat_rate, percent_rate, last_recorded_assets):
+    """The view's expected_fee CASE (migrations/004), transcribed with SQL NULLs."""
+    if fee_type == 'flat':
+        return flat_rate
+    if fee_type == 'percentage' and last_recorded_assets is not None:
+        if percent_rate is None:
+            return None
+        return sql_round(last_recorded_assets * percent_rate)
+    return None
+
+
+def random_rows(count, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        rows.append((
+            rng.choice(['flat', 'percentage', 'percentage', None, 'other']),
+            rng.choice([None, 0.0, round(rng.uniform(100, 5000), 2)]),
+            rng.choice([None, 0.0, round(rng.uniform(0.0001, 0.003), 6)]),
+            rng.choice([None, 0.0, round(rng.uniform(1e4, 5e7), 2)]),
+        ))
+    return rows
+
+
+def columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+
+class TestExpectedFee:
+    """Test expected fees."""
+
+    @pytest.mark.parametrize("args,expected", PINNED_FEES)
+    def test_pinned(self, args, expected):
+        assert expected_fee(*args) == expected
+        assert to_optional(expected_fees(*columns([args]))) == [expected]
+
+    def test_percent_rate_is_a_fraction(self):
+        # 0.25% of $1M, not a hundredth of it
+        assert expected_fee('percentage', None, 0.0025, 1e6) == 2500.0
+
+    def test_round_cents_half_away_from_zero(self):
+        assert [round_cents(v) for v in (0.125, 0.375, -0.125, 0.5, -0.004)] == [0.13, 0.38, -0.13, 0.5, 0.0]
+
+    def test_round_cents_matches_array(self):
+        values = [0.125, 0.135, 2.675, 1.005, 916.765, 1e6 * 0.00125, -0.125, 0.0]
+        assert [round_cents(v) for v in values] == round_cents_array(np.array(values)).tolist()
+
+    def test_array_path_matches_scalar_path(self):
+        rows = random_rows(20000)
+        vector = to_optional(expected_fees(*columns(rows)))
+        assert vector == [expected_fee(*row) for row in rows]
+
+    def test_accepts_fee_type_codes(self):
+        rows = random_rows(500)
+        fee_types, *rest = columns(rows)
+        by_name = expected_fees(fee_types, *rest)
+        by_code = expected_fees(fee_type_codes(fee_types), *rest)
+        np.testing.assert_array_equal(by_name, by_code)
+
+
+class TestViewParity:
+    """The engine and the view's CASE agree on every row."""
+
+    def test_matches_view_case(self):
+        for row in random_rows(20000, seed=11):
+            engine, view = expected_fee(*row), view_expected_fee(*row)
+            if engine is None or view is None:
+                assert engine is view, row
+            else:
+                # Decimal and binary rounding differ at most on half-cent ties
+                assert abs(engine - view) <= 0.01 + 1e-9, row
+
+    @pytest.mark.integration
+    def test_matches_sql_server_round(self, live_connection):
+        rows = [(a, r) for _, _, r, a in random_rows(5000, seed=13) if a is not None and r is not None]
+        rows += [(1000.0, 0.000125), (733412.37, 0.00125), (2.675, 1.0), (0.125, 1.0), (-0.125, 1.0)]
+        cursor = live_connection.cursor()
+        cursor.execute("CREATE TABLE #fee_inputs (id INT PRIMARY KEY, assets FLOAT, percent_rate FLOAT)")
+        cursor.fast_executemany = True
+        cursor.executemany("INSERT INTO #fee_inputs VALUES (?, ?, ?)",
+                           [(i, a, r) for i, (a, r) in enumerate(rows)])
+        cursor.execute("SELECT id, ROUND(assets * percent_rate, 2) FROM #fee_inputs ORDER BY id")
+
+        mismatches = [(rows[i], sql, expected_fee('percentage', None, rows[i][1], rows[i][0]))
+                      for i, sql in cursor.fetchall()
+                      if abs(sql - expected_fee('percentage', None, rows[i][1], rows[i][0])) > 1e-9]
+        assert mismatches == []
+
+
+class TestVariance:
+    """Test fee variance."""
+
+    @pytest.mark.parametrize("args,status", PINNED_VARIANCES)
+    def test_pinned(self, args, status):
+        assert variance(*args)["status"] == status
+        _, _, codes = variances(*([v] for v in args))
+        assert variance_labels(codes).tolist() == [status]
+
+    def test_message_and_numbers(self):
+        result = variance(1120.0, 1000.0)
+        assert result["message"] == "$120.00 (12.0%)"
+        assert result["difference"] == pytest.approx(120.0)
+        assert result["percent_difference"] == pytest.approx(12.0)
+        assert variance(1000.0, 0.0) == {"status": "unknown", "message": "N/A",
+                                         "difference": None, "percent_difference": None}
+
+    def test_array_path_matches_scalar_path(self):
+        rng = random.Random(3)
+        pairs = [(rng.choice([None, round(rng.uniform(0, 6000), 2)]),
+                  rng.choice([None, 0.0, round(rng.uniform(100, 5000), 2)])) for _ in range(20000)]
+        difference, percent, codes = variances(*columns(pairs))
+
+        for (actual, expected), diff, pct, code in zip(pairs, to_optional(difference),
+                                                       to_optional(percent), codes.tolist()):
+            scalar = variance(actual, expected)
+            assert VARIANCE_STATUSES[code] == scalar["status"]
+            assert diff == scalar["difference"]
+            assert pct == scalar["percent_difference"]
@@ -0,0 +1,133 @@
+"""
+Tests for provider statement ingestion.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+from services.ingestion import (
+    PROVIDER_MAPPINGS,
+    ContractIndex,
+    RowError,
+    ingest_file,
+    load_mapping,
+    parse_amount,
+    parse_period
+)
+
+
+CONTRACT_ROWS = [
+    {"contract_id": 10, "client_id": 1, "contract_number": "JH-100",
+     "payment_schedule": "quarterly", "display_name": "AirSea America", "full_name": "AirSea America 401(k) Plan"},
+    {"contract_id": 20, "client_id": 2, "contract_number": None,
+     "payment_schedule": "monthly", "display_name": "Bumgardner", "full_name": None},
+]
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database whose cursors return CONTRACT_ROWS and new payment IDs."""
+    db = MagicMock()
+    cursor = MagicMock()
+    columns = list(CONTRACT_ROWS[0].keys())
+    cursor.description = [(c,) for c in columns]
+    cursor.fetchall.return_value = [tuple(r[c] for c in columns) for r in CONTRACT_ROWS]
+    db.cursor.return_value.__enter__.return_value = cursor
+    return db
+
+
+class TestParsing:
+    """Test value parsing helpers."""
+
+    def test_parse_amount(self):
+        assert parse_amount("$1,234.50") == 1234.50
+        assert parse_amount("(12.00)") == -12.0
+        assert parse_amount("") is None
+        assert parse_amount(99.5) == 99.5
+        with pytest.raises(RowError):
+            parse_amount("n/a")
+
+    def test_parse_quarterly_period(self):
+        assert parse_period("Q1 2024", "quarterly") == (1, 2024)
+        assert parse_period("2024-Q3", "quarterly") == (3, 2024)
+        with pytest.raises(RowError):
+            parse_period("Q5 2024", "quarterly")
+
+    def test_parse_monthly_period(self):
+        assert parse_period("2024-03", "monthly") == (3, 2024)
+        assert parse_period("11/2023", "monthly") == (11, 2023)
+        assert parse_period("March 2024", "monthly") == (3, 2024)
+        with pytest.raises(RowError):
+            parse_period("2024-13", "monthly")
+
+
+class TestContractIndex:
+    """Test in-memory contract resolution."""
+
+    def test_resolve_by_number_then_name(self):
+        index = ContractIndex(CONTRACT_ROWS)
+        assert index.resolve(" jh-100 ", None)["contract_id"] == 10
+        assert index.resolve(None, "airsea america 401(k) plan")["contract_id"] == 10
+        assert index.resolve("unknown", "Bumgardner")["contract_id"] == 20
+
+    def test_unresolved_row(self):
+        with pytest.raises(RowError):
+            ContractIndex(CONTRACT_ROWS).resolve("nope", "nobody")
+
+
+class TestIngestFile:
+    """Test streaming ingestion end to end with a mock database."""
+
+    def write_csv(self, tmp_path, lines):
+        path = tmp_path / "statement.csv"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+    def test_dry_run_reports_without_writing(self, tmp_path, mock_db):
+        path = self.write_csv(tmp_path, [
+            "Contract Number,Plan Name,Deposit Date,Advisor Fee,Plan Assets",
+            "JH-100,,2024-04-15,\"$1,250.00\",\"500,000\"",
+            ",Bumgardner,05/03/2024,300.00,",
+            "XX-1,Unknown Plan,2024-04-15,10.00,",
+            "JH-100,,not a date,10.00,",
+        ])
+
+        report = ingest_file(mock_db, path, load_mapping("John Hancock"), dry_run=True)
+
+        assert report.rows_read == 4
+        assert report.rows_valid == 2
+        assert report.rows_written == 0
+        assert [e["line"] for e in report.errors] == [4, 5]
+        # Only the single index-building cursor is opened in dry-run mode
+        assert mock_db.cursor.call_count == 1
+
+    def test_writes_in_batches(self, tmp_path, mock_db, monkeypatch):
+        written = []
+
+        def fake_insert(cursor, payments):
+            written.append(list(payments))
+            return list(range(len(payments)))
+
+        monkeypatch.setattr("services.ingestion.insert_payment_batch", fake_insert)
+        path = self.write_csv(tmp_path, [
+            "Contract Number,Plan Name,Deposit Date,Advisor Fee,Plan Assets",
+            *["JH-100,,2024-04-15,100.00,1000" for _ in range(5)],
+        ])
+
+        report = ingest_file(mock_db, path, load_mapping("John Hancock"), batch_size=2)
+
+        assert [len(b) for b in written] == [2, 2, 1]
+        assert report.rows_written == 5
+        assert report.batches_written == 3
+        assert written[0][0].applied_period == 1 and written[0][0].applied_year == 2024
+
+    def test_unknown_provider_mapping(self):
+        with pytest.raises(ValueError):
+            load_mapping("Nonexistent Provider")
+        assert "voya" in PROVIDER_MAPPINGS
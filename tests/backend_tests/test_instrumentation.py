@@ -0,0 +1,193 @@
+"""
+Tests for database query instrumentation.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import logging
+from unittest.mock import MagicMock, patch
+
+from database.database import Database
+from database.instrumentation import (
+    InstrumentedCursor,
+    current_trace,
+    instrument_cursor,
+    statement_name,
+    trace_request
+)
+from database.timeouts import QueryTimeoutError, statement_timeout
+
+
+@pytest.fixture
+def db():
+    env = {'SQL_AUTH': 'sql', 'SQL_SERVER': 'localhost', 'SQL_DATABASE': 'test',
+           'SQL_USER': 'sa', 'SQL_PASSWORD': 'secret'}
+    with patch.dict('os.environ', env), patch('database.database.pyodbc.connect') as connect:
+        raw_cursor = MagicMock()
+        raw_cursor.fetchall.return_value = [(1,), (2,), (3,)]
+        raw_cursor.fetchone.return_value = (1,)
+        connect.return_value.cursor.return_value = raw_cursor
+        raw_cursor.connection = connect.return_value
+        yield Database(), raw_cursor
+
+
+class FakeConnection:
+    """Copies its timeout onto cursors when they are created, as pyodbc does."""
+
+    def __init__(self):
+        self.timeout = 0
+        self.cursors = []
+
+    def cursor(self):
+        cursor = MagicMock()
+        cursor.connection = self
+        cursor.created_timeout = self.timeout
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestStatementName:
+    """Test statement naming."""
+
+    def test_name_comment(self):
+        assert statement_name("\n    -- name: dashboard.client\n    SELECT 1") == "dashboard.client"
+
+    def test_falls_back_to_leading_text(self):
+        assert statement_name("\n  SELECT  client_id\n FROM clients  ") == "SELECT client_id FROM clients"
+
+
+class TestDisabled:
+    """No trace and no slow-query threshold means no wrapping."""
+
+    def test_cursor_is_not_wrapped(self, db):
+        database, raw_cursor = db
+        with patch.dict('os.environ', {}, clear=False):
+            os.environ.pop('DB_SLOW_QUERY_MS', None)
+            with database.cursor() as cursor:
+                assert cursor is raw_cursor
+        assert current_trace() is None
+
+
+class TestRequestTrace:
+    """Test per-request traces through Database.cursor."""
+
+    def test_records_connect_execute_fetch(self, db):
+        database, raw_cursor = db
+        with trace_request("dashboard") as trace:
+            with database.cursor(commit=False) as cursor:
+                assert isinstance(cursor, InstrumentedCursor)
+                cursor.execute("-- name: clients.list\nSELECT client_id FROM clients")
+                rows = cursor.fetchall()
+                cursor.execute("SELECT 1 WHERE 1 = ?", [1])
+                cursor.fetchone()
+                cursor.description  # passes through
+
+        assert len(rows) == 3
+        data = trace.to_dict()
+        assert data["request"] == "dashboard"
+        assert data["connections"] == 1
+        assert data["queries"] == 2
+        assert data["token_ms"] == 0
+        assert [s["name"] for s in data["statements"]] == ["clients.list", "SELECT 1 WHERE 1 = ?"]
+        assert [s["rows"] for s in data["statements"]] == [3, 1]
+        raw_cursor.execute.assert_any_call("SELECT 1 WHERE 1 = ?", [1])
+        assert current_trace() is None
+
+    def test_attribute_writes_pass_through(self):
+        raw_cursor = MagicMock()
+        with trace_request() as trace:
+            cursor = instrument_cursor(raw_cursor)
+            cursor.fast_executemany = True
+            cursor.executemany("INSERT INTO t VALUES (?)", ((i,) for i in range(4)))
+        assert raw_cursor.fast_executemany is True
+        assert trace.statements[0].batch_size == 4
+
+
+class TestSlowQueryLog:
+    """Test the opt-in slow-query log."""
+
+    def test_logs_statements_over_threshold(self, db, caplog):
+        database, _ = db
+        with patch.dict('os.environ', {'DB_SLOW_QUERY_MS': '0'}):
+            with caplog.at_level(logging.WARNING, logger="database.slow_query"):
+                with database.cursor() as cursor:
+                    cursor.execute("-- name: slow.one\nSELECT 1")
+                    cursor.fetchall()
+        events = [r.custom_dimensions for r in caplog.records if r.name == "database.slow_query"]
+        assert any(e["event"] == "db.slow_query" and e["query"] == "slow.one" and e["rows"] == 3
+                   for e in events)
+        assert any("slow.one" in r.getMessage() for r in caplog.records)
+
+    def test_invalid_threshold_is_ignored(self, db):
+        database, raw_cursor = db
+        with patch.dict('os.environ', {'DB_SLOW_QUERY_MS': 'soon'}):
+            with database.cursor() as cursor:
+                assert cursor is raw_cursor
+
+
+class TestStatementTimeouts:
+    """Test per-query timeouts and cancellation."""
+
+    def test_timeout_set_per_named_query(self, db):
+        database, raw_cursor = db
+        conn = FakeConnection()
+        with patch('database.database.pyodbc.connect', return_value=conn), \
+                patch.dict('os.environ', {'DB_QUERY_TIMEOUTS': 'dashboard.client=5'}):
+            with trace_request():
+                with database.cursor() as cursor:
+                    cursor.execute("-- name: dashboard.client\nSELECT 1")
+                    cursor.execute("-- name: dashboard.payments\nSELECT 1")
+                    cursor.execute("-- name: portfolio.status\nSELECT 1")
+                    cursor.execute("SELECT 2")
+                    cursor.execute("SELECT 3")
+
+        # Each statement ran on a cursor created with its timeout
+        timeouts = [(c.created_timeout, c.execute.call_args_list[i][0][0].split('\n')[-1])
+                    for c in conn.cursors for i in range(c.execute.call_count)]
+        assert [t for t, _ in timeouts] == [5, 30, 60, 30, 30]
+        assert statement_timeout("portfolio.status") == 60
+        # The default timeout is set before the first cursor, so only changes open new ones
+        assert [c.created_timeout for c in conn.cursors] == [30, 5, 30, 60, 30]
+        assert all(c.close.called for c in conn.cursors)
+
+    def test_untraced_cursors_keep_driver_default(self, db):
+        database, raw_cursor = db
+        raw_cursor.connection.timeout = 0
+        with patch.dict('os.environ', {'DB_SLOW_QUERY_MS': '1000'}):
+            with database.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        assert raw_cursor.connection.timeout == 0
+
+    def test_driver_timeout_raises_query_timeout_error(self, db):
+        database, raw_cursor = db
+        raw_cursor.execute.side_effect = Exception('HYT00', '[HYT00] Query timeout expired')
+        with trace_request() as trace:
+            with pytest.raises(QueryTimeoutError) as excinfo:
+                with database.cursor() as cursor:
+                    cursor.execute("-- name: payments.scan\nSELECT * FROM payments")
+        assert excinfo.value.name == "payments.scan"
+        assert trace.timeouts == 1
+        assert trace.errors == 1
+
+    def test_cancel_statements_cancels_open_cursors(self, db):
+        database, raw_cursor = db
+        with trace_request() as trace:
+            with database.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                assert trace.cancel_statements() == 1
+                raw_cursor.cancel.assert_called_once()
+            assert trace.cancel_statements() == 0
@@ -0,0 +1,126 @@
+"""
+Tests for the snapshot read isolation mode.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock, patch
+
+from database.database import Database
+from database.isolation import (
+    READ_COMMITTED,
+    SNAPSHOT,
+    SNAPSHOT_SQL,
+    checked_read_isolation,
+    database_settings,
+    enable_snapshot,
+    read_isolation
+)
+
+ENV = {'SQL_AUTH': 'sql', 'SQL_SERVER': 'localhost', 'SQL_DATABASE': 'test',
+       'SQL_USER': 'sa', 'SQL_PASSWORD': 'secret'}
+
+
+@pytest.fixture
+def snapshot_db():
+    with patch.dict('os.environ', {**ENV, 'SQL_READ_ISOLATION': 'snapshot'}), \
+            patch('database.database.pyodbc.connect') as connect:
+        raw_cursor = MagicMock()
+        raw_cursor.fetchone.return_value = ('ON', 0)
+        connect.return_value.cursor.return_value = raw_cursor
+        db = Database()
+        raw_cursor.execute.reset_mock()
+        yield db, raw_cursor
+
+
+def statements(raw_cursor):
+    return [c[0][0] for c in raw_cursor.execute.call_args_list]
+
+
+class TestReadIsolation:
+    """Test the SQL_READ_ISOLATION setting."""
+
+    @pytest.mark.parametrize("value,expected", [
+        (None, READ_COMMITTED), ('snapshot', SNAPSHOT), ('SNAPSHOT', SNAPSHOT),
+        ('read_committed', READ_COMMITTED), ('rcsi', READ_COMMITTED),
+    ])
+    def test_parses(self, value, expected):
+        env = {'SQL_READ_ISOLATION': value} if value else {}
+        with patch.dict('os.environ', env, clear=True):
+            assert read_isolation() == expected
+
+    def test_database_settings(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ('ON', 0)
+        assert database_settings(cursor) == {"snapshot_isolation": 'ON', "read_committed_snapshot": False}
+
+    @pytest.mark.parametrize("state,expected", [
+        ('ON', SNAPSHOT), ('OFF', READ_COMMITTED), ('IN_TRANSITION_TO_ON', READ_COMMITTED),
+    ])
+    def test_checked_against_database(self, state, expected):
+        conn = MagicMock()
+        conn.cursor.return_value.fetchone.return_value = (state, 0)
+        with patch.dict('os.environ', {'SQL_READ_ISOLATION': 'snapshot'}):
+            assert checked_read_isolation(lambda: conn) == expected
+        conn.close.assert_called_once()
+
+    def test_check_failure_falls_back(self):
+        def connect():
+            raise RuntimeError("login failed")
+        with patch.dict('os.environ', {'SQL_READ_ISOLATION': 'snapshot'}):
+            assert checked_read_isolation(connect) == READ_COMMITTED
+
+    def test_read_committed_is_not_checked(self):
+        connect = MagicMock()
+        with patch.dict('os.environ', {}, clear=True):
+            assert checked_read_isolation(connect) == READ_COMMITTED
+        connect.assert_not_called()
+
+    def test_enable_snapshot_runs_outside_a_transaction(self):
+        db = MagicMock()
+        conn = db.connection.return_value.__enter__.return_value
+        enable_snapshot(db)
+        assert conn.autocommit is True
+        assert "ALLOW_SNAPSHOT_ISOLATION ON" in conn.cursor.return_value.execute.call_args[0][0]
+
+
+class TestDatabaseCursorIsolation:
+    """Test which cursors run under snapshot isolation."""
+
+    def test_read_only_cursor_sets_snapshot_first(self, snapshot_db):
+        db, raw_cursor = snapshot_db
+        with db.cursor(commit=False) as cursor:
+            cursor.execute("SELECT 1")
+        assert statements(raw_cursor) == [SNAPSHOT_SQL, "SELECT 1"]
+
+    def test_writing_cursors_keep_read_committed(self, snapshot_db):
+        db, raw_cursor = snapshot_db
+        with db.cursor():
+            pass
+        with db.cursor(commit=False, read_only=False):
+            pass
+        assert SNAPSHOT_SQL not in statements(raw_cursor)
+
+    def test_snapshot_not_allowed_reads_read_committed(self):
+        with patch.dict('os.environ', {**ENV, 'SQL_READ_ISOLATION': 'snapshot'}), \
+                patch('database.database.pyodbc.connect') as connect:
+            raw_cursor = connect.return_value.cursor.return_value
+            raw_cursor.fetchone.return_value = ('OFF', 0)
+            db = Database()
+            with db.cursor(commit=False):
+                pass
+        assert db.read_isolation == READ_COMMITTED
+        assert SNAPSHOT_SQL not in statements(raw_cursor)
+
+    def test_default_is_read_committed(self):
+        with patch.dict('os.environ', ENV), patch('database.database.pyodbc.connect') as connect:
+            os.environ.pop('SQL_READ_ISOLATION', None)
+            raw_cursor = connect.return_value.cursor.return_value
+            with Database().cursor(commit=False):
+                pass
+        raw_cursor.execute.assert_not_called()
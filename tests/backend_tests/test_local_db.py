@@ -0,0 +1,78 @@
+"""
+Tests for the local database schema script and seed data generator.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import re
+from datetime import date
+
+from database.local_db import (
+    CONTRACT_COLUMNS,
+    PAYMENT_COLUMNS,
+    SCHEMA_PATH,
+    iter_dataset,
+    split_batches
+)
+
+TODAY = date(2024, 10, 15)
+
+
+class TestSchemaScript:
+    """schema.sql must cover everything in the schema dump."""
+
+    def test_all_objects_created(self):
+        dump = open(os.path.join(api_dir, 'database', 'database_schema_dump.txt')).read()
+        schema = SCHEMA_PATH.read_text()
+        tables = re.findall(r'^--- (\w+) ---$', dump, flags=re.MULTILINE)
+        objects = re.findall(r'^--- (?:TRIGGER|VIEW): (\w+)', dump, flags=re.MULTILINE)
+        indexes = re.findall(r'^- \w+: (\w+) \(NONCLUSTERED\)', dump, flags=re.MULTILINE)
+
+        assert len(tables) == 9
+        for name in tables:
+            assert f"CREATE TABLE {name} (" in schema
+        for name in objects + indexes:
+            assert name in schema
+
+    def test_split_batches(self):
+        batches = split_batches("CREATE TABLE a (x INT);\nGO\n\nCREATE VIEW v AS\nSELECT 1 AS go_col\ngo\n")
+        assert batches == ["CREATE TABLE a (x INT);", "CREATE VIEW v AS\nSELECT 1 AS go_col"]
+
+
+class TestSeedGenerator:
+    """Test generated data shape and determinism."""
+
+    def test_deterministic_per_seed(self):
+        first = list(iter_dataset(20, seed=3, today=TODAY))
+        assert first == list(iter_dataset(20, seed=3, today=TODAY))
+        assert first != list(iter_dataset(20, seed=4, today=TODAY))
+
+    def test_rows_are_consistent(self):
+        data = list(iter_dataset(200, seed=1, today=TODAY))
+        contract_ids = [c[0] for d in data for c in d.contracts]
+        assert contract_ids == list(range(1, len(contract_ids) + 1))
+
+        for client in data:
+            schedule = client.contracts[0][CONTRACT_COLUMNS.index('payment_schedule')]
+            active = [c for c in client.contracts if c[CONTRACT_COLUMNS.index('valid_to')] is None]
+            assert len(active) == 1
+            owned = {c[0] for c in client.contracts}
+            for payment in client.payments:
+                row = dict(zip(PAYMENT_COLUMNS, payment))
+                assert row['contract_id'] in owned
+                assert row['applied_period_type'] == schedule
+                assert row['received_date'] <= TODAY.isoformat()
+                assert 1 <= row['applied_period'] <= (12 if schedule == 'monthly' else 4)
+
+    def test_mix_of_schedules_and_fee_types(self):
+        contracts = [c for d in iter_dataset(300, seed=2, today=TODAY) for c in d.contracts]
+        schedules = {c[CONTRACT_COLUMNS.index('payment_schedule')] for c in contracts}
+        fee_types = {c[CONTRACT_COLUMNS.index('fee_type')] for c in contracts}
+        assert schedules == {'monthly', 'quarterly'}
+        assert fee_types == {'flat', 'percentage'}
+        assert len(contracts) > 300
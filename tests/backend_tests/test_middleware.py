@@ -0,0 +1,143 @@
+"""
+Tests for the shared HTTP middleware and metrics registry.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+import inspect
+import json
+import logging
+from unittest.mock import MagicMock
+
+import azure.functions as func
+
+from database.instrumentation import current_trace, record_connect
+from utils import metrics
+from utils.metrics import Counter, Histogram, Registry
+from utils.middleware import http_function, json_response
+
+
+def make_request(method='GET'):
+    return func.HttpRequest(method=method, url='http://localhost/api/test', body=b'')
+
+
+class TestHttpFunction:
+    """Test the middleware wrapper."""
+
+    def test_server_timing_and_metrics(self):
+        @http_function("test/{id?}")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            assert current_trace().name == "test/{id?}"
+            record_connect(12.0)
+            return json_response({"ok": True})
+
+        before = metrics.REQUESTS.value(route="test/{id?}", method="GET", status="200")
+        response = asyncio.run(main(make_request()))
+
+        assert json.loads(response.get_body()) == {"ok": True}
+        timing = response.headers['Server-Timing']
+        assert timing.startswith("db;dur=12.0, serialize;dur=")
+        assert "total;dur=" in timing
+        assert metrics.REQUESTS.value(route="test/{id?}", method="GET", status="200") == before + 1
+
+    def test_unhandled_exception_becomes_500(self):
+        @http_function("test/error")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            raise RuntimeError("boom")
+
+        response = asyncio.run(main(make_request('POST')))
+
+        assert response.status_code == 500
+        assert json.loads(response.get_body()) == {"error": "boom"}
+        assert 'Server-Timing' in response.headers
+        assert metrics.REQUESTS.value(route="test/error", method="POST", status="500") >= 1
+
+    def test_signature_preserved_for_bindings(self):
+        async def handler(req: func.HttpRequest) -> func.HttpResponse:
+            return json_response({})
+
+        wrapped = http_function("test")(handler)
+        parameters = inspect.signature(wrapped).parameters
+        assert list(parameters) == ['req', 'context']
+        assert parameters['req'].annotation is func.HttpRequest
+        assert parameters['context'].annotation is func.Context
+
+
+    def test_request_event_carries_invocation_id(self, caplog):
+        @http_function("test/events")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            return json_response([])
+
+        context = MagicMock(invocation_id="inv-1")
+        context.trace_context.trace_parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        with caplog.at_level(logging.INFO, logger="hohimer.telemetry"):
+            asyncio.run(main(make_request(), context))
+
+        event = next(r.custom_dimensions for r in caplog.records
+                     if getattr(r, 'custom_dimensions', {}).get("event") == "request.completed")
+        assert event["route"] == "test/events"
+        assert event["invocation_id"] == "inv-1"
+        assert event["operation_id"] == "0af7651916cd43dd8448eb211c80319c"
+        assert event["status"] == 200
+
+
+class TestMetricsRegistry:
+    """Test Prometheus text rendering."""
+
+    def test_render_counter_and_histogram(self):
+        registry = Registry()
+        requests = registry.register(Counter('x_requests_total', 'Requests.', ('route',)))
+        latency = registry.register(Histogram('x_latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1)))
+
+        requests.inc(route='a"b')
+        latency.observe(0.05, route='a')
+        latency.observe(0.5, route='a')
+        latency.observe(3, route='a')
+        text = registry.render()
+
+        assert '# TYPE x_requests_total counter' in text
+        assert 'x_requests_total{route="a\\"b"} 1' in text
+        assert 'x_latency_seconds_bucket{route="a",le="0.1"} 1' in text
+        assert 'x_latency_seconds_bucket{route="a",le="1"} 2' in text
+        assert 'x_latency_seconds_bucket{route="a",le="+Inf"} 3' in text
+        assert 'x_latency_seconds_count{route="a"} 3' in text
+        assert 'x_latency_seconds_sum{route="a"} 3.55' in text
+
+    def test_default_registry_includes_connection_gauges(self):
+        text = metrics.REGISTRY.render()
+        assert 'hohimer_db_connections_in_use ' in text
+        assert 'hohimer_db_connections_opened_total ' in text
+
+
+class TestQueryTimeouts:
+    """Test distinct reporting of statement timeouts."""
+
+    def test_timed_out_query_returns_504(self):
+        @http_function("test/timeout")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            current_trace().timeouts += 1
+            return func.HttpResponse(json.dumps({"error": "timed out"}), status_code=500)
+
+        response = asyncio.run(main(make_request()))
+
+        assert response.status_code == 504
+        assert metrics.DB_TIMEOUTS.value(route="test/timeout") >= 1
+
+    def test_cancelled_request_cancels_statements(self):
+        cancelled = []
+
+        @http_function("test/cancel")
+        async def main(req: func.HttpRequest) -> func.HttpResponse:
+            trace = current_trace()
+            trace.cancel_statements = lambda: cancelled.append(True)
+            raise asyncio.CancelledError()
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(main(make_request()))
+        assert cancelled == [True]
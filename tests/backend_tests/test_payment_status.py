@@ -0,0 +1,245 @@
+"""
+Tests for Python payment status and its parity with client_payment_status.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+from services.payment_status import (
+    LatestPayment,
+    PeriodClock,
+    StatusIndex,
+    client_status,
+    collection_period,
+    note_payment_write,
+    ordinal_period,
+    payment_client_id,
+    payment_status,
+    period_ordinal
+)
+
+
+def view_current(today, schedule):
+    """The view's current_period/current_year CASE expressions, transcribed."""
+    month, quarter, year = today.month, (today.month - 1) // 3 + 1, today.year
+    if schedule == 'monthly':
+        period = 12 if month == 1 else month - 1
+    elif schedule == 'quarterly':
+        period = 4 if quarter == 1 else quarter - 1
+    else:
+        period = None
+    if month == 1 and schedule == 'monthly':
+        current_year = year - 1
+    elif quarter == 1 and schedule == 'quarterly':
+        current_year = year - 1
+    else:
+        current_year = year
+    return period, current_year
+
+
+def view_status(today, schedule, applied_year, applied_period, applied_period_type):
+    """The view's payment_status CASE and period_ordinal column, transcribed with SQL NULLs."""
+    _, current_year = view_current(today, schedule)
+    if applied_year is None:
+        return 'Due'
+    ordinal = None if applied_period is None else \
+        applied_year * 12 + (applied_period if applied_period_type == 'monthly' else applied_period * 3) - 1
+    quarter = (today.month - 1) // 3 + 1
+    current_ordinal = {
+        'monthly': today.year * 12 + today.month - 2,
+        'quarterly': today.year * 12 + (quarter - 1) * 3 - 1,
+    }.get(schedule)
+    if ordinal is None or current_ordinal is None:
+        return 'Due' if applied_year < current_year else 'Paid'
+    return 'Due' if ordinal < current_ordinal else 'Paid'
+
+
+def latest(year, period, period_type='quarterly'):
+    return LatestPayment('2024-01-01', 1, period, year, period_type)
+
+
+class TestCollectionPeriod:
+    """Test the arrears period arithmetic."""
+
+    def test_is_in_arrears(self):
+        assert collection_period(date(2024, 4, 15), "quarterly") == (1, 2024)
+        assert collection_period(date(2024, 2, 1), "quarterly") == (4, 2023)
+        assert collection_period(date(2024, 1, 10), "monthly") == (12, 2023)
+        assert collection_period(date(2024, 7, 10), "monthly") == (6, 2024)
+
+    def test_clock_recomputes_only_when_day_changes(self):
+        days = iter([date(2024, 3, 31), date(2024, 3, 31), date(2024, 4, 1)])
+        clock = PeriodClock(today=lambda: next(days))
+        assert clock.current_period('quarterly') == (4, 2023)
+        cached = clock._periods
+        assert clock.current_period('monthly') == (2, 2024)
+        assert clock._periods is cached
+        assert clock.current_period('quarterly') == (1, 2024)
+
+    def test_unknown_schedule_matches_view(self):
+        clock = PeriodClock(today=lambda: date(2024, 2, 1))
+        assert clock.current_period('annual') == view_current(date(2024, 2, 1), 'annual')
+
+
+class TestPeriodOrdinal:
+    """Test the payments.period_ordinal mirror."""
+
+    def test_ordinal_is_last_month_of_period(self):
+        assert period_ordinal(3, 2024, 'monthly') == 2024 * 12 + 2
+        assert period_ordinal(1, 2024, 'quarterly') == period_ordinal(3, 2024, 'monthly')
+        assert period_ordinal(4, 2023, None) == period_ordinal(12, 2023, 'monthly')
+        assert period_ordinal(None, 2024, 'monthly') is None
+        assert period_ordinal(1, None, 'monthly') is None
+
+    @pytest.mark.parametrize("period_type,periods", [("monthly", 12), ("quarterly", 4)])
+    def test_round_trips(self, period_type, periods):
+        for year in (2023, 2024):
+            for period in range(1, periods + 1):
+                assert ordinal_period(period_ordinal(period, year, period_type), period_type) == (period, year)
+
+    def test_month_maps_to_its_quarter(self):
+        assert ordinal_period(period_ordinal(5, 2024, 'monthly'), 'quarterly') == (2, 2024)
+        assert ordinal_period(period_ordinal(12, 2023, 'monthly'), 'quarterly') == (4, 2023)
+
+
+class TestViewParity:
+    """Exhaustive comparison with the view's CASE logic."""
+
+    @pytest.mark.parametrize("schedule", ["monthly", "quarterly", "annual"])
+    def test_every_day_and_period(self, schedule):
+        day = date(2023, 1, 1)
+        applied = [(None, None, None), (2024, None, 'quarterly')] + [
+            (year, period, period_type)
+            for year in (2022, 2023, 2024)
+            for period_type, periods in (('monthly', 12), ('quarterly', 4))
+            for period in range(1, periods + 1)
+        ]
+        while day <= date(2024, 12, 31):
+            clock = PeriodClock(today=lambda: day)
+            current = clock.current_period(schedule)
+            assert current == view_current(day, schedule)
+            for year, period, period_type in applied:
+                payment = None if year is None else latest(year, period, period_type)
+                assert payment_status(payment, current, schedule) == \
+                    view_status(day, schedule, year, period, period_type), (day, schedule, year, period)
+            day += timedelta(days=1)
+
+    def test_mixed_period_types_compare_by_month(self):
+        # Collecting Q1 2024: March 2024 covers it, February does not
+        assert payment_status(latest(2024, 3, 'monthly'), (1, 2024), 'quarterly') == 'Paid'
+        assert payment_status(latest(2024, 2, 'monthly'), (1, 2024), 'quarterly') == 'Due'
+        # Collecting May 2024: Q2 2024 covers it
+        assert payment_status(latest(2024, 2, 'quarterly'), (5, 2024), 'monthly') == 'Paid'
+
+
+class TestStatusIndex:
+    """Test index loading and write-driven refresh."""
+
+    def make_cursor(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(1, '2024-04-10', 7, 1, 2024, 'quarterly')]
+        return cursor
+
+    def test_client_read_once_until_ttl(self):
+        now = [0.0]
+        index = StatusIndex(ttl=60, clock=lambda: now[0])
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = [('2024-04-10', 7, 1, 2024, 'quarterly'), None,
+                                       ('2024-07-09', 9, 2, 2024, 'quarterly')]
+
+        assert index.latest(cursor, 1).applied_period == 1
+        assert index.latest(cursor, 2) is None
+        assert index.latest(cursor, 1).applied_period == 1
+        assert index.latest(cursor, 2) is None
+        assert cursor.execute.call_count == 2
+
+        # Only the expired client is read again, never the whole index
+        now[0] = 61.0
+        assert index.latest(cursor, 1).applied_period == 2
+        assert cursor.execute.call_count == 3
+        assert all("TOP 1" in c[0][0] for c in cursor.execute.call_args_list)
+
+    def test_load_fills_every_client(self):
+        index = StatusIndex(clock=lambda: 0.0)
+        cursor = self.make_cursor()
+        index.load(cursor)
+
+        assert index.latest(cursor, 1).payment_id == 7
+        assert cursor.execute.call_count == 1
+
+    def test_write_during_load_stays_stale(self):
+        index = StatusIndex(clock=lambda: 0.0)
+        cursor = self.make_cursor()
+        cursor.execute.side_effect = lambda *args: index.mark_stale([1])
+        index.load(cursor)
+
+        cursor.execute.side_effect = None
+        cursor.fetchone.return_value = ('2024-07-09', 9, 2, 2024, 'quarterly')
+        assert index.latest(cursor, 1).payment_id == 9
+
+    def test_write_during_client_read_stays_stale(self):
+        index = StatusIndex(clock=lambda: 0.0)
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ('2024-04-10', 7, 1, 2024, 'quarterly')
+        cursor.execute.side_effect = lambda *args: index.mark_stale([1])
+        index.latest(cursor, 1)
+
+        index.latest(cursor, 1)
+        assert cursor.execute.call_count == 2
+
+    def test_stale_client_reloaded_alone(self):
+        index = StatusIndex(clock=lambda: 0.0)
+        cursor = self.make_cursor()
+        index.load(cursor)
+
+        index.mark_stale([1])
+        cursor.fetchone.return_value = ('2024-07-09', 9, 2, 2024, 'quarterly')
+        assert index.latest(cursor, 1).payment_id == 9
+        assert "TOP 1" in cursor.execute.call_args[0][0]
+
+        # Stale client whose payments were all deleted
+        index.mark_stale([1])
+        cursor.fetchone.return_value = None
+        assert index.latest(cursor, 1) is None
+
+    def test_client_status_row(self):
+        index = StatusIndex(clock=lambda: 0.0)
+        index.load(self.make_cursor())
+        clock = PeriodClock(today=lambda: date(2024, 7, 2))
+        client = {"client_id": 1, "display_name": "AirSea", "payment_schedule": "quarterly",
+                  "fee_type": "flat", "flat_rate": 500.0, "percent_rate": None,
+                  "last_payment_date": "2024-04-10", "last_payment_amount": 500.0,
+                  "last_recorded_assets": None}
+
+        row = client_status(MagicMock(), client, index, clock)
+
+        assert (row["current_period"], row["current_year"]) == (2, 2024)
+        assert row["applied_period"] == 1
+        assert row["payment_status"] == 'Due'
+        assert row["expected_fee"] == 500.0
+
+
+class TestPaymentWrites:
+    """Test marking clients stale after committed payment writes."""
+
+    def test_note_payment_write_skips_unknown_clients(self):
+        index = StatusIndex()
+        with patch('services.payment_status.status_index', index):
+            note_payment_write(1, None, 2)
+        assert index._stale == {1, 2}
+
+    def test_payment_client_id(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (7,)
+        assert payment_client_id(cursor, 3) == 7
+        assert cursor.execute.call_args[0][1] == [3]
+
+        cursor.fetchone.return_value = None
+        assert payment_client_id(cursor, 4) is None
@@ -0,0 +1,64 @@
+"""
+Tests for the payments endpoint.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+import importlib.util
+import json
+from unittest.mock import patch
+
+import azure.functions as func
+
+
+@pytest.fixture
+def payments():
+    spec = importlib.util.spec_from_file_location(
+        "payments_function", os.path.join(api_dir, "payments", "__init__.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestUpdate:
+    """Test PUT /api/payments/{id}."""
+
+    def put(self, payments, db):
+        req = func.HttpRequest(method='PUT', url='http://localhost/api/payments/5',
+                               route_params={'id': '5'},
+                               body=json.dumps({'notes': 'late'}).encode())
+        with patch.object(payments, 'get_db', return_value=db), \
+                patch.object(payments, 'enqueue_payment') as enqueue, \
+                patch.object(payments, 'mark_payment_stale') as mark_stale, \
+                patch.object(payments, 'note_payment_write') as note_write:
+            response = asyncio.run(payments.main(req))
+        return response, enqueue, mark_stale, note_write
+
+    def test_missing_payment_has_no_side_effects(self, payments, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = None
+
+        response, enqueue, mark_stale, note_write = self.put(payments, db)
+
+        assert response.status_code == 404
+        enqueue.assert_not_called()
+        mark_stale.assert_not_called()
+        note_write.assert_not_called()
+        assert not any("UPDATE payments" in c.args[0] for c in cursor.execute.call_args_list)
+
+    def test_updates_and_refreshes_both_clients(self, payments, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.side_effect = [(3,), (4,)]
+
+        response, enqueue, mark_stale, note_write = self.put(payments, db)
+
+        assert response.status_code == 200
+        assert enqueue.call_count == 2
+        assert mark_stale.call_count == 2
+        note_write.assert_called_once_with(3, 4)
@@ -0,0 +1,84 @@
+"""
+Tests for execution plan checks.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+from database.plans import check_seeks, estimated_plan, index_accesses, inline_params
+
+
+def showplan(*operators):
+    """Minimal showplan XML with one RelOp per (op, table, index)."""
+    relops = "".join(
+        f'<RelOp PhysicalOp="{op}"><IndexScan>'
+        f'<Object Database="[hohimer]" Schema="[dbo]" Table="[{table}]" Index="[{index}]" />'
+        f'</IndexScan></RelOp>'
+        for op, table, index in operators
+    )
+    return ('<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan">'
+            '<BatchSequence><Batch><Statements><StmtSimple><QueryPlan>'
+            f'<RelOp PhysicalOp="Stream Aggregate"><StreamAggregate>{relops}</StreamAggregate></RelOp>'
+            '</QueryPlan></StmtSimple></Statements></Batch></BatchSequence></ShowPlanXML>')
+
+
+class TestIndexAccesses:
+    """Test showplan parsing."""
+
+    def test_lists_seeks_and_scans(self):
+        plan = showplan(("Index Seek", "payments", "idx_payments_period_ordinal"),
+                        ("Clustered Index Scan", "contracts", "PK_contracts"))
+        accesses = index_accesses(plan)
+
+        assert [(a.op, a.table, a.index) for a in accesses] == [
+            ("Index Seek", "payments", "idx_payments_period_ordinal"),
+            ("Clustered Index Scan", "contracts", "PK_contracts"),
+        ]
+        assert accesses[0].is_seek and not accesses[1].is_seek
+
+    def test_ignores_operators_without_an_index(self):
+        assert index_accesses(showplan()) == []
+
+
+class TestInlineParams:
+    """Test literal substitution."""
+
+    def test_writes_literals(self):
+        assert inline_params("WHERE a = ? AND b = ?", [7, "it's"]) == "WHERE a = 7 AND b = N'it''s'"
+
+    @pytest.mark.parametrize("params", [[1], [1, 2, 3], [1, 2.5]])
+    def test_rejects_wrong_count_or_type(self, params):
+        with pytest.raises(ValueError):
+            inline_params("a = ? AND b = ?", params)
+
+
+class TestCheckSeeks:
+    """Test plan requests and verdicts."""
+
+    def test_showplan_is_turned_off_after_an_error(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = [None, RuntimeError("syntax"), None]
+        with pytest.raises(RuntimeError):
+            estimated_plan(cursor, "SELECT 1")
+        assert cursor.execute.call_args_list[-1][0][0] == "SET SHOWPLAN_XML OFF"
+
+    def test_seek_passes_and_scan_fails(self):
+        cursor = MagicMock()
+        seek = showplan(("Index Seek", "payments", "idx_payments_period_ordinal"))
+        scan = showplan(("Index Seek", "payments", "idx_payments_period_ordinal"),
+                        ("Index Scan", "payments", "idx_payments_client_id"))
+        cursor.fetchone.side_effect = [(seek,), (scan,), (seek,)]
+
+        results = check_seeks(cursor, client_id=42, year=2024)
+
+        assert [r["ok"] for r in results.values()] == [True, False, True]
+        compiled = [c[0][0] for c in cursor.execute.call_args_list
+                    if not c[0][0].startswith("SET SHOWPLAN_XML")]
+        assert all("?" not in sql and "42" in sql for sql in compiled)
+        assert "BETWEEN 24288 AND 24299" in compiled[1]
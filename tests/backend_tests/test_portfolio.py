@@ -0,0 +1,87 @@
+"""
+Tests for the portfolio dashboard query and serialization.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from services.portfolio import collection_quarters, iter_portfolio_json, portfolio_query
+
+COLUMNS = ["client_id", "display_name", "provider_name", "payment_schedule", "fee_type",
+           "current_period", "current_year", "payment_status", "expected_fee",
+           "last_payment_date", "last_payment_amount", "last_recorded_assets",
+           "ytd_payments", "quarter_payments"]
+
+
+def status_row(client_id, provider, schedule, status, expected, ytd):
+    period = 9 if schedule == 'monthly' else 3
+    return (client_id, f"Client {client_id}", provider, schedule, "flat", period, 2024,
+            status, expected, date(2024, 7, 15), Decimal("100.00"), None, ytd, None)
+
+
+@pytest.fixture
+def cursor():
+    cursor = MagicMock()
+    cursor.description = [(c,) for c in COLUMNS]
+    rows = [
+        status_row(1, "Voya", "quarterly", "Paid", Decimal("250.00"), Decimal("750.00")),
+        status_row(2, "Voya", "monthly", "Due", Decimal("50.00"), None),
+        status_row(3, None, "quarterly", "Due", None, Decimal("10.50")),
+    ]
+    cursor.fetchmany.side_effect = [rows[:2], rows[2:], []]
+    return cursor
+
+
+class TestCollectionQuarters:
+    """Test the arrears period used for quarter totals."""
+
+    def test_mid_year(self):
+        assert collection_quarters(date(2024, 10, 2)) == ((2024, 3), (2024, 3))
+        assert collection_quarters(date(2024, 7, 1)) == ((2024, 2), (2024, 2))
+        assert collection_quarters(date(2024, 8, 1)) == ((2024, 3), (2024, 2))
+
+    def test_january_rolls_back_a_year(self):
+        assert collection_quarters(date(2025, 1, 20)) == ((2024, 4), (2024, 4))
+        assert collection_quarters(date(2025, 2, 20)) == ((2025, 1), (2024, 4))
+
+    def test_status_filter_is_parameterized(self):
+        sql, params = portfolio_query(date(2024, 10, 2), "Due")
+        assert "s.payment_status = ?" in sql
+        assert params == [2024, 2024, 2024, 3, 3, "Due"]
+
+
+class TestPortfolioJson:
+    """Test chunked serialization."""
+
+    def test_body_is_valid_json_with_totals(self, cursor):
+        body = "".join(iter_portfolio_json(cursor, today=date(2024, 10, 2), chunk_size=2))
+        data = json.loads(body)
+
+        assert data["as_of"] == "2024-10-02"
+        assert [c["client_id"] for c in data["clients"]] == [1, 2, 3]
+        assert data["clients"][0]["current_period_name"] == "Q3 2024"
+        assert data["clients"][1]["current_period_name"] == "September 2024"
+        assert data["totals"]["clients"] == 3
+        assert data["totals"]["due"] == 2
+        assert data["totals"]["ytd_payments"] == 760.5
+        assert data["totals"]["by_provider"]["Voya"]["expected_fees"] == 300.0
+        assert data["totals"]["by_provider"]["Unknown"]["clients"] == 1
+        # One query for the whole portfolio
+        assert cursor.execute.call_count == 1
+
+    def test_empty_portfolio(self):
+        cursor = MagicMock()
+        cursor.description = [(c,) for c in COLUMNS]
+        cursor.fetchmany.return_value = []
+        data = json.loads("".join(iter_portfolio_json(cursor, today=date(2024, 10, 2))))
+        assert data["clients"] == []
+        assert data["totals"]["clients"] == 0
@@ -0,0 +1,62 @@
+"""
+Tests for sparse field projection.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from database.projection import Entity, Field
+
+ENTITY = Entity("payment", {
+    'payment_id': Field('p.payment_id'),
+    'total_assets': Field('p.total_assets'),
+    'fee_type': Field('co.fee_type', 'co'),
+    'client_name': Field('c.display_name', 'c'),
+}, joins={
+    'c': "JOIN clients c ON p.client_id = c.client_id",
+    'co': "LEFT JOIN contracts co ON p.contract_id = co.contract_id",
+})
+
+
+class TestParse:
+    """Test the fields parameter."""
+
+    @pytest.mark.parametrize("value", [None, "", " , "])
+    def test_empty_selects_every_field(self, value):
+        assert ENTITY.parse(value) == list(ENTITY.fields)
+
+    def test_parses_and_dedupes_in_order(self):
+        assert ENTITY.parse("fee_type, payment_id,fee_type") == ['fee_type', 'payment_id']
+
+    def test_rejects_unknown_fields(self):
+        with pytest.raises(ValueError) as e:
+            ENTITY.parse("payment_id,password,1;DROP TABLE payments")
+
+        message = str(e.value)
+        assert "password" in message
+        assert "DROP TABLE" in message
+        assert "Allowed: payment_id" in message
+
+
+class TestSql:
+    """Test SELECT lists and join elimination."""
+
+    def test_select_list_aliases_fields(self):
+        assert ENTITY.select_list(['payment_id', 'client_name']) == \
+            "p.payment_id AS payment_id, c.display_name AS client_name"
+
+    def test_unneeded_joins_are_dropped(self):
+        assert ENTITY.join_clauses(['payment_id', 'total_assets']) == ""
+
+    def test_joins_follow_declared_order(self):
+        clauses = ENTITY.join_clauses(['fee_type', 'client_name']).split('\n')
+
+        assert clauses == [ENTITY.joins['c'], ENTITY.joins['co']]
+
+    def test_filters_can_force_a_join(self):
+        assert ENTITY.join_clauses(['payment_id'], also=['co']) == ENTITY.joins['co']
@@ -0,0 +1,110 @@
+"""
+Tests for read-replica routing.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock, patch
+
+from database import database as database_module
+from database.database import Database
+from database.instrumentation import trace_request
+from database.routing import ReadRouter, pin_primary
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReadRouter:
+    """Test when reads may use the replica."""
+
+    def test_staleness_bound_after_write(self):
+        clock = FakeClock()
+        router = ReadRouter(staleness=30, clock=clock)
+        assert router.use_replica()
+
+        router.note_write()
+        clock.now += 10
+        assert not router.use_replica()
+        clock.now += 25
+        assert router.use_replica()
+
+    def test_pinned_requests_use_primary(self):
+        router = ReadRouter(staleness=30)
+        with pin_primary():
+            assert not router.use_replica()
+            with pin_primary(False):
+                assert not router.use_replica()
+        with pin_primary(False):
+            assert router.use_replica()
+
+
+@pytest.fixture
+def replica_db():
+    env = {'SQL_AUTH': 'sql', 'SQL_SERVER': 'primary', 'SQL_DATABASE': 'test',
+           'SQL_USER': 'sa', 'SQL_PASSWORD': 'secret',
+           'SQL_READ_REPLICA': 'on', 'SQL_READ_SERVER': 'replica'}
+    router = ReadRouter(staleness=30, clock=FakeClock())
+    with patch.dict('os.environ', env), \
+            patch('database.database.pyodbc.connect') as connect, \
+            patch.object(database_module, 'read_router', router):
+        connect.return_value.cursor.return_value = MagicMock()
+        yield Database(), connect, router
+
+
+def connected_server(connect):
+    return connect.call_args[0][0].split('Server=tcp:')[1].split(',')[0]
+
+
+class TestDatabaseRouting:
+    """Test Database.cursor routing."""
+
+    def test_read_connection_string(self, replica_db):
+        db, _, _ = replica_db
+        assert "Server=tcp:replica,1433;" in db.read_connection_string
+        assert db.read_connection_string.endswith("ApplicationIntent=ReadOnly")
+        assert "ApplicationIntent" not in db.connection_string
+
+    def test_replica_disabled_by_default(self):
+        with patch.dict('os.environ', {'SQL_SERVER': 'primary', 'SQL_DATABASE': 'test'}):
+            os.environ.pop('SQL_READ_REPLICA', None)
+            assert Database().read_connection_string is None
+
+    def test_reads_use_replica_and_writes_pin_primary(self, replica_db):
+        db, connect, router = replica_db
+        with trace_request() as trace:
+            with db.cursor(commit=False):
+                assert connected_server(connect) == 'replica'
+            with db.cursor():
+                assert connected_server(connect) == 'primary'
+            with db.cursor(commit=False):
+                assert connected_server(connect) == 'primary'
+        assert trace.replica_connections == 1
+
+        router._clock.now += 31
+        with db.cursor(commit=False):
+            assert connected_server(connect) == 'replica'
+
+    def test_falls_back_to_primary(self, replica_db):
+        db, connect, _ = replica_db
+        primary = MagicMock()
+
+        def connect_to(connection_string):
+            if 'replica' in connection_string:
+                raise database_module.pyodbc.Error("replica down")
+            return primary
+
+        connect.side_effect = connect_to
+        with db.cursor(commit=False):
+            pass
+        primary.cursor.assert_called_once()
@@ -0,0 +1,186 @@
+"""
+Tests for request coalescing.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import asyncio
+import threading
+from unittest.mock import patch
+
+from utils.single_flight import SingleFlight, default_window
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSingleFlight:
+    """Test sharing one execution per key."""
+
+    def test_concurrent_callers_share_one_load(self):
+        flight = SingleFlight("test", window=0)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"rows": 3}
+
+        async def run():
+            return await asyncio.gather(*(flight.do(("k", 1), load) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        assert calls == [1]
+        assert all(r is results[0] for r in results)
+        assert flight.stats() == {"executed": 1, "shared": 4, "reused": 0, "errors": 0}
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight("test", window=0)
+
+        async def run():
+            return await asyncio.gather(
+                flight.do(1, lambda: asyncio.sleep(0, result="a")),
+                flight.do(2, lambda: asyncio.sleep(0, result="b")))
+
+        assert asyncio.run(run()) == ["a", "b"]
+        assert flight.stats()["executed"] == 2
+
+    def test_sequential_calls_reload_without_window(self):
+        flight = SingleFlight("test", window=0)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return len(calls)
+
+        assert asyncio.run(flight.do("k", load)) == 1
+        assert asyncio.run(flight.do("k", load)) == 2
+
+    def test_window_reuses_recent_result(self):
+        clock = FakeClock()
+        flight = SingleFlight("test", window=0.5, clock=clock)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return len(calls)
+
+        assert asyncio.run(flight.do("k", load)) == 1
+        clock.now = 0.4
+        assert asyncio.run(flight.do("k", load)) == 1
+        clock.now = 1.0
+        assert asyncio.run(flight.do("k", load)) == 2
+        assert flight.stats()["reused"] == 1
+
+        flight.forget("k")
+        assert asyncio.run(flight.do("k", load)) == 3
+
+    def test_errors_reach_every_caller_and_are_not_reused(self):
+        flight = SingleFlight("test", window=10)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("down")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("k", load) for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, ValueError) for r in results)
+        assert calls == [1]
+
+        with pytest.raises(ValueError):
+            asyncio.run(flight.do("k", load))
+        assert calls == [1, 1]
+        assert flight.stats()["errors"] == 2
+
+    def test_callers_on_other_threads_share_the_call(self):
+        flight = SingleFlight("test", window=0)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            started.set()
+            await asyncio.to_thread(release.wait, 5)
+            return "done"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(asyncio.run(flight.do("k", load))))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(asyncio.run(flight.do("k", load))))
+        follower.start()
+        while flight.stats()["shared"] == 0:
+            pass
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert results == ["done", "done"]
+        assert calls == [1]
+
+    def test_cancelled_follower_does_not_cancel_leader(self):
+        flight = SingleFlight("test", window=0)
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do("k", load))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("k", load))
+            await asyncio.sleep(0)
+            follower.cancel()
+            return await leader
+
+        assert asyncio.run(run()) == "ok"
+
+    def test_cancelled_leader_hands_the_call_to_a_follower(self):
+        flight = SingleFlight("test", window=0)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return len(calls)
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do("k", load))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(flight.do("k", load)) for _ in range(2)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+
+        assert asyncio.run(run()) == [2, 2]
+        assert calls == [1, 1]
+        assert flight.stats()["errors"] == 0
+
+
+class TestWindowSetting:
+    """Test SINGLE_FLIGHT_WINDOW_MS parsing."""
+
+    def test_window_from_env(self):
+        with patch.dict('os.environ', {'SINGLE_FLIGHT_WINDOW_MS': '250'}):
+            assert default_window() == 0.25
+        with patch.dict('os.environ', {'SINGLE_FLIGHT_WINDOW_MS': 'later'}):
+            assert default_window() == 0.0
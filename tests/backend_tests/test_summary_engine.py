@@ -0,0 +1,105 @@
+"""
+Tests for the incremental summary engine.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+from services.summary_engine import PaymentFact, SummaryEngine, persist, verify
+
+
+def fact(client_id=1, period_type='quarterly', period=1, year=2024,
+         fee=100.0, assets=1000.0, expected=None):
+    return PaymentFact(client_id, period_type, period, year, fee, assets, expected)
+
+
+class TestQuarterRollup:
+    """Test quarter aggregates."""
+
+    def test_monthly_payments_roll_up_to_quarter(self):
+        engine = SummaryEngine.rebuild([
+            fact(period_type='monthly', period=4, fee=10.0, expected=12.0),
+            fact(period_type='monthly', period=5, fee=20.0, expected=12.0),
+            fact(period_type='monthly', period=6, fee=None, expected=12.0),
+        ])
+        row = engine.quarterly_row((1, 2024, 2))
+        assert row["payment_count"] == 3
+        assert row["total_payments"] == 30.0
+        assert row["avg_payment"] == 15.0
+        assert row["expected_total"] == 36.0
+
+    def test_quarterly_expected_is_max_and_survives_removal(self):
+        high = fact(expected=50.0)
+        engine = SummaryEngine.rebuild([fact(expected=40.0), high])
+        assert engine.quarterly_row((1, 2024, 1))["expected_total"] == 50.0
+
+        engine.remove(high)
+        assert engine.quarterly_row((1, 2024, 1))["expected_total"] == 40.0
+
+    def test_removing_last_payment_deletes_quarter(self):
+        payment = fact()
+        engine = SummaryEngine()
+        engine.add(payment)
+        engine.flush()
+        engine.remove(payment)
+
+        quarters, years = engine.flush()
+        assert quarters == {(1, 2024, 1): None}
+        assert years[(1, 2024)] is None
+
+
+class TestYearly:
+    """Test yearly rows and year-over-year growth."""
+
+    def test_yoy_growth(self):
+        engine = SummaryEngine.rebuild([
+            fact(year=2023, fee=100.0), fact(year=2023, period=2, fee=100.0),
+            fact(year=2024, fee=250.0),
+        ])
+        assert engine.yearly_row((1, 2023))["yoy_growth"] is None
+        assert engine.yearly_row((1, 2024))["yoy_growth"] == pytest.approx(25.0)
+
+    def test_change_marks_following_year_dirty(self):
+        engine = SummaryEngine.rebuild([fact(year=2024)])
+        engine.add(fact(year=2023))
+        _, years = engine.flush()
+        assert set(years) == {(1, 2023), (1, 2024)}
+        assert years[(1, 2024)]["yoy_growth"] == pytest.approx(0.0)
+
+    def test_update_moves_payment_between_periods(self):
+        old = fact(period=1)
+        new = fact(period=3, fee=150.0)
+        engine = SummaryEngine.rebuild([old])
+        engine.update(old, new)
+        assert engine.quarterly_row((1, 2024, 1)) is None
+        assert engine.yearly_row((1, 2024))["total_payments"] == 150.0
+
+
+class TestVerification:
+    """Incremental and rebuilt engines must agree."""
+
+    def test_synthetic_stream_matches_rebuild(self):
+        result = verify(clients=25, events=5000, seed=7)
+        assert result["mismatches"] == []
+        assert result["live_payments"] > 0
+
+    def test_persist_deletes_then_inserts(self):
+        cursor = MagicMock()
+        engine = SummaryEngine()
+        engine.add(fact())
+        quarters, years = engine.flush()
+        quarters[(1, 2020, 1)] = None
+
+        persist(cursor, quarters, years)
+
+        statements = [c[0][0] for c in cursor.executemany.call_args_list]
+        assert "DELETE FROM quarterly_summaries" in statements[0]
+        assert "INSERT INTO quarterly_summaries" in statements[1]
+        assert len(cursor.executemany.call_args_list[1][0][1]) == 1
+        assert "yearly_summaries" in statements[2]
@@ -0,0 +1,89 @@
+"""
+Tests for deferred summary maintenance.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+from unittest.mock import MagicMock
+
+from services.summary_maintenance import (
+    DEFERRED_MODE,
+    ENQUEUE_PAYMENT_BATCH_SQL,
+    TRIGGER_MODE,
+    enqueue_payment,
+    maintenance_mode,
+    run_summary_maintenance,
+    set_mode
+)
+
+
+class TestMaintenanceMode:
+    """Test reading the mode from the payment trigger's state."""
+
+    @pytest.mark.parametrize("disabled,mode", [(1, DEFERRED_MODE), (0, TRIGGER_MODE)])
+    def test_mode_from_trigger_state(self, disabled, mode):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (disabled,)
+        assert maintenance_mode(cursor) == mode
+        assert "sys.triggers" in cursor.execute.call_args[0][0]
+
+
+class TestEnqueue:
+    """Test write-path enqueueing."""
+
+    def test_enqueue_is_guarded_by_trigger_state(self):
+        cursor = MagicMock()
+        enqueue_payment(cursor, 5)
+        sql, params = cursor.execute.call_args[0]
+        assert "INSERT INTO summary_dirty_keys" in sql
+        assert "is_disabled = 1" in sql
+        assert params == [5]
+
+    def test_batch_enqueue_is_guarded_by_trigger_state(self):
+        assert "is_disabled = 1" in ENQUEUE_PAYMENT_BATCH_SQL
+
+
+class TestRunSummaryMaintenance:
+    """Test the queue-draining job."""
+
+    def test_empty_queue_skips_refresh(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (0, 0, 0, 0)
+
+        stats = run_summary_maintenance(db)
+
+        assert stats["claimed_keys"] == 0
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert not any("MERGE" in s for s in statements)
+        assert "DROP TABLE #claimed" in statements[-1]
+
+    def test_refreshes_summaries_then_metrics(self, mock_db):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (12, 3, 2, 2)
+
+        stats = run_summary_maintenance(db)
+
+        assert stats["claimed_keys"] == 12
+        assert stats["quarters"] == 3
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        # The same procedure the payment trigger runs
+        assert "#dirty_quarters" in statements[1] and "EXEC refresh_summaries" in statements[1]
+        assert "client_metrics" in statements[2]
+
+    @pytest.mark.parametrize("mode,action", [(TRIGGER_MODE, "ENABLE"), (DEFERRED_MODE, "DISABLE")])
+    def test_switch_rebuilds_after_switching_triggers(self, mock_db, mode, action):
+        db, cursor = mock_db
+        cursor.fetchone.return_value = (0, 0, 0, 0)
+
+        set_mode(db, mode)
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        switched = [i for i, s in enumerate(statements) if s.startswith(f"{action} TRIGGER")]
+        assert len(switched) == 2
+        rebuild = next(i for i, s in enumerate(statements) if "INSERT INTO summary_dirty_keys" in s)
+        assert rebuild > switched[-1]
@@ -0,0 +1,108 @@
+"""
+Integration tests for the summary triggers, against the local SQL Server.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from services.bulk_payments import insert_payment_batch, validate_payment_batch
+
+pytestmark = pytest.mark.integration
+
+
+def make_client(cursor, schedule='quarterly'):
+    """A client with an active flat-fee contract; returns (client_id, contract_id)."""
+    cursor.execute("INSERT INTO clients (display_name) OUTPUT INSERTED.client_id VALUES ('Trigger Test')")
+    client_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO contracts (client_id, provider_name, fee_type, flat_rate, payment_schedule)
+        OUTPUT INSERTED.contract_id
+        VALUES (?, 'Test Provider', 'flat', 1000.0, ?)
+    """, [client_id, schedule])
+    return client_id, cursor.fetchone()[0]
+
+
+def payment(client_id, contract_id, actual_fee, period=2, period_type='quarterly'):
+    return {"contract_id": contract_id, "client_id": client_id, "received_date": "2024-05-15",
+            "total_assets": 500000.0, "actual_fee": actual_fee, "applied_period_type": period_type,
+            "applied_period": period, "applied_year": 2024}
+
+
+def quarter_row(cursor, client_id, quarter):
+    cursor.execute("""
+        SELECT total_payments, payment_count, avg_payment, expected_total
+        FROM quarterly_summaries WHERE client_id = ? AND year = 2024 AND quarter = ?
+    """, [client_id, quarter])
+    row = cursor.fetchone()
+    return tuple(row) if row else None
+
+
+class TestBulkInsertSummaries:
+    """A bulk insert counts each payment once in the summaries."""
+
+    def test_two_payments_same_quarter(self, live_connection):
+        cursor = live_connection.cursor()
+        client_id, contract_id = make_client(cursor)
+
+        insert_payment_batch(cursor, validate_payment_batch([
+            payment(client_id, contract_id, 400.0),
+            payment(client_id, contract_id, 600.0),
+        ]))
+
+        assert quarter_row(cursor, client_id, 2) == (1000.0, 2, 500.0, 1000.0)
+
+        cursor.execute("""
+            SELECT total_payments, payment_count FROM yearly_summaries
+            WHERE client_id = ? AND year = 2024
+        """, [client_id])
+        assert tuple(cursor.fetchone()) == (1000.0, 2)
+
+
+class TestSummaryDefinition:
+    """The trigger computes the figures refresh_summaries defines."""
+
+    def test_monthly_payments_roll_up_to_quarter(self, live_connection):
+        cursor = live_connection.cursor()
+        client_id, contract_id = make_client(cursor, schedule='monthly')
+
+        insert_payment_batch(cursor, validate_payment_batch([
+            payment(client_id, contract_id, 300.0, period=4, period_type='monthly'),
+            payment(client_id, contract_id, 500.0, period=5, period_type='monthly'),
+        ]))
+
+        # expected_total sums the monthly expected fees
+        assert quarter_row(cursor, client_id, 2) == (800.0, 2, 400.0, 2000.0)
+
+    def test_soft_delete_and_move_refresh_both_quarters(self, live_connection):
+        cursor = live_connection.cursor()
+        client_id, contract_id = make_client(cursor)
+        insert_payment_batch(cursor, validate_payment_batch([
+            payment(client_id, contract_id, 400.0),
+            payment(client_id, contract_id, 600.0),
+        ]))
+        cursor.execute("SELECT payment_id FROM payments WHERE client_id = ? ORDER BY actual_fee", [client_id])
+        small, large = [r[0] for r in cursor.fetchall()]
+
+        cursor.execute("UPDATE payments SET valid_to = GETDATE() WHERE payment_id = ?", [small])
+        assert quarter_row(cursor, client_id, 2) == (600.0, 1, 600.0, 1000.0)
+
+        cursor.execute("UPDATE payments SET applied_period = 3 WHERE payment_id = ?", [large])
+        assert quarter_row(cursor, client_id, 2) is None
+        assert quarter_row(cursor, client_id, 3) == (600.0, 1, 600.0, 1000.0)
+
+    def test_yoy_growth(self, live_connection):
+        cursor = live_connection.cursor()
+        client_id, contract_id = make_client(cursor)
+        previous = dict(payment(client_id, contract_id, 800.0), applied_year=2023, received_date="2023-05-15")
+        insert_payment_batch(cursor, validate_payment_batch([previous]))
+        insert_payment_batch(cursor, validate_payment_batch([payment(client_id, contract_id, 1000.0)]))
+
+        cursor.execute("""
+            SELECT year, yoy_growth FROM yearly_summaries WHERE client_id = ? ORDER BY year
+        """, [client_id])
+        assert [tuple(r) for r in cursor.fetchall()] == [(2023, None), (2024, 25.0)]
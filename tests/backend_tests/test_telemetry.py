@@ -0,0 +1,107 @@
+"""
+Tests for structured telemetry events and sampling.
+"""
+import os
+import sys
+
+import pytest
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+import json
+import logging
+from unittest.mock import patch
+
+from utils import telemetry
+from utils.telemetry import Sampler
+
+
+class RecordingHandler(logging.Handler):
+    """Keeps records without formatting them."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def handler():
+    handler = RecordingHandler()
+    log = telemetry.logger
+    saved = log.handlers, log.level, log.propagate
+    # setLevel rather than assigning level, so isEnabledFor's cache is cleared
+    log.handlers, log.propagate = [handler], False
+    log.setLevel(logging.INFO)
+    yield handler
+    log.handlers, _, log.propagate = saved
+    log.setLevel(saved[1])
+    telemetry.set_sampler(None)
+
+
+class TestSampler:
+    """Test sampling configuration."""
+
+    def test_from_env(self):
+        env = {'TELEMETRY_SAMPLE_RATE': '0.5', 'TELEMETRY_ROUTE_SAMPLING': 'dashboard/portfolio=1; _metrics=0;bad=x'}
+        with patch.dict('os.environ', env):
+            sampler = Sampler.from_env()
+        assert sampler.rate('clients/{id?}') == 0.5
+        assert sampler.rate('dashboard/portfolio') == 1.0
+        assert sampler.rate('_metrics') == 0.0
+        assert 'bad' not in sampler.routes
+
+    def test_sample_uses_rate(self):
+        sampler = Sampler(0.25, {'always': 1.0, 'never': 0.0}, rng=lambda: 0.5)
+        assert sampler.sample('always')
+        assert not sampler.sample('never')
+        assert not sampler.sample('other')
+
+
+class TestEmit:
+    """Test event emission."""
+
+    def test_event_fields_and_scope(self, handler):
+        with telemetry.request_scope("clients/{id?}", invocation_id="abc"):
+            telemetry.emit("cache.lookup", hit=True)
+
+        record = handler.records[0]
+        assert record.custom_dimensions == {
+            "event": "cache.lookup", "route": "clients/{id?}", "invocation_id": "abc", "hit": True}
+        name, _, body = record.getMessage().partition(' ')
+        assert name == "cache.lookup"
+        assert json.loads(body)["hit"] is True
+
+    def test_sampled_out_requests_drop_info_but_keep_errors(self, handler):
+        telemetry.set_sampler(Sampler(0.0))
+        with telemetry.request_scope("payments/{id?}"):
+            assert not telemetry.enabled()
+            telemetry.emit("request.completed", status=200)
+            telemetry.emit("request.completed", level=logging.ERROR, status=500)
+
+        assert [r.custom_dimensions["status"] for r in handler.records] == [500]
+
+    def test_message_is_formatted_lazily(self):
+        handler = RecordingHandler()
+        log = logging.getLogger("test_telemetry.lazy")
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        calls = []
+
+        class Field:
+            def __str__(self):
+                calls.append(1)
+                return "field"
+
+        telemetry.emit("lazy", log=log, value=Field())
+        assert calls == []
+        assert handler.records[0].getMessage() == 'lazy {"value":"field"}'
+        assert calls == [1]
+
+    def test_disabled_level_is_skipped(self, handler):
+        telemetry.emit("debug.only", level=logging.DEBUG, rows=1)
+        assert handler.records == []
@@ -0,0 +1,84 @@
+"""
+Throughput benchmark for the bulk payment import.
+
+Measures validation and set-based insert throughput for 1k and 10k row
+batches. Inserts run against the configured database inside a transaction
+that is rolled back, so no data is left behind.
+
+Usage:
+    python tests/benchmarks/bench_bulk_payments.py --client-id 1 --contract-id 1
+    python tests/benchmarks/bench_bulk_payments.py --validate-only
+"""
+import argparse
+import os
+import sys
+import time
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from services.bulk_payments import validate_payment_batch, insert_payment_batch
+
+
+def make_batch(size, client_id, contract_id):
+    """Generate ``size`` synthetic monthly payments."""
+    return [
+        {
+            "contract_id": contract_id,
+            "client_id": client_id,
+            "received_date": f"{2000 + i // 12 % 100}-{i % 12 + 1:02d}-15",
+            "total_assets": 500000.00 + i,
+            "actual_fee": 1250.00,
+            "method": "Auto - ACH",
+            "applied_period_type": "monthly",
+            "applied_period": i % 12 + 1,
+            "applied_year": 2000 + i // 12 % 100
+        }
+        for i in range(size)
+    ]
+
+
+def bench(size, client_id, contract_id, validate_only):
+    """Time one batch and print rows/second for each phase."""
+    items = make_batch(size, client_id, contract_id)
+
+    start = time.perf_counter()
+    payments = validate_payment_batch(items)
+    validate_s = time.perf_counter() - start
+    print(f"{size:>6} rows  validate {validate_s * 1000:8.1f} ms  "
+          f"({size / validate_s:,.0f} rows/s)")
+
+    if validate_only:
+        return
+
+    from database.database import get_db
+    db = get_db()
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        ids = insert_payment_batch(cursor, payments)
+        insert_s = time.perf_counter() - start
+        conn.rollback()
+
+    print(f"{size:>6} rows  insert   {insert_s * 1000:8.1f} ms  "
+          f"({len(ids) / insert_s:,.0f} rows/s, rolled back)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='1000,10000', help='Comma-separated batch sizes')
+    parser.add_argument('--client-id', type=int, default=1)
+    parser.add_argument('--contract-id', type=int, default=1)
+    parser.add_argument('--validate-only', action='store_true',
+                        help='Skip the database insert phase')
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        bench(size, args.client_id, args.contract_id, args.validate_only)
+
+
+if __name__ == "__main__":
+    main()
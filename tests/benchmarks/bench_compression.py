@@ -0,0 +1,152 @@
+"""
+CPU cost against bytes saved for response compression.
+
+Builds realistic JSON bodies (a contracts list with notes, a client's
+payment history, a dashboard and a small single-row response), then times
+gzip and brotli at several levels on each and reports compressed size,
+ratio and microseconds per response. Use it to pick
+COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY and
+COMPRESSION_MIN_BYTES; the defaults are marked with *.
+
+Brotli rows are skipped when the brotli package is not installed.
+
+Usage:
+    python tests/benchmarks/bench_compression.py
+    python tests/benchmarks/bench_compression.py -n 200 --only payments
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from utils import compression
+
+PROVIDERS = ["Ascensus", "John Hancock", "Voya", "Empower", "Principal", "Capital Group"]
+NOTES = [
+    "Fee billed quarterly in arrears on average AUM.",
+    "Client requested paper statements; mail to home address.",
+    "Rate reduced from 0.0025 after 2023 review. See IMA amendment in OneDrive.",
+    "",
+    None,
+]
+
+
+def contracts_payload(rng, count=300):
+    return [
+        {
+            "contract_id": i,
+            "client_id": i,
+            "contract_number": f"{rng.randint(100000, 999999)}-{rng.randint(10, 99)}",
+            "provider_name": rng.choice(PROVIDERS),
+            "contract_start_date": f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-01",
+            "fee_type": rng.choice(["percentage", "flat"]),
+            "percent_rate": round(rng.uniform(0.0005, 0.003), 6),
+            "flat_rate": rng.choice([None, 666.66, 1250.0, 3000.0]),
+            "payment_schedule": rng.choice(["monthly", "quarterly"]),
+            "num_people": rng.randint(1, 400),
+            "notes": " ".join(n for n in rng.sample(NOTES[:3], 2)) if rng.random() < 0.7 else None,
+            "valid_from": "2024-01-01 00:00:00",
+            "valid_to": None,
+            "client_name": f"Client {i} 401(k) Plan",
+        }
+        for i in range(count)
+    ]
+
+
+def payments_payload(rng, count=120):
+    return [
+        {
+            "payment_id": 10000 + i,
+            "contract_id": 42,
+            "client_id": 7,
+            "received_date": f"20{14 + i // 12}-{i % 12 + 1:02d}-15",
+            "total_assets": round(rng.uniform(200000, 5000000), 2),
+            "expected_fee": round(rng.uniform(100, 5000), 2),
+            "actual_fee": round(rng.uniform(100, 5000), 2),
+            "method": rng.choice(["Auto - ACH", "Check", "Wire"]),
+            "notes": rng.choice(NOTES),
+            "applied_period_type": "monthly",
+            "applied_period": i % 12 + 1,
+            "applied_year": 2014 + i // 12,
+            "valid_from": "2024-01-01 00:00:00",
+            "valid_to": None,
+            "client_name": "Client 7 401(k) Plan",
+            "provider_name": "Voya",
+            "fee_type": "percentage",
+            "percent_rate": 0.00125,
+            "flat_rate": None,
+            "payment_schedule": "monthly",
+            "has_files": rng.randint(0, 1),
+        }
+        for i in range(count)
+    ]
+
+
+def dashboard_payload(rng):
+    return {
+        "client": {"client_id": 7, "display_name": "Client 7 401(k) Plan", "full_name": "Client Seven Inc."},
+        "contract": contracts_payload(rng, 1)[0],
+        "payment_status": {"status": "Due", "current_period": 9, "current_year": 2025},
+        "compliance": {"status": "green", "reason": "Current period paid"},
+        "recent_payments": payments_payload(rng, 10),
+        "metrics": {"total_ytd_payments": 12345.67, "avg_quarterly_payment": 4115.22},
+    }
+
+
+def payloads(rng):
+    return {
+        "contracts": json.dumps(contracts_payload(rng), default=str).encode(),
+        "payments": json.dumps(payments_payload(rng), default=str).encode(),
+        "dashboard": json.dumps(dashboard_payload(rng), default=str).encode(),
+        "single": json.dumps(payments_payload(rng, 1)[0], default=str).encode(),
+    }
+
+
+def codecs():
+    cases = [("gzip", level, lambda body, level=level: gzip.compress(body, compresslevel=level))
+             for level in (1, 4, 6, 9)]
+    if compression.brotli is not None:
+        brotli = compression.brotli
+        cases += [("br", quality, lambda body, quality=quality: brotli.compress(body, quality=quality))
+                  for quality in (1, 4, 6, 11)]
+    return cases
+
+
+def time_codec(compress, body, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        out = compress(body)
+    return (time.perf_counter() - start) / count * 1e6, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure compression CPU cost against bytes saved")
+    parser.add_argument('-n', type=int, default=100, help='Compressions per payload and level')
+    parser.add_argument('--only', help='Only this payload (contracts, payments, dashboard, single)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    defaults = {("gzip", compression.DEFAULT_GZIP_LEVEL), ("br", compression.DEFAULT_BROTLI_QUALITY)}
+    for name, body in payloads(random.Random(args.seed)).items():
+        if args.only and name != args.only:
+            continue
+        note = " (below threshold, sent as is)" if len(body) < compression.DEFAULT_MIN_BYTES else ""
+        print(f"\n{name}: {len(body):,} bytes{note}")
+        print(f"  {'codec':>8} {'bytes':>9} {'ratio':>6} {'saved':>9} {'us/resp':>9} {'MB/s':>7}")
+        for codec, level, compress in codecs():
+            us, size = time_codec(compress, body, args.n)
+            mark = "*" if (codec, level) in defaults else " "
+            print(f"  {codec:>5}-{level:<2}{mark}{size:>9,} {len(body) / size:6.1f} "
+                  f"{len(body) - size:>9,} {us:9.1f} {len(body) / us:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Fee engine throughput: the NumPy array path against the scalar path.
+
+Builds a synthetic payment history (default 1M rows: a mix of flat and
+percentage contracts with some missing inputs), computes expected fees
+and variances with both paths, checks they agree and reports rows per
+second. The scalar path runs on a sample and is extrapolated.
+
+Measured on one vCPU with NumPy 2.4 at 1M rows: expected fees take about
+70 ms on the array path (14M rows/s) against 0.9 s scalar; variances
+about 90 ms (11M rows/s) against 4.6 s scalar, most of which is
+formatting each row's display message.
+
+Usage:
+    python tests/benchmarks/bench_fees.py
+    python tests/benchmarks/bench_fees.py --rows 100000 --scalar-sample 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+import numpy as np
+
+from services import fees
+
+
+def history(rows, seed):
+    """Columns of a synthetic payment history."""
+    rng = np.random.default_rng(seed)
+    fee_types = rng.choice(np.array(['percentage', 'flat', None], dtype=object), rows, p=[0.6, 0.38, 0.02])
+    flat_rates = np.where(fee_types == 'flat', rng.choice([666.66, 1250.0, 3000.0], rows), np.nan)
+    percent_rates = np.where(fee_types == 'percentage', np.round(rng.uniform(0.0001, 0.003, rows), 6), np.nan)
+    assets = np.round(rng.uniform(2e5, 2e7, rows), 2)
+    assets[rng.random(rows) < 0.05] = np.nan
+    return fee_types, flat_rates, percent_rates, assets
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure fee engine throughput")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--scalar-sample', type=int, default=200_000,
+                        help='Rows timed on the scalar path (extrapolated to --rows)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fee_types, flat_rates, percent_rates, assets = history(args.rows, args.seed)
+    codes = fees.fee_type_codes(fee_types)
+    noise = np.random.default_rng(args.seed + 1).normal(1.0, 0.08, args.rows)
+
+    expected, vector_s = timed(fees.expected_fees, codes, flat_rates, percent_rates, assets)
+    actual = np.round(expected * noise, 2)
+    (_, _, statuses), variance_s = timed(fees.variances, actual, expected)
+
+    sample = random.Random(args.seed).sample(range(args.rows), min(args.scalar_sample, args.rows))
+    rows = [(fee_types[i], *fees.to_optional(np.array([flat_rates[i], percent_rates[i], assets[i]])))
+            for i in sample]
+    scalar_fees, scalar_s = timed(lambda: [fees.expected_fee(*row) for row in rows])
+    pairs = [(None if np.isnan(actual[i]) else float(actual[i]), fee) for i, fee in zip(sample, scalar_fees)]
+    scalar_variances, scalar_var_s = timed(lambda: [fees.variance(a, e) for a, e in pairs])
+
+    vector_sample = fees.to_optional(expected[sample])
+    mismatches = sum(a != b for a, b in zip(vector_sample, scalar_fees))
+    mismatches += sum(fees.VARIANCE_STATUSES[statuses[i]] != v["status"]
+                      for i, v in zip(sample, scalar_variances))
+
+    scale = args.rows / len(sample)
+    print(f"{args.rows:,} rows ({len(sample):,} on the scalar path, extrapolated)")
+    print(f"  {'':<14} {'array ms':>9} {'rows/s':>12} {'scalar ms':>10} {'speedup':>8}")
+    for name, array_s, one_s in (("expected fee", vector_s, scalar_s), ("variance", variance_s, scalar_var_s)):
+        print(f"  {name:<14} {array_s * 1000:9.1f} {args.rows / array_s:12,.0f} "
+              f"{one_s * scale * 1000:10.1f} {one_s * scale / array_s:7.1f}x")
+    print("parity: OK" if not mismatches else f"parity: {mismatches} mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+In-process benchmark of the Azure Function handlers.
+
+Calls each endpoint's ``main`` coroutine with synthetic HttpRequest objects
+against the configured database (normally the seeded local SQL Server, see
+api/database/local_db.py) and reports latency percentiles, throughput,
+database time, queries and connections per request (from the database
+request trace), and peak RSS. Only read requests are issued, so the
+database is left unchanged.
+
+Usage:
+    python tests/benchmarks/bench_handlers.py -n 500 -c 8
+    python tests/benchmarks/bench_handlers.py --only dashboard --save-baseline baseline.json
+    python tests/benchmarks/bench_handlers.py --compare baseline.json --tolerance 0.2
+
+No baseline is committed, since numbers depend on the machine and the seeded
+data: save one with --save-baseline on the machine you compare on.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+import azure.functions as func
+
+from database.instrumentation import trace_request
+
+# ----------------------------------------------------------------------------
+# Handlers and scenarios
+# ----------------------------------------------------------------------------
+
+def load_handler(folder):
+    """Import api/<folder>/__init__.py and return its main coroutine."""
+    path = os.path.join(api_dir, folder, '__init__.py')
+    spec = importlib.util.spec_from_file_location(f"bench_{folder.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.main
+
+
+def make_request(method, route, route_params=None, params=None, body=None):
+    return func.HttpRequest(
+        method=method,
+        url=f"http://localhost/api/{route}",
+        headers={'Content-Type': 'application/json'},
+        params=params or {},
+        route_params=route_params or {},
+        body=json.dumps(body).encode() if body is not None else b'',
+    )
+
+
+def sample_ids(limit=200):
+    """Active client/contract pairs to spread requests across."""
+    from database.database import get_db
+    with get_db().cursor(commit=False) as cursor:
+        cursor.execute(f"""
+            SELECT TOP {int(limit)} c.client_id, co.contract_id
+            FROM clients c
+            JOIN contracts co ON co.client_id = c.client_id AND co.valid_to IS NULL
+            WHERE c.valid_to IS NULL
+            ORDER BY NEWID()
+        """)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def build_scenarios(ids):
+    """name -> (handler folder, request factory taking the request number)."""
+    def pick(i):
+        return ids[i % len(ids)]
+
+    return {
+        'clients-list': ('clients', lambda i: make_request('GET', 'clients')),
+        'clients-get': ('clients', lambda i: make_request(
+            'GET', f'clients/{pick(i)[0]}', route_params={'id': str(pick(i)[0])})),
+        'contracts-get': ('contracts', lambda i: make_request(
+            'GET', f'contracts/{pick(i)[1]}', route_params={'id': str(pick(i)[1])})),
+        'contracts-by-client': ('contracts', lambda i: make_request(
+            'GET', f'contracts/client/{pick(i)[0]}', route_params={'client_id': str(pick(i)[0])})),
+        'payments-list': ('payments', lambda i: make_request(
+            'GET', 'payments', params={'client_id': str(pick(i)[0])})),
+        'dashboard': ('dashboard', lambda i: make_request(
+            'GET', f'dashboard/{pick(i)[0]}', route_params={'client_id': str(pick(i)[0])})),
+        'dashboard-portfolio': ('dashboard-portfolio', lambda i: make_request(
+            'GET', 'dashboard/portfolio')),
+        'periods': ('periods', lambda i: make_request(
+            'GET', 'periods', params={'client_id': str(pick(i)[0]), 'contract_id': str(pick(i)[1])})),
+        'calculations': ('calculations', lambda i: make_request(
+            'GET', 'calculations/variance', params={'actual_fee': '1010.50', 'expected_fee': '1000'})),
+    }
+
+
+# ----------------------------------------------------------------------------
+# Running
+# ----------------------------------------------------------------------------
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def invoke(handler, request):
+    """Run one request on the calling thread; returns (ms, status, trace)."""
+
+    async def traced():
+        with trace_request() as trace:
+            return await handler(request), trace
+
+    start = time.perf_counter()
+    response, trace = asyncio.run(traced())
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, response.status_code, trace
+
+
+def run_scenario(handler, factory, count, concurrency, warmup):
+    for i in range(warmup):
+        invoke(handler, factory(i))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: invoke(handler, factory(i)), range(count)))
+    wall = time.perf_counter() - start
+
+    latencies = [r[0] for r in results]
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput_rps": round(count / wall, 1),
+        "db_ms_p50": round(statistics.median(r[2].db_ms for r in results), 2),
+        "queries_per_request": round(statistics.mean(r[2].query_count for r in results), 2),
+        "connections_per_request": round(statistics.mean(r[2].connections for r in results), 2),
+        "errors": sum(1 for r in results if r[1] >= 500),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Scenarios whose p95 or queries per request regressed past the baseline."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(f"{name}: queries/request {previous['queries_per_request']} -> "
+                               f"{current['queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Azure Function handlers in-process")
+    parser.add_argument('-n', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='Scenario names to run')
+    parser.add_argument('--save-baseline', help='Write results as JSON to this path')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 regression (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # Checked before the run so a missing baseline does not waste it
+    baseline = None
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"Baseline {args.compare} not found; create it first with --save-baseline {args.compare}")
+            raise SystemExit(2)
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    ids = sample_ids()
+    if not ids:
+        print("No active clients with contracts; seed the database first")
+        raise SystemExit(1)
+
+    scenarios = build_scenarios(ids)
+    selected = args.only or list(scenarios)
+    handlers = {}
+    results = {"config": {"requests": args.n, "concurrency": args.concurrency}, "scenarios": {}}
+
+    for name in selected:
+        folder, factory = scenarios[name]
+        handler = handlers.setdefault(folder, load_handler(folder))
+        stats = run_scenario(handler, factory, args.n, args.concurrency, args.warmup)
+        results["scenarios"][name] = stats
+        print(f"{name:>20}: p50 {stats['p50_ms']:8.2f}  p95 {stats['p95_ms']:8.2f}  "
+              f"p99 {stats['p99_ms']:8.2f} ms  {stats['throughput_rps']:7.1f} req/s  "
+              f"{stats['queries_per_request']:5.2f} q/req  {stats['errors']} errors")
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"peak RSS: {results['peak_rss_mb']} MB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("  REGRESSION", regression)
+        if regressions:
+            raise SystemExit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Dashboard payment status: client_payment_status view vs the Python index.
+
+Times the per-request view query the dashboard used to run against
+client_status() backed by the cached period clock and latest-payment
+index, for the same clients, and reports any parity mismatches.
+
+Usage:
+    python tests/benchmarks/bench_payment_status.py -n 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from services.payment_status import StatusIndex, client_status, verify
+
+VIEW_CLIENT_SQL = """
+    SELECT client_id, payment_schedule, applied_period, applied_year,
+           current_period, current_year, expected_fee, payment_status
+    FROM client_payment_status
+    WHERE client_id = ?
+"""
+
+CLIENT_SQL = """
+    SELECT c.client_id, c.display_name, ct.payment_schedule, ct.fee_type, ct.flat_rate,
+           ct.percent_rate, cm.last_payment_date, cm.last_payment_amount, cm.last_recorded_assets
+    FROM clients c
+    JOIN contracts ct ON c.client_id = ct.client_id AND ct.valid_to IS NULL
+    LEFT JOIN client_metrics cm ON c.client_id = cm.client_id
+    WHERE c.valid_to IS NULL
+"""
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(f"{label:>6}: p50 {statistics.median(samples):8.3f} ms  "
+          f"p95 {percentile(samples, 95):8.3f} ms  (n={len(samples)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payment status view vs index latency")
+    parser.add_argument('-n', type=int, default=200, help='Lookups per mode')
+    args = parser.parse_args()
+
+    from database.database import get_db
+    db = get_db()
+
+    with db.cursor(commit=False) as cursor:
+        cursor.execute(CLIENT_SQL)
+        columns = [c[0] for c in cursor.description]
+        clients = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        if not clients:
+            print("No active clients")
+            return
+        picks = [clients[i % len(clients)] for i in range(args.n)]
+
+        view_samples = []
+        for client in picks:
+            start = time.perf_counter()
+            cursor.execute(VIEW_CLIENT_SQL, [client['client_id']])
+            cursor.fetchone()
+            view_samples.append((time.perf_counter() - start) * 1000)
+
+        index = StatusIndex()
+        index.load(cursor)
+        index_samples = []
+        for client in picks:
+            start = time.perf_counter()
+            client_status(cursor, client, index)
+            index_samples.append((time.perf_counter() - start) * 1000)
+
+    report('view', view_samples)
+    report('index', index_samples)
+
+    result = verify(db)
+    mismatches = result.pop("mismatches")
+    print(result)
+    print("parity OK" if not mismatches else f"{len(mismatches)} mismatches: {mismatches[:10]}")
+
+
+if __name__ == "__main__":
+    main()
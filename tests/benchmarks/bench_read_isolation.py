@@ -0,0 +1,164 @@
+"""
+Dashboard reads under concurrent payment writes, by read isolation level.
+
+Writer threads insert payments for a small set of hot clients, firing
+the client_metrics and summary triggers, and hold each transaction open
+for --hold-ms (standing in for trigger cascades over long histories)
+before rolling it back, so no data is left behind. Reader threads build
+those clients' dashboards with read-only cursors meanwhile. Each phase
+runs once per isolation level and reports read latency and the lock
+waits SQL Server recorded (sys.dm_os_wait_stats, server-wide), first
+under locking READ COMMITTED and then under snapshot.
+
+Run against the local SQL Server container (see database/local_db.py),
+seeded, with snapshot isolation allowed:
+    python -m database.isolation enable-snapshot   # from api/, if needed
+
+Usage:
+    python tests/benchmarks/bench_read_isolation.py
+    python tests/benchmarks/bench_read_isolation.py --writers 8 --readers 16 --seconds 20 --hold-ms 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import date
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from database.isolation import READ_COMMITTED, SNAPSHOT, database_settings
+from services.dashboard import build_dashboard
+from services.payment_status import StatusIndex
+
+HOT_CLIENTS_SQL = """
+    SELECT TOP (?) client_id, contract_id, payment_schedule
+    FROM contracts
+    WHERE valid_to IS NULL
+    ORDER BY client_id
+"""
+
+INSERT_PAYMENT_SQL = """
+    INSERT INTO payments (
+        contract_id, client_id, received_date, total_assets, expected_fee,
+        actual_fee, method, notes, applied_period_type, applied_period, applied_year
+    ) VALUES (?, ?, ?, ?, ?, ?, 'ACH', 'bench_read_isolation', ?, ?, ?)
+"""
+
+LOCK_WAITS_SQL = """
+    SELECT COALESCE(SUM(waiting_tasks_count), 0), COALESCE(SUM(wait_time_ms), 0)
+    FROM sys.dm_os_wait_stats
+    WHERE wait_type LIKE 'LCK_M_%'
+"""
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def lock_waits(db):
+    with db.cursor(commit=False, read_only=False) as cursor:
+        cursor.execute(LOCK_WAITS_SQL)
+        return tuple(cursor.fetchone())
+
+
+def write_loop(db, clients, deadline, hold, rng, counts):
+    year = date.today().year
+    while time.monotonic() < deadline:
+        client_id, contract_id, schedule = rng.choice(clients)
+        period_type = 'monthly' if schedule == 'monthly' else 'quarterly'
+        period = rng.randint(1, 12 if period_type == 'monthly' else 4)
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(INSERT_PAYMENT_SQL, [contract_id, client_id, date.today(), 500000.0,
+                                                1250.0, 1250.0, period_type, period, year])
+            time.sleep(hold)
+            conn.rollback()
+        counts.append(1)
+
+
+def read_loop(db, clients, deadline, rng, latencies):
+    index = StatusIndex()
+    while time.monotonic() < deadline:
+        client_id = rng.choice(clients)[0]
+        start = time.perf_counter()
+        with db.cursor(commit=False) as cursor:
+            build_dashboard(cursor, client_id, index)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run_phase(db, level, clients, args):
+    """Run writers and readers for args.seconds under one read isolation level."""
+    db.read_isolation = level
+    latencies, writes = [], []
+    deadline = time.monotonic() + args.seconds
+    waits_before = lock_waits(db)
+
+    threads = [threading.Thread(target=write_loop,
+                                args=(db, clients, deadline, args.hold_ms / 1000, random.Random(i), writes))
+               for i in range(args.writers)]
+    threads += [threading.Thread(target=read_loop,
+                                 args=(db, clients, deadline, random.Random(1000 + i), latencies))
+                for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    waits_after = lock_waits(db)
+    return {
+        "reads": len(latencies),
+        "writes": len(writes),
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "lock_waits": waits_after[0] - waits_before[0],
+        "lock_wait_ms": waits_after[1] - waits_before[1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard read latency under concurrent payment writes")
+    parser.add_argument('--clients', type=int, default=20, help='Hot clients written and read')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each phase')
+    parser.add_argument('--hold-ms', type=int, default=50, help='How long each write transaction stays open')
+    parser.add_argument('--levels', nargs='+', choices=[READ_COMMITTED, SNAPSHOT],
+                        default=[READ_COMMITTED, SNAPSHOT])
+    args = parser.parse_args()
+
+    from database.database import get_db
+    db = get_db()
+    if db.auth_mode != 'sql':
+        parser.error("Set SQL_AUTH=sql to point at a local SQL Server, not Azure SQL")
+
+    with db.cursor(commit=False, read_only=False) as cursor:
+        settings = database_settings(cursor)
+        cursor.execute(HOT_CLIENTS_SQL, [args.clients])
+        clients = [tuple(row) for row in cursor.fetchall()]
+    if not clients:
+        parser.error("No active contracts; seed the database first (python -m database.local_db seed)")
+    if SNAPSHOT in args.levels and settings["snapshot_isolation"] != 'ON':
+        parser.error("Snapshot isolation is not allowed; run python -m database.isolation enable-snapshot")
+
+    print(f"{len(clients)} hot clients, {args.writers} writers holding {args.hold_ms} ms, "
+          f"{args.readers} readers, {args.seconds:.0f} s per level")
+    print(f"  {'level':<15} {'reads':>7} {'writes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'lock waits':>11} {'wait ms':>9}")
+    for level in args.levels:
+        result = run_phase(db, level, clients, args)
+        print(f"  {level:<15} {result['reads']:7d} {result['writes']:7d} {result['p50']:8.1f} "
+              f"{result['p95']:8.1f} {result['p99']:8.1f} {result['max']:8.1f} "
+              f"{result['lock_waits']:11d} {result['lock_wait_ms']:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Write-path latency: trigger-maintained vs deferred summaries.
+
+Inserts payments one at a time for a client, the way POST /api/payments
+does, first with the summary triggers enabled and then with them disabled
+and the dirty key enqueued instead. Each mode runs in its own transaction
+that is rolled back (trigger DDL included), so the database is unchanged.
+
+Usage:
+    python tests/benchmarks/bench_summary_maintenance.py --client-id 1 --contract-id 1 -n 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from services.summary_maintenance import SUMMARY_TRIGGERS, ENQUEUE_PAYMENT_SQL
+
+INSERT_SQL = """
+    DECLARE @ids TABLE (payment_id INT);
+    INSERT INTO payments (
+        contract_id, client_id, received_date, total_assets,
+        expected_fee, actual_fee, method, notes,
+        applied_period_type, applied_period, applied_year
+    )
+    OUTPUT INSERTED.payment_id INTO @ids
+    VALUES (?, ?, ?, ?, NULL, ?, 'Benchmark', NULL, 'quarterly', ?, ?);
+    SELECT payment_id FROM @ids;
+"""
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_mode(db, deferred, client_id, contract_id, count):
+    """Insert ``count`` payments and return per-write latencies in ms."""
+    latencies = []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SET NOCOUNT ON")
+        if deferred:
+            for trigger, table in SUMMARY_TRIGGERS.items():
+                cursor.execute(f"DISABLE TRIGGER {trigger} ON {table}")
+
+        for i in range(count):
+            start = time.perf_counter()
+            cursor.execute(INSERT_SQL, [contract_id, client_id, '2099-01-15',
+                                        1000000.0, 2500.0, i % 4 + 1, 2099])
+            payment_id = cursor.fetchone()[0]
+            if deferred:
+                cursor.execute(ENQUEUE_PAYMENT_SQL, [payment_id])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        conn.rollback()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payment write latency by summary mode")
+    parser.add_argument('--client-id', type=int, default=1)
+    parser.add_argument('--contract-id', type=int, default=1)
+    parser.add_argument('-n', type=int, default=200, help='Writes per mode')
+    args = parser.parse_args()
+
+    from database.database import get_db
+    db = get_db()
+
+    for label, deferred in (('trigger', False), ('deferred', True)):
+        samples = run_mode(db, deferred, args.client_id, args.contract_id, args.n)
+        print(f"{label:>8}: p50 {statistics.median(samples):7.2f} ms  "
+              f"p95 {percentile(samples, 95):7.2f} ms  "
+              f"max {max(samples):7.2f} ms  (n={len(samples)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Overhead of the structured telemetry events.
+
+Times the per-request ``request.completed`` event the middleware emits
+(with a trace of ten statements) when the request is sampled out, when it
+is sampled in and the record is formatted, and when the telemetry logger
+is disabled, and fails if any case costs more than the budget.
+
+Usage:
+    python tests/benchmarks/bench_telemetry.py
+    python tests/benchmarks/bench_telemetry.py -n 200000 --budget-us 100
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(test_dir))
+api_dir = os.path.join(root_dir, 'api')
+sys.path.insert(0, api_dir)
+
+from database.instrumentation import StatementTiming, trace_request
+from utils import telemetry
+from utils.telemetry import Sampler
+
+
+def request_event(trace):
+    """The middleware's request.completed event for a finished request."""
+    if telemetry.enabled():
+        telemetry.emit(
+            "request.completed",
+            method="GET",
+            status=200,
+            client_id="42",
+            duration_ms=12.345,
+            db_ms=round(trace.db_ms, 3),
+            serialize_ms=0.5,
+            connections=trace.connections,
+            db_errors=trace.errors,
+            query_count=trace.query_count,
+            queries=[{"name": s.name, "ms": round(s.total_ms, 3), "rows": s.rows}
+                     for s in trace.statements],
+        )
+
+
+def time_case(count, sample_rate, level):
+    telemetry.set_sampler(Sampler(sample_rate))
+    telemetry.logger.setLevel(level)
+    with trace_request("bench") as trace:
+        trace.statements = [StatementTiming(f"bench.query_{i}", 1.5) for i in range(10)]
+        start = time.perf_counter()
+        for i in range(count):
+            with telemetry.request_scope("bench", invocation_id="00000000-0000-0000-0000-000000000000"):
+                request_event(trace)
+        elapsed = time.perf_counter() - start
+    return elapsed / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure telemetry overhead per request")
+    parser.add_argument('-n', type=int, default=50000, help='Events per case')
+    parser.add_argument('--budget-us', type=float, default=250.0, help='Allowed microseconds per request')
+    args = parser.parse_args()
+
+    # Format every record into memory, as an exporter would
+    handler = logging.StreamHandler(io.StringIO())
+    telemetry.logger.addHandler(handler)
+    telemetry.logger.propagate = False
+
+    cases = {
+        "sampled out": (0.0, logging.INFO),
+        "sampled in": (1.0, logging.INFO),
+        "logger disabled": (1.0, logging.WARNING),
+    }
+    failures = []
+    for name, (rate, level) in cases.items():
+        per_request = time_case(args.n, rate, level)
+        print(f"{name:>16}: {per_request:7.2f} us/request")
+        if per_request > args.budget_us:
+            failures.append(name)
+
+    if failures:
+        print(f"Over the {args.budget_us} us budget: {', '.join(failures)}")
+        raise SystemExit(1)
+    print(f"All cases within {args.budget_us} us/request")
+
+
+if __name__ == "__main__":
+    main()